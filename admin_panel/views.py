@@ -2,11 +2,11 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
 from django.contrib import messages
-from django.db.models import Count
-from django.utils import timezone
-from datetime import timedelta
 from functools import wraps
 from data_ingestion.models import Station, Reading
+from station_data.caching import get_or_compute
+from station_data.pagination import PaginationError, paginate_readings
+from station_data.stats import annotate_reading_counts, reading_totals
 from apps.core.accounts.models import User
 from django_celery_beat.models import PeriodicTask, IntervalSchedule, CrontabSchedule
 import json
@@ -31,33 +31,29 @@ def admin_logout(request):
     return redirect('/login/')
 
 
+def _dashboard_data():
+    """儀表板中只隨 Reading / Station 變動的統計（依全系統數據版本快取）"""
+    # 數據筆數讀取計數器，近 7 天以當地日期計
+    totals = reading_totals()
+
+    return {
+        'total_stations': Station.objects.count(),
+        'total_readings': totals['total'],
+        'recent_readings': totals['recent'],
+        # 測站數據統計
+        'station_stats': list(annotate_reading_counts(Station.objects.all()).order_by('-reading_count')[:5]),
+        # 最新數據
+        'latest_readings': list(Reading.objects.select_related('station').order_by('-timestamp')[:10]),
+    }
+
+
 @staff_required
 def dashboard(request):
     """儀表板"""
     # 統計資料
-    total_stations = Station.objects.count()
-    total_readings = Reading.objects.count()
-    total_users = User.objects.count()
-
-    # 近7天的數據筆數
-    week_ago = timezone.now() - timedelta(days=7)
-    recent_readings = Reading.objects.filter(timestamp__gte=week_ago).count()
-
-    # 測站數據統計
-    station_stats = Station.objects.annotate(
-        reading_count=Count('readings')
-    ).order_by('-reading_count')[:5]
-
-    # 最新數據
-    latest_readings = Reading.objects.select_related('station').order_by('-timestamp')[:10]
-
     context = {
-        'total_stations': total_stations,
-        'total_readings': total_readings,
-        'total_users': total_users,
-        'recent_readings': recent_readings,
-        'station_stats': station_stats,
-        'latest_readings': latest_readings,
+        **get_or_compute('dashboard', _dashboard_data),
+        'total_users': User.objects.count(),
     }
 
     return render(request, 'admin_panel/dashboard.html', context)
@@ -66,9 +62,7 @@ def dashboard(request):
 @staff_required
 def station_list(request):
     """測站列表"""
-    stations = Station.objects.annotate(
-        reading_count=Count('readings')
-    ).order_by('-install_date')
+    stations = annotate_reading_counts(Station.objects.all()).order_by('-install_date')
 
     context = {
         'stations': stations,
@@ -148,11 +142,16 @@ def station_delete(request, pk):
 
 @staff_required
 def reading_list(request):
-    """數據記錄列表"""
-    readings = Reading.objects.select_related('station').order_by('-timestamp')[:100]
+    """數據記錄列表（每頁 100 筆，keyset 分頁）"""
+    readings = Reading.objects.select_related('station')
+    try:
+        page = paginate_readings(readings, request.GET.get('cursor'))
+    except PaginationError:
+        page = paginate_readings(readings)
 
     context = {
-        'readings': readings,
+        'readings': page.items,
+        'page': page,
     }
 
     return render(request, 'admin_panel/reading_list.html', context)
@@ -256,6 +255,8 @@ def periodic_task_create(request):
         ('station_data.tasks.check_ocean_data_alerts', '檢查數據異常'),
         ('station_data.tasks.generate_daily_statistics', '產生每日統計報告'),
         ('station_data.tasks.send_data_alert_notification', '發送數據異常通知'),
+        ('station_data.tasks.archive_old_readings', '封存過期數據'),
+        ('station_data.tasks.reconcile_reading_counts', '核對數據筆數'),
     ]
 
     context = {
@@ -330,6 +331,8 @@ def periodic_task_edit(request, pk):
         ('station_data.tasks.check_ocean_data_alerts', '檢查數據異常'),
         ('station_data.tasks.generate_daily_statistics', '產生每日統計報告'),
         ('station_data.tasks.send_data_alert_notification', '發送數據異常通知'),
+        ('station_data.tasks.archive_old_readings', '封存過期數據'),
+        ('station_data.tasks.reconcile_reading_counts', '核對數據筆數'),
     ]
 
     # 判斷當前排程類型
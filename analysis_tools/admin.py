@@ -0,0 +1,18 @@
+from django.contrib import admin
+from .models import Anomaly, AnomalyBaseline
+
+
+@admin.register(AnomalyBaseline)
+class AnomalyBaselineAdmin(admin.ModelAdmin):
+    list_display = ('station', 'field', 'count', 'mean', 'variance', 'last_timestamp', 'updated_at')
+    list_filter = ('field',)
+    list_select_related = ('station',)
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(Anomaly)
+class AnomalyAdmin(admin.ModelAdmin):
+    list_display = ('timestamp', 'station', 'field', 'value', 'expected', 'zscore')
+    list_filter = ('field',)
+    list_select_related = ('station',)
+    date_hierarchy = 'timestamp'
@@ -0,0 +1,425 @@
+"""
+各測站、各參數的線上異常偵測（EWMA / z-score）
+
+每個 (測站, 參數) 只保存固定大小的狀態（AnomalyBaseline）：
+
+    d = x - mean                    # 與加權平均的差
+    e = d - seasonal[hour]          # 扣除日週期偏移後的殘差
+    z = e / sqrt(variance)          # 以更新前的狀態計算
+    mean     += alpha * d
+    seasonal[hour] += seasonal_alpha * (d - seasonal[hour])
+    variance  = (1 - alpha) * (variance + alpha * e²)
+
+每筆數據 O(1)；同一個測站的基準只由該測站的數據決定，
+因此 27°C 在溫暖海域的測站正常，在較冷的測站則會被標記。
+hour 以 UTC 小時分組（只用來區分日週期，與時區無關）。
+
+- 寫入時：readings_ingested 接收器呼叫 detect_anomalies()，逐筆（大批時向量化）更新並寫入 Anomaly
+- 歷史回填：backfill_baselines() 以 NumPy 一次處理整段歷史（含封存檔），
+  各遞迴式都是一階線性濾波，可分塊以 cumsum 向量化，結果與逐筆更新相同
+"""
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from data_ingestion.columns import ReadingColumns
+from .chart_helpers import CHART_FIELDS, reading_columns
+from .models import Anomaly, AnomalyBaseline
+
+ANOMALY_FIELDS = CHART_FIELDS
+
+HOURS = 24
+
+DEFAULT_BACKFILL_CHUNK_SIZE = 50000
+
+# 寫入時同一測站的筆數達此值即改用向量化更新
+VECTORIZE_MIN_ROWS = 64
+
+BASELINE_UPDATE_FIELDS = ['count', 'mean', 'variance', 'seasonal', 'last_timestamp', 'updated_at']
+
+
+def hour_of(seconds):
+    """UNIX 秒數對應的 UTC 小時（純量或陣列）"""
+    if isinstance(seconds, np.ndarray):
+        return np.floor_divide(seconds, 3600).astype(np.int64) % HOURS
+    return int(seconds // 3600) % HOURS
+
+
+def _block_size(decay):
+    # decay ** -block 不超過 1e150，避免分塊 cumsum 溢位
+    return max(1, min(4096, int(150 * math.log(10) / -math.log(decay))))
+
+
+def linear_filter(u, decay, gain, initial):
+    """
+    向量化的一階線性遞迴 y[t] = decay * y[t-1] + gain * u[t]（y[-1] = initial）
+
+    分塊後 y[t] = decay^(t+1) * (y_init + gain * Σ u[k] / decay^(k+1))，每塊一次 cumsum。
+    """
+    u = np.asarray(u, dtype=np.float64)
+    out = np.empty_like(u)
+    if not len(u):
+        return out
+    if decay <= 0:
+        out[:] = gain * u
+        return out
+    if decay >= 1:
+        out[:] = initial + gain * np.cumsum(u)
+        return out
+
+    block = _block_size(decay)
+    powers = decay ** np.arange(1, min(block, len(u)) + 1)
+    y = initial
+    for start in range(0, len(u), block):
+        chunk = u[start:start + block]
+        p = powers[:len(chunk)]
+        out[start:start + len(chunk)] = p * (y + gain * np.cumsum(chunk / p))
+        y = out[start + len(chunk) - 1]
+    return out
+
+
+def _shifted(series, initial):
+    """更新前的狀態序列：[initial, series[0], ..., series[-2]]"""
+    previous = np.empty_like(series)
+    if len(series):
+        previous[0] = initial
+        previous[1:] = series[:-1]
+    return previous
+
+
+@dataclass
+class EwmaState:
+    """單一 (測站, 參數) 的線上狀態；last_timestamp 為 UNIX 秒數"""
+    count: int = 0
+    mean: float = 0.0
+    variance: float = 0.0
+    seasonal: list = field(default_factory=lambda: [0.0] * HOURS)
+    last_timestamp: float | None = None
+
+    @classmethod
+    def from_baseline(cls, baseline):
+        return cls(
+            count=baseline.count,
+            mean=baseline.mean,
+            variance=baseline.variance,
+            seasonal=list(baseline.seasonal) if len(baseline.seasonal or ()) == HOURS else [0.0] * HOURS,
+            last_timestamp=baseline.last_timestamp.timestamp() if baseline.last_timestamp else None,
+        )
+
+    def apply_to(self, baseline):
+        baseline.count = self.count
+        baseline.mean = self.mean
+        baseline.variance = self.variance
+        baseline.seasonal = [float(value) for value in self.seasonal]
+        baseline.last_timestamp = (
+            datetime.fromtimestamp(self.last_timestamp, tz=dt_timezone.utc)
+            if self.last_timestamp is not None else None
+        )
+        return baseline
+
+
+class EwmaDetector:
+    """
+    EWMA / z-score 偵測器（參數預設取自 settings.ANOMALY_*）
+
+    update() 逐筆更新（寫入時使用），run() 向量化處理一段時間序列（回填使用），
+    兩者對同一串數據產生相同的狀態與 z-score。
+    """
+
+    def __init__(self, alpha=None, seasonal_alpha=None, threshold=None, warmup=None):
+        self.alpha = settings.ANOMALY_EWMA_ALPHA if alpha is None else alpha
+        self.seasonal_alpha = settings.ANOMALY_SEASONAL_ALPHA if seasonal_alpha is None else seasonal_alpha
+        self.threshold = settings.ANOMALY_Z_THRESHOLD if threshold is None else threshold
+        self.warmup = settings.ANOMALY_WARMUP if warmup is None else warmup
+
+    def update(self, state, value, seconds):
+        """
+        以一筆數據更新狀態
+
+        Returns:
+            (z-score, 預期值)；暖機期間 z-score 為 None。
+            時間不晚於上一筆（重複或亂序）時不更新，回傳 None
+        """
+        if state.last_timestamp is not None and seconds <= state.last_timestamp:
+            return None
+        hour = hour_of(seconds)
+        if not state.count:
+            state.mean = value
+        d = value - state.mean
+        e = d - state.seasonal[hour]
+        expected = state.mean + state.seasonal[hour]
+        z = e / math.sqrt(state.variance) if state.count >= self.warmup and state.variance > 0 else None
+
+        state.mean += self.alpha * d
+        if self.seasonal_alpha:
+            state.seasonal[hour] += self.seasonal_alpha * (d - state.seasonal[hour])
+        state.variance = (1 - self.alpha) * (state.variance + self.alpha * e * e)
+        state.count += 1
+        state.last_timestamp = seconds
+        return z, expected
+
+    def run(self, state, x, values):
+        """
+        向量化處理一段依時間排序的數據（可分段連續呼叫）
+
+        Args:
+            state: EwmaState（就地更新）
+            x: UNIX 秒數（遞增）
+            values: 數值（NaN 為缺值，略過）
+
+        Returns:
+            (x, values, zscores, expected)：實際用於更新的數據；暖機期間 z-score 為 NaN
+        """
+        x = np.asarray(x, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        keep = ~np.isnan(values)
+        x, values = x[keep], values[keep]
+        # 與逐筆更新相同：略過時間不晚於上一筆的數據
+        previous = _shifted(x, -np.inf if state.last_timestamp is None else state.last_timestamp)
+        keep = x > previous
+        x, values = x[keep], values[keep]
+        n = len(values)
+        if not n:
+            return x, values, np.empty(0), np.empty(0)
+
+        alpha = self.alpha
+        initial_mean = values[0] if not state.count else state.mean
+        mean_prev = _shifted(linear_filter(values, 1 - alpha, alpha, initial_mean), initial_mean)
+        d = values - mean_prev
+
+        hours = hour_of(x)
+        seasonal = np.asarray(state.seasonal, dtype=np.float64)
+        if self.seasonal_alpha:
+            seasonal_prev = np.empty(n)
+            for hour in np.unique(hours):
+                index = np.flatnonzero(hours == hour)
+                series = linear_filter(d[index], 1 - self.seasonal_alpha, self.seasonal_alpha, seasonal[hour])
+                seasonal_prev[index] = _shifted(series, seasonal[hour])
+                seasonal[hour] = series[-1]
+        else:
+            seasonal_prev = seasonal[hours]
+        e = d - seasonal_prev
+
+        variance = linear_filter(e * e, 1 - alpha, (1 - alpha) * alpha, state.variance)
+        variance_prev = _shifted(variance, state.variance)
+        counts = state.count + np.arange(n)
+        scored = (counts >= self.warmup) & (variance_prev > 0)
+        zscores = np.full(n, np.nan)
+        zscores[scored] = e[scored] / np.sqrt(variance_prev[scored])
+
+        state.count += n
+        state.mean = float(mean_prev[-1] + alpha * d[-1])
+        state.variance = float(variance[-1])
+        state.seasonal = seasonal.tolist()
+        state.last_timestamp = float(x[-1])
+        return x, values, zscores, mean_prev + seasonal_prev
+
+    def is_anomaly(self, z):
+        return z is not None and abs(z) >= self.threshold
+
+
+# ==========================================
+# 寫入時偵測
+# ==========================================
+
+def _baseline_key(baseline):
+    return baseline.station_id, baseline.field
+
+
+def _update_one_by_one(group, states, detector, anomalies):
+    """逐筆更新（小批次）"""
+    for reading in group:
+        seconds = reading.timestamp.timestamp()
+        for name in ANOMALY_FIELDS:
+            value = getattr(reading, name)
+            if value is None:
+                continue
+            key = (reading.station_id, name)
+            state = states.get(key)
+            if state is None:
+                state = states[key] = EwmaState()
+            result = detector.update(state, float(value), seconds)
+            if result is not None and detector.is_anomaly(result[0]):
+                z, expected = result
+                anomalies.append(Anomaly(
+                    station_id=reading.station_id, field=name, timestamp=reading.timestamp,
+                    value=float(value), expected=expected, zscore=z, reading_id=reading.pk,
+                ))
+
+
+def _update_vectorized(columns, start, end, states, detector, anomalies):
+    """
+    以 EwmaDetector.run() 一次更新同一測站的一批數據（結果與逐筆更新相同）
+
+    先套用與 update() 相同的略過規則（缺值、不晚於上一筆的時間），
+    run() 收到的數據即全部用於更新，z-score 可直接對應回 Reading。
+    """
+    station_id = int(columns.station_ids[start])
+    x = columns.seconds[start:end]
+    for name in ANOMALY_FIELDS:
+        values = columns.values(name)[start:end]
+        present = ~np.isnan(values)
+        if not present.any():
+            continue
+        state = states.get((station_id, name))
+        if state is None:
+            state = states[(station_id, name)] = EwmaState()
+
+        index = np.flatnonzero(present & (x > (-np.inf if state.last_timestamp is None else state.last_timestamp)))
+        if len(index) > 1:
+            # 已依時間排序，同一時間只有第一筆會用於更新
+            index = index[np.concatenate([[True], x[index][1:] > x[index][:-1]])]
+        if not len(index):
+            continue
+        _, used_values, zscores, expected = detector.run(state, x[index], values[index])
+        for hit in np.flatnonzero(np.abs(np.nan_to_num(zscores)) >= detector.threshold).tolist():
+            reading = columns.readings[start + index[hit]]
+            anomalies.append(Anomaly(
+                station_id=station_id, field=name, timestamp=reading.timestamp,
+                value=float(used_values[hit]), expected=float(expected[hit]), zscore=float(zscores[hit]),
+                reading_id=reading.pk,
+            ))
+
+
+def detect_anomalies(readings, detector=None, columns=None):
+    """
+    以新寫入的數據更新基準並寫入 Anomaly（readings_ingested 接收器呼叫）
+
+    先以 INSERT ... ON CONFLICT DO NOTHING 建立尚不存在的基準（預設值即空的 EwmaState），
+    再一次查詢取出相關測站的基準（鎖定列），更新後以一次 upsert 寫回；
+    並行建立同一測站的新基準時，後者會等待前者提交後接續更新，而不是覆蓋。
+    同一測站本批達 VECTORIZE_MIN_ROWS 筆時以向量化路徑更新（批次匯入），否則逐筆 O(1) 更新。
+
+    Args:
+        columns: 同一批數據的 ReadingColumns（readings_ingested 傳入；None 時自行建立）
+
+    Returns:
+        本批偵測到的 Anomaly 列表
+    """
+    columns = ReadingColumns(readings) if columns is None else columns
+    if not len(columns):
+        return []
+    detector = detector or EwmaDetector()
+
+    station_ids = set(columns.station_ids.tolist())
+    with transaction.atomic():
+        AnomalyBaseline.objects.bulk_create(
+            [AnomalyBaseline(station_id=station_id, field=name)
+             for station_id in station_ids for name in ANOMALY_FIELDS],
+            ignore_conflicts=True,
+        )
+        baselines = {
+            _baseline_key(baseline): baseline
+            for baseline in AnomalyBaseline.objects.select_for_update().filter(station_id__in=station_ids)
+        }
+        states = {key: EwmaState.from_baseline(baseline) for key, baseline in baselines.items()}
+        anomalies = []
+        for start, end in columns.bounds(columns.station_starts):
+            if end - start >= VECTORIZE_MIN_ROWS:
+                _update_vectorized(columns, start, end, states, detector, anomalies)
+            else:
+                _update_one_by_one(columns.readings[start:end], states, detector, anomalies)
+
+        AnomalyBaseline.objects.bulk_create(
+            [
+                state.apply_to(baselines.get(key) or AnomalyBaseline(station_id=key[0], field=key[1]))
+                for key, state in states.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['station', 'field'],
+            update_fields=BASELINE_UPDATE_FIELDS,
+        )
+        if anomalies:
+            Anomaly.objects.bulk_create(anomalies)
+    return anomalies
+
+
+# ==========================================
+# 歷史回填（向量化）
+# ==========================================
+
+def _iter_station_columns(station_id, fields, chunk_size):
+    """依時間順序產生 (x, values)：先封存檔（逐月），再資料庫中的數據（依時間分批）"""
+    from data_ingestion.archive import archives_in_range, read_archived_columns
+    from data_ingestion.models import Reading
+
+    for archive in sorted(archives_in_range([station_id]), key=lambda archive: archive.first_timestamp):
+        x, values = read_archived_columns([archive], fields)
+        order = np.argsort(x, kind='stable')
+        yield x[order], values[order]
+
+    readings = Reading.objects.filter(station_id=station_id).order_by('timestamp')
+    while True:
+        # 本批最後一筆的時間；同一時間的數據放在同一批
+        upper = readings.values_list('timestamp', flat=True)[chunk_size - 1:chunk_size].first()
+        batch = readings if upper is None else readings.filter(timestamp__lte=upper)
+        x, values = reading_columns(batch, fields)
+        if len(x):
+            yield x, values
+        if upper is None:
+            return
+        readings = readings.filter(timestamp__gt=upper)
+
+
+def backfill_baselines(station_ids=None, fields=ANOMALY_FIELDS, record=False, detector=None,
+                       chunk_size=DEFAULT_BACKFILL_CHUNK_SIZE, log=None):
+    """
+    由完整歷史重新計算基準（含封存檔）
+
+    Args:
+        station_ids: 限定測站（None 表示全部）
+        fields: 要計算的參數
+        record: 是否重新寫入歷史數據的 Anomaly（先刪除這些測站與參數原有的紀錄）
+        detector: EwmaDetector（預設取自 settings）
+        chunk_size: 每批讀取的數據筆數
+        log: 進度輸出函數
+
+    Returns:
+        {'stations': 測站數, 'rows': 處理筆數, 'anomalies': 寫入的異常筆數}
+    """
+    from data_ingestion.models import Station
+
+    detector = detector or EwmaDetector()
+    stations = Station.objects.order_by('pk').values_list('pk', flat=True)
+    if station_ids is not None:
+        stations = stations.filter(pk__in=station_ids)
+
+    result = {'stations': 0, 'rows': 0, 'anomalies': 0}
+    for station_id in stations:
+        states = {name: EwmaState() for name in fields}
+        anomalies = []
+        rows = 0
+        for x, values in _iter_station_columns(station_id, fields, chunk_size):
+            rows += len(x)
+            for column, name in enumerate(fields):
+                used_x, used_values, zscores, expected = detector.run(states[name], x, values[:, column])
+                if not record:
+                    continue
+                for index in np.flatnonzero(np.abs(np.nan_to_num(zscores)) >= detector.threshold):
+                    anomalies.append(Anomaly(
+                        station_id=station_id, field=name,
+                        timestamp=datetime.fromtimestamp(used_x[index], tz=dt_timezone.utc),
+                        value=float(used_values[index]), expected=float(expected[index]),
+                        zscore=float(zscores[index]),
+                    ))
+
+        with transaction.atomic():
+            AnomalyBaseline.objects.filter(station_id=station_id, field__in=fields).delete()
+            AnomalyBaseline.objects.bulk_create([
+                state.apply_to(AnomalyBaseline(station_id=station_id, field=name))
+                for name, state in states.items() if state.count
+            ])
+            if record:
+                Anomaly.objects.filter(station_id=station_id, field__in=fields).delete()
+                Anomaly.objects.bulk_create(anomalies, batch_size=1000)
+
+        result['stations'] += 1
+        result['rows'] += rows
+        result['anomalies'] += len(anomalies)
+        if log:
+            log(f'測站 {station_id}: {rows:,} 筆，{len(anomalies):,} 筆異常')
+    return result
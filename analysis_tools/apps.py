@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class AnalysisToolsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'analysis_tools'
+
+    def ready(self):
+        # 註冊 readings_ingested 的接收器（異常偵測）
+        from . import signals  # noqa: F401
@@ -1,4 +1,9 @@
 """ocean_monitor\analysis_tools\calculations.py 統計分析函數"""
+import math
+from datetime import datetime
+from operator import attrgetter, itemgetter
+
+import numpy as np
 
 
 def calculate_average(values):
@@ -15,21 +20,210 @@ def calculate_min_max(values):
     return min(values), max(values)
 
 
-def calculate_statistics(readings, field_name):
-    """計算特定欄位的統計資料"""
-    values = [getattr(r, field_name) for r in readings if getattr(r, field_name) is not None]
-    
-    if not values:
-        return {
-            'count': 0,
-            'avg': None,
-            'min': None,
-            'max': None
+def _order_key(value):
+    """first/last 的排序鍵（datetime 轉為 UNIX 秒數）"""
+    if value is None:
+        return math.nan
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class FieldAccumulator:
+    """
+    單一欄位的可合併統計量
+
+    平均與變異數以 Welford / Chan 的合併公式累加（每批先以 NumPy 算出該批的
+    count / mean / M2 再合併），數值穩定且可任意分批、跨 worker 合併。
+    min / max / first / last 保留原始值（例如 Decimal）。
+    """
+
+    __slots__ = (
+        'count', 'mean', 'm2', 'min', 'max', '_min_key', '_max_key',
+        'first', 'last', '_first_order', '_last_order', 'samples',
+    )
+
+    def __init__(self, keep_samples=False):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = self.max = None
+        self._min_key = math.inf
+        self._max_key = -math.inf
+        self.first = self.last = None
+        self._first_order = math.inf
+        self._last_order = -math.inf
+        # 百分位數需要保留數值（只有要求百分位數時）
+        self.samples = [] if keep_samples else None
+
+    def _combine(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def update(self, values, originals=None, order=None):
+        """
+        加入一批數值
+
+        Args:
+            values: float64 陣列（NaN 為缺值）
+            originals: 與 values 對應的原始值（min / max / first / last 回傳原始值）
+            order: 排序鍵陣列（None 表示依輸入順序）
+        """
+        present = np.flatnonzero(~np.isnan(values))
+        if not len(present):
+            return
+        chunk = values[present]
+        mean = float(chunk.mean())
+        self._combine(len(chunk), mean, float(np.square(chunk - mean).sum()))
+
+        def original(position):
+            return originals[position] if originals is not None else float(values[position])
+
+        low, high = present[chunk.argmin()], present[chunk.argmax()]
+        if values[low] < self._min_key:
+            self._min_key, self.min = float(values[low]), original(low)
+        if values[high] > self._max_key:
+            self._max_key, self.max = float(values[high]), original(high)
+
+        if order is None:
+            first, last = present[0], present[-1]
+            first_order = self._first_order if self.first is not None else -math.inf
+            last_order = math.inf
+        else:
+            keys = order[present]
+            first, last = present[keys.argmin()], present[keys.argmax()]
+            first_order, last_order = float(order[first]), float(order[last])
+        if first_order < self._first_order:
+            self._first_order, self.first = first_order, original(first)
+        if last_order >= self._last_order:
+            self._last_order, self.last = last_order, original(last)
+
+        if self.samples is not None:
+            self.samples.append(chunk)
+
+    def merge(self, other):
+        """合併另一個（時間在後的）部分結果"""
+        if not other.count:
+            return self
+        self._combine(other.count, other.mean, other.m2)
+        if other._min_key < self._min_key:
+            self._min_key, self.min = other._min_key, other.min
+        if other._max_key > self._max_key:
+            self._max_key, self.max = other._max_key, other.max
+        if other._first_order < self._first_order:
+            self._first_order, self.first = other._first_order, other.first
+        if other._last_order >= self._last_order:
+            self._last_order, self.last = other._last_order, other.last
+        if self.samples is not None and other.samples is not None:
+            self.samples.extend(other.samples)
+        return self
+
+    def result(self, percentiles=()):
+        stats = {
+            'count': self.count,
+            'mean': self.mean if self.count else None,
+            # 樣本標準差（n - 1）
+            'std': math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None,
+            'min': self.min,
+            'max': self.max,
+            'first': self.first,
+            'last': self.last,
         }
-    
+        if percentiles:
+            values = np.concatenate(self.samples) if self.count else None
+            for q in percentiles:
+                stats[f'p{q:g}'] = float(np.percentile(values, q)) if values is not None else None
+        return stats
+
+
+class StatisticsEngine:
+    """
+    多欄位、單次掃描的統計引擎
+
+    接受三種輸入（欄位順序為 engine.columns：order_field 在前，其後為 fields）：
+    - model 實例或 dict（依欄位名稱取值）
+    - values_list(*engine.columns) 的 tuple
+    - (筆數, 欄位數) 的 NumPy 陣列（NULL 為 NaN）
+
+    每次 update() 只走訪一次輸入並轉為一個 float64 陣列，所有欄位的統計由
+    NumPy 逐欄計算；部分結果可用 merge() 合併（分批、彙總、平行 worker）。
+
+    Example:
+        engine = StatisticsEngine(['temperature', 'ph'], percentiles=(50, 95), order_field='timestamp')
+        engine.update(readings)
+        engine.result()['temperature']  # count, mean, std, min, max, first, last, p50, p95
+    """
+
+    def __init__(self, fields, percentiles=(), order_field=None):
+        self.fields = list(fields)
+        self.percentiles = tuple(percentiles)
+        self.order_field = order_field
+        self.accumulators = {field: FieldAccumulator(keep_samples=bool(self.percentiles)) for field in self.fields}
+
+    @property
+    def columns(self):
+        return [self.order_field, *self.fields] if self.order_field else list(self.fields)
+
+    def update(self, data):
+        """加入一批數據，回傳 self"""
+        offset = 1 if self.order_field else 0
+        if isinstance(data, np.ndarray):
+            table = np.asarray(data, dtype=np.float64).reshape(-1, len(self.columns))
+            order = table[:, 0] if offset else None
+            for index, field in enumerate(self.fields):
+                self.accumulators[field].update(table[:, offset + index], order=order)
+            return self
+
+        rows = list(data)
+        if not rows:
+            return self
+        if not isinstance(rows[0], (tuple, list)):
+            getter = (itemgetter if isinstance(rows[0], dict) else attrgetter)(*self.columns)
+            rows = [getter(row) for row in rows] if len(self.columns) > 1 else [(getter(row),) for row in rows]
+        if offset:
+            order = np.fromiter((_order_key(row[0]) for row in rows), dtype=np.float64, count=len(rows))
+            table = np.array([row[1:] for row in rows], dtype=np.float64).reshape(len(rows), len(self.fields))
+        else:
+            order = None
+            table = np.array(rows, dtype=np.float64).reshape(len(rows), len(self.fields))
+        for index, field in enumerate(self.fields):
+            originals = [row[offset + index] for row in rows]
+            self.accumulators[field].update(table[:, index], originals=originals, order=order)
+        return self
+
+    def merge(self, other):
+        """合併另一個相同欄位的引擎（例如平行 worker 或另一段時間），回傳 self"""
+        for field in self.fields:
+            self.accumulators[field].merge(other.accumulators[field])
+        return self
+
+    def result(self):
+        """{欄位: {'count', 'mean', 'std', 'min', 'max', 'first', 'last', 'p50', ...}}"""
+        return {field: accumulator.result(self.percentiles) for field, accumulator in self.accumulators.items()}
+
+
+def calculate_field_statistics(readings, fields):
+    """
+    一次掃描計算多個欄位的 count / avg / min / max（calculate_statistics 的多欄位版本）
+
+    Returns:
+        {欄位: {'count', 'avg'（四捨五入到小數 2 位）, 'min', 'max'}}；min / max 保留原始型別（Decimal）
+    """
+    results = StatisticsEngine(fields).update(readings).result()
     return {
-        'count': len(values),
-        'avg': round(sum(values) / len(values), 2),
-        'min': min(values),
-        'max': max(values)
-    }
\ No newline at end of file
+        field: {
+            'count': stats['count'],
+            'avg': round(stats['mean'], 2) if stats['count'] else None,
+            'min': stats['min'],
+            'max': stats['max'],
+        }
+        for field, stats in results.items()
+    }
+
+
+def calculate_statistics(readings, field_name):
+    """計算特定欄位的統計資料"""
+    return calculate_field_statistics(readings, [field_name])[field_name]
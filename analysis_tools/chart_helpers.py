@@ -1,15 +1,356 @@
 """ocean_monitor\analysis_tools\chart_helpers.py 圖表數據轉換工具"""
+import logging
+import math
+from datetime import datetime, timedelta
+from operator import attrgetter
+
+import numpy as np
+import orjson
+from django.db import connections
+from django.db.models import FloatField, Func, QuerySet
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# 圖表的 8 個海洋監測參數
+CHART_FIELDS = [
+    'temperature', 'ph', 'oxygen', 'salinity',
+    'conductivity', 'pressure', 'fluorescence', 'turbidity',
+]
+
+LABEL_FORMAT = '%m/%d %H:%M'
+
+# 圖表最多點數（降採樣目標）
+DEFAULT_MAX_POINTS = 500
+
+# 原始數據（依日彙總估計）超過此筆數時改讀 ReadingRollup 彙總
+RAW_DOWNSAMPLE_LIMIT = 50000
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
 
 def prepare_chart_data(readings):
-    """準備圖表數據 - 包含完整 8 個海洋監測參數"""
-    return {
-        'labels': [r.timestamp.strftime('%m/%d %H:%M') for r in reversed(readings)],
-        'temperature': [float(r.temperature) if r.temperature else None for r in reversed(readings)],
-        'ph': [float(r.ph) if r.ph else None for r in reversed(readings)],
-        'oxygen': [float(r.oxygen) if r.oxygen else None for r in reversed(readings)],
-        'salinity': [float(r.salinity) if r.salinity else None for r in reversed(readings)],
-        'conductivity': [float(r.conductivity) if r.conductivity else None for r in reversed(readings)],
-        'pressure': [float(r.pressure) if r.pressure else None for r in reversed(readings)],
-        'fluorescence': [float(r.fluorescence) if r.fluorescence else None for r in reversed(readings)],
-        'turbidity': [float(r.turbidity) if r.turbidity else None for r in reversed(readings)],
-    }
\ No newline at end of file
+    """
+    準備圖表數據 - 包含完整 8 個海洋監測參數
+
+    readings 為新到舊排列（QuerySet 或 Reading 列表），輸出為舊到新。
+    QuerySet 只以 values_list 取出需要的欄位，單次掃描建立所有參數的欄位陣列；
+    NULL 轉為 None，0 值保留。標籤為當地時間。
+    """
+    x, values = reading_columns(readings)
+    return columns_to_chart_data(x[::-1], values[::-1])
+
+
+# ==========================================
+# 降採樣
+# ==========================================
+
+def lttb_indices(x, values, threshold):
+    """
+    Largest-Triangle-Three-Buckets：挑出 threshold 個最能保留曲線形狀的點
+
+    多個參數共用同一組時間軸，因此每個區間挑選「各參數正規化後三角形面積總和」
+    最大的點；NaN（缺值）不計入面積。
+
+    Args:
+        x: 時間（秒）一維陣列，已排序
+        values: (n, k) 陣列，k 個參數
+        threshold: 目標點數（含頭尾）
+
+    Returns:
+        選中的索引（遞增）
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # 各參數正規化到 0-1，避免電導率等大數值主導面積
+    masked = np.ma.masked_invalid(values)
+    low = masked.min(axis=0).filled(0.0)
+    span = (masked.max(axis=0) - masked.min(axis=0)).filled(1.0)
+    span[span == 0] = 1.0
+    y = (values - low) / span
+
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        # 下一個區間的平均點
+        next_start = int(math.floor((i + 1) * every)) + 1
+        next_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        next_y = np.ma.masked_invalid(y[next_start:next_end]).mean(axis=0).filled(np.nan)
+
+        # 目前區間
+        start = int(math.floor(i * every)) + 1
+        end = int(math.floor((i + 1) * every)) + 1
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end, None]) * (next_y - y[a])
+        )
+        a = start + int(np.argmax(np.nan_to_num(areas, nan=0.0).sum(axis=1)))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_envelope(x, values, buckets):
+    """
+    每個區間輸出兩點：各參數先出現的極值與後出現的極值
+
+    兩點的時間分別為區間內第一筆與最後一筆的時間，突波（最大 / 最小值）
+    一定會保留。
+
+    Returns:
+        (時間陣列, (2 * buckets, k) 數值陣列)
+    """
+    n = len(x)
+    if n <= buckets * 2:
+        return x, values
+
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    out_x = np.empty(buckets * 2)
+    out_values = np.full((buckets * 2, values.shape[1]), np.nan)
+    for b in range(buckets):
+        chunk = values[edges[b]:edges[b + 1]]
+        out_x[2 * b] = x[edges[b]]
+        out_x[2 * b + 1] = x[edges[b + 1] - 1]
+        for column in range(chunk.shape[1]):
+            series = chunk[:, column]
+            if np.isnan(series).all():
+                continue
+            low, high = np.nanargmin(series), np.nanargmax(series)
+            first, second = (low, high) if low <= high else (high, low)
+            out_values[2 * b, column] = series[first]
+            out_values[2 * b + 1, column] = series[second]
+    return out_x, out_values
+
+
+def downsample(x, values, max_points=DEFAULT_MAX_POINTS, method='lttb'):
+    """依 method 降採樣到約 max_points 點；點數不足時原樣回傳"""
+    if len(x) <= max_points:
+        return x, values
+    if method == 'minmax':
+        return minmax_envelope(x, values, max(max_points // 2, 1))
+    indices = lttb_indices(x, values, max_points)
+    return x[indices], values[indices]
+
+
+# ==========================================
+# 數據來源
+# ==========================================
+
+class EpochSeconds(Func):
+    """時間欄位轉為 Unix 秒數（浮點數）"""
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite 以 UTC 文字儲存時間
+        return self.as_sql(
+            compiler, connection,
+            template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)',
+            **extra_context,
+        )
+
+
+def _empty_columns(fields):
+    return np.empty(0), np.empty((0, len(fields)))
+
+
+def reading_columns(readings, fields=CHART_FIELDS):
+    """
+    單次掃描取出時間與參數欄位（保留 readings 原本的順序）
+
+    QuerySet（可已切片）由 values_list 產生 SQL、資料庫轉為浮點數後直接以 cursor 取值，
+    不建立 model 實例；
+    其他可迭代物件視為 Reading 實例。
+
+    Returns:
+        (時間秒數陣列, (n, k) 數值陣列；NULL 為 NaN)
+    """
+    if isinstance(readings, QuerySet):
+        # 時間與數值都在資料庫端轉為浮點數，直接以 cursor 取值，略過 Django 的逐列轉換器
+        columns = readings.values_list(
+            EpochSeconds('timestamp'), *[Cast(field, output_field=FloatField()) for field in fields]
+        )
+        sql, params = columns.query.sql_with_params()
+        with connections[readings.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        if not rows:
+            return _empty_columns(fields)
+        table = np.array(rows, dtype=np.float64)
+        return np.ascontiguousarray(table[:, 0]), table[:, 1:]
+
+    getter = attrgetter('timestamp', *fields)
+    rows = [getter(reading) for reading in readings]
+    if not rows:
+        return _empty_columns(fields)
+    x = np.fromiter((row[0].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+    values = np.array([row[1:] for row in rows], dtype=np.float64)
+    return x, values
+
+
+def fetch_chart_columns(readings, fields=CHART_FIELDS):
+    """依時間排序（舊到新）後取出欄位陣列"""
+    return reading_columns(readings.order_by('timestamp'), fields)
+
+
+def fetch_rollup_columns(station_id, resolution, start=None, end=None, fields=CHART_FIELDS, method='lttb'):
+    """
+    由 ReadingRollup 取出各區間的數值
+
+    method='lttb' 時每個區間一點（平均值）；'minmax' 時每個區間兩點（最小值、最大值）。
+    """
+    from data_ingestion.rollups import RESOLUTION_STEPS, rollup_queryset
+
+    rows = rollup_queryset(resolution, station_id=station_id, start=start, end=end).filter(
+        field__in=fields
+    ).values_list('bucket', 'field', 'count', 'sum', 'min', 'max')
+
+    column_index = {field: i for i, field in enumerate(fields)}
+    buckets = {}
+    for bucket, field, count, total, minimum, maximum in rows:
+        entry = buckets.setdefault(bucket, np.full((3, len(fields)), np.nan))
+        entry[0, column_index[field]] = total / count if count else np.nan
+        entry[1, column_index[field]] = minimum
+        entry[2, column_index[field]] = maximum
+
+    ordered = sorted(buckets)
+    if not ordered:
+        return _empty_columns(fields)
+    starts = np.array([bucket.timestamp() for bucket in ordered])
+    if method == 'minmax':
+        half = RESOLUTION_STEPS[resolution].total_seconds() / 2
+        x = np.column_stack([starts, starts + half]).ravel()
+        values = np.vstack([np.vstack([buckets[bucket][1], buckets[bucket][2]]) for bucket in ordered])
+        return x, values
+    return starts, np.vstack([buckets[bucket][0] for bucket in ordered])
+
+
+def format_labels(x):
+    """
+    時間秒數轉為 MM/DD HH:MM 標籤（當地時間）
+
+    範圍內時區偏移不變時（台灣沒有日光節約時間）以 NumPy 一次轉換。
+    """
+    if not len(x):
+        return []
+    tz = timezone.get_current_timezone()
+    first_offset = datetime.fromtimestamp(x[0], tz).utcoffset()
+    if first_offset != datetime.fromtimestamp(x[-1], tz).utcoffset():
+        return [datetime.fromtimestamp(seconds, tz).strftime(LABEL_FORMAT) for seconds in x.tolist()]
+
+    local = (np.floor(x).astype(np.int64) + int(first_offset.total_seconds())).astype('datetime64[s]')
+    return [f'{text[5:7]}/{text[8:10]} {text[11:16]}' for text in np.datetime_as_string(local, unit='m').tolist()]
+
+
+def columns_to_chart_data(x, values, fields=CHART_FIELDS, as_arrays=False):
+    """
+    轉為前端圖表格式：labels + 各參數數值（NaN 轉為 None，0 值保留）
+
+    as_arrays=True 時各參數保留為 NumPy 陣列，交給 dumps_chart_data() 直接序列化
+    （NaN 輸出為 null），省去逐值轉換。
+    """
+    chart_data = {'labels': format_labels(x)}
+    for column, field in enumerate(fields):
+        if as_arrays:
+            chart_data[field] = np.ascontiguousarray(values[:, column])
+        else:
+            chart_data[field] = [None if math.isnan(value) else value for value in values[:, column].tolist()]
+    return chart_data
+
+
+def dumps_chart_data(data):
+    """以 orjson 序列化圖表回應（支援 NumPy 陣列），回傳 bytes"""
+    return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _read_archives_or_rollups(archives, start, end, method):
+    """
+    讀取封存檔的欄位陣列；檔案遺失或無法讀取時記錄並改讀該檔案時間範圍的小時彙總
+    （封存後仍保留），不讓整張圖表失敗
+    """
+    from data_ingestion.archive import ArchiveError, read_archived_columns
+
+    xs = []
+    tables = []
+    for archive in archives:
+        try:
+            x, values = read_archived_columns([archive], CHART_FIELDS, start, end)
+        except (OSError, ArchiveError):
+            logger.warning('無法讀取封存檔 %s，改用小時彙總', archive.path, exc_info=True)
+            first = archive.first_timestamp if start is None else max(start, archive.first_timestamp)
+            # rollup_queryset 的 end 不含，加 1 微秒以包含最後一筆所在的區間
+            last = archive.last_timestamp + timedelta(microseconds=1)
+            x, values = fetch_rollup_columns(
+                archive.station_id, 'hour', start=first, end=last if end is None else min(end, last), method=method,
+            )
+        xs.append(x)
+        tables.append(values)
+    return np.concatenate(xs), np.vstack(tables)
+
+
+def build_chart_data(station, start=None, end=None, max_points=DEFAULT_MAX_POINTS, method='lttb', as_arrays=False):
+    """
+    產生指定時間範圍的圖表數據（固定點數、保留形狀）
+
+    依日彙總估計範圍內的原始筆數（含已封存的數據，不查詢 Reading 也不開啟封存檔）選擇來源：
+    - 不超過 RAW_DOWNSAMPLE_LIMIT：原始數據（多於 max_points 時降採樣）；
+      無法讀取的封存檔以該月份的小時彙總代替
+    - 更多：改讀 ReadingRollup（區間數至少 max_points 的最粗解析度）再降採樣；
+      該解析度沒有彙總時退回原始數據
+
+    Args:
+        station: 測站
+        start, end: 時間範圍（None 表示不限）
+        max_points: 輸出點數上限
+        method: 'lttb'（預設）或 'minmax'（每區間最小 / 最大值包絡）
+        as_arrays: 參數保留為 NumPy 陣列（搭配 dumps_chart_data）
+
+    Returns:
+        (chart_data, sampling)；sampling 說明來源與點數（total 讀彙總時為估計的原始筆數）
+    """
+    from data_ingestion.archive import archives_in_range
+    from data_ingestion.rollups import coarsest_resolution, estimate_reading_count
+
+    if method not in DOWNSAMPLE_METHODS:
+        method = 'lttb'
+
+    total, first_bucket = estimate_reading_count(station.id, start, end)
+
+    source = 'raw'
+    x = values = None
+    if total > RAW_DOWNSAMPLE_LIMIT:
+        resolution = coarsest_resolution(start or first_bucket, end or timezone.now(), min_buckets=max_points)
+        x, values = fetch_rollup_columns(station.id, resolution, start=start, end=end, method=method)
+        if len(x):
+            source = f'rollup:{resolution}'
+    if source == 'raw':
+        readings = station.readings.all()
+        if start is not None:
+            readings = readings.filter(timestamp__gte=start)
+        if end is not None:
+            readings = readings.filter(timestamp__lte=end)
+        x, values = fetch_chart_columns(readings)
+        # 已封存的原始數據（冷儲存）與資料庫中的一併讀取
+        archives = archives_in_range([station.id], start, end)
+        if archives:
+            archived_x, archived_values = _read_archives_or_rollups(archives, start, end, method)
+            # 封存月份之後補寫的數據可能早於封存檔的最後一筆，合併後重新排序
+            x = np.concatenate([archived_x, x])
+            order = np.argsort(x, kind='stable')
+            x, values = x[order], np.vstack([archived_values, values])[order]
+        total = len(x)
+
+    x, values = downsample(x, values, max_points=max_points, method=method)
+    sampling = {
+        'source': source,
+        'method': method,
+        'total': total,
+        'points': len(x),
+    }
+    return columns_to_chart_data(x, values, as_arrays=as_arrays), sampling
@@ -0,0 +1,44 @@
+"""
+由歷史數據（含封存檔）重新計算異常偵測的 EWMA 基準
+使用方法:
+    python manage.py backfill_anomaly_baselines
+    python manage.py backfill_anomaly_baselines --station 1 --field temperature --record
+
+寫入時的異常偵測只處理即時數據；新增測站的歷史資料、調整 ANOMALY_* 參數
+或歷史回填（軌跡產生器等）之後執行本命令，讓基準反映完整歷史。
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis_tools.anomaly import ANOMALY_FIELDS, DEFAULT_BACKFILL_CHUNK_SIZE, backfill_baselines
+
+
+class Command(BaseCommand):
+    help = '由歷史數據重新計算異常偵測基準'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--station', type=int, action='append', help='測站 ID（可重複指定，預設全部）')
+        parser.add_argument('--field', action='append', choices=ANOMALY_FIELDS, help='參數（可重複指定，預設全部）')
+        parser.add_argument('--record', action='store_true', help='重新寫入歷史數據的異常紀錄')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_BACKFILL_CHUNK_SIZE,
+                            help=f'每批讀取筆數（預設：{DEFAULT_BACKFILL_CHUNK_SIZE}）')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size 必須大於 0')
+
+        started = time.perf_counter()
+        summary = backfill_baselines(
+            station_ids=options['station'],
+            fields=options['field'] or ANOMALY_FIELDS,
+            record=options['record'],
+            chunk_size=options['chunk_size'],
+            log=self.stdout.write,
+        )
+        elapsed = time.perf_counter() - started
+        rate = summary['rows'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'[完成] {summary["stations"]} 個測站、{summary["rows"]:,} 筆數據'
+            f'（{summary["anomalies"]:,} 筆異常），耗時 {elapsed:.2f} 秒（{rate:,.0f} 筆/秒）'
+        ))
@@ -0,0 +1,75 @@
+"""
+異常偵測效能基準測試（不需資料庫）
+使用方法:
+    python manage.py benchmark_anomaly_detection
+    python manage.py benchmark_anomaly_detection --rows 1000000 --repeat 3
+
+以模擬的溫度序列（日週期 + 雜訊 + 偶發尖峰）比較：
+- 逐筆更新（寫入時使用）：EwmaDetector.update()
+- 向量化回填：EwmaDetector.run()
+並確認兩者的最終狀態與 z-score 一致。
+"""
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis_tools.anomaly import EwmaDetector, EwmaState
+
+
+def simulated_series(rows, seed=0):
+    """每分鐘一筆的模擬溫度：日週期 ± 1.5°C、雜訊 0.2°C、約 0.1% 的尖峰"""
+    rng = np.random.default_rng(seed)
+    x = 1_700_000_000 + np.arange(rows, dtype=np.float64) * 60
+    values = 25 + 1.5 * np.sin(2 * np.pi * x / 86400) + rng.normal(0, 0.2, rows)
+    spikes = rng.random(rows) < 0.001
+    values[spikes] += rng.choice([-1, 1], spikes.sum()) * rng.uniform(2, 5, spikes.sum())
+    return x, values
+
+
+class Command(BaseCommand):
+    help = '比較逐筆與向量化異常偵測的每秒更新數'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000, help='模擬數據筆數（預設：200,000）')
+        parser.add_argument('--repeat', type=int, default=3, help='每種做法重複次數（預設：3）')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        if rows <= 0 or options['repeat'] <= 0:
+            raise CommandError('--rows 與 --repeat 必須大於 0')
+        x, values = simulated_series(rows)
+        detector = EwmaDetector()
+        xs, vs = x.tolist(), values.tolist()
+
+        def online():
+            state = EwmaState()
+            zscores = [detector.update(state, value, seconds)[0] for seconds, value in zip(xs, vs)]
+            return state, np.array([np.nan if z is None else z for z in zscores])
+
+        def vectorized():
+            state = EwmaState()
+            return state, detector.run(state, x, values)[2]
+
+        results = {}
+        outputs = {}
+        for name, run in [('逐筆更新（update）', online), ('向量化（run）', vectorized)]:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                outputs[name] = run()
+                timings.append(time.perf_counter() - started)
+            results[name] = statistics.median(timings)
+            self.stdout.write(f'{name:<20} 中位數 {results[name] * 1000:>9.2f} ms  {rows / results[name]:>14,.0f} 筆/秒')
+
+        (online_state, online_z), (vector_state, vector_z) = outputs.values()
+        scored = ~np.isnan(online_z)
+        difference = float(np.max(np.abs(online_z[scored] - vector_z[scored]))) if scored.any() else 0.0
+        flagged = int(np.sum(np.abs(online_z[scored]) >= detector.threshold))
+        self.stdout.write(
+            f'\n最終平均 {online_state.mean:.4f} / {vector_state.mean:.4f}，'
+            f'z-score 最大差異 {difference:.2e}，標記 {flagged:,} 筆異常'
+        )
+        online_seconds, vector_seconds = results.values()
+        self.stdout.write(self.style.SUCCESS(f'加速比: {online_seconds / vector_seconds:.1f}x（{rows:,} 筆）'))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('data_ingestion', '0008_reading_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Anomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=20, verbose_name='參數')),
+                ('timestamp', models.DateTimeField(verbose_name='數據時間')),
+                ('value', models.FloatField(verbose_name='數值')),
+                ('expected', models.FloatField(verbose_name='預期值')),
+                ('zscore', models.FloatField(verbose_name='z-score')),
+                ('reading_id', models.BigIntegerField(blank=True, null=True, verbose_name='數據 ID')),
+                ('detected_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='偵測時間')),
+                ('station', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='anomalies', to='data_ingestion.station', verbose_name='測站')),
+            ],
+            options={
+                'verbose_name': '異常數據',
+                'verbose_name_plural': '異常數據',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['station', '-timestamp'], name='anomaly_station_time_idx'), models.Index(fields=['-timestamp'], name='anomaly_time_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AnomalyBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=20, verbose_name='參數')),
+                ('count', models.BigIntegerField(default=0, verbose_name='已更新筆數')),
+                ('mean', models.FloatField(default=0, verbose_name='加權平均')),
+                ('variance', models.FloatField(default=0, verbose_name='加權變異數')),
+                ('seasonal', models.JSONField(blank=True, default=list, verbose_name='日週期偏移')),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True, verbose_name='最後數據時間')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新時間')),
+                ('station', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='anomaly_baselines', to='data_ingestion.station', verbose_name='測站')),
+            ],
+            options={
+                'verbose_name': '異常偵測基準',
+                'verbose_name_plural': '異常偵測基準',
+                'constraints': [models.UniqueConstraint(fields=('station', 'field'), name='anomaly_baseline_station_field_uniq')],
+            },
+        ),
+    ]
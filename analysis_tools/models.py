@@ -0,0 +1,65 @@
+from django.db import models
+from django.utils import timezone
+
+
+class AnomalyBaseline(models.Model):
+    """
+    各測站、各參數的 EWMA 基準（異常偵測的線上狀態，見 analysis_tools.anomaly）
+
+    每筆新數據以 O(1) 更新：指數加權平均、殘差的指數加權變異數，
+    以及可選的 24 小時日週期偏移（seasonal，依 UTC 小時分組）。
+    """
+    station = models.ForeignKey(
+        'data_ingestion.Station',
+        on_delete=models.CASCADE,
+        related_name='anomaly_baselines',
+        verbose_name="測站",
+        db_index=False,  # 由 (station, field) 唯一約束涵蓋
+    )
+    field = models.CharField(max_length=20, verbose_name="參數")
+    count = models.BigIntegerField(default=0, verbose_name="已更新筆數")
+    mean = models.FloatField(default=0, verbose_name="加權平均")
+    variance = models.FloatField(default=0, verbose_name="加權變異數")
+    seasonal = models.JSONField(default=list, blank=True, verbose_name="日週期偏移")
+    last_timestamp = models.DateTimeField(null=True, blank=True, verbose_name="最後數據時間")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新時間")
+
+    class Meta:
+        verbose_name = "異常偵測基準"
+        verbose_name_plural = "異常偵測基準"
+        constraints = [
+            models.UniqueConstraint(fields=['station', 'field'], name='anomaly_baseline_station_field_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.station_id} - {self.field}: {self.mean:.3f} ± {self.variance ** 0.5:.3f}"
+
+
+class Anomaly(models.Model):
+    """偵測到的異常數據（z-score 超過門檻）"""
+    station = models.ForeignKey(
+        'data_ingestion.Station',
+        on_delete=models.CASCADE,
+        related_name='anomalies',
+        verbose_name="測站",
+        db_index=False,  # 由 (station, -timestamp) 複合索引涵蓋
+    )
+    field = models.CharField(max_length=20, verbose_name="參數")
+    timestamp = models.DateTimeField(verbose_name="數據時間")
+    value = models.FloatField(verbose_name="數值")
+    expected = models.FloatField(verbose_name="預期值")
+    zscore = models.FloatField(verbose_name="z-score")
+    reading_id = models.BigIntegerField(null=True, blank=True, verbose_name="數據 ID")
+    detected_at = models.DateTimeField(default=timezone.now, verbose_name="偵測時間")
+
+    class Meta:
+        verbose_name = "異常數據"
+        verbose_name_plural = "異常數據"
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['station', '-timestamp'], name='anomaly_station_time_idx'),
+            models.Index(fields=['-timestamp'], name='anomaly_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.station_id} {self.field} {self.value:g}（z={self.zscore:+.1f}）"
@@ -0,0 +1,14 @@
+"""
+analysis_tools 的訊號接收器
+"""
+from django.dispatch import receiver
+
+from data_ingestion.signals import readings_ingested
+from .anomaly import detect_anomalies
+
+
+@receiver(readings_ingested)
+def detect_reading_anomalies(sender, readings, live=True, columns=None, **kwargs):
+    """新數據寫入後更新 EWMA 基準並標記異常（歷史回填改用 backfill_anomaly_baselines）"""
+    if live:
+        detect_anomalies(readings, columns=columns)
@@ -0,0 +1,180 @@
+"""
+anomaly.py 測試 - EWMA / z-score 異常偵測
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from analysis_tools.anomaly import ANOMALY_FIELDS, EwmaDetector, EwmaState, linear_filter
+from analysis_tools.models import Anomaly, AnomalyBaseline
+from data_ingestion.ingest import bulk_insert_readings
+from data_ingestion.models import Reading
+
+
+@pytest.fixture
+def anomaly_settings(settings):
+    settings.ANOMALY_EWMA_ALPHA = 0.1
+    settings.ANOMALY_SEASONAL_ALPHA = 0.2
+    settings.ANOMALY_Z_THRESHOLD = 4.0
+    settings.ANOMALY_WARMUP = 20
+    return settings
+
+
+def _series(rows, base=25.0, seed=1):
+    rng = np.random.default_rng(seed)
+    x = 1_700_000_000 + np.arange(rows, dtype=np.float64) * 600
+    values = base + np.sin(2 * np.pi * x / 86400) + rng.normal(0, 0.1, rows)
+    return x, values
+
+
+def test_linear_filter_matches_recursion():
+    """測試分塊向量化的線性遞迴與逐筆計算相同（含跨塊）"""
+    u = np.random.default_rng(0).normal(size=5000)
+    expected = []
+    y = 3.0
+    for value in u:
+        y = 0.98 * y + 0.5 * value
+        expected.append(y)
+
+    np.testing.assert_allclose(linear_filter(u, 0.98, 0.5, 3.0), expected, rtol=1e-9, atol=1e-9)
+
+
+def test_vectorized_run_matches_online_updates():
+    """測試向量化回填（分段呼叫）與逐筆更新得到相同的狀態與 z-score"""
+    detector = EwmaDetector(alpha=0.05, seasonal_alpha=0.1, threshold=4.0, warmup=30)
+    x, values = _series(3000)
+    values[[500, 1700]] += 5
+    values[100] = np.nan
+    x[200] = x[199]  # 重複的時間會被略過
+
+    online = EwmaState()
+    online_z = []
+    for seconds, value in zip(x.tolist(), values.tolist()):
+        result = None if np.isnan(value) else detector.update(online, value, seconds)
+        if result is not None:
+            online_z.append(np.nan if result[0] is None else result[0])
+
+    vectorized = EwmaState()
+    zscores = np.concatenate([
+        detector.run(vectorized, x[:1234], values[:1234])[2],
+        detector.run(vectorized, x[1234:], values[1234:])[2],
+    ])
+
+    assert vectorized.count == online.count == 2998
+    assert vectorized.mean == pytest.approx(online.mean)
+    assert vectorized.variance == pytest.approx(online.variance)
+    np.testing.assert_allclose(vectorized.seasonal, online.seasonal, atol=1e-9)
+    np.testing.assert_allclose(zscores, online_z, rtol=1e-6, atol=1e-9)
+    assert {498, 1698} <= set(np.flatnonzero(np.abs(zscores) >= 4.0))
+
+
+def test_ingest_uses_station_specific_baseline(station, station_b, anomaly_settings):
+    """測試同一個溫度在不同測站的基準下，只有偏離該測站基準時才被標記"""
+    start = timezone.now() - timedelta(days=2)
+    readings = []
+    for index in range(60):
+        timestamp = start + timedelta(minutes=10 * index)
+        offset = Decimal('0.05') * (index % 3)
+        readings.append(Reading(station=station, timestamp=timestamp, temperature=Decimal('27.00') + offset))
+        readings.append(Reading(station=station_b, timestamp=timestamp, temperature=Decimal('20.00') + offset))
+    bulk_insert_readings(readings)
+    assert not Anomaly.objects.exists()
+
+    later = start + timedelta(hours=12)
+    created, _ = bulk_insert_readings([
+        Reading(station=station, timestamp=later, temperature=Decimal('27.05')),
+        Reading(station=station_b, timestamp=later, temperature=Decimal('27.05')),
+    ])
+
+    anomaly = Anomaly.objects.get()
+    assert (anomaly.station_id, anomaly.field, anomaly.value) == (station_b.id, 'temperature', 27.05)
+    assert anomaly.reading_id == created[1].pk
+    assert anomaly.zscore > 4
+    assert anomaly.expected == pytest.approx(20.05, abs=0.1)
+    assert AnomalyBaseline.objects.get(station=station, field='temperature').count == 61
+
+
+def test_ingest_locks_baselines_created_concurrently(station, anomaly_settings):
+    """測試基準先以 ON CONFLICT DO NOTHING 建立再鎖定：已存在的預設列（並行寫入者建立）視為空基準接續更新"""
+    AnomalyBaseline.objects.create(station=station, field='temperature')
+    start = timezone.now() - timedelta(days=1)
+    bulk_insert_readings([
+        Reading(station=station, timestamp=start + timedelta(minutes=10 * index), temperature=Decimal('25.00'))
+        for index in range(5)
+    ])
+
+    baseline = AnomalyBaseline.objects.get(station=station, field='temperature')
+    assert baseline.count == 5
+    assert baseline.mean == pytest.approx(25.0)
+    assert AnomalyBaseline.objects.filter(station=station).count() == len(ANOMALY_FIELDS)
+
+
+def test_historical_backfill_skips_ingest_detection(station, anomaly_settings):
+    """測試歷史回填不更新基準，改由 backfill_anomaly_baselines 一次計算"""
+    x, values = _series(200)
+    values[150] += 3
+    bulk_insert_readings([
+        Reading(
+            station=station,
+            timestamp=timezone.now() - timedelta(days=3) + timedelta(minutes=10 * index),
+            temperature=Decimal(f'{value:.2f}'),
+        )
+        for index, value in enumerate(values)
+    ], live=False)
+    assert not AnomalyBaseline.objects.exists()
+
+    out = StringIO()
+    call_command('backfill_anomaly_baselines', '--record', '--chunk-size', '64', stdout=out)
+
+    baseline = AnomalyBaseline.objects.get(station=station, field='temperature')
+    assert baseline.count == 200
+    assert len(baseline.seasonal) == 24
+    last = Reading.objects.latest('timestamp').timestamp
+    assert abs(baseline.last_timestamp - last) < timedelta(milliseconds=1)
+    assert list(Anomaly.objects.values_list('field', flat=True)) == ['temperature']
+    assert Anomaly.objects.get().value == pytest.approx(values[150], abs=0.01)
+    assert '200 筆數據（1 筆異常）' in out.getvalue()
+
+
+def test_large_ingest_batches_match_online_updates(station, station_b, anomaly_settings):
+    """測試大批寫入的向量化更新與逐筆寫入得到相同的基準與異常（含重複時間與缺值）"""
+    x, values = _series(300)
+    values[[120, 250]] += 5
+    start = timezone.now() - timedelta(days=5)
+
+    def readings_for(target):
+        readings = [
+            Reading(
+                station=target, timestamp=start + timedelta(seconds=x[index] - x[0]),
+                temperature=None if index == 40 else Decimal(f'{value:.2f}'),
+                ph=Decimal('8.10') if index % 2 else None,
+            )
+            for index, value in enumerate(values)
+        ]
+        readings.append(Reading(station=target, timestamp=readings[80].timestamp, temperature=Decimal('40.00')))
+        return readings
+
+    bulk_insert_readings(readings_for(station))
+    for reading in readings_for(station_b):
+        bulk_insert_readings([reading])
+
+    for field in ('temperature', 'ph'):
+        batched = AnomalyBaseline.objects.get(station=station, field=field)
+        online = AnomalyBaseline.objects.get(station=station_b, field=field)
+        assert batched.count == online.count
+        assert batched.mean == pytest.approx(online.mean)
+        assert batched.variance == pytest.approx(online.variance)
+        np.testing.assert_allclose(batched.seasonal, online.seasonal, atol=1e-9)
+
+    def flagged(target):
+        return list(Anomaly.objects.filter(station=target).order_by('timestamp').values_list('field', 'value'))
+
+    assert flagged(station) == flagged(station_b)
+    assert ('temperature', pytest.approx(values[120], abs=0.01)) in flagged(station)
+    reading_ids = set(Anomaly.objects.filter(station=station).values_list('reading_id', flat=True))
+    assert reading_ids <= set(Reading.objects.filter(station=station).values_list('pk', flat=True))
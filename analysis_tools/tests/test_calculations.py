@@ -188,3 +188,53 @@ def test_calculate_statistics_complex_average(db, station):
 
     # (10 + 15 + 20) / 3 = 15.0
     assert stats['avg'] == 15.0
+
+
+# ==========================================
+# StatisticsEngine 測試
+# ==========================================
+
+def test_statistics_engine_accepts_instances_tuples_and_arrays(multiple_readings):
+    """測試 model 實例、values_list tuple 與 NumPy 陣列得到相同結果"""
+    import numpy as np
+    from analysis_tools.calculations import StatisticsEngine
+    from data_ingestion.models import Reading
+
+    fields = ['temperature', 'ph']
+    from_instances = StatisticsEngine(fields).update(multiple_readings).result()
+    from_tuples = StatisticsEngine(fields).update(Reading.objects.values_list(*fields)).result()
+    from_array = StatisticsEngine(fields).update(
+        np.array(Reading.objects.values_list(*fields), dtype=np.float64)
+    ).result()
+
+    for results in (from_instances, from_tuples, from_array):
+        assert results['temperature']['count'] == 10
+        assert results['temperature']['mean'] == pytest.approx(24.5)
+        assert results['temperature']['std'] == pytest.approx(np.std(np.arange(20, 30), ddof=1))
+        assert float(results['ph']['max']) == pytest.approx(7.9)
+    assert from_instances['ph']['max'] == Decimal('7.9')
+
+
+def test_statistics_engine_merge_matches_single_pass():
+    """測試分批後合併與單次計算相同（含百分位數與依時間的 first / last）"""
+    import numpy as np
+    from analysis_tools.calculations import StatisticsEngine
+
+    rng = np.random.default_rng(0)
+    table = np.column_stack([rng.permutation(1000).astype(float), rng.normal(20, 3, 1000)])
+    table[::7, 1] = np.nan
+
+    whole = StatisticsEngine(['value'], percentiles=(5, 50, 95), order_field='timestamp').update(table).result()
+    parts = [
+        StatisticsEngine(['value'], percentiles=(5, 50, 95), order_field='timestamp').update(chunk)
+        for chunk in np.array_split(table, 4)
+    ]
+    merged = parts[3].merge(parts[1]).merge(parts[0]).merge(parts[2]).result()
+
+    values = table[~np.isnan(table[:, 1])]
+    assert merged['value']['count'] == whole['value']['count'] == len(values)
+    for key in ('mean', 'std', 'min', 'max', 'p5', 'p50', 'p95'):
+        assert merged['value'][key] == pytest.approx(whole['value'][key])
+    assert merged['value']['p50'] == pytest.approx(np.median(values[:, 1]))
+    assert merged['value']['first'] == values[values[:, 0].argmin(), 1]
+    assert merged['value']['last'] == values[values[:, 0].argmax(), 1]
@@ -1,9 +1,16 @@
 """
 chart_helpers.py 函數測試 - pytest 風格
 """
+import json
+
+import numpy as np
 import pytest
-from analysis_tools.chart_helpers import prepare_chart_data
+from analysis_tools import chart_helpers
+from analysis_tools.chart_helpers import build_chart_data, lttb_indices, minmax_envelope, prepare_chart_data
+from data_ingestion.ingest import bulk_insert_readings
 from data_ingestion.models import Reading
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
@@ -176,3 +183,149 @@ def test_prepare_chart_data_handles_mixed_null_and_values(db, station):
     # 第二筆（反轉後）：temp=25.0, ph=None
     assert result['temperature'][1] == 25.0
     assert result['ph'][1] is None
+
+
+# ==========================================
+# 降採樣測試
+# ==========================================
+
+def test_lttb_keeps_endpoints_and_spike():
+    """測試 LTTB 保留頭尾與突波"""
+    x = np.arange(1000, dtype=float)
+    values = np.column_stack([np.sin(x / 50), np.zeros(1000)])
+    values[437, 1] = 100.0  # 只出現在第二個參數的突波
+
+    indices = lttb_indices(x, values, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert np.all(np.diff(indices) > 0)
+    assert 437 in indices
+
+
+def test_lttb_ignores_missing_values():
+    """測試缺值（NaN）不影響選點"""
+    x = np.arange(300, dtype=float)
+    values = np.column_stack([np.cos(x / 20), np.full(300, np.nan)])
+
+    indices = lttb_indices(x, values, 30)
+
+    assert len(indices) == 30
+
+
+def test_minmax_envelope_preserves_extremes():
+    """測試 min/max 包絡保留每個參數的極值與先後順序"""
+    x = np.arange(100, dtype=float)
+    values = np.column_stack([np.full(100, 5.0), np.full(100, 1.0)])
+    values[10, 0] = -3.0
+    values[40, 0] = 9.0
+    values[20, 1] = 7.0
+
+    out_x, out_values = minmax_envelope(x, values, 2)
+
+    assert len(out_x) == 4
+    assert list(out_values[:2, 0]) == [-3.0, 9.0]
+    assert 7.0 in out_values[:2, 1]
+
+
+def test_build_chart_data_covers_whole_range(db, station):
+    """測試圖表涵蓋整個時間範圍，而不是只有最新的 200 筆"""
+    end = timezone.now()
+    start = end - timedelta(days=30)
+    bulk_insert_readings([
+        Reading(
+            station=station,
+            timestamp=start + timedelta(minutes=30 * i),
+            temperature=Decimal('0.00') if i == 5 else Decimal('20.00'),
+        )
+        for i in range(1440)
+    ], notify=False)
+
+    chart_data, sampling = build_chart_data(station, start=start - timedelta(minutes=1), max_points=200)
+
+    assert sampling == {'source': 'raw', 'method': 'lttb', 'total': 1440, 'points': 200}
+    assert len(chart_data['labels']) == 200
+    assert chart_data['labels'][0] == timezone.localtime(start).strftime('%m/%d %H:%M')
+    assert 0.0 in chart_data['temperature']  # 0 值保留且突波被選中
+    assert chart_data['ph'] == [None] * 200
+
+
+def test_build_chart_data_uses_rollups_for_large_ranges(db, station, monkeypatch):
+    """測試原始數據超過上限時改讀彙總"""
+    monkeypatch.setattr(chart_helpers, 'RAW_DOWNSAMPLE_LIMIT', 100)
+    start = timezone.now() - timedelta(days=3)
+    bulk_insert_readings([
+        Reading(station=station, timestamp=start + timedelta(minutes=10 * i), temperature=Decimal('21.00'))
+        for i in range(300)
+    ])
+
+    chart_data, sampling = build_chart_data(station, max_points=50, method='minmax')
+
+    assert sampling['source'] == 'rollup:hour'
+    assert sampling['points'] == 50
+    assert set(chart_data['temperature']) == {21.0}
+
+
+def test_build_chart_data_picks_resolution_from_max_points(db, station, monkeypatch):
+    """測試依 max_points 選擇彙總解析度，且不查詢原始數據表"""
+    monkeypatch.setattr(chart_helpers, 'RAW_DOWNSAMPLE_LIMIT', 100)
+    start = timezone.now() - timedelta(days=21)
+    bulk_insert_readings([
+        Reading(station=station, timestamp=start + timedelta(minutes=30 * i), temperature=Decimal('21.00'))
+        for i in range(1000)
+    ])
+
+    with CaptureQueriesContext(connection) as queries:
+        chart_data, sampling = build_chart_data(station, start=start, max_points=200)
+
+    assert sampling['source'] == 'rollup:hour'
+    assert sampling['total'] >= 1000
+    assert sampling['points'] == 200
+    reading_table = connection.ops.quote_name(Reading._meta.db_table)
+    assert not any(reading_table in query['sql'] for query in queries.captured_queries)
+
+
+# ==========================================
+# 欄位式序列化測試
+# ==========================================
+
+def test_prepare_chart_data_keeps_zero_values(db, station):
+    """測試 0 值保留為 0.0（不再視為缺值）"""
+    Reading.objects.create(
+        station=station,
+        timestamp=timezone.now(),
+        temperature=Decimal('0.00'),
+        turbidity=Decimal('0.000'),
+    )
+
+    result = prepare_chart_data(station.readings.all())
+
+    assert result['temperature'] == [0.0]
+    assert result['turbidity'] == [0.0]
+    assert result['ph'] == [None]
+
+
+def test_prepare_chart_data_queryset_matches_instances(multiple_readings, station):
+    """測試 QuerySet（欄位式）與 Reading 列表結果相同，且支援已切片的 QuerySet"""
+    queryset = station.readings.order_by('-timestamp')[:5]
+
+    from_queryset = prepare_chart_data(queryset)
+    from_instances = prepare_chart_data(list(queryset))
+
+    assert from_queryset == from_instances
+    assert len(from_queryset['labels']) == 5
+    assert from_queryset['temperature'] == [25.0, 26.0, 27.0, 28.0, 29.0]
+    assert from_queryset['labels'][-1] == timezone.localtime(multiple_readings[-1].timestamp).strftime('%m/%d %H:%M')
+
+
+def test_dumps_chart_data_serializes_arrays():
+    """測試 NumPy 欄位直接序列化，NaN 輸出為 null"""
+    x = np.array([0.0, 60.0])
+    values = np.array([[1.5, np.nan], [0.0, 2.0]])
+    chart_data = chart_helpers.columns_to_chart_data(x, values, fields=['temperature', 'ph'], as_arrays=True)
+
+    decoded = json.loads(chart_helpers.dumps_chart_data(chart_data))
+
+    assert decoded['temperature'] == [1.5, 0.0]
+    assert decoded['ph'] == [None, 2.0]
+    assert len(decoded['labels']) == 2
@@ -224,6 +224,56 @@ CHANNEL_LAYERS = {
     },
 }
 
+# 單一批次中每個測站最多推播的筆數（取最新者）：大批匯入時瀏覽器只需要最近的數據，
+# Consumer 也只保留每個測站最新一筆待送訊息
+BROADCAST_MAX_PER_STATION = int(os.getenv('BROADCAST_MAX_PER_STATION', '20'))
+
+# ==========================================
+# 數據保留與冷封存（data_ingestion.archive）
+# ==========================================
+# 超過此天數的原始數據（以完整月份為單位）移到封存檔，彙總保留在資料庫
+READING_RETENTION_DAYS = int(os.getenv('READING_RETENTION_DAYS', '365'))
+
+# 封存檔目錄（可為掛載的物件儲存）
+READING_ARCHIVE_ROOT = Path(os.getenv('READING_ARCHIVE_ROOT', BASE_DIR / 'archive'))
+
+# 分鐘彙總的保留天數：每個測站、參數每分鐘一筆，成長速度高於原始數據；
+# 封存時刪除較舊的分鐘彙總（小時與日彙總永久保留，圖表的長時間範圍只用這兩種）
+ROLLUP_MINUTE_RETENTION_DAYS = int(os.getenv('ROLLUP_MINUTE_RETENTION_DAYS', '30'))
+
+# ==========================================
+# 異常偵測（analysis_tools.anomaly）
+# ==========================================
+# EWMA 平均與變異數的平滑係數（越大越快適應新數據）
+ANOMALY_EWMA_ALPHA = float(os.getenv('ANOMALY_EWMA_ALPHA', '0.05'))
+
+# 日週期偏移的平滑係數（0 表示不使用日週期基準）
+ANOMALY_SEASONAL_ALPHA = float(os.getenv('ANOMALY_SEASONAL_ALPHA', '0.1'))
+
+# |z-score| 達到此值視為異常
+ANOMALY_Z_THRESHOLD = float(os.getenv('ANOMALY_Z_THRESHOLD', '4.0'))
+
+# 基準累積此筆數後才開始標記異常
+ANOMALY_WARMUP = int(os.getenv('ANOMALY_WARMUP', '50'))
+
+# ==========================================
+# 批次匯入 API（data_ingestion.views.ingest_readings）
+# ==========================================
+# 單一請求的數據筆數與請求大小上限（位元組，gzip 解壓後同樣適用）；
+# 只套用在匯入 API（以串流讀取），其他頁面維持 Django 預設的 DATA_UPLOAD_MAX_MEMORY_SIZE
+INGEST_MAX_ROWS = int(os.getenv('INGEST_MAX_ROWS', '50000'))
+INGEST_MAX_BODY_SIZE = int(os.getenv('INGEST_MAX_BODY_SIZE', str(32 * 1024 * 1024)))
+
+# 允許的時鐘誤差（秒）：時間戳晚於現在超過此值的數據視為錯誤
+INGEST_MAX_CLOCK_SKEW = int(os.getenv('INGEST_MAX_CLOCK_SKEW', '300'))
+
+# 最早可接受的時間戳（Unix 秒數，預設 1900-01-01 UTC）：更早的時間多為記錄器時鐘未設定，
+# 且接近 datetime 下限的時間換算 UTC 時會溢位
+INGEST_MIN_TIMESTAMP = int(os.getenv('INGEST_MIN_TIMESTAMP', '-2208988800'))
+
+# 記憶體中測站清單的有效秒數
+INGEST_STATION_CACHE_SECONDS = int(os.getenv('INGEST_STATION_CACHE_SECONDS', '60'))
+
 # ==========================================
 # Celery Beat 定時任務設定 - 使用 django-celery-beat
 # ==========================================
@@ -254,6 +304,24 @@ CELERY_BEAT_SCHEDULE = {
         'schedule': crontab(hour=8, minute=0),  # 每天早上 8 點
     },
 
+    # 每天預先建立 Reading 未來月份的分區（僅在已分區的 PostgreSQL 上動作）
+    'ensure-reading-partitions': {
+        'task': 'station_data.tasks.ensure_reading_partitions',
+        'schedule': crontab(hour=3, minute=30),
+    },
+
+    # 每天核對數據筆數計數器（修正單筆刪除、COPY 寫入等未即時計入的變更）
+    'reconcile-reading-counts': {
+        'task': 'station_data.tasks.reconcile_reading_counts',
+        'schedule': crontab(hour=2, minute=30),
+    },
+
+    # 每天將超過保留期限的原始數據封存為欄式壓縮檔
+    'archive-old-readings': {
+        'task': 'station_data.tasks.archive_old_readings',
+        'schedule': crontab(hour=4, minute=0),
+    },
+
     # 測試用：每 2 分鐘執行一次（開發測試用，正式環境請移除或註解）
     'test-update-every-2-minutes': {
         'task': 'station_data.tasks.update_ocean_data_from_source',
@@ -18,6 +18,7 @@ urlpatterns = [
     # 其他功能
     path('accounts/', include('allauth.urls')),  # allauth 的所有 URLs (Google登入)
     path('stations/', include('station_data.urls')),  # 測站資料頁面
+    path('api/ingest/', include('data_ingestion.urls')),  # 批次匯入 API（權杖驗證）
 ]
 
 # 靜態文件由 WhiteNoise 的 AsgiStaticFilesHandler 自動處理
\ No newline at end of file
@@ -46,6 +46,66 @@ def setup_site_and_social_app(db):
         pass
 
 
+@pytest.fixture(autouse=True)
+def in_memory_channel_layer(settings):
+    """測試環境使用記憶體 channel layer，避免依賴 Redis"""
+    settings.CHANNEL_LAYERS = {
+        'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+    }
+
+
+@pytest.fixture(autouse=True)
+def celery_eager():
+    """測試環境直接執行 Celery 任務，避免依賴 broker"""
+    from config.celery import app
+
+    previous = app.conf.task_always_eager, app.conf.task_eager_propagates
+    app.conf.task_always_eager = True
+    app.conf.task_eager_propagates = True
+    yield
+    app.conf.task_always_eager, app.conf.task_eager_propagates = previous
+
+
+@pytest.fixture(autouse=True)
+def local_memory_cache(settings):
+    """測試環境使用記憶體快取，避免依賴 Redis，且每個測試從空快取開始"""
+    from django.core.cache import cache
+
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    }
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def alert_evaluator():
+    """每個測試重新編譯警報規則（快取與資料庫在測試之間都會清空）"""
+    from station_data.alerts import reset_evaluator
+
+    reset_evaluator()
+    yield
+    reset_evaluator()
+
+
+@pytest.fixture(autouse=True)
+def ingest_station_directory():
+    """每個測試重新載入匯入 API 的測站清單（測試之間測站 ID 可能重複使用）"""
+    from data_ingestion.schema import STATIONS
+
+    STATIONS.invalidate()
+    yield
+    STATIONS.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def archive_root(settings, tmp_path):
+    """封存檔寫到暫存目錄"""
+    settings.READING_ARCHIVE_ROOT = tmp_path / 'archive'
+    return settings.READING_ARCHIVE_ROOT
+
+
 # ==========================================
 # 使用者相關 Fixtures
 # ==========================================
@@ -1,6 +1,6 @@
 #ocean_monitor\data_ingestion\admin.py
 from django.contrib import admin
-from .models import Station, Reading
+from .models import IngestToken, Station, Reading, ReadingArchive, ReadingRollup, ReadingSketch
 
 
 @admin.register(Station)
@@ -13,4 +13,37 @@ class StationAdmin(admin.ModelAdmin):
 class ReadingAdmin(admin.ModelAdmin):
     list_display = ('station', 'timestamp', 'temperature', 'ph', 'oxygen', 'salinity')
     list_filter = ('station', 'timestamp')
-    date_hierarchy = 'timestamp'
\ No newline at end of file
+    date_hierarchy = 'timestamp'
+
+@admin.register(ReadingRollup)
+class ReadingRollupAdmin(admin.ModelAdmin):
+    list_display = ('station', 'resolution', 'field', 'bucket', 'count', 'min', 'max')
+    list_filter = ('resolution', 'field', 'station')
+    date_hierarchy = 'bucket'
+
+
+@admin.register(ReadingSketch)
+class ReadingSketchAdmin(admin.ModelAdmin):
+    list_display = ('station', 'resolution', 'field', 'bucket', 'count')
+    list_filter = ('resolution', 'field', 'station')
+    date_hierarchy = 'bucket'
+    exclude = ('digest',)
+
+
+@admin.register(ReadingArchive)
+class ReadingArchiveAdmin(admin.ModelAdmin):
+    list_display = ('station', 'month', 'rows', 'size', 'path', 'updated_at')
+    list_filter = ('station',)
+    date_hierarchy = 'month'
+
+
+@admin.register(IngestToken)
+class IngestTokenAdmin(admin.ModelAdmin):
+    list_display = ('name', 'station', 'is_active', 'created_at', 'last_used_at')
+    list_filter = ('is_active', 'station')
+    search_fields = ('name',)
+    readonly_fields = ('created_at', 'last_used_at')
+
+    def has_add_permission(self, request):
+        # 原始權杖只在建立時顯示一次，請使用 manage.py create_ingest_token
+        return False
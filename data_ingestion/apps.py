@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class DataIngestionConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'data_ingestion'
+
+    def ready(self):
+        # 註冊 Reading 寫入事件（post_save → readings_ingested）
+        from . import signals  # noqa: F401
@@ -0,0 +1,549 @@
+"""
+冷數據封存（每個測站每月一個欄式壓縮檔）
+
+超過保留期限（settings.READING_RETENTION_DAYS）的 Reading 以完整月份（當地時間）為單位，
+依測站寫入 READING_ARCHIVE_ROOT/<測站 ID>/<YYYY-MM>.oca 後自資料庫刪除。
+ReadingRollup 的小時與日彙總保留在資料庫，長時間範圍的圖表仍直接讀彙總；
+分鐘彙總超過 settings.ROLLUP_MINUTE_RETENTION_DAYS 的部分在封存時一併刪除。
+圖表原始數據與匯出則透過 ReadingArchive 找出重疊的檔案，以 mmap 讀取。
+
+檔案格式（OCA1）：
+
+    b'OCA1' + uint32 標頭長度 + JSON 標頭 + 各區塊各欄位的 zlib 壓縮資料
+
+- 每 BLOCK_ROWS 筆一個區塊，依 (timestamp, id) 排序；標頭記錄每個區塊的時間範圍
+  與各欄位資料的位移、長度
+- id、timestamp（UTC 微秒）為 int64 差分編碼
+- 數值欄位依 DecimalField 的小數位數放大為 int64（NULL 為 NULL_SENTINEL），
+  還原為 Decimal 時與資料庫完全相同
+- 讀取時只解壓縮時間範圍內區塊的所需欄位，其餘部分不會從磁碟讀入
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Max
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .counters import subtract_reading_counts
+from .models import Reading, ReadingArchive
+from .purge import DEFAULT_PURGE_CHUNK_SIZE, purge_queryset
+from .rollups import prune_minute_rollups
+from .signals import readings_purged
+
+MAGIC = b'OCA1'
+HEADER_LENGTH = struct.Struct('<I')
+BLOCK_ROWS = 8192
+COMPRESSION_LEVEL = 6
+NULL_SENTINEL = np.iinfo(np.int64).min
+
+# 數值欄位與小數位數（放大倍率）
+ARCHIVE_SCALES = {
+    field.name: field.decimal_places
+    for field in Reading._meta.concrete_fields
+    if isinstance(field, models.DecimalField)
+}
+ARCHIVE_FIELDS = list(ARCHIVE_SCALES)
+
+# 差分編碼的欄位
+KEY_COLUMNS = ('id', 'timestamp')
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class ArchiveError(Exception):
+    """封存檔格式錯誤"""
+
+
+# ==========================================
+# 時間與數值轉換
+# ==========================================
+
+def to_micros(value):
+    """aware datetime 轉為 UTC 微秒"""
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_micros(micros):
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+def month_start(value):
+    """所在月份的月初（當地時間）"""
+    return timezone.localtime(value).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(start):
+    year, month = (start.year + 1, 1) if start.month == 12 else (start.year, start.month + 1)
+    return timezone.make_aware(datetime(year, month, 1), start.tzinfo)
+
+
+def scale_values(values, scale):
+    """Decimal（或 None）序列放大為 int64 陣列"""
+    return np.fromiter(
+        (NULL_SENTINEL if value is None else int(Decimal(value).scaleb(scale)) for value in values),
+        dtype=np.int64,
+        count=len(values),
+    )
+
+
+def unscale_float(values, scale):
+    """int64 陣列還原為 float64（NULL 為 NaN）"""
+    result = values.astype(np.float64) / 10 ** scale
+    result[values == NULL_SENTINEL] = np.nan
+    return result
+
+
+def unscale_decimal(values, scale):
+    """int64 陣列還原為 Decimal 列表（NULL 為 None）"""
+    return [None if value == NULL_SENTINEL else Decimal(value).scaleb(-scale) for value in values.tolist()]
+
+
+# ==========================================
+# 檔案讀寫
+# ==========================================
+
+def archive_root():
+    return Path(settings.READING_ARCHIVE_ROOT)
+
+
+def archive_relpath(station_id, month):
+    return f'{station_id}/{month:%Y-%m}.oca'
+
+
+def write_archive(path, columns):
+    """
+    寫入封存檔（先寫暫存檔再置換，讀取端不會看到寫到一半的檔案）
+
+    Args:
+        path: 檔案路徑
+        columns: {'id', 'timestamp', 各數值欄位: int64 陣列}，已依 (timestamp, id) 排序
+
+    Returns:
+        檔案大小
+    """
+    path = Path(path)
+    os.replace(_write_temporary(path, columns), path)
+    return path.stat().st_size
+
+
+def _write_temporary(path, columns):
+    """將封存內容寫入 path 旁的暫存檔（fsync 後回傳暫存檔路徑，由呼叫端置換）"""
+    timestamps = columns['timestamp']
+    rows = len(timestamps)
+    blobs = []
+    blocks = []
+    offset = 0
+    for begin in range(0, rows, BLOCK_ROWS):
+        stop = min(begin + BLOCK_ROWS, rows)
+        block = {'rows': stop - begin, 'first': int(timestamps[begin]), 'last': int(timestamps[stop - 1]), 'columns': {}}
+        for name, array in columns.items():
+            part = array[begin:stop]
+            if name in KEY_COLUMNS:
+                part = np.diff(part, prepend=np.int64(0))
+            data = zlib.compress(np.ascontiguousarray(part, dtype='<i8').tobytes(), COMPRESSION_LEVEL)
+            block['columns'][name] = [offset, len(data)]
+            blobs.append(data)
+            offset += len(data)
+        blocks.append(block)
+
+    header = json.dumps({
+        'version': 1,
+        'rows': rows,
+        'scales': {field: ARCHIVE_SCALES[field] for field in columns if field not in KEY_COLUMNS},
+        'blocks': blocks,
+    }).encode()
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f'{path.name}.tmp')
+    with open(temporary, 'wb') as output:
+        output.write(MAGIC)
+        output.write(HEADER_LENGTH.pack(len(header)))
+        output.write(header)
+        for data in blobs:
+            output.write(data)
+        output.flush()
+        os.fsync(output.fileno())
+    return temporary
+
+
+class ArchiveReader:
+    """
+    以 mmap 讀取封存檔
+
+        with ArchiveReader(path) as reader:
+            columns = reader.read(['timestamp', 'temperature'], start=..., end=...)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as source:
+            self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ArchiveError(f'不是封存檔: {self.path}')
+        (length,) = HEADER_LENGTH.unpack_from(self._map, len(MAGIC))
+        header_start = len(MAGIC) + HEADER_LENGTH.size
+        self.header = json.loads(self._map[header_start:header_start + length])
+        self._data_start = header_start + length
+        self.rows = self.header['rows']
+        self.scales = self.header['scales']
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _decode(self, block, name):
+        offset, length = block['columns'][name]
+        begin = self._data_start + offset
+        view = memoryview(self._map)[begin:begin + length]
+        try:
+            array = np.frombuffer(zlib.decompress(view), dtype='<i8')
+        finally:
+            view.release()
+        return np.cumsum(array) if name in KEY_COLUMNS else array
+
+    def read(self, columns, start=None, end=None):
+        """
+        讀取欄位
+
+        Args:
+            columns: 欄位名稱（'id'、'timestamp' 或數值欄位）
+            start, end: UTC 微秒（含），None 表示不限
+
+        Returns:
+            {欄位: int64 陣列}；數值欄位為放大後的整數（見 unscale_float / unscale_decimal）
+        """
+        blocks = [
+            block for block in self.header['blocks']
+            if (start is None or block['last'] >= start) and (end is None or block['first'] <= end)
+        ]
+        if not blocks:
+            return {name: np.empty(0, dtype=np.int64) for name in columns}
+
+        names = ['timestamp', *(name for name in columns if name != 'timestamp')]
+        result = {name: np.concatenate([self._decode(block, name) for block in blocks]) for name in names}
+        timestamps = result['timestamp']
+        low = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        high = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        return {name: result[name][low:high] for name in columns}
+
+
+# ==========================================
+# 封存
+# ==========================================
+
+def _collect_columns(readings, chunk_size):
+    """依 (timestamp, id) 排序讀出數據並轉為欄位陣列（每批轉換一次）"""
+    parts = {name: [] for name in (*KEY_COLUMNS, *ARCHIVE_FIELDS)}
+    rows = readings.order_by('timestamp', 'id').values_list('id', 'timestamp', *ARCHIVE_FIELDS)
+
+    def flush(chunk):
+        parts['id'].append(np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk)))
+        parts['timestamp'].append(np.fromiter((to_micros(row[1]) for row in chunk), dtype=np.int64, count=len(chunk)))
+        for index, field in enumerate(ARCHIVE_FIELDS, start=2):
+            parts[field].append(scale_values([row[index] for row in chunk], ARCHIVE_SCALES[field]))
+
+    chunk = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    if not parts['id']:
+        return None
+    return {name: np.concatenate(arrays) for name, arrays in parts.items()}
+
+
+def _merge_columns(existing, columns):
+    """合併既有封存檔與新數據（相同 id 以新數據為準），重新依 (timestamp, id) 排序"""
+    keep = ~np.isin(existing['id'], columns['id'])
+    merged = {name: np.concatenate([existing[name][keep], columns[name]]) for name in columns}
+    order = np.lexsort((merged['id'], merged['timestamp']))
+    return {name: array[order] for name, array in merged.items()}
+
+
+def archive_station_month(station_id, month, chunk_size=DEFAULT_PURGE_CHUNK_SIZE):
+    """
+    將一個測站一個月的數據寫入封存檔並自資料庫刪除
+
+    該月已有封存檔時（例如之後補寫的舊數據）與既有內容合併。
+    只依 id 刪除已寫入檔案的數據：封存期間新寫入（即使 id 較小、較晚提交）的數據留待下次封存。
+    新檔案先寫入暫存檔，交易提交後才置換：交易回復時既有的封存檔維持不變。
+
+    Args:
+        station_id: 測站 ID
+        month: 月初（當地時間的 aware datetime）
+
+    Returns:
+        封存的筆數
+    """
+    readings = Reading.objects.filter(
+        station_id=station_id, timestamp__gte=month, timestamp__lt=next_month(month)
+    )
+    columns = _collect_columns(readings, chunk_size)
+    if columns is None:
+        return 0
+    archived_ids = columns['id'].tolist()
+
+    existing = ReadingArchive.objects.filter(station_id=station_id, month=month.date()).first()
+    if existing is not None:
+        with open_archive(existing) as reader:
+            columns = _merge_columns(reader.read(list(columns)), columns)
+
+    relpath = archive_relpath(station_id, month)
+    path = archive_root() / relpath
+    temporary = _write_temporary(path, columns)
+    try:
+        with transaction.atomic():
+            ReadingArchive.objects.update_or_create(
+                station_id=station_id,
+                month=month.date(),
+                defaults={
+                    'path': relpath,
+                    'rows': len(columns['id']),
+                    'first_timestamp': from_micros(columns['timestamp'][0]),
+                    'last_timestamp': from_micros(columns['timestamp'][-1]),
+                    'size': temporary.stat().st_size,
+                },
+            )
+            deleted = 0
+            for begin in range(0, len(archived_ids), chunk_size):
+                deleted += purge_queryset(
+                    readings.filter(id__in=archived_ids[begin:begin + chunk_size]), chunk_size=chunk_size,
+                    allow_truncate=False, before_delete=subtract_reading_counts,
+                )
+            transaction.on_commit(partial(os.replace, temporary, path))
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+    return deleted
+
+
+def archived_until(station_ids=None):
+    """
+    各測站已封存範圍的結束時間（最後一個封存月份的下個月初）
+
+    封存依月份由舊到新進行，這個時間之前的原始數據都已移出資料庫。
+    """
+    archives = ReadingArchive.objects.all()
+    if station_ids is not None:
+        archives = archives.filter(station_id__in=station_ids)
+    tzinfo = timezone.get_current_timezone()
+    return {
+        station_id: next_month(timezone.make_aware(datetime(last.year, last.month, 1), tzinfo))
+        for station_id, last in archives.values('station_id').annotate(last=Max('month')).values_list('station_id', 'last')
+    }
+
+
+def archive_cutoff(older_than_days=None, now=None):
+    """封存截止時間：保留期限所在月份的月初（只封存完整月份）"""
+    days = settings.READING_RETENTION_DAYS if older_than_days is None else older_than_days
+    return month_start((now or timezone.now()) - timedelta(days=days))
+
+
+def pending_archive_months(cutoff, station_ids=None):
+    """截止時間前仍在資料庫中的 (測站 ID, 月初)，依測站、月份排序"""
+    readings = Reading.objects.filter(timestamp__lt=cutoff)
+    if station_ids is not None:
+        readings = readings.filter(station_id__in=station_ids)
+    return list(
+        readings.annotate(month=TruncMonth('timestamp', tzinfo=timezone.get_current_timezone()))
+        .values_list('station_id', 'month')
+        .distinct()
+        .order_by('station_id', 'month')
+    )
+
+
+def archive_readings(older_than_days=None, station_ids=None, chunk_size=DEFAULT_PURGE_CHUNK_SIZE,
+                     dry_run=False, log=None):
+    """
+    封存超過保留期限的數據，並刪除超過保留期限的分鐘彙總
+    （小時與日彙總、StationLatest 快照保留）
+
+    Args:
+        older_than_days: 保留天數（None 使用 settings.READING_RETENTION_DAYS）
+        station_ids: 限定測站（None 表示全部）
+        chunk_size: 每批讀取 / 刪除筆數
+        dry_run: 只列出要封存的月份
+        log: 進度輸出函式
+
+    Returns:
+        {'cutoff': 截止時間, 'months': 封存的月份數, 'rows': 封存筆數,
+         'minute_rollups': 刪除（dry_run 時為待刪除）的分鐘彙總筆數}
+    """
+    cutoff = archive_cutoff(older_than_days)
+    months = pending_archive_months(cutoff, station_ids)
+    summary = {'cutoff': cutoff, 'months': 0, 'rows': 0}
+    affected = set()
+    for station_id, month in months:
+        month = month_start(month)
+        if dry_run:
+            if log:
+                log(f'測站 {station_id} {month:%Y-%m}: 待封存')
+            summary['months'] += 1
+            continue
+        archived = archive_station_month(station_id, month, chunk_size=chunk_size)
+        if log:
+            log(f'測站 {station_id} {month:%Y-%m}: 已封存 {archived:,} 筆')
+        if archived:
+            summary['months'] += 1
+            summary['rows'] += archived
+            affected.add(station_id)
+
+    summary['minute_rollups'] = prune_minute_rollups(station_ids=station_ids, chunk_size=chunk_size, dry_run=dry_run)
+    if log and summary['minute_rollups']:
+        log(f'分鐘彙總: {"待刪除" if dry_run else "已刪除"} {summary["minute_rollups"]:,} 筆')
+
+    if affected:
+        readings_purged.send(sender=Reading, station_ids=sorted(affected), deleted=summary['rows'])
+    return summary
+
+
+# ==========================================
+# 讀取（圖表、匯出）
+# ==========================================
+
+def open_archive(archive):
+    return ArchiveReader(archive_root() / archive.path)
+
+
+def archives_in_range(station_ids=None, start=None, end=None):
+    """與時間範圍重疊的封存檔（依月份、測站排序）"""
+    archives = ReadingArchive.objects.order_by('month', 'station_id')
+    if station_ids is not None:
+        archives = archives.filter(station_id__in=station_ids)
+    if start is not None:
+        archives = archives.filter(last_timestamp__gte=start)
+    if end is not None:
+        archives = archives.filter(first_timestamp__lte=end)
+    return list(archives)
+
+
+def _micros_or_none(value):
+    return None if value is None else to_micros(value)
+
+
+def count_archived(archives, start=None, end=None):
+    """封存檔中時間範圍內的筆數；完全落在範圍內的檔案直接使用記錄的筆數"""
+    total = 0
+    for archive in archives:
+        if (start is None or archive.first_timestamp >= start) and (end is None or archive.last_timestamp <= end):
+            total += archive.rows
+            continue
+        with open_archive(archive) as reader:
+            total += len(reader.read(['timestamp'], _micros_or_none(start), _micros_or_none(end))['timestamp'])
+    return total
+
+
+def read_archived_columns(archives, fields, start=None, end=None):
+    """
+    圖表用的欄位陣列（舊到新）
+
+    Returns:
+        (x, values)：x 為 UNIX 秒數，values 為 (筆數, 欄位數) 的 float64（NULL 為 NaN）
+    """
+    xs = []
+    tables = []
+    for archive in sorted(archives, key=lambda archive: archive.first_timestamp):
+        with open_archive(archive) as reader:
+            columns = reader.read(['timestamp', *fields], _micros_or_none(start), _micros_or_none(end))
+        xs.append(columns['timestamp'] / 1e6)
+        tables.append(np.column_stack(
+            [unscale_float(columns[field], reader.scales[field]) for field in fields]
+        ).reshape(len(columns['timestamp']), len(fields)))
+    if not xs:
+        return np.empty(0), np.empty((0, len(fields)))
+    return np.concatenate(xs), np.vstack(tables)
+
+
+def _range_mask(columns, scales, ranges):
+    """數值範圍篩選（與 SQL 相同，NULL 不符合任何範圍）"""
+    mask = np.ones(len(columns['timestamp']), dtype=bool)
+    for field, lookup, bound in ranges:
+        values = columns[field]
+        scaled = Decimal(bound).scaleb(scales[field])
+        valid = values != NULL_SENTINEL
+        if lookup == 'gte':
+            mask &= valid & (values >= int(scaled.to_integral_value(rounding=ROUND_CEILING)))
+        else:
+            mask &= valid & (values <= int(scaled.to_integral_value(rounding=ROUND_FLOOR)))
+    return mask
+
+
+def iter_archived_rows(fields, station_ids=None, start=None, end=None, ranges=(), chunk_size=DEFAULT_PURGE_CHUNK_SIZE):
+    """
+    匯出用的封存數據：逐批產生 [(id, station_id, timestamp, Decimal 數值...), ...]
+
+    依月份逐一讀取，同一月份各測站的數據依 (timestamp, id) 合併排序；
+    篩選條件與 station_data.pagination.parse_reading_filters() 相同。
+    """
+    archives = archives_in_range(station_ids, start, end)
+    range_fields = [field for field, _, _ in ranges]
+    columns_needed = ['id', 'timestamp', *dict.fromkeys([*fields, *range_fields])]
+
+    by_month = {}
+    for archive in archives:
+        by_month.setdefault(archive.month, []).append(archive)
+
+    for month in sorted(by_month):
+        parts = []
+        for archive in by_month[month]:
+            with open_archive(archive) as reader:
+                columns = reader.read(columns_needed, _micros_or_none(start), _micros_or_none(end))
+                scales = reader.scales
+            if ranges:
+                mask = _range_mask(columns, scales, ranges)
+                columns = {name: array[mask] for name, array in columns.items()}
+            columns['station_id'] = np.full(len(columns['id']), archive.station_id, dtype=np.int64)
+            parts.append((columns, scales))
+        if not parts:
+            continue
+
+        merged = {
+            name: np.concatenate([columns[name] for columns, _ in parts])
+            for name in ('id', 'timestamp', 'station_id', *fields)
+        }
+        order = np.lexsort((merged['id'], merged['timestamp']))
+        scales = parts[0][1]
+        for begin in range(0, len(order), chunk_size):
+            index = order[begin:begin + chunk_size]
+            values = [unscale_decimal(merged[field][index], scales[field]) for field in fields]
+            yield [
+                (pk, station_id, from_micros(micros), *row_values)
+                for pk, station_id, micros, *row_values in zip(
+                    merged['id'][index].tolist(),
+                    merged['station_id'][index].tolist(),
+                    merged['timestamp'][index].tolist(),
+                    *values,
+                )
+            ]
+
+
+def delete_station_archives(station_id):
+    """刪除測站的封存檔（測站刪除後由訊號接收器呼叫；ReadingArchive 紀錄由 CASCADE 刪除）"""
+    directory = archive_root() / str(station_id)
+    for path in directory.glob('*.oca'):
+        path.unlink(missing_ok=True)
+    if directory.exists() and not any(directory.iterdir()):
+        directory.rmdir()
+
@@ -0,0 +1,96 @@
+"""
+一批 Reading 的欄式檢視
+
+readings_ingested 的接收器（彙總、分位數摘要、計數器、異常偵測）都要把同一批數據
+轉為 NumPy 陣列並依 (測站, 時間) 分組。ReadingColumns 隨訊號以 columns 參數傳遞，
+排序與每個欄位的 Decimal → float 轉換在整批數據中只做一次，由各接收器共用。
+
+所有陣列與 readings 都依 (測站, 時間) 排序；同一時間維持原本的順序。
+"""
+from datetime import datetime, timezone as dt_timezone
+from functools import cached_property
+
+import numpy as np
+
+
+class ReadingColumns:
+    """
+    Example:
+        columns = ReadingColumns(readings)
+        for start, end in columns.bounds(columns.station_starts):
+            columns.values('temperature')[start:end]
+    """
+
+    def __init__(self, readings):
+        self._readings = list(readings)
+        self._values = {}
+
+    def __len__(self):
+        return len(self._readings)
+
+    @cached_property
+    def _order(self):
+        size = len(self._readings)
+        station_ids = np.fromiter((reading.station_id for reading in self._readings), dtype=np.int64, count=size)
+        seconds = np.fromiter(
+            (reading.timestamp.timestamp() for reading in self._readings), dtype=np.float64, count=size,
+        )
+        order = np.lexsort((seconds, station_ids))
+        return order, station_ids[order], seconds[order]
+
+    @cached_property
+    def readings(self):
+        return [self._readings[index] for index in self._order[0].tolist()]
+
+    @property
+    def station_ids(self):
+        return self._order[1]
+
+    @property
+    def seconds(self):
+        """UNIX 秒數（float64）"""
+        return self._order[2]
+
+    def values(self, field):
+        """欄位數值（float64，缺值為 NaN）"""
+        column = self._values.get(field)
+        if column is None:
+            raw = [getattr(reading, field) for reading in self.readings]
+            column = self._values[field] = np.array(
+                [np.nan if value is None else float(value) for value in raw], dtype=np.float64,
+            )
+        return column
+
+    def _starts(self, *keys):
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        changed = np.zeros(len(self) - 1, dtype=bool)
+        for key in keys:
+            changed |= key[1:] != key[:-1]
+        return np.flatnonzero(np.r_[True, changed])
+
+    @cached_property
+    def station_starts(self):
+        """各測站在排序後陣列中的起點"""
+        return self._starts(self.station_ids)
+
+    @cached_property
+    def minute_groups(self):
+        """
+        依 (測站, 分鐘) 分組
+
+        Returns:
+            (starts, keys)：各組的起點，與各組的 (station_id, 分鐘起點 UTC datetime)
+        """
+        minutes = self.seconds // 60
+        starts = self._starts(self.station_ids, minutes)
+        keys = [
+            (station_id, datetime.fromtimestamp(minute * 60, dt_timezone.utc))
+            for station_id, minute in zip(self.station_ids[starts].tolist(), minutes[starts].tolist())
+        ]
+        return starts, keys
+
+    def bounds(self, starts):
+        """起點陣列轉為 [(start, end), ...]"""
+        starts = starts.tolist()
+        return list(zip(starts, starts[1:] + [len(self)]))
@@ -0,0 +1,128 @@
+"""
+數據筆數計數器（ReadingCount：每個測站每天一筆）
+
+- 寫入：readings_ingested 接收器呼叫 apply_reading_counts()，與寫入在同一個交易內
+  以 INSERT ... ON CONFLICT DO UPDATE 累加
+- 大量刪除（purge / 封存）：每批刪除前以 subtract_reading_counts() 在同一個交易內扣除
+- 不經上述路徑的變更（單筆刪除、修改時間戳、COPY 寫入）由 reconcile_reading_counts()
+  以 GROUP BY 重新計算並修正差異（定時任務）
+
+日期以當地時間（settings.TIME_ZONE）切分，與 ReadingRollup 的日彙總一致。
+"""
+from collections import Counter
+from datetime import datetime, time
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .columns import ReadingColumns
+from .models import Reading, ReadingCount
+
+
+def count_by_day(readings, columns=None):
+    """在記憶體中合併一批數據：{(station_id, 日期): 筆數}（每分鐘只換算一次當地日期）"""
+    columns = ReadingColumns(readings) if columns is None else columns
+    if not len(columns):
+        return Counter()
+    starts, keys = columns.minute_groups
+    tz = timezone.get_current_timezone()
+    counts = Counter()
+    for (station_id, minute), size in zip(keys, np.diff(np.r_[starts, len(columns)]).tolist()):
+        counts[station_id, timezone.localdate(minute, tz)] += size
+    return counts
+
+
+def _upsert_sql():
+    quote = connection.ops.quote_name
+    table = quote(ReadingCount._meta.db_table)
+    count = quote('count')
+    return (
+        f'INSERT INTO {table} ("station_id", "day", {count}) VALUES (%s, %s, %s) '
+        f'ON CONFLICT ("station_id", "day") DO UPDATE SET {count} = {table}.{count} + EXCLUDED.{count}'
+    )
+
+
+def adjust_reading_counts(deltas):
+    """
+    依 {(station_id, 日期): 增減筆數} 更新計數器
+
+    Returns:
+        更新的計數器筆數
+    """
+    adapt = connection.ops.adapt_datefield_value
+    params = [(station_id, adapt(day), delta) for (station_id, day), delta in deltas.items() if delta]
+    if not params:
+        return 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), params)
+    return len(params)
+
+
+def apply_reading_counts(readings, columns=None):
+    """新寫入的數據累加到計數器"""
+    return adjust_reading_counts(count_by_day(readings, columns))
+
+
+def _daily_counts(readings):
+    """資料庫端 GROUP BY：{(station_id, 日期): 筆數}"""
+    rows = (
+        readings.order_by()
+        .annotate(day=TruncDate('timestamp', tzinfo=timezone.get_current_timezone()))
+        .values_list('station_id', 'day')
+        .annotate(total=Count('pk'))
+    )
+    return {(station_id, day): total for station_id, day, total in rows}
+
+
+def subtract_reading_counts(readings):
+    """
+    即將刪除的數據自計數器扣除（在刪除的同一個交易內呼叫）
+
+    Args:
+        readings: 即將刪除的 Reading QuerySet
+    """
+    return adjust_reading_counts({key: -total for key, total in _daily_counts(readings).items()})
+
+
+def reconcile_reading_counts(station_ids=None, since=None):
+    """
+    以原始數據重新計算計數器並修正差異
+
+    與寫入同時執行時，期間寫入的數據可能被算入兩次或漏算，下次執行會再修正。
+
+    Args:
+        station_ids: 限定測站（None 表示全部）
+        since: 只核對此日期（含）之後的計數器（None 表示全部）
+
+    Returns:
+        修正的計數器筆數
+    """
+    readings = Reading.objects.all()
+    stored = ReadingCount.objects.all()
+    if station_ids is not None:
+        readings = readings.filter(station_id__in=station_ids)
+        stored = stored.filter(station_id__in=station_ids)
+    if since is not None:
+        readings = readings.filter(timestamp__gte=timezone.make_aware(datetime.combine(since, time.min)))
+        stored = stored.filter(day__gte=since)
+
+    actual = _daily_counts(readings)
+    current = {(station_id, day): count for station_id, day, count in stored.values_list('station_id', 'day', 'count')}
+
+    changed = [
+        ReadingCount(station_id=station_id, day=day, count=total)
+        for (station_id, day), total in actual.items()
+        if current.get((station_id, day)) != total
+    ]
+    stale = [key for key in current if key not in actual]
+    with transaction.atomic():
+        if changed:
+            ReadingCount.objects.bulk_create(
+                changed, update_conflicts=True, unique_fields=['station', 'day'], update_fields=['count'],
+            )
+        for station_id, day in stale:
+            ReadingCount.objects.filter(station_id=station_id, day=day).delete()
+    return len(changed) + len(stale)
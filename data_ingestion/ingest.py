@@ -0,0 +1,162 @@
+"""
+Reading 批次寫入
+
+所有批次產生數據的路徑（模擬器、軌跡產生器、匯入 API 等）都透過
+bulk_insert_readings() 寫入，確保：
+- 使用 bulk_create 分批寫入，且整批在同一個交易內
+- 寫入後發送 readings_ingested 訊號（bulk_create 不會觸發 post_save）
+
+已驗證的數據（schema.READING_SCHEMA 產生）可傳 use_copy=True：PostgreSQL 改以 COPY 寫入
+（預先由序列取得 ID），SQLite 改以預先轉換參數的單一 executemany，
+兩者都略過 bulk_create 逐值的欄位轉換，仍發送訊號；批次匯入 API 與 socket 匯入使用此路徑。
+
+大量歷史回填可改用 copy_insert_rows()（COPY FROM STDIN），
+此路徑不發送訊號，寫入後需以 rollups.backfill_rollups() 重建彙總、
+counters.reconcile_reading_counts() 核對筆數計數器。
+"""
+import csv
+import io
+import operator
+import time
+
+from django.db import connection, transaction
+
+from .models import Reading
+from .signals import notify_readings_ingested
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def bulk_insert_readings(readings, chunk_size=DEFAULT_CHUNK_SIZE, notify=True, live=True, use_copy=False):
+    """
+    批次寫入 Reading
+
+    Args:
+        readings: 尚未存檔的 Reading 實例（可迭代）
+        chunk_size: 每次 INSERT 的筆數
+        notify: 是否發送 readings_ingested 訊號
+        live: 是否為即時數據（歷史回填傳 False，不做即時推播）
+        use_copy: 數值已驗證時的快速路徑（PostgreSQL 為 COPY，SQLite 為 executemany，其他資料庫仍用 bulk_create）
+
+    Returns:
+        (已寫入的 Reading 列表, 耗時秒數)
+    """
+    readings = list(readings)
+    if not readings:
+        return [], 0.0
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        if use_copy and supports_copy():
+            created = copy_insert_readings(readings)
+        elif use_copy and connection.vendor == 'sqlite':
+            created = sqlite_insert_readings(readings)
+        else:
+            created = Reading.objects.bulk_create(readings, batch_size=chunk_size)
+        if notify:
+            notify_readings_ingested(created, live=live)
+    return created, time.perf_counter() - started
+
+
+# COPY 路徑寫入的欄位順序
+COPY_COLUMNS = [
+    'station_id', 'timestamp', 'latitude', 'longitude',
+    'temperature', 'salinity', 'oxygen', 'ph',
+    'conductivity', 'pressure', 'fluorescence', 'turbidity',
+]
+
+
+def supports_copy():
+    return connection.vendor == 'postgresql'
+
+
+def copy_insert_readings(readings):
+    """
+    以 COPY 寫入 Reading 實例，並設定主鍵（呼叫端負責交易與訊號）
+
+    COPY 不會回傳 ID，先由 Reading.id 的序列一次取得所需的 ID 再連同數據寫入。
+    """
+    table = Reading._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+            [f'"{table}"', 'id', len(readings)],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+    for reading, pk in zip(readings, ids):
+        reading.pk = pk
+    copy_insert_rows(
+        ([reading.pk] + [getattr(reading, column) for column in COPY_COLUMNS] for reading in readings),
+        columns=['id'] + COPY_COLUMNS,
+    )
+    for reading in readings:
+        reading._state.adding = False
+        reading._state.db = 'default'
+    return readings
+
+
+def sqlite_insert_readings(readings):
+    """
+    SQLite 上以單一 executemany 寫入 Reading 實例，並設定主鍵（呼叫端負責交易與訊號）
+
+    數值須已轉為欄位型別（Decimal / aware datetime，需 USE_TZ）：只轉換時間，其餘參數直接傳給驅動程式，
+    省去 bulk_create 逐值呼叫 get_db_prep_save 與逐批組 SQL 的成本。
+    SQLite 寫入期間持有整個資料庫的寫入鎖，同一敘述寫入的 ID（AUTOINCREMENT）必為連續，
+    因此由 last_insert_rowid() 往回推算各筆的 ID。
+    """
+    # 與 adapt_datetimefield_value 相同的格式（連線時區的 naive 時間，由驅動程式轉為字串），
+    # 省去逐筆的時區判斷
+    tz = connection.timezone
+    timestamp_index = COPY_COLUMNS.index('timestamp')
+    values = operator.attrgetter(*COPY_COLUMNS)
+    params = []
+    for reading in readings:
+        row = list(values(reading))
+        row[timestamp_index] = row[timestamp_index].astimezone(tz).replace(tzinfo=None)
+        params.append(row)
+
+    column_sql = ', '.join(connection.ops.quote_name(column) for column in COPY_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {connection.ops.quote_name(Reading._meta.db_table)} ({column_sql}) '
+            f'VALUES ({", ".join(["%s"] * len(COPY_COLUMNS))})',
+            params,
+        )
+        cursor.execute('SELECT last_insert_rowid()')
+        last_id = cursor.fetchone()[0]
+
+    for pk, reading in enumerate(readings, start=last_id - len(readings) + 1):
+        reading.pk = pk
+        reading._state.adding = False
+        reading._state.db = 'default'
+    return readings
+
+
+def copy_insert_rows(rows, columns=COPY_COLUMNS):
+    """
+    以 PostgreSQL COPY FROM STDIN 寫入（不建立 model 實例，也不發送訊號）
+
+    Args:
+        rows: 與 columns 順序對應的 tuple 可迭代；None 寫為 NULL
+        columns: Reading 資料表欄位
+
+    Returns:
+        (寫入筆數, 耗時秒數)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow(['' if value is None else value for value in row])
+        count += 1
+    buffer.seek(0)
+
+    started = time.perf_counter()
+    column_sql = ', '.join(f'"{column}"' for column in columns)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.copy_expert(
+            f'COPY "{Reading._meta.db_table}" ({column_sql}) FROM STDIN WITH (FORMAT csv)',
+            buffer,
+        )
+    return count, time.perf_counter() - started
@@ -0,0 +1,106 @@
+"""
+各測站最新數據快照（StationLatest）
+
+- 增量更新：readings_ingested 接收器呼叫 update_station_latest()，每批數據中每個測站
+  只取最新一筆，以 INSERT ... ON CONFLICT DO UPDATE ... WHERE 寫入，
+  只有時間較新的數據會覆蓋快照（補寫舊數據不影響）
+- 冷啟動：快照表為空時，latest_readings() 以視窗函式一次查出各測站最新一筆，
+  並順便寫回快照
+"""
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Reading, StationLatest
+
+COLUMNS = ['station_id', 'reading_id', 'timestamp', *StationLatest.VALUE_FIELDS]
+
+
+def _upsert_sql():
+    quote = connection.ops.quote_name
+    table = quote(StationLatest._meta.db_table)
+    column_sql = ', '.join(quote(column) for column in COLUMNS)
+    placeholders = ', '.join(['%s'] * len(COLUMNS))
+    updates = ', '.join(f'{quote(column)} = EXCLUDED.{quote(column)}' for column in COLUMNS[1:])
+    return (
+        f'INSERT INTO {table} ({column_sql}) VALUES ({placeholders}) '
+        f'ON CONFLICT ({quote("station_id")}) DO UPDATE SET {updates} '
+        f'WHERE {table}.{quote("timestamp")} <= EXCLUDED.{quote("timestamp")}'
+    )
+
+
+def _newest_per_station(readings):
+    newest = {}
+    for reading in readings:
+        current = newest.get(reading.station_id)
+        if current is None or (reading.timestamp, reading.pk or 0) >= (current.timestamp, current.pk or 0):
+            newest[reading.station_id] = reading
+    return newest
+
+
+def update_station_latest(readings):
+    """
+    以新寫入的數據更新快照
+
+    Returns:
+        參與更新的測站數
+    """
+    newest = _newest_per_station(readings)
+    if not newest:
+        return 0
+
+    adapt_datetime = connection.ops.adapt_datetimefield_value
+    params = [
+        (
+            reading.station_id,
+            reading.pk,
+            adapt_datetime(reading.timestamp),
+            *(getattr(reading, field) for field in StationLatest.VALUE_FIELDS),
+        )
+        for reading in newest.values()
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), params)
+    return len(params)
+
+
+def newest_readings_queryset():
+    """各測站最新一筆 Reading（視窗函式，單一查詢）"""
+    return Reading.objects.annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('station_id')],
+            order_by=[F('timestamp').desc(), F('id').desc()],
+        )
+    ).filter(row_number=1).order_by('station_id')
+
+
+def rebuild_station_latest():
+    """由原始數據重建快照（COPY 匯入或刪除數據後使用）；回傳測站數"""
+    readings = list(newest_readings_queryset())
+    with transaction.atomic():
+        StationLatest.objects.all().delete()
+        return update_station_latest(readings)
+
+
+def latest_readings(station_ids=None):
+    """
+    所有測站（或 station_ids 指定測站）的最新數據（依測站 ID 排序）
+
+    Returns:
+        [(Reading, 測站名稱), ...]；Reading 來自快照時為未存檔的實例
+    """
+    snapshot = StationLatest.objects.select_related('station').order_by('station_id')
+    readings = newest_readings_queryset()
+    if station_ids is not None:
+        snapshot = snapshot.filter(station_id__in=station_ids)
+        readings = readings.filter(station_id__in=station_ids)
+    snapshot = list(snapshot)
+    if snapshot:
+        return [(latest.as_reading(), latest.station.station_name) for latest in snapshot]
+
+    # 冷啟動：快照尚未建立
+    readings = list(readings.select_related('station'))
+    if readings:
+        update_station_latest(readings)
+    return [(reading, reading.station.station_name) for reading in readings]
@@ -0,0 +1,55 @@
+"""
+將超過保留期限的數據封存為每個測站每月一個欄式壓縮檔（小時與日彙總保留在資料庫，
+超過 ROLLUP_MINUTE_RETENTION_DAYS 的分鐘彙總一併刪除）
+使用方法:
+    python manage.py archive_readings                      # 依 READING_RETENTION_DAYS
+    python manage.py archive_readings --older-than 180 --station 1
+    python manage.py archive_readings --dry-run            # 只列出待封存的月份
+
+封存檔位於 READING_ARCHIVE_ROOT/<測站 ID>/<YYYY-MM>.oca，圖表與匯出會自動讀取。
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from data_ingestion.archive import archive_readings
+from data_ingestion.purge import DEFAULT_PURGE_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = '封存超過保留期限的數據記錄'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=None,
+            help=f'保留天數（預設：READING_RETENTION_DAYS = {settings.READING_RETENTION_DAYS}）',
+        )
+        parser.add_argument('--station', type=int, action='append', help='測站 ID（可重複指定，預設全部）')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_PURGE_CHUNK_SIZE,
+                            help=f'每批讀取 / 刪除筆數（預設：{DEFAULT_PURGE_CHUNK_SIZE}）')
+        parser.add_argument('--dry-run', action='store_true', help='只列出待封存的月份')
+
+    def handle(self, *args, **options):
+        if options['older_than'] is not None and options['older_than'] < 0:
+            raise CommandError('--older-than 不可為負數')
+
+        started = time.perf_counter()
+        summary = archive_readings(
+            older_than_days=options['older_than'],
+            station_ids=options['station'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+            log=self.stdout.write,
+        )
+        elapsed = time.perf_counter() - started
+        cutoff = f'{summary["cutoff"]:%Y-%m-%d}'
+        if options['dry_run']:
+            self.stdout.write(f'[預覽] {cutoff} 之前共 {summary["months"]} 個月份待封存')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'[完成] {cutoff} 之前共封存 {summary["rows"]:,} 筆（{summary["months"]} 個檔案），'
+            f'刪除分鐘彙總 {summary["minute_rollups"]:,} 筆，耗時 {elapsed:.2f} 秒'
+        ))
@@ -0,0 +1,56 @@
+"""
+由原始數據重建 ReadingRollup（分鐘 / 小時 / 日彙總）與 ReadingSketch（分位數摘要）
+使用方法:
+    python manage.py backfill_rollups                       # 全部重建
+    python manage.py backfill_rollups --station 1 --since 2025-12-14 --until 2025-12-21
+    python manage.py backfill_rollups --resolution hour --resolution day
+
+新數據寫入時會自動增量更新彙總；以 COPY 匯入、修改或刪除原始數據後，
+再以此指令重建受影響的範圍。
+"""
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from data_ingestion.rollups import RESOLUTIONS, backfill_rollups
+
+
+class Command(BaseCommand):
+    help = '由原始數據重建分鐘 / 小時 / 日彙總'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--station', type=int, action='append', help='測站 ID（可重複指定，預設全部）')
+        parser.add_argument('--since', help='開始日期 YYYY-MM-DD（含）')
+        parser.add_argument('--until', help='結束日期 YYYY-MM-DD（含）')
+        parser.add_argument(
+            '--resolution',
+            action='append',
+            choices=RESOLUTIONS,
+            help='要重建的解析度（可重複指定，預設全部）',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000, help='每次寫入的筆數（預設：2000）')
+
+    def _parse_date(self, value):
+        if value is None:
+            return None
+        try:
+            return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+        except ValueError:
+            raise CommandError(f'日期格式錯誤: {value}，請使用 YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = backfill_rollups(
+            station_ids=options['station'],
+            start=self._parse_date(options['since']),
+            end=self._parse_date(options['until']),
+            resolutions=options['resolution'] or RESOLUTIONS,
+            chunk_size=options['chunk_size'],
+            log=self.stdout.write,
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'[完成] 共寫入 {sum(written.values()):,} 筆彙總，耗時 {elapsed:.2f} 秒'
+        ))
@@ -0,0 +1,146 @@
+"""
+批次匯入 API 效能基準測試
+使用方法:
+    python manage.py benchmark_ingest_api
+    python manage.py benchmark_ingest_api --rows 50000 --format ndjson --historical
+    python manage.py benchmark_ingest_api --repeat 5
+
+產生模擬的資料記錄器數據，分段量測 解析 → 驗證 → 寫入（含 readings_ingested 接收器）
+的每秒筆數，再以同一份內容呼叫匯入 API 的 view 量測端到端（權杖驗證、解析、驗證、寫入、
+接收器，以及交易提交後才執行的推播與快取失效）。
+
+每次量測都在交易內執行後回滾，不會留下數據；提交後的回呼在回滾前直接執行並計時。
+端到端量測重複 --repeat 次，取最快的一次（排除其他行程與 GC 造成的雜訊）。
+"""
+import time
+from datetime import timedelta
+
+import numpy as np
+import orjson
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from data_ingestion.ingest import bulk_insert_readings
+from data_ingestion.models import IngestToken, Station
+from data_ingestion.schema import READING_SCHEMA, parse_payload
+from data_ingestion.views import ingest_readings
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+FIELDS = ['station_id', 'timestamp', 'temperature', 'salinity', 'oxygen', 'ph', 'pressure', 'latitude', 'longitude']
+
+
+def simulated_rows(station_ids, rows, seed=0):
+    """每秒一筆、各測站輪流的模擬數據（約 1% 的列含超出範圍的數值）"""
+    rng = np.random.default_rng(seed)
+    start = timezone.now() - timedelta(seconds=rows + 60)
+    temperature = rng.normal(25, 1.5, rows)
+    temperature[rng.random(rows) < 0.01] = 99
+    return [
+        {
+            'station_id': station_ids[index % len(station_ids)],
+            'timestamp': (start + timedelta(seconds=index)).isoformat(),
+            'temperature': round(float(temperature[index]), 2),
+            'salinity': round(float(rng.normal(34, 0.3)), 4),
+            'oxygen': round(float(rng.normal(7, 0.2)), 3),
+            'ph': round(float(rng.normal(8.1, 0.05)), 2),
+            'pressure': round(float(rng.uniform(0, 50)), 3),
+            'latitude': 22.6 + index % 100 / 1000,
+            'longitude': 120.3 + index % 100 / 1000,
+        }
+        for index in range(rows)
+    ]
+
+
+def encode(rows, payload_format):
+    if payload_format == 'json':
+        return orjson.dumps(rows)
+    if payload_format == 'ndjson':
+        return b'\n'.join(orjson.dumps(row) for row in rows)
+    lines = [','.join(FIELDS)]
+    lines.extend(','.join(str(row[name]) for name in FIELDS) for row in rows)
+    return '\n'.join(lines).encode()
+
+
+class Command(BaseCommand):
+    help = '量測批次匯入 API 各階段的每秒筆數'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20_000, help='每批筆數（預設：20,000）')
+        parser.add_argument('--format', choices=FORMATS, default='csv', help='請求格式（預設：csv）')
+        parser.add_argument('--historical', action='store_true', help='以歷史回填模式寫入（不推播、不評估警報）')
+        parser.add_argument('--repeat', type=int, default=3, help='端到端量測次數，取最快的一次（預設：3）')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        if rows <= 0:
+            raise CommandError('--rows 必須大於 0')
+        if options['repeat'] <= 0:
+            raise CommandError('--repeat 必須大於 0')
+        station_ids = list(Station.objects.values_list('pk', flat=True)[:10])
+        if not station_ids:
+            raise CommandError('沒有測站，請先執行 setup_demo_stations')
+
+        body = encode(simulated_rows(station_ids, rows), options['format'])
+        self.stdout.write(f'{rows:,} 筆 {options["format"]}，{len(body) / 1024 / 1024:.1f} MB')
+
+        timings = {}
+        started = time.perf_counter()
+        batch = parse_payload(body, FORMATS[options['format']], max_rows=rows)
+        timings['解析'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        readings, rejects = READING_SCHEMA.validate(batch)
+        timings['驗證'] = time.perf_counter() - started
+
+        with transaction.atomic():
+            created, timings['寫入'] = bulk_insert_readings(readings, live=not options['historical'], use_copy=True)
+            transaction.set_rollback(True)
+
+        for name, seconds in timings.items():
+            self.stdout.write(f'{name:<4} {seconds * 1000:>9.1f} ms  {rows / seconds:>12,.0f} 筆/秒')
+        total = sum(timings.values())
+        self.stdout.write(f'合計 {total:.2f} 秒，{rows / total:,.0f} 筆/秒（寫入 {len(created):,} 筆，拒絕 {len(rejects):,} 筆）')
+        # 分段量測的物件不留到端到端量測（大量存活物件會拖慢 GC）
+        del batch, readings, rejects, created
+
+        elapsed, commit_seconds, data = min((
+            self.run_view(body, FORMATS[options['format']], options['historical'])
+            for _ in range(options['repeat'])
+        ), key=lambda result: result[0])
+        self.stdout.write(self.style.SUCCESS(
+            f'端到端 {elapsed:.2f} 秒，{rows / elapsed:,.0f} 筆/秒'
+            f'（API 回應 {data["status"]}，寫入 {data["accepted"]:,} 筆，提交後回呼 {commit_seconds * 1000:.1f} ms，'
+            f'{options["repeat"]} 次中最快，已回滾）'
+        ))
+
+    def run_view(self, body, content_type, historical):
+        """
+        以匯入 API 的 view 處理一次請求（不經過 middleware），並執行提交後的回呼
+
+        Returns:
+            (總秒數, 提交後回呼秒數, 回應內容)
+        """
+        with transaction.atomic():
+            _, key = IngestToken.issue('benchmark_ingest_api')
+            request = RequestFactory().post(
+                reverse('data_ingestion:ingest_readings') + ('?historical=1' if historical else ''),
+                data=body, content_type=content_type, HTTP_AUTHORIZATION=f'Token {key}',
+            )
+            pending = len(connection.run_on_commit)
+            started = time.perf_counter()
+            response = ingest_readings(request)
+            callbacks = connection.run_on_commit[pending:]
+            commit_started = time.perf_counter()
+            for _, callback, _ in callbacks:
+                callback()
+            finished = time.perf_counter()
+            transaction.set_rollback(True)
+        return finished - started, finished - commit_started, orjson.loads(response.content)
@@ -0,0 +1,74 @@
+"""
+分位數摘要效能基準測試（不需資料庫）
+使用方法:
+    python manage.py benchmark_quantile_sketches
+    python manage.py benchmark_quantile_sketches --days 3650 --per-day 1440
+
+模擬多個測站多年的每日 t-digest，比較「一年範圍的百分位數」兩種做法：
+- 合併日摘要：TDigest.merge_all() + percentiles()
+- 精確計算：載入所有數值後 np.percentile()
+並列出兩者的誤差與摘要大小。
+"""
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from data_ingestion.sketches import DEFAULT_PERCENTILES, TDigest
+
+
+class Command(BaseCommand):
+    help = '比較合併分位數摘要與精確百分位數的耗時與誤差'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=3650, help='日摘要數量（測站數 × 天數，預設：3,650）')
+        parser.add_argument('--per-day', type=int, default=1440, help='每天的數據筆數（預設：1,440）')
+        parser.add_argument('--repeat', type=int, default=3, help='每種做法重複次數（預設：3）')
+
+    def handle(self, *args, **options):
+        days, per_day, repeat = options['days'], options['per_day'], options['repeat']
+        if days <= 0 or per_day <= 0 or repeat <= 0:
+            raise CommandError('--days、--per-day 與 --repeat 必須大於 0')
+
+        # 季節變化 ± 3°C、日週期 ± 1.5°C、雜訊 0.3°C
+        rng = np.random.default_rng(0)
+        minutes = np.arange(per_day) / per_day
+        daily = [
+            25 + 3 * np.sin(2 * np.pi * day / 365) + 1.5 * np.sin(2 * np.pi * minutes) + rng.normal(0, 0.3, per_day)
+            for day in range(days)
+        ]
+        started = time.perf_counter()
+        serialized = [TDigest.from_values(values).to_bytes() for values in daily]
+        build_seconds = time.perf_counter() - started
+        average_size = sum(len(data) for data in serialized) / days
+        self.stdout.write(
+            f'建立 {days:,} 個日摘要: {build_seconds:.2f} 秒，平均 {average_size / 1024:.1f} KB'
+            f'（原始數值 {per_day * 8 / 1024:.1f} KB）'
+        )
+
+        def sketch():
+            return TDigest.merge_all(TDigest.from_bytes(data) for data in serialized).percentiles(DEFAULT_PERCENTILES)
+
+        def exact():
+            return [float(value) for value in np.percentile(np.concatenate(daily), DEFAULT_PERCENTILES)]
+
+        results = {}
+        outputs = {}
+        for name, run in [('合併日摘要', sketch), ('精確計算', exact)]:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                outputs[name] = run()
+                timings.append(time.perf_counter() - started)
+            results[name] = statistics.median(timings)
+            self.stdout.write(f'{name:<10} 中位數 {results[name] * 1000:>9.2f} ms')
+
+        estimated, exact_values = outputs.values()
+        for percent, estimate, value in zip(DEFAULT_PERCENTILES, estimated, exact_values):
+            self.stdout.write(f'P{percent:<3} 摘要 {estimate:.4f} / 精確 {value:.4f}（誤差 {estimate - value:+.4f}）')
+        sketch_seconds, exact_seconds = results.values()
+        self.stdout.write(self.style.SUCCESS(
+            f'加速比: {exact_seconds / sketch_seconds:.1f}x（精確計算未含資料庫讀取）；'
+            f'讀取量 {average_size * days / 1024 / 1024:.1f} MB 摘要 vs {days * per_day:,} 筆原始數據'
+        ))
@@ -0,0 +1,173 @@
+"""
+Reading 熱點查詢的索引效能基準測試
+使用方法:
+    python manage.py benchmark_reading_queries --rows 1000000
+    python manage.py benchmark_reading_queries --rows 10000000 --stations 50 --repeat 20
+    python manage.py benchmark_reading_queries --rows 1000000 --keep   # 保留測試數據
+
+流程：
+1. 建立 bench- 開頭的測試測站並以 bulk_create 寫入指定筆數的數據
+2. 「索引前」：暫時移除 (station, -timestamp) 與 timestamp 索引，只保留原本的 station_id 單欄索引
+3. 「索引後」：恢復 Reading.Meta.indexes 定義的索引
+4. 每個階段輸出各查詢的執行計畫（EXPLAIN）與延遲（中位數 / 最大值）
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from data_ingestion.models import Station, Reading
+
+BENCH_PREFIX = 'bench-'
+BASELINE_INDEX = models.Index(fields=['station'], name='reading_bench_station_idx')
+
+
+class Command(BaseCommand):
+    help = '比較 Reading 熱點查詢在加入複合索引前後的執行計畫與延遲'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='寫入的數據總筆數（預設：1,000,000）')
+        parser.add_argument('--stations', type=int, default=10, help='測試測站數（預設：10）')
+        parser.add_argument('--repeat', type=int, default=10, help='每個查詢重複次數（預設：10）')
+        parser.add_argument('--chunk-size', type=int, default=10_000, help='bulk_create 批次大小（預設：10,000）')
+        parser.add_argument('--keep', action='store_true', help='結束後保留測試測站與數據')
+
+    def handle(self, *args, **options):
+        stations = self.prepare_data(options['rows'], options['stations'], options['chunk_size'])
+        target = stations[0]
+
+        queries = self.build_queries(target)
+        results = {}
+        try:
+            self.drop_indexes()
+            results['索引前'] = self.run_phase('索引前', queries, options['repeat'])
+        finally:
+            self.restore_indexes()
+        results['索引後'] = self.run_phase('索引後', queries, options['repeat'])
+
+        self.print_summary(results)
+
+        if not options['keep']:
+            deleted = Reading.objects.filter(station__in=stations)._raw_delete(Reading.objects.db)
+            Station.objects.filter(pk__in=[s.pk for s in stations]).delete()
+            self.stdout.write(f'\n已清除 {deleted} 筆測試數據')
+
+    # ------------------------------------------------------------------
+    # 測試數據
+    # ------------------------------------------------------------------
+
+    def prepare_data(self, rows, station_count, chunk_size):
+        stations = [
+            Station.objects.create(
+                station_name=f'{BENCH_PREFIX}{i}',
+                device_model='BENCH',
+                location='benchmark',
+                install_date=timezone.now().date(),
+            )
+            for i in range(station_count)
+        ]
+
+        per_station = max(rows // station_count, 1)
+        interval = timedelta(minutes=1)
+        end = timezone.now()
+
+        self.stdout.write(f'寫入 {per_station * station_count:,} 筆數據（{station_count} 個測站）...')
+        started = time.perf_counter()
+        batch = []
+        with transaction.atomic():
+            for station in stations:
+                for i in range(per_station):
+                    batch.append(Reading(
+                        station=station,
+                        timestamp=end - interval * i,
+                        temperature=Decimal(f'{random.uniform(20, 30):.2f}'),
+                        ph=Decimal(f'{random.uniform(7.8, 8.4):.2f}'),
+                        oxygen=Decimal(f'{random.uniform(5, 9):.3f}'),
+                        salinity=Decimal(f'{random.uniform(33, 34):.4f}'),
+                    ))
+                    if len(batch) >= chunk_size:
+                        Reading.objects.bulk_create(batch)
+                        batch.clear()
+            if batch:
+                Reading.objects.bulk_create(batch)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'  完成，耗時 {elapsed:.1f} 秒（{per_station * station_count / elapsed:,.0f} 筆/秒）')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE "{Reading._meta.db_table}"')
+        return stations
+
+    def build_queries(self, station):
+        """對應 station_detail、get_chart_data_ajax、WebSocket 與異常檢查的查詢"""
+        now = timezone.now()
+        day_ago = now - timedelta(hours=24)
+        return {
+            'station_detail 24h 前 200 筆': lambda: Reading.objects.filter(
+                station=station, timestamp__gte=day_ago
+            ).order_by('-timestamp')[:200],
+            'station 全部範圍前 200 筆': lambda: Reading.objects.filter(
+                station=station
+            ).order_by('-timestamp')[:200],
+            '測站最新一筆': lambda: Reading.objects.filter(
+                station=station
+            ).order_by('-timestamp')[:1],
+            '24h 高溫筆數（異常檢查）': lambda: Reading.objects.filter(
+                timestamp__gte=day_ago, temperature__gt=30
+            ).values('pk')[:1],
+        }
+
+    # ------------------------------------------------------------------
+    # 索引切換
+    # ------------------------------------------------------------------
+
+    def drop_indexes(self):
+        with connection.schema_editor() as editor:
+            for index in Reading._meta.indexes:
+                editor.remove_index(Reading, index)
+            editor.add_index(Reading, BASELINE_INDEX)
+
+    def restore_indexes(self):
+        with connection.schema_editor() as editor:
+            editor.remove_index(Reading, BASELINE_INDEX)
+            for index in Reading._meta.indexes:
+                editor.add_index(Reading, index)
+
+    # ------------------------------------------------------------------
+    # 量測
+    # ------------------------------------------------------------------
+
+    def run_phase(self, label, queries, repeat):
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write('=' * 60)
+
+        phase = {}
+        for name, build in queries.items():
+            self.stdout.write(f'\n▶ {name}')
+            self.stdout.write(build().explain())
+
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(build())
+                timings.append((time.perf_counter() - started) * 1000)
+
+            phase[name] = (statistics.median(timings), max(timings))
+            self.stdout.write(f'  中位數 {phase[name][0]:.2f} ms / 最大 {phase[name][1]:.2f} ms')
+        return phase
+
+    def print_summary(self, results):
+        before, after = results['索引前'], results['索引後']
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS('延遲比較（中位數，毫秒）'))
+        self.stdout.write('=' * 60)
+        for name in before:
+            speedup = before[name][0] / after[name][0] if after[name][0] else float('inf')
+            self.stdout.write(f'{name:<28} {before[name][0]:>10.2f} → {after[name][0]:>10.2f}  ({speedup:.1f}x)')
@@ -0,0 +1,32 @@
+"""
+建立批次匯入 API 的權杖
+使用方法:
+    python manage.py create_ingest_token "1 號浮標資料記錄器"
+    python manage.py create_ingest_token "1 號浮標資料記錄器" --station 1   # 只能寫入測站 1
+
+原始權杖只會顯示這一次，資料庫只保存雜湊；遺失時請停用舊權杖後重新建立。
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from data_ingestion.models import IngestToken, Station
+
+
+class Command(BaseCommand):
+    help = '建立批次匯入 API 的權杖'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='權杖名稱（例如資料記錄器名稱）')
+        parser.add_argument('--station', type=int, help='限定只能寫入此測站 ID')
+
+    def handle(self, *args, **options):
+        station = None
+        if options['station'] is not None:
+            station = Station.objects.filter(pk=options['station']).first()
+            if station is None:
+                raise CommandError(f'測站不存在: {options["station"]}')
+
+        token, key = IngestToken.issue(options['name'], station=station)
+        scope = f'測站 {station}' if station else '所有測站'
+        self.stdout.write(self.style.SUCCESS(f'[完成] 已建立權杖「{token.name}」（{scope}）'))
+        self.stdout.write(key)
+        self.stdout.write('請妥善保存，原始權杖不會再次顯示。')
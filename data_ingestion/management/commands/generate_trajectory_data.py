@@ -1,20 +1,33 @@
 """
 生成歷史軌跡數據
-從 2025-12-14 到 2025-12-21，每 10 分鐘一筆記錄
-使用方法: python manage.py generate_trajectory_data
+預設從 2025-12-14 到 2025-12-21，每 10 分鐘一筆記錄
+使用方法:
+    python manage.py generate_trajectory_data
+    python manage.py generate_trajectory_data --start 2025-11-01 --end 2025-11-30 --interval 1
+    python manage.py generate_trajectory_data --workers 4 --method copy   # PostgreSQL 多行程 COPY 寫入
+
+數據以 NumPy 向量化產生（data_ingestion.trajectory），再分段以 bulk_create
+或 PostgreSQL COPY 寫入，最後輸出寫入速度統計。
 """
-from django.core.management.base import BaseCommand
-from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
 from datetime import datetime, timedelta
 from decimal import Decimal
 import random
+import time
 from zoneinfo import ZoneInfo
 
-from data_ingestion.models import Station, Reading
+from data_ingestion.ingest import supports_copy
+from data_ingestion.counters import reconcile_reading_counts
+from data_ingestion.latest import rebuild_station_latest
+from data_ingestion.models import Station
+from data_ingestion.purge import purge_readings
+from data_ingestion.rollups import backfill_rollups
+from data_ingestion.trajectory import SEA_AREAS, build_timestamps, find_sea_area, run_trajectory_jobs
 
 
 class Command(BaseCommand):
-    help = '生成 12/14-12/21 的歷史軌跡數據（每10分鐘一筆）'
+    help = '生成歷史軌跡數據（預設 12/14-12/21，每10分鐘一筆）'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -22,54 +35,54 @@ class Command(BaseCommand):
             action='store_true',
             help='清空現有的所有 Reading 數據',
         )
+        parser.add_argument('--start', default='2025-12-14', help='開始日期 YYYY-MM-DD（預設：2025-12-14）')
+        parser.add_argument('--end', default='2025-12-21', help='結束日期 YYYY-MM-DD，含當天（預設：2025-12-21）')
+        parser.add_argument('--interval', type=int, default=10, help='數據間隔（分鐘，預設：10）')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='每次寫入的筆數（預設：5000）')
+        parser.add_argument(
+            '--method',
+            choices=['bulk', 'copy'],
+            default='bulk',
+            help='寫入方式：bulk（bulk_create）或 copy（僅 PostgreSQL）',
+        )
+        parser.add_argument('--workers', type=int, default=1, help='平行處理測站的行程數（預設：1）')
+        parser.add_argument('--seed', type=int, default=None, help='亂數種子（方便重現結果）')
 
     def handle(self, *args, **options):
         # 設定台灣時區
         taipei_tz = ZoneInfo('Asia/Taipei')
 
+        if options['method'] == 'copy' and not supports_copy():
+            raise CommandError('COPY 寫入只支援 PostgreSQL，請改用 --method bulk')
+
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING('SQLite 不支援多行程同時寫入，改為單一行程'))
+            workers = 1
+
         # 清空現有數據
         if options['clear']:
-            count = Reading.objects.count()
-            Reading.objects.all().delete()
+            count = purge_readings(
+                progress=lambda deleted, total: self.stdout.write(f'  刪除中 {deleted:,} / {total:,}')
+            )
             self.stdout.write(self.style.WARNING(f'已刪除 {count} 筆舊數據'))
 
         # 獲取所有測站
-        stations = Station.objects.all()
+        stations = list(Station.objects.all())
 
-        if not stations.exists():
+        if not stations:
             self.stdout.write(self.style.ERROR('錯誤: 沒有找到任何測站!'))
             self.stdout.write('請先在管理後台創建測站')
             return
 
-        # 定義三個海域範圍
-        SEA_AREAS = {
-            'chaojing': {  # 潮境公園外海
-                'name': '潮境公園外海',
-                'lat_range': (25.115, 25.170),
-                'lng_range': (121.833, 121.923)
-            },
-            'bisha': {  # 碧砂漁港外海
-                'name': '碧砂漁港外海',
-                'lat_range': (25.116693, 25.170747),
-                'lng_range': (121.817556, 121.907124)
-            },
-            'zhengbin': {  # 正濱漁港外海
-                'name': '正濱漁港外海',
-                'lat_range': (25.126682, 25.180736),
-                'lng_range': (121.801490, 121.891066)
-            }
-        }
-
         # 自動為沒有經緯度的測站設置海上初始座標
         stations_updated = 0
-        station_list = list(stations)
+        area_keys = list(SEA_AREAS.keys())
 
-        for idx, station in enumerate(station_list):
+        for idx, station in enumerate(stations):
             if not station.latitude or not station.longitude:
                 # 根據測站索引循環分配海域
-                area_keys = list(SEA_AREAS.keys())
-                area_key = area_keys[idx % len(area_keys)]
-                area = SEA_AREAS[area_key]
+                area = SEA_AREAS[area_keys[idx % len(area_keys)]]
 
                 # 在該海域範圍內隨機選擇起始點
                 lat_min, lat_max = area['lat_range']
@@ -87,130 +100,64 @@ class Command(BaseCommand):
             self.stdout.write(f'\n已更新 {stations_updated} 個測站的座標\n')
 
         # 設定時間範圍
-        start_date = datetime(2025, 12, 14, 0, 0, 0, tzinfo=taipei_tz)
-        end_date = datetime(2025, 12, 21, 23, 59, 59, tzinfo=taipei_tz)
-        interval = timedelta(minutes=10)
+        try:
+            start_date = datetime.strptime(options['start'], '%Y-%m-%d').replace(tzinfo=taipei_tz)
+            end_date = datetime.strptime(options['end'], '%Y-%m-%d').replace(
+                hour=23, minute=59, second=59, tzinfo=taipei_tz
+            )
+        except ValueError:
+            raise CommandError('日期格式錯誤，請使用 YYYY-MM-DD')
+        interval = timedelta(minutes=options['interval'])
+        timestamps = build_timestamps(start_date, end_date, interval)
 
         self.stdout.write(f'\n開始生成數據:')
         self.stdout.write(f'  時間範圍: {start_date.strftime("%Y-%m-%d %H:%M")} ~ {end_date.strftime("%Y-%m-%d %H:%M")}')
         self.stdout.write(f'  間隔: {interval.total_seconds() / 60} 分鐘')
-        self.stdout.write(f'  測站數: {stations.count()}')
-
-        total_readings = 0
+        self.stdout.write(f'  測站數: {len(stations)}')
+        self.stdout.write(f'  寫入方式: {options["method"]}，行程數: {workers}')
 
-        for station in stations:
-            self.stdout.write(f'\n處理測站: {station.station_name}')
-
-            if not station.latitude or not station.longitude:
-                self.stdout.write(self.style.WARNING(f'  ⚠ 跳過 (未設定經緯度)'))
-                continue
-
-            # 判斷測站屬於哪個海域（根據座標）
+        jobs = []
+        names = {}
+        for index, station in enumerate(stations):
             station_lat = float(station.latitude)
             station_lng = float(station.longitude)
 
-            # 找出最接近的海域
-            current_area = None
-            for area_key, area_data in SEA_AREAS.items():
-                lat_min, lat_max = area_data['lat_range']
-                lng_min, lng_max = area_data['lng_range']
-                if lat_min <= station_lat <= lat_max and lng_min <= station_lng <= lng_max:
-                    current_area = area_data
-                    self.stdout.write(f'  海域: {area_data["name"]}')
-                    break
-
-            # 如果找不到匹配的海域，使用預設範圍（潮境）
-            if not current_area:
-                current_area = SEA_AREAS['chaojing']
-                self.stdout.write(f'  使用預設海域: {current_area["name"]}')
-
-            LAT_MIN, LAT_MAX = current_area['lat_range']
-            LNG_MIN, LNG_MAX = current_area['lng_range']
-
-            station_readings = 0
-            current_time = start_date
-
-            # 初始化 GPS 位置（從測站基礎位置開始）
-            current_lat = station_lat
-            current_lng = station_lng
-
-            # 模擬主要洋流方向（東北向，帶有隨機擾動）
-            # 這會產生更連貫的漂移軌跡
-            drift_direction_lat = random.uniform(0.00005, 0.00015)  # 主要向北漂移
-            drift_direction_lng = random.uniform(0.00005, 0.00015)  # 主要向東漂移
-
-            while current_time <= end_date:
-                # 生成連貫的 GPS 漂移（模擬洋流帶動儀器緩慢移動）
-                # 主要漂移方向 + 隨機擾動
-                lat_drift = drift_direction_lat + random.uniform(-0.00005, 0.00005)
-                lng_drift = drift_direction_lng + random.uniform(-0.00005, 0.00005)
-
-                current_lat += lat_drift
-                current_lng += lng_drift
-
-                # 確保保持在該測站對應的海域範圍內
-                # 如果超出範圍，反彈回來（模擬儀器遇到邊界後改變方向）
-                if current_lat < LAT_MIN:
-                    current_lat = LAT_MIN + 0.001
-                    drift_direction_lat = abs(drift_direction_lat)  # 改為向北
-                elif current_lat > LAT_MAX:
-                    current_lat = LAT_MAX - 0.001
-                    drift_direction_lat = -abs(drift_direction_lat)  # 改為向南
-
-                if current_lng < LNG_MIN:
-                    current_lng = LNG_MIN + 0.001
-                    drift_direction_lng = abs(drift_direction_lng)  # 改為向東
-                elif current_lng > LNG_MAX:
-                    current_lng = LNG_MAX - 0.001
-                    drift_direction_lng = -abs(drift_direction_lng)  # 改為向西
-
-                # 偶爾改變漂移方向（模擬洋流變化）
-                if random.random() < 0.05:  # 5% 機率改變方向
-                    drift_direction_lat += random.uniform(-0.0001, 0.0001)
-                    drift_direction_lng += random.uniform(-0.0001, 0.0001)
-
-                # 生成環境數據（帶日週期變化）
-                hour = current_time.hour
-                import math
-                diurnal = (math.sin((hour - 6) * math.pi / 12) + 1) / 2
-
-                # 基礎參數
-                temperature = 25.0 + diurnal * 3.0 + random.uniform(-0.5, 0.5)
-                salinity = 33.5 + random.uniform(-0.3, 0.3)
-                oxygen = 8.0 + (1 - diurnal) * 1.5 + random.uniform(-0.3, 0.3)
-                ph = 8.2 + random.uniform(-0.2, 0.2)
-                conductivity = 54000.0 + random.uniform(-300, 300)
-                pressure = 0.6 + random.uniform(-0.03, 0.03)
-                fluorescence = 0.5 + diurnal * 0.8 + random.uniform(-0.1, 0.1)
-                turbidity = random.uniform(3.0, 7.0)
-
-                # 創建數據記錄
-                Reading.objects.create(
-                    station=station,
-                    timestamp=current_time,
-                    latitude=Decimal(str(round(current_lat, 6))),
-                    longitude=Decimal(str(round(current_lng, 6))),
-                    temperature=Decimal(str(round(temperature, 2))),
-                    salinity=Decimal(str(round(salinity, 4))),
-                    oxygen=Decimal(str(round(max(oxygen, 4.0), 3))),
-                    ph=Decimal(str(round(ph, 2))),
-                    conductivity=Decimal(str(round(conductivity, 2))),
-                    pressure=Decimal(str(round(pressure, 3))),
-                    fluorescence=Decimal(str(round(max(fluorescence, 0.0), 3))),
-                    turbidity=Decimal(str(round(turbidity, 3))),
-                )
-
-                station_readings += 1
-                current_time += interval
-
-            self.stdout.write(self.style.SUCCESS(f'  [OK] 已生成 {station_readings} 筆數據'))
-            total_readings += station_readings
+            # 判斷測站屬於哪個海域；找不到匹配的海域時使用預設範圍（潮境）
+            sea_area = find_sea_area(station_lat, station_lng) or SEA_AREAS['chaojing']
+            names[station.id] = f'{station.station_name}（{sea_area["name"]}）'
+            jobs.append({
+                'station_id': station.id,
+                'start_lat': station_lat,
+                'start_lng': station_lng,
+                'sea_area': sea_area,
+                'timestamps': timestamps,
+                'method': options['method'],
+                'chunk_size': options['chunk_size'],
+                'seed': None if options['seed'] is None else options['seed'] + index,
+            })
+
+        total_readings = 0
+        started = time.perf_counter()
+        for station_id, count in run_trajectory_jobs(jobs, workers=workers):
+            self.stdout.write(self.style.SUCCESS(f'  [OK] {names[station_id]}: 已生成 {count:,} 筆數據'))
+            total_readings += count
+        elapsed = time.perf_counter() - started
 
         # 總結
         self.stdout.write('\n' + '=' * 50)
-        self.stdout.write(self.style.SUCCESS(f'[完成] 總共生成 {total_readings} 筆數據'))
-        self.stdout.write(f'  平均每測站: {total_readings // stations.count() if stations.count() > 0 else 0} 筆')
-
-        # 計算預期數量
-        expected_per_station = int((end_date - start_date).total_seconds() / interval.total_seconds()) + 1
-        self.stdout.write(f'  預期每測站: {expected_per_station} 筆')
+        self.stdout.write(self.style.SUCCESS(f'[完成] 總共生成 {total_readings:,} 筆數據'))
+        self.stdout.write(f'  平均每測站: {total_readings // len(stations):,} 筆')
+        self.stdout.write(f'  預期每測站: {len(timestamps):,} 筆')
+        self.stdout.write(f'  耗時: {elapsed:.2f} 秒（{total_readings / elapsed if elapsed else 0:,.0f} 筆/秒）')
+
+        if options['method'] == 'copy':
+            # COPY 寫入不會觸發 readings_ingested，由原始數據重建彙總、最新數據快照與筆數計數器
+            self.stdout.write('\n重建彙總...')
+            backfill_rollups(
+                station_ids=[station.id for station in stations],
+                start=start_date,
+                end=end_date,
+                log=lambda message: self.stdout.write(f'  {message}'),
+            )
+            rebuild_station_latest()
+            reconcile_reading_counts(station_ids=[station.id for station in stations])
@@ -0,0 +1,48 @@
+"""
+Reading 資料表按月分區（僅 PostgreSQL）
+使用方法:
+    python manage.py partition_readings --status              # 查看目前是否為分區表
+    python manage.py partition_readings --convert             # 轉換為按月分區
+    python manage.py partition_readings --ensure --months 6   # 預先建立未來 6 個月的分區
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from data_ingestion import partitioning
+
+
+class Command(BaseCommand):
+    help = '將 Reading 資料表轉換為 PostgreSQL 按月分區，或預先建立未來月份的分區'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='store_true', help='顯示分區狀態')
+        parser.add_argument('--convert', action='store_true', help='將現有資料表轉換為分區表')
+        parser.add_argument('--ensure', action='store_true', help='建立未來月份的分區')
+        parser.add_argument('--months', type=int, default=3, help='預先建立的月份數（預設：3）')
+        parser.add_argument(
+            '--keep-legacy',
+            action='store_true',
+            help='轉換後保留原資料表（data_ingestion_reading_legacy）',
+        )
+
+    def handle(self, *args, **options):
+        if (options['convert'] or options['ensure']) and not partitioning.is_postgresql():
+            raise CommandError('按月分區只支援 PostgreSQL，目前資料庫不需要也無法分區')
+
+        if options['convert']:
+            names = partitioning.convert_reading_table_to_partitioned(
+                months_ahead=options['months'],
+                keep_legacy=options['keep_legacy'],
+                log=self.stdout.write,
+            )
+            self.stdout.write(self.style.SUCCESS(f'[完成] 已轉換為分區表，共 {len(names)} 個月份分區'))
+
+        if options['ensure']:
+            names = partitioning.ensure_monthly_partitions(months_ahead=options['months'])
+            if names:
+                self.stdout.write(self.style.SUCCESS(f'[完成] 已確認分區: {", ".join(names)}'))
+            else:
+                self.stdout.write(self.style.WARNING('Reading 資料表尚未分區，請先執行 --convert'))
+
+        if options['status'] or not (options['convert'] or options['ensure']):
+            state = '已分區' if partitioning.is_partitioned() else '未分區'
+            self.stdout.write(f'Reading 資料表狀態: {state}')
@@ -0,0 +1,118 @@
+"""
+啟動資料記錄器的 socket 匯入伺服器（asyncio TCP / UDP）
+使用方法:
+    python manage.py run_ingest_server
+    python manage.py run_ingest_server --tcp-port 9100 --udp-port 9101 --batch-size 5000 --flush-interval 1
+    python manage.py run_ingest_server --host 0.0.0.0 --allow 10.1.0.0/16 --stations 1,2
+
+記錄器以 TCP 或 UDP 逐行推送（格式見 data_ingestion.socket_ingest），
+紀錄在記憶體中累積成批後寫入 Reading；Ctrl+C / SIGTERM 時寫完暫存的紀錄再結束。
+
+行協定沒有驗證：預設只監聽 127.0.0.1，監聽其他位址時必須以 --allow 指定允許的來源網段，
+並可用 --stations 限定這個伺服器可寫入的測站。
+"""
+import asyncio
+import ipaddress
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_ingestion.socket_ingest import (
+    DEFAULT_CSV_COLUMNS, IngestServer, IngestStats, ReadingBatcher, publish_stats,
+)
+
+
+def is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class Command(BaseCommand):
+    help = '啟動資料記錄器的 TCP / UDP 匯入伺服器'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='監聽位址（預設：127.0.0.1）')
+        parser.add_argument(
+            '--allow', action='append', default=None, metavar='CIDR',
+            help='允許的來源網段，可重複指定（監聽非本機位址時必填）',
+        )
+        parser.add_argument('--stations', default=None, help='可寫入的測站 ID，以逗號分隔（預設不限）')
+        parser.add_argument('--tcp-port', type=int, default=9100, help='TCP 埠（預設：9100）')
+        parser.add_argument('--udp-port', type=int, default=None, help='UDP 埠（預設不啟用）')
+        parser.add_argument('--batch-size', type=int, default=5000, help='每批寫入筆數（預設：5000）')
+        parser.add_argument('--flush-interval', type=float, default=1.0, help='最長暫存秒數（預設：1）')
+        parser.add_argument('--max-pending', type=int, default=50000, help='暫存筆數上限，達到時暫停讀取（預設：50000）')
+        parser.add_argument('--columns', default=','.join(DEFAULT_CSV_COLUMNS), help='CSV 行的預設欄位順序')
+        parser.add_argument('--stats-interval', type=float, default=10.0, help='輸出計數器的間隔秒數（預設：10）')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0 or options['max_pending'] < options['batch_size']:
+            raise CommandError('--batch-size 必須大於 0，且 --max-pending 不可小於 --batch-size')
+        try:
+            for network in options['allow'] or ():
+                ipaddress.ip_network(network, strict=False)
+        except ValueError as exc:
+            raise CommandError(f'--allow 格式錯誤: {exc}')
+        if not options['allow'] and not is_loopback(options['host']):
+            raise CommandError('行協定沒有驗證，監聽非本機位址時必須以 --allow 指定允許的來源網段')
+        if options['stations'] is not None:
+            try:
+                options['stations'] = {int(value) for value in options['stations'].split(',') if value.strip()}
+            except ValueError:
+                raise CommandError('--stations 必須是以逗號分隔的測站 ID')
+        asyncio.run(self.serve(options))
+
+    async def serve(self, options):
+        stats = IngestStats()
+        batcher = ReadingBatcher(
+            stats,
+            batch_size=options['batch_size'],
+            flush_interval=options['flush_interval'],
+            max_pending=options['max_pending'],
+            station_ids=options['stations'],
+        )
+        server = IngestServer(
+            batcher,
+            host=options['host'],
+            tcp_port=options['tcp_port'],
+            udp_port=options['udp_port'],
+            columns=[name.strip() for name in options['columns'].split(',')],
+            allowed_sources=options['allow'],
+        )
+        await server.start()
+        self.stdout.write(self.style.SUCCESS(
+            f'[啟動] TCP {server.tcp_address}' + (f'，UDP {server.udp_address}' if server.udp_address else '')
+        ))
+
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows：Ctrl+C 會中斷 asyncio.run，仍會執行下方的 finally
+
+        try:
+            while not stopping.is_set():
+                try:
+                    await asyncio.wait_for(stopping.wait(), options['stats_interval'])
+                except asyncio.TimeoutError:
+                    pass
+                self.report(stats)
+        finally:
+            await server.stop()
+            self.report(stats)
+            self.stdout.write(self.style.SUCCESS('[結束] 暫存的紀錄已全部寫入'))
+
+    def report(self, stats):
+        publish_stats(stats)
+        self.stdout.write(
+            f'連線 {stats.connections}，收到 {stats.records_received:,} 筆，通過 {stats.readings_accepted:,}，'
+            f'拒絕 {stats.readings_rejected:,}，無法解析 {stats.parse_errors:,}，丟棄 {stats.records_dropped:,}，'
+            f'失敗 {stats.readings_failed:,}，暫存 {stats.pending:,}，背壓 {stats.backpressure_waits:,} 次，'
+            f'拒絕來源 {stats.sources_refused:,}'
+        )
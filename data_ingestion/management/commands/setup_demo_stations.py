@@ -3,13 +3,15 @@
 使用方法: python manage.py setup_demo_stations
 """
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
 import random
+import time
 from zoneinfo import ZoneInfo
 
-from data_ingestion.models import Station, Reading
+from data_ingestion.models import Station
+from data_ingestion.purge import purge_readings
+from data_ingestion.trajectory import SEA_AREAS, build_timestamps, write_station_trajectory
 
 
 class Command(BaseCommand):
@@ -28,9 +30,9 @@ class Command(BaseCommand):
 
         # 清空現有數據
         if options['clear']:
-            reading_count = Reading.objects.count()
             station_count = Station.objects.count()
-            Reading.objects.all().delete()
+            # 數據記錄依主鍵分批刪除（可 TRUNCATE 時直接清空），避免 Python 端收集串聯刪除
+            reading_count = purge_readings()
             Station.objects.all().delete()
             self.stdout.write(self.style.WARNING(
                 f'已刪除 {station_count} 個測站和 {reading_count} 筆數據'
@@ -43,33 +45,21 @@ class Command(BaseCommand):
                 'device_model': 'CR1000X',
                 'location': '潮境公園外海',
                 'install_date': datetime(2025, 1, 15, tzinfo=taipei_tz).date(),
-                'sea_area': {
-                    'name': '潮境公園外海',
-                    'lat_range': (25.115, 25.170),
-                    'lng_range': (121.833, 121.923)
-                }
+                'sea_area': SEA_AREAS['chaojing']
             },
             {
                 'name': 'BiShaCR1000X',
                 'device_model': 'CR1000X',
                 'location': '碧砂漁港外海',
                 'install_date': datetime(2025, 2, 1, tzinfo=taipei_tz).date(),
-                'sea_area': {
-                    'name': '碧砂漁港外海',
-                    'lat_range': (25.116693, 25.170747),
-                    'lng_range': (121.817556, 121.907124)
-                }
+                'sea_area': SEA_AREAS['bisha']
             },
             {
                 'name': 'ZhengBinCR1000X',
                 'device_model': 'CR1000X',
                 'location': '正濱漁港外海',
                 'install_date': datetime(2025, 3, 10, tzinfo=taipei_tz).date(),
-                'sea_area': {
-                    'name': '正濱漁港外海',
-                    'lat_range': (25.126682, 25.180736),
-                    'lng_range': (121.801490, 121.891066)
-                }
+                'sea_area': SEA_AREAS['zhengbin']
             }
         ]
 
@@ -127,7 +117,9 @@ class Command(BaseCommand):
         self.stdout.write(f'數據間隔: {interval.total_seconds() / 60} 分鐘')
         self.stdout.write(f'測站數量: {len(created_stations)}\n')
 
+        timestamps = build_timestamps(start_date, end_date, interval)
         total_readings = 0
+        started = time.perf_counter()
 
         for station_info in created_stations:
             station = station_info['station']
@@ -136,87 +128,25 @@ class Command(BaseCommand):
             self.stdout.write(f'\n處理測站: {station.station_name}')
             self.stdout.write(f'  海域: {sea_area["name"]}')
 
-            LAT_MIN, LAT_MAX = sea_area['lat_range']
-            LNG_MIN, LNG_MAX = sea_area['lng_range']
-
-            station_readings = 0
-            current_time = start_date
-
-            # 初始化 GPS 位置（從測站基礎位置開始）
-            current_lat = float(station.latitude)
-            current_lng = float(station.longitude)
-
-            # 模擬主要洋流方向（東北向，帶有隨機擾動）
-            drift_direction_lat = random.uniform(0.00005, 0.00015)  # 主要向北漂移
-            drift_direction_lng = random.uniform(0.00005, 0.00015)  # 主要向東漂移
-
-            while current_time <= end_date:
-                # 生成連貫的 GPS 漂移（模擬洋流帶動儀器緩慢移動）
-                lat_drift = drift_direction_lat + random.uniform(-0.00005, 0.00005)
-                lng_drift = drift_direction_lng + random.uniform(-0.00005, 0.00005)
-
-                current_lat += lat_drift
-                current_lng += lng_drift
-
-                # 確保保持在該測站對應的海域範圍內
-                if current_lat < LAT_MIN:
-                    current_lat = LAT_MIN + 0.001
-                    drift_direction_lat = abs(drift_direction_lat)
-                elif current_lat > LAT_MAX:
-                    current_lat = LAT_MAX - 0.001
-                    drift_direction_lat = -abs(drift_direction_lat)
-
-                if current_lng < LNG_MIN:
-                    current_lng = LNG_MIN + 0.001
-                    drift_direction_lng = abs(drift_direction_lng)
-                elif current_lng > LNG_MAX:
-                    current_lng = LNG_MAX - 0.001
-                    drift_direction_lng = -abs(drift_direction_lng)
-
-                # 偶爾改變漂移方向（模擬洋流變化）
-                if random.random() < 0.05:  # 5% 機率改變方向
-                    drift_direction_lat += random.uniform(-0.0001, 0.0001)
-                    drift_direction_lng += random.uniform(-0.0001, 0.0001)
-
-                # 生成環境數據（帶日週期變化）
-                hour = current_time.hour
-                import math
-                diurnal = (math.sin((hour - 6) * math.pi / 12) + 1) / 2
-
+            # 以 NumPy 一次產生整週數據，再分段寫入
+            _, station_readings = write_station_trajectory({
+                'station_id': station.id,
+                'start_lat': float(station.latitude),
+                'start_lng': float(station.longitude),
+                'sea_area': sea_area,
+                'timestamps': timestamps,
+                'method': 'bulk',
+                'chunk_size': 5000,
+                'seed': None,
                 # 基礎參數（加入測站間的細微差異）
-                station_offset = hash(station.station_name) % 10 / 10  # 0.0-0.9
-
-                temperature = 25.0 + diurnal * 3.0 + random.uniform(-0.5, 0.5) + station_offset * 0.5
-                salinity = 33.5 + random.uniform(-0.3, 0.3) + station_offset * 0.2
-                oxygen = 8.0 + (1 - diurnal) * 1.5 + random.uniform(-0.3, 0.3)
-                ph = 8.2 + random.uniform(-0.2, 0.2)
-                conductivity = 54000.0 + random.uniform(-300, 300) + station_offset * 100
-                pressure = 0.6 + random.uniform(-0.03, 0.03)
-                fluorescence = 0.5 + diurnal * 0.8 + random.uniform(-0.1, 0.1)
-                turbidity = random.uniform(3.0, 7.0) + station_offset
-
-                # 創建數據記錄
-                Reading.objects.create(
-                    station=station,
-                    timestamp=current_time,
-                    latitude=Decimal(str(round(current_lat, 6))),
-                    longitude=Decimal(str(round(current_lng, 6))),
-                    temperature=Decimal(str(round(temperature, 2))),
-                    salinity=Decimal(str(round(salinity, 4))),
-                    oxygen=Decimal(str(round(max(oxygen, 4.0), 3))),
-                    ph=Decimal(str(round(ph, 2))),
-                    conductivity=Decimal(str(round(conductivity, 2))),
-                    pressure=Decimal(str(round(pressure, 3))),
-                    fluorescence=Decimal(str(round(max(fluorescence, 0.0), 3))),
-                    turbidity=Decimal(str(round(turbidity, 3))),
-                )
-
-                station_readings += 1
-                current_time += interval
+                'station_offset': hash(station.station_name) % 10 / 10,  # 0.0-0.9
+            })
 
             self.stdout.write(self.style.SUCCESS(f'  [OK] 已生成 {station_readings} 筆數據'))
             total_readings += station_readings
 
+        elapsed = time.perf_counter() - started
+
         # 總結
         self.stdout.write('\n' + '=' * 60)
         self.stdout.write(self.style.SUCCESS(f'[完成] 設置完成！'))
@@ -228,5 +158,6 @@ class Command(BaseCommand):
         # 計算預期數量
         expected_per_station = int((end_date - start_date).total_seconds() / interval.total_seconds()) + 1
         self.stdout.write(f'預期每測站: {expected_per_station:,} 筆')
+        self.stdout.write(f'耗時: {elapsed:.2f} 秒（{total_readings / elapsed if elapsed else 0:,.0f} 筆/秒）')
 
         self.stdout.write('\n' + self.style.SUCCESS('現在可以訪問 http://localhost:8000 查看結果！'))
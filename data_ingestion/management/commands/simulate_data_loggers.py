@@ -0,0 +1,152 @@
+"""
+模擬資料記錄器，對 socket 匯入伺服器施加負載
+使用方法:
+    python manage.py simulate_data_loggers --serve                      # 內建伺服器，量測端到端每秒筆數
+    python manage.py simulate_data_loggers --serve --no-write           # 只解析與驗證，不寫入資料庫
+    python manage.py simulate_data_loggers --port 9100 --loggers 20 --records 5000 --rate 10
+    python manage.py simulate_data_loggers --protocol udp --port 9101 --format csv
+
+每個記錄器一個連線（UDP 為一個 socket），依序送出各測站的模擬紀錄；
+--serve 時在同一個行程啟動伺服器（系統指定的埠），等全部紀錄處理完才結束。
+"""
+import asyncio
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from data_ingestion.models import Station
+from data_ingestion.socket_ingest import DEFAULT_CSV_COLUMNS, IngestServer, IngestStats, ReadingBatcher
+
+# UDP 每個封包的紀錄數（避免超過常見的 MTU）
+UDP_RECORDS_PER_DATAGRAM = 10
+
+
+def logger_lines(station_id, records, line_format, seed):
+    """單一記錄器的模擬紀錄（每秒一筆，最後一筆為現在）"""
+    rng = np.random.default_rng(seed)
+    end = int(timezone.now().timestamp())
+    temperature = 25 + 1.5 * np.sin(np.arange(records) / 600) + rng.normal(0, 0.1, records)
+    salinity = rng.normal(34, 0.2, records)
+    oxygen = rng.normal(7, 0.2, records)
+    ph = rng.normal(8.1, 0.03, records)
+    lines = []
+    for index in range(records):
+        timestamp = end - records + index + 1
+        if line_format == 'line':
+            lines.append(
+                f'{station_id} {timestamp} temperature={temperature[index]:.2f},salinity={salinity[index]:.4f},'
+                f'oxygen={oxygen[index]:.3f},ph={ph[index]:.2f}\n'
+            )
+        else:
+            lines.append(
+                f'{station_id},{timestamp},{temperature[index]:.2f},{salinity[index]:.4f},'
+                f'{oxygen[index]:.3f},{ph[index]:.2f},,,\n'
+            )
+    return lines
+
+
+class Command(BaseCommand):
+    help = '模擬資料記錄器推送紀錄，量測 socket 匯入的每秒筆數'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='伺服器位址（預設：127.0.0.1）')
+        parser.add_argument('--port', type=int, default=9100, help='伺服器埠（預設：9100）')
+        parser.add_argument('--protocol', choices=['tcp', 'udp'], default='tcp')
+        parser.add_argument('--format', choices=['line', 'csv'], default='line', help='行協定或 CSV（預設：line）')
+        parser.add_argument('--loggers', type=int, default=10, help='同時連線的記錄器數（預設：10）')
+        parser.add_argument('--records', type=int, default=2000, help='每個記錄器送出的筆數（預設：2000）')
+        parser.add_argument('--rate', type=float, default=0, help='每個記錄器每秒筆數（預設 0：不限速）')
+        parser.add_argument('--chunk', type=int, default=50, help='TCP 每次寫入的筆數（預設：50）')
+        parser.add_argument('--serve', action='store_true', help='在同一個行程啟動伺服器並量測端到端處理速度')
+        parser.add_argument('--no-write', action='store_true', help='搭配 --serve：只解析與驗證，不寫入資料庫')
+        parser.add_argument('--batch-size', type=int, default=5000, help='搭配 --serve：每批寫入筆數')
+        parser.add_argument('--max-pending', type=int, default=50000, help='搭配 --serve：暫存筆數上限')
+
+    def handle(self, *args, **options):
+        if options['loggers'] <= 0 or options['records'] <= 0:
+            raise CommandError('--loggers 與 --records 必須大於 0')
+        station_ids = list(Station.objects.values_list('pk', flat=True))
+        if not station_ids:
+            raise CommandError('沒有測站，請先執行 setup_demo_stations')
+
+        payloads = [
+            logger_lines(station_ids[index % len(station_ids)], options['records'], options['format'], seed=index)
+            for index in range(options['loggers'])
+        ]
+        asyncio.run(self.run(payloads, options))
+
+    async def run(self, payloads, options):
+        server = None
+        host, port = options['host'], options['port']
+        if options['serve']:
+            stats = IngestStats()
+            batcher = ReadingBatcher(
+                stats,
+                batch_size=options['batch_size'],
+                flush_interval=0.2,
+                max_pending=options['max_pending'],
+                write=not options['no_write'],
+            )
+            tcp = options['protocol'] == 'tcp'
+            server = IngestServer(
+                batcher, host='127.0.0.1', tcp_port=0 if tcp else None, udp_port=None if tcp else 0,
+                columns=DEFAULT_CSV_COLUMNS,
+            )
+            await server.start()
+            host, port = server.tcp_address if tcp else server.udp_address
+
+        send = self.send_tcp if options['protocol'] == 'tcp' else self.send_udp
+        total = sum(len(lines) for lines in payloads)
+        started = time.perf_counter()
+        await asyncio.gather(*(send(host, port, lines, options) for lines in payloads))
+        sent_seconds = time.perf_counter() - started
+        self.stdout.write(
+            f'送出 {total:,} 筆（{len(payloads)} 個記錄器）：{sent_seconds:.2f} 秒，{total / sent_seconds:,.0f} 筆/秒'
+        )
+        if server is None:
+            return
+
+        # 等待伺服器處理完（UDP 可能遺失封包：一段時間沒有進度即停止）
+        last_progress, last_processed = time.perf_counter(), -1
+        while stats.processed < total and time.perf_counter() - last_progress < 2:
+            await asyncio.sleep(0.05)
+            if stats.processed != last_processed:
+                last_progress, last_processed = time.perf_counter(), stats.processed
+        await server.stop()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'通過 {stats.readings_accepted:,}，拒絕 {stats.readings_rejected:,}，無法解析 {stats.parse_errors:,}，'
+            f'丟棄 {stats.records_dropped:,}，{stats.batches} 批（寫入耗時 {stats.flush_seconds:.2f} 秒），'
+            f'背壓 {stats.backpressure_waits:,} 次'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'端到端 {elapsed:.2f} 秒，{stats.processed / elapsed:,.0f} 筆/秒'
+            + ('（未寫入資料庫）' if options['no_write'] else '')
+        ))
+
+    async def send_tcp(self, host, port, lines, options):
+        reader, writer = await asyncio.open_connection(host, port)
+        chunk = max(options['chunk'], 1)
+        interval = chunk / options['rate'] if options['rate'] else 0
+        for start in range(0, len(lines), chunk):
+            writer.write(''.join(lines[start:start + chunk]).encode())
+            await writer.drain()  # 伺服器背壓時在此等待
+            if interval:
+                await asyncio.sleep(interval)
+        writer.close()
+        await writer.wait_closed()
+
+    async def send_udp(self, host, port, lines, options):
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+        interval = UDP_RECORDS_PER_DATAGRAM / options['rate'] if options['rate'] else 0
+        try:
+            for start in range(0, len(lines), UDP_RECORDS_PER_DATAGRAM):
+                transport.sendto(''.join(lines[start:start + UDP_RECORDS_PER_DATAGRAM]).encode())
+                # 讓出事件迴圈（內建伺服器才有機會接收），並依 --rate 限速
+                await asyncio.sleep(interval)
+        finally:
+            transport.close()
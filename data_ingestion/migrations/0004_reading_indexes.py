@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0003_reading_latitude_reading_longitude'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reading',
+            index=models.Index(fields=['station', '-timestamp'], name='reading_station_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reading',
+            index=models.Index(fields=['timestamp'], name='reading_timestamp_idx'),
+        ),
+        # 先建立複合索引再移除單欄 FK 索引，避免中間出現沒有索引可用的空窗
+        migrations.AlterField(
+            model_name='reading',
+            name='station',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='readings', to='data_ingestion.station', verbose_name='測站'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0004_reading_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('minute', '每分鐘'), ('hour', '每小時'), ('day', '每日')], max_length=10, verbose_name='時間解析度')),
+                ('field', models.CharField(max_length=20, verbose_name='參數')),
+                ('bucket', models.DateTimeField(verbose_name='區間起點')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='筆數')),
+                ('sum', models.FloatField(default=0, verbose_name='總和')),
+                ('sum_sq', models.FloatField(default=0, verbose_name='平方和')),
+                ('min', models.FloatField(blank=True, null=True, verbose_name='最小值')),
+                ('max', models.FloatField(blank=True, null=True, verbose_name='最大值')),
+                ('station', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='data_ingestion.station', verbose_name='測站')),
+            ],
+            options={
+                'verbose_name': '數據彙總',
+                'verbose_name_plural': '數據彙總',
+                'ordering': ['bucket'],
+                'indexes': [models.Index(fields=['resolution', 'field', 'bucket'], name='rollup_resolution_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('station', 'resolution', 'field', 'bucket'), name='rollup_unique_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0005_reading_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationLatest',
+            fields=[
+                ('station', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest', serialize=False, to='data_ingestion.station', verbose_name='測站')),
+                ('reading_id', models.BigIntegerField(blank=True, null=True, verbose_name='數據記錄 ID')),
+                ('timestamp', models.DateTimeField(verbose_name='時間戳')),
+                ('temperature', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='溫度')),
+                ('conductivity', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='電導率')),
+                ('pressure', models.DecimalField(blank=True, decimal_places=3, max_digits=6, null=True, verbose_name='壓力')),
+                ('oxygen', models.DecimalField(blank=True, decimal_places=3, max_digits=5, null=True, verbose_name='溶氧')),
+                ('ph', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='酸鹼值')),
+                ('fluorescence', models.DecimalField(blank=True, decimal_places=3, max_digits=6, null=True, verbose_name='螢光值')),
+                ('turbidity', models.DecimalField(blank=True, decimal_places=3, max_digits=6, null=True, verbose_name='濁度')),
+                ('salinity', models.DecimalField(blank=True, decimal_places=4, max_digits=6, null=True, verbose_name='鹽度')),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='緯度')),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='經度')),
+            ],
+            options={
+                'verbose_name': '測站最新數據',
+                'verbose_name_plural': '測站最新數據',
+            },
+        ),
+    ]
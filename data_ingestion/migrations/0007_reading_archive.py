@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0006_station_latest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='月份')),
+                ('path', models.CharField(max_length=255, verbose_name='檔案路徑')),
+                ('rows', models.PositiveIntegerField(verbose_name='筆數')),
+                ('first_timestamp', models.DateTimeField(verbose_name='最早時間')),
+                ('last_timestamp', models.DateTimeField(verbose_name='最晚時間')),
+                ('size', models.PositiveBigIntegerField(verbose_name='檔案大小')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新時間')),
+                ('station', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='data_ingestion.station', verbose_name='測站')),
+            ],
+            options={
+                'verbose_name': '封存數據',
+                'verbose_name_plural': '封存數據',
+                'ordering': ['station', 'month'],
+                'indexes': [models.Index(fields=['first_timestamp', 'last_timestamp'], name='archive_time_range_idx')],
+                'constraints': [models.UniqueConstraint(fields=('station', 'month'), name='archive_station_month_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def populate_counts(apps, schema_editor):
+    """由既有數據建立計數器（資料庫端 GROUP BY）"""
+    Reading = apps.get_model('data_ingestion', 'Reading')
+    ReadingCount = apps.get_model('data_ingestion', 'ReadingCount')
+    rows = (
+        Reading.objects.order_by()
+        .annotate(day=TruncDate('timestamp', tzinfo=timezone.get_current_timezone()))
+        .values('station_id', 'day')
+        .annotate(total=Count('id'))
+        .iterator(chunk_size=2000)
+    )
+    batch = []
+    for row in rows:
+        batch.append(ReadingCount(station_id=row['station_id'], day=row['day'], count=row['total']))
+        if len(batch) >= 2000:
+            ReadingCount.objects.bulk_create(batch)
+            batch = []
+    ReadingCount.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0007_reading_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('count', models.BigIntegerField(default=0, verbose_name='筆數')),
+                ('station', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reading_counts', to='data_ingestion.station', verbose_name='測站')),
+            ],
+            options={
+                'verbose_name': '數據筆數',
+                'verbose_name_plural': '數據筆數',
+                'indexes': [models.Index(fields=['day'], name='reading_count_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('station', 'day'), name='reading_count_station_day_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
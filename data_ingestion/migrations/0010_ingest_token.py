@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0009_reading_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='名稱')),
+                ('key_hash', models.CharField(editable=False, max_length=64, unique=True, verbose_name='權杖雜湊')),
+                ('is_active', models.BooleanField(default=True, verbose_name='啟用')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='建立時間')),
+                ('last_used_at', models.DateTimeField(blank=True, null=True, verbose_name='最後使用時間')),
+                ('station', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ingest_tokens', to='data_ingestion.station', verbose_name='限定測站')),
+            ],
+            options={
+                'verbose_name': '匯入權杖',
+                'verbose_name_plural': '匯入權杖',
+                'ordering': ['name'],
+            },
+        ),
+    ]
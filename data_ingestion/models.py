@@ -1,4 +1,7 @@
 #ocean_monitor\data_ingestion\models.py
+import hashlib
+import secrets
+
 from django.db import models
 
 
@@ -25,7 +28,8 @@ class Reading(models.Model):
         Station,
         on_delete=models.CASCADE,
         related_name='readings',
-        verbose_name="測站"
+        verbose_name="測站",
+        db_index=False,  # 由 (station, -timestamp) 複合索引涵蓋
     )
     timestamp = models.DateTimeField(verbose_name="時間戳")
     temperature = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name="溫度")
@@ -43,6 +47,264 @@ class Reading(models.Model):
         verbose_name = "數據記錄"
         verbose_name_plural = "數據記錄"
         ordering = ['-timestamp']
+        indexes = [
+            # 測站詳情、圖表、WebSocket 最新資料：依測站篩選並按時間倒序
+            models.Index(fields=['station', '-timestamp'], name='reading_station_ts_idx'),
+            # 異常檢查、儀表板：跨測站的時間範圍查詢
+            models.Index(fields=['timestamp'], name='reading_timestamp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.station.station_name} - {self.timestamp}"
+
+class ReadingRollup(models.Model):
+    """
+    數據彙總資料表（分鐘 / 小時 / 日）
+
+    每個測站、每個參數、每個時間區間一筆，保存 count / sum / sum_sq / min / max，
+    可合併出任意範圍的平均值與標準差。寫入 Reading 時由 data_ingestion.rollups
+    增量更新；歷史數據以 `manage.py backfill_rollups` 重建。
+    """
+
+    RESOLUTION_CHOICES = [
+        ('minute', '每分鐘'),
+        ('hour', '每小時'),
+        ('day', '每日'),
+    ]
+
+    station = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        related_name='rollups',
+        verbose_name="測站",
+        db_index=False,  # 由唯一約束 (station, resolution, field, bucket) 涵蓋
+    )
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES, verbose_name="時間解析度")
+    field = models.CharField(max_length=20, verbose_name="參數")
+    bucket = models.DateTimeField(verbose_name="區間起點")
+    count = models.PositiveIntegerField(default=0, verbose_name="筆數")
+    sum = models.FloatField(default=0, verbose_name="總和")
+    sum_sq = models.FloatField(default=0, verbose_name="平方和")
+    min = models.FloatField(null=True, blank=True, verbose_name="最小值")
+    max = models.FloatField(null=True, blank=True, verbose_name="最大值")
+
+    class Meta:
+        verbose_name = "數據彙總"
+        verbose_name_plural = "數據彙總"
+        ordering = ['bucket']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['station', 'resolution', 'field', 'bucket'],
+                name='rollup_unique_bucket',
+            ),
+        ]
+        indexes = [
+            # 全測站的時間範圍彙總（儀表板、每日報告）
+            models.Index(fields=['resolution', 'field', 'bucket'], name='rollup_resolution_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.station_id} {self.field} {self.resolution} {self.bucket}"
+
+    @property
+    def avg(self):
+        return self.sum / self.count if self.count else None
+
+
+class ReadingSketch(models.Model):
+    """
+    分位數摘要（t-digest，小時 / 日）
+
+    與 ReadingRollup 相同的 (測站, 解析度, 參數, 區間) 鍵，保存可合併的 t-digest，
+    任意時間範圍、任意測站組合的百分位數只需合併數千筆摘要（data_ingestion.sketches）。
+    """
+    station = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        related_name='sketches',
+        verbose_name="測站",
+        db_index=False,  # 由唯一約束 (station, resolution, field, bucket) 涵蓋
+    )
+    resolution = models.CharField(max_length=10, choices=ReadingRollup.RESOLUTION_CHOICES, verbose_name="時間解析度")
+    field = models.CharField(max_length=20, verbose_name="參數")
+    bucket = models.DateTimeField(verbose_name="區間起點")
+    count = models.PositiveIntegerField(default=0, verbose_name="筆數")
+    digest = models.BinaryField(verbose_name="t-digest")
+
+    class Meta:
+        verbose_name = "分位數摘要"
+        verbose_name_plural = "分位數摘要"
+        ordering = ['bucket']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['station', 'resolution', 'field', 'bucket'],
+                name='sketch_unique_bucket',
+            ),
+        ]
+        indexes = [
+            # 全測站的時間範圍合併（每日報告）
+            models.Index(fields=['resolution', 'field', 'bucket'], name='sketch_resolution_bucket_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.station.station_name} - {self.timestamp}"
\ No newline at end of file
+        return f"{self.station_id} {self.field} {self.resolution} {self.bucket}"
+
+
+class ReadingCount(models.Model):
+    """
+    各測站每天（當地時間）的數據筆數計數器
+
+    寫入與大量刪除時在同一個交易內增減（data_ingestion.counters），
+    總筆數、各測站筆數、近期筆數只需加總這張小表，不必 COUNT 整張 Reading。
+    """
+    station = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        related_name='reading_counts',
+        verbose_name="測站",
+        db_index=False,  # 由 (station, day) 唯一約束涵蓋
+    )
+    day = models.DateField(verbose_name="日期")
+    count = models.BigIntegerField(default=0, verbose_name="筆數")
+
+    class Meta:
+        verbose_name = "數據筆數"
+        verbose_name_plural = "數據筆數"
+        constraints = [
+            models.UniqueConstraint(fields=['station', 'day'], name='reading_count_station_day_uniq'),
+        ]
+        indexes = [
+            # 近期筆數：跨測站的日期範圍加總
+            models.Index(fields=['day'], name='reading_count_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.station_id} - {self.day}: {self.count}"
+
+
+class StationLatest(models.Model):
+    """
+    各測站最新一筆數據的快照（每個測站一筆）
+
+    寫入 Reading 時由 data_ingestion.latest 增量更新，讓「所有測站最新數據」
+    只需一次查詢。reading_id 不設外鍵：Reading 分區後主鍵為 (id, timestamp)。
+    """
+    station = models.OneToOneField(
+        Station,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='latest',
+        verbose_name="測站",
+    )
+    reading_id = models.BigIntegerField(null=True, blank=True, verbose_name="數據記錄 ID")
+    timestamp = models.DateTimeField(verbose_name="時間戳")
+    temperature = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True, verbose_name="溫度")
+    conductivity = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="電導率")
+    pressure = models.DecimalField(max_digits=6, decimal_places=3, null=True, blank=True, verbose_name="壓力")
+    oxygen = models.DecimalField(max_digits=5, decimal_places=3, null=True, blank=True, verbose_name="溶氧")
+    ph = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name="酸鹼值")
+    fluorescence = models.DecimalField(max_digits=6, decimal_places=3, null=True, blank=True, verbose_name="螢光值")
+    turbidity = models.DecimalField(max_digits=6, decimal_places=3, null=True, blank=True, verbose_name="濁度")
+    salinity = models.DecimalField(max_digits=6, decimal_places=4, null=True, blank=True, verbose_name="鹽度")
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, verbose_name="緯度")
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, verbose_name="經度")
+
+    # 與 Reading 共用的數值欄位
+    VALUE_FIELDS = [
+        'temperature', 'conductivity', 'pressure', 'oxygen', 'ph',
+        'fluorescence', 'turbidity', 'salinity', 'latitude', 'longitude',
+    ]
+
+    class Meta:
+        verbose_name = "測站最新數據"
+        verbose_name_plural = "測站最新數據"
+
+    def __str__(self):
+        return f"{self.station_id} - {self.timestamp}"
+
+    def as_reading(self):
+        """轉為未存檔的 Reading（pk 為原始數據 ID），可直接套用 Reading 的序列化函式"""
+        return Reading(
+            pk=self.reading_id,
+            station_id=self.station_id,
+            timestamp=self.timestamp,
+            **{field: getattr(self, field) for field in self.VALUE_FIELDS}
+        )
+
+
+class ReadingArchive(models.Model):
+    """
+    已封存的數據記錄（每個測站每月一個欄式壓縮檔，見 data_ingestion.archive）
+
+    原始數據超過保留期限後寫入 READING_ARCHIVE_ROOT 下的檔案並自 Reading 刪除；
+    這裡記錄檔案位置與時間範圍，圖表與匯出依此判斷是否需要讀取封存檔。
+    """
+    station = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        related_name='archives',
+        verbose_name="測站",
+        db_index=False,  # 由 (station, month) 唯一約束涵蓋
+    )
+    month = models.DateField(verbose_name="月份")  # 當地時間的月初
+    path = models.CharField(max_length=255, verbose_name="檔案路徑")  # 相對於 READING_ARCHIVE_ROOT
+    rows = models.PositiveIntegerField(verbose_name="筆數")
+    first_timestamp = models.DateTimeField(verbose_name="最早時間")
+    last_timestamp = models.DateTimeField(verbose_name="最晚時間")
+    size = models.PositiveBigIntegerField(verbose_name="檔案大小")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新時間")
+
+    class Meta:
+        verbose_name = "封存數據"
+        verbose_name_plural = "封存數據"
+        ordering = ['station', 'month']
+        constraints = [
+            models.UniqueConstraint(fields=['station', 'month'], name='archive_station_month_uniq'),
+        ]
+        indexes = [
+            # 圖表與匯出：依時間範圍找出重疊的封存檔
+            models.Index(fields=['first_timestamp', 'last_timestamp'], name='archive_time_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.station_id} - {self.month:%Y-%m}"
+
+
+class IngestToken(models.Model):
+    """
+    批次匯入 API 的存取權杖（見 data_ingestion.views.ingest_readings）
+
+    只保存權杖的 SHA-256 雜湊；原始權杖在建立時顯示一次（`manage.py create_ingest_token`）。
+    指定 station 時只能寫入該測站的數據。
+    """
+    name = models.CharField(max_length=100, verbose_name="名稱")
+    key_hash = models.CharField(max_length=64, unique=True, editable=False, verbose_name="權杖雜湊")
+    station = models.ForeignKey(
+        Station,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='ingest_tokens',
+        verbose_name="限定測站",
+    )
+    is_active = models.BooleanField(default=True, verbose_name="啟用")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="建立時間")
+    last_used_at = models.DateTimeField(null=True, blank=True, verbose_name="最後使用時間")
+
+    class Meta:
+        verbose_name = "匯入權杖"
+        verbose_name_plural = "匯入權杖"
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, name, station=None):
+        """建立權杖，回傳 (IngestToken, 原始權杖)"""
+        key = secrets.token_urlsafe(32)
+        return cls.objects.create(name=name, key_hash=cls.hash_key(key), station=station), key
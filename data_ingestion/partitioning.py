@@ -0,0 +1,196 @@
+"""
+Reading 資料表的 PostgreSQL 按月分區工具
+
+分區模式為選用功能，只在 PostgreSQL 上有效：
+- convert_reading_table_to_partitioned(): 將現有資料表轉為按月 RANGE 分區
+- ensure_monthly_partitions(): 預先建立未來月份的分區（供 Celery Beat 定期呼叫）；
+  DEFAULT 分區已有該月數據時先移入新分區
+
+注意：分區表的主鍵必須包含分區鍵，轉換後主鍵變為 (id, timestamp)，
+因此其他資料表不應再以外鍵參照 Reading.id。
+"""
+import logging
+from datetime import date
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+READING_TABLE = 'data_ingestion_reading'
+LEGACY_TABLE = 'data_ingestion_reading_legacy'
+ID_SEQUENCE = 'data_ingestion_reading_id_seq_part'
+
+# 與 Reading.Meta.indexes 同名，轉換後 Django 的遷移狀態仍然一致
+READING_INDEXES = {
+    'reading_station_ts_idx': '("station_id", "timestamp" DESC)',
+    'reading_timestamp_idx': '("timestamp")',
+}
+
+
+def is_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned():
+    """Reading 資料表是否已經是分區表"""
+    if not is_postgresql():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT 1
+            FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = %s
+        """, [READING_TABLE])
+        return cursor.fetchone() is not None
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _add_months(value, months):
+    month_index = value.year * 12 + (value.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{READING_TABLE}_{month.year:04d}{month.month:02d}'
+
+
+def _create_month_partition(cursor, month):
+    """
+    建立月份分區
+
+    DEFAULT 分區已有該月的數據時，直接 CREATE TABLE ... PARTITION OF 會失敗：
+    改為建立獨立資料表、在同一個交易內把數據自 DEFAULT 分區移入後再 ATTACH。
+    """
+    name = partition_name(month)
+    lower, upper = month.isoformat(), _add_months(month, 1).isoformat()
+    bounds = f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    default = f'{READING_TABLE}_default'
+
+    cursor.execute('SELECT to_regclass(%s), to_regclass(%s)', [f'"{name}"', f'"{default}"'])
+    exists, has_default = cursor.fetchone()
+    if exists:
+        return name
+
+    with transaction.atomic():
+        if has_default:
+            # 鎖定 DEFAULT 分區，避免檢查與搬移之間又寫入該月的數據
+            cursor.execute(f'LOCK TABLE "{default}" IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(
+                f'SELECT COUNT(*) FROM "{default}" WHERE "timestamp" >= %s AND "timestamp" < %s',
+                [lower, upper],
+            )
+            (rows,) = cursor.fetchone()
+        else:
+            rows = 0
+
+        if not rows:
+            cursor.execute(f'CREATE TABLE "{name}" PARTITION OF "{READING_TABLE}" {bounds}')
+            return name
+
+        logger.warning('DEFAULT 分區有 %s 筆 %s 的數據，移入新分區 %s', rows, month.strftime('%Y-%m'), name)
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE "{READING_TABLE}" INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS ('
+            f'DELETE FROM "{default}" WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *'
+            f') INSERT INTO "{name}" SELECT * FROM moved',
+            [lower, upper],
+        )
+        cursor.execute(f'ALTER TABLE "{READING_TABLE}" ATTACH PARTITION "{name}" {bounds}')
+    return name
+
+
+def ensure_monthly_partitions(months_ahead=3, start=None):
+    """
+    確保從 start（預設本月）起到未來 months_ahead 個月的分區都存在
+
+    Returns:
+        新建或已存在的分區名稱列表；資料表未分區時回傳空列表
+    """
+    if not is_partitioned():
+        return []
+
+    first = _month_start(start or date.today())
+    names = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            names.append(_create_month_partition(cursor, _add_months(first, offset)))
+    return names
+
+
+def convert_reading_table_to_partitioned(months_ahead=3, keep_legacy=False, log=print):
+    """
+    將 Reading 資料表轉換為按月分區（單一交易內完成）
+
+    步驟：
+    1. 原表改名為 legacy，並將其索引改名以釋出名稱
+    2. 建立同結構的分區主表，主鍵改為 (id, timestamp)
+    3. 依現有資料的時間範圍建立每月分區，外加 DEFAULT 分區承接範圍外的資料
+    4. 複製資料、校正 id 序列、重建索引與外鍵
+    """
+    if not is_postgresql():
+        raise RuntimeError('按月分區只支援 PostgreSQL')
+    if is_partitioned():
+        log('Reading 資料表已經是分區表，略過轉換')
+        return []
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{READING_TABLE}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT MIN("timestamp"), MAX("timestamp") FROM "{READING_TABLE}"')
+        min_ts, max_ts = cursor.fetchone()
+
+        log('重新命名原資料表...')
+        cursor.execute(f'ALTER TABLE "{READING_TABLE}" RENAME TO "{LEGACY_TABLE}"')
+        for index_name in READING_INDEXES:
+            cursor.execute(f'ALTER INDEX IF EXISTS "{index_name}" RENAME TO "{index_name}_legacy"')
+
+        log('建立分區主表...')
+        cursor.execute(
+            f'CREATE TABLE "{READING_TABLE}" (LIKE "{LEGACY_TABLE}" INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS "{ID_SEQUENCE}"')
+        cursor.execute(
+            f'ALTER TABLE "{READING_TABLE}" ALTER COLUMN "id" '
+            f"SET DEFAULT nextval('{ID_SEQUENCE}')"
+        )
+        cursor.execute(f'ALTER SEQUENCE "{ID_SEQUENCE}" OWNED BY "{READING_TABLE}"."id"')
+        cursor.execute(f'ALTER TABLE "{READING_TABLE}" ADD PRIMARY KEY ("id", "timestamp")')
+
+        today = date.today()
+        first = _month_start(min_ts.date() if min_ts else today)
+        last = _add_months(_month_start(max(max_ts.date(), today) if max_ts else today), months_ahead)
+        names = []
+        month = first
+        while month <= last:
+            names.append(_create_month_partition(cursor, month))
+            month = _add_months(month, 1)
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS "{READING_TABLE}_default" '
+            f'PARTITION OF "{READING_TABLE}" DEFAULT'
+        )
+        log(f'已建立 {len(names)} 個月份分區')
+
+        log('複製資料...')
+        cursor.execute(f'INSERT INTO "{READING_TABLE}" SELECT * FROM "{LEGACY_TABLE}"')
+        cursor.execute(
+            f"SELECT setval('{ID_SEQUENCE}', COALESCE((SELECT MAX(id) FROM \"{READING_TABLE}\"), 0) + 1, false)"
+        )
+
+        log('重建索引與外鍵...')
+        for index_name, columns in READING_INDEXES.items():
+            cursor.execute(f'CREATE INDEX "{index_name}" ON "{READING_TABLE}" {columns}')
+        cursor.execute(
+            f'ALTER TABLE "{READING_TABLE}" ADD CONSTRAINT "{READING_TABLE}_station_id_fk" '
+            f'FOREIGN KEY ("station_id") REFERENCES "data_ingestion_station" ("id") '
+            f'DEFERRABLE INITIALLY DEFERRED'
+        )
+
+        if not keep_legacy:
+            cursor.execute(f'DROP TABLE "{LEGACY_TABLE}"')
+            log('已刪除原資料表')
+
+    return names
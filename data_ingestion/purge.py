@@ -0,0 +1,135 @@
+"""
+大量刪除（依主鍵分批）
+
+Django 的 QuerySet.delete() 會先在 Python 端收集串聯刪除的物件並逐一送出訊號，
+大資料表上可能長時間持有鎖。這裡改為：
+- 依主鍵排序分批刪除，每批一個短交易，可回報進度
+- 沒有訊號接收器、也沒有其他資料表參照時（Collector.can_fast_delete），
+  每批以 _raw_delete 直接執行 DELETE；否則每批仍走 QuerySet.delete()
+- 整張資料表且可快速刪除時，PostgreSQL 直接 TRUNCATE
+"""
+from django.db import connections, transaction
+from django.db.models.deletion import Collector
+
+from .models import Reading, ReadingCount, ReadingRollup, ReadingSketch, Station
+from .signals import readings_purged
+
+DEFAULT_PURGE_CHUNK_SIZE = 10000
+
+
+def can_fast_delete(queryset):
+    """是否可以不經 Collector 直接刪除（無訊號接收器、無串聯刪除）"""
+    return Collector(using=queryset.db, origin=queryset).can_fast_delete(queryset)
+
+
+def truncate_table(model, using='default'):
+    """清空整張資料表；PostgreSQL 以 TRUNCATE，其他資料庫以不帶條件的 DELETE"""
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'TRUNCATE TABLE {table}')
+        else:
+            cursor.execute(f'DELETE FROM {table}')
+
+
+def purge_queryset(queryset, chunk_size=DEFAULT_PURGE_CHUNK_SIZE, progress=None, allow_truncate=True,
+                   before_delete=None):
+    """
+    依主鍵分批刪除 queryset 中的資料
+
+    Args:
+        queryset: 要刪除的資料（可帶篩選條件）
+        chunk_size: 每批筆數
+        progress: 進度回呼 progress(deleted, total)
+        allow_truncate: 沒有篩選條件時是否允許 TRUNCATE
+        before_delete: 每批刪除前在同一個交易內呼叫 before_delete(batch)（例如扣除計數器）；
+            TRUNCATE 時不呼叫
+
+    Returns:
+        刪除筆數
+    """
+    model = queryset.model
+    using = queryset.db
+    queryset = queryset.order_by()
+    fast = can_fast_delete(queryset)
+
+    total = queryset.count()
+    if not total:
+        return 0
+
+    if fast and allow_truncate and not queryset.query.has_filters():
+        with transaction.atomic(using=using):
+            truncate_table(model, using)
+        if progress:
+            progress(total, total)
+        return total
+
+    deleted = 0
+    last_pk = None
+    while True:
+        remaining = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        # 本批最後一筆的主鍵；不足一批時刪除剩下的全部
+        upper = remaining.order_by('pk').values_list('pk', flat=True)[chunk_size - 1:chunk_size].first()
+        batch = remaining if upper is None else remaining.filter(pk__lte=upper)
+        with transaction.atomic(using=using):
+            if before_delete:
+                before_delete(batch)
+            if fast:
+                count = batch._raw_delete(using)
+            else:
+                count = batch.delete()[1].get(model._meta.label, 0)
+        deleted += count
+        if progress:
+            progress(deleted, total)
+        if upper is None:
+            return deleted
+        last_pk = upper
+
+
+def purge_readings(station_ids=None, before=None, chunk_size=DEFAULT_PURGE_CHUNK_SIZE, progress=None,
+                   keep_rollups=False):
+    """
+    刪除數據記錄並維護衍生資料
+
+    - 彙總與分位數摘要：全部刪除時一併清空；部分刪除時重建受影響範圍（keep_rollups=True 時保留）
+    - StationLatest 快照：由剩餘數據重建
+    - ReadingCount 計數器：每批刪除時在同一個交易內扣除
+    - 發送 readings_purged 訊號（頁面快取失效等）
+
+    Args:
+        station_ids: 限定測站（None 表示全部）
+        before: 只刪除此時間之前的數據（None 表示不限）
+        chunk_size: 每批筆數
+        progress: 進度回呼 progress(deleted, total)
+        keep_rollups: 保留彙總（例如原始數據已封存）
+
+    Returns:
+        刪除筆數
+    """
+    from .counters import subtract_reading_counts
+    from .latest import rebuild_station_latest
+    from .rollups import backfill_rollups
+
+    readings = Reading.objects.all()
+    if station_ids is not None:
+        readings = readings.filter(station_id__in=station_ids)
+    if before is not None:
+        readings = readings.filter(timestamp__lt=before)
+
+    deleted = purge_queryset(readings, chunk_size=chunk_size, progress=progress, before_delete=subtract_reading_counts)
+    if station_ids is None and before is None:
+        # 全部刪除（可能以 TRUNCATE 執行）時計數器一併清空
+        purge_queryset(ReadingCount.objects.all(), chunk_size=chunk_size)
+
+    if not keep_rollups:
+        if station_ids is None and before is None:
+            purge_queryset(ReadingRollup.objects.all(), chunk_size=chunk_size)
+            purge_queryset(ReadingSketch.objects.all(), chunk_size=chunk_size)
+        elif deleted:
+            backfill_rollups(station_ids=station_ids, end=before)
+    if deleted:
+        rebuild_station_latest()
+        affected = station_ids if station_ids is not None else Station.objects.values_list('pk', flat=True)
+        readings_purged.send(sender=Reading, station_ids=list(affected), deleted=deleted)
+    return deleted
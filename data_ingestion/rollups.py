@@ -0,0 +1,377 @@
+"""
+Reading 彙總（ReadingRollup）
+
+每個測站、每個參數在分鐘 / 小時 / 日三種解析度下各保存一筆
+count / sum / sum_sq / min / max，圖表與報告的長時間範圍可直接讀取
+數百筆彙總，而不必掃描數百萬筆原始數據。
+
+- 增量更新：readings_ingested 接收器呼叫 apply_rollups()，先在記憶體合併同一批
+  數據，再以 INSERT ... ON CONFLICT DO UPDATE 累加（PostgreSQL 與 SQLite 皆支援）
+- 重建：backfill_rollups() 以資料庫端 GROUP BY 重新計算指定範圍
+  （COPY 寫入、修改或刪除原始數據後使用）
+- 保留：分鐘彙總只保留 settings.ROLLUP_MINUTE_RETENTION_DAYS 天，
+  archive_readings() 執行時以 prune_minute_rollups() 刪除；小時與日彙總永久保留
+
+時間區間以當地時間（settings.TIME_ZONE）切分，日彙總對應當地的一天。
+"""
+import math
+from datetime import timedelta
+
+import numpy as np
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .columns import ReadingColumns
+from .models import Reading, ReadingRollup, ReadingSketch
+
+# 彙總的參數（Reading 欄位）
+ROLLUP_FIELDS = [
+    'temperature', 'ph', 'oxygen', 'salinity',
+    'conductivity', 'pressure', 'fluorescence', 'turbidity',
+]
+
+RESOLUTIONS = ['minute', 'hour', 'day']
+
+RESOLUTION_STEPS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+
+def bucket_start(timestamp, resolution, tz=None):
+    """時間點所屬區間的起點（當地時間；逐筆呼叫時由呼叫端傳入 tz，省去每次查詢目前時區）"""
+    local = timezone.localtime(timestamp, tz)
+    if resolution == 'minute':
+        return local.replace(second=0, microsecond=0)
+    if resolution == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    if resolution == 'day':
+        return local.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f'不支援的解析度: {resolution}')
+
+
+def choose_resolution(start, end, max_buckets=1000):
+    """選擇區間數不超過 max_buckets 的最細解析度"""
+    span = end - start
+    for resolution in RESOLUTIONS:
+        if span / RESOLUTION_STEPS[resolution] <= max_buckets:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def coarsest_resolution(start, end, min_buckets):
+    """選擇區間數至少 min_buckets 的最粗解析度（範圍太短時為最細的解析度）"""
+    span = end - start
+    for resolution in reversed(RESOLUTIONS):
+        if span / RESOLUTION_STEPS[resolution] >= min_buckets:
+            return resolution
+    return RESOLUTIONS[0]
+
+
+def aggregate_readings(readings, resolutions=RESOLUTIONS, columns=None):
+    """
+    在記憶體中合併一批數據
+
+    以 NumPy 依 (測站, 分鐘) 累加，再把連續的分鐘依各解析度的區間累加一次；
+    時區換算與區間計算每分鐘只做一次（時區偏移都是整分鐘，UTC 的分鐘即當地的分鐘）。
+
+    Args:
+        columns: 同一批數據的 ReadingColumns（readings_ingested 傳入；None 時自行建立）
+
+    Returns:
+        {(station_id, resolution, field, bucket): [count, sum, sum_sq, min, max]}
+    """
+    columns = ReadingColumns(readings) if columns is None else columns
+    if not len(columns):
+        return {}
+    starts, keys = columns.minute_groups
+    minute_stations = columns.station_ids[starts]
+
+    per_minute = {}
+    for field in ROLLUP_FIELDS:
+        values = columns.values(field)
+        present = ~np.isnan(values)
+        if not present.any():
+            continue
+        filled = np.where(present, values, 0.0)
+        per_minute[field] = (
+            np.add.reduceat(present, starts, dtype=np.int64),
+            np.add.reduceat(filled, starts),
+            np.add.reduceat(filled * filled, starts),
+            np.fmin.reduceat(values, starts),
+            np.fmax.reduceat(values, starts),
+        )
+
+    totals = {}
+    tz = timezone.get_current_timezone()
+    for resolution in resolutions:
+        # 依 (測站, 時間) 排序，同一區間的分鐘必定相鄰
+        buckets = [bucket_start(minute, resolution, tz) for _, minute in keys]
+        bucket_seconds = np.array([bucket.timestamp() for bucket in buckets])
+        group_starts = np.flatnonzero(np.r_[
+            True, (minute_stations[1:] != minute_stations[:-1]) | (bucket_seconds[1:] != bucket_seconds[:-1])
+        ])
+        group_keys = [(keys[index][0], buckets[index]) for index in group_starts.tolist()]
+        for field, (counts, sums, sums_sq, minimums, maximums) in per_minute.items():
+            entries = zip(
+                np.add.reduceat(counts, group_starts).tolist(),
+                np.add.reduceat(sums, group_starts).tolist(),
+                np.add.reduceat(sums_sq, group_starts).tolist(),
+                np.fmin.reduceat(minimums, group_starts).tolist(),
+                np.fmax.reduceat(maximums, group_starts).tolist(),
+            )
+            for (station_id, bucket), entry in zip(group_keys, entries):
+                if entry[0]:
+                    totals[station_id, resolution, field, bucket] = list(entry)
+    return totals
+
+
+def _upsert_sql():
+    quote = connection.ops.quote_name
+    table = quote(ReadingRollup._meta.db_table)
+    # PostgreSQL 用 LEAST/GREATEST，SQLite 的多參數 MIN/MAX 為純量函式
+    least, greatest = ('LEAST', 'GREATEST') if connection.vendor == 'postgresql' else ('MIN', 'MAX')
+    count, total, total_sq, minimum, maximum = (quote(name) for name in ('count', 'sum', 'sum_sq', 'min', 'max'))
+    return (
+        f'INSERT INTO {table} ("station_id", "resolution", "field", "bucket", '
+        f'{count}, {total}, {total_sq}, {minimum}, {maximum}) '
+        f'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) '
+        f'ON CONFLICT ("station_id", "resolution", "field", "bucket") DO UPDATE SET '
+        f'{count} = {table}.{count} + EXCLUDED.{count}, '
+        f'{total} = {table}.{total} + EXCLUDED.{total}, '
+        f'{total_sq} = {table}.{total_sq} + EXCLUDED.{total_sq}, '
+        f'{minimum} = COALESCE({least}({table}.{minimum}, EXCLUDED.{minimum}), EXCLUDED.{minimum}), '
+        f'{maximum} = COALESCE({greatest}({table}.{maximum}, EXCLUDED.{maximum}), EXCLUDED.{maximum})'
+    )
+
+
+def apply_rollups(readings, resolutions=RESOLUTIONS, columns=None):
+    """
+    將新寫入的數據累加到彙總表
+
+    Returns:
+        更新的彙總筆數
+    """
+    totals = aggregate_readings(readings, resolutions, columns)
+    if not totals:
+        return 0
+
+    adapt = connection.ops.adapt_datetimefield_value
+    params = [
+        (station_id, resolution, field, adapt(bucket), *values)
+        for (station_id, resolution, field, bucket), values in totals.items()
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), params)
+    return len(params)
+
+
+def _align_range(start, end):
+    """將重建範圍對齊到當地日界，確保日彙總完整"""
+    if start is not None:
+        start = bucket_start(start, 'day')
+    if end is not None:
+        end = bucket_start(end, 'day') + RESOLUTION_STEPS['day']
+    return start, end
+
+
+def backfill_rollups(station_ids=None, start=None, end=None, resolutions=RESOLUTIONS,
+                     chunk_size=2000, log=None):
+    """
+    由原始數據重建彙總（資料庫端 GROUP BY，不載入原始數據）
+
+    已封存到冷儲存的月份（data_ingestion.archive）不重建，保留既有彙總。
+    同時重建小時 / 日的分位數摘要（data_ingestion.sketches）。
+
+    Args:
+        station_ids: 限定測站（None 表示全部）
+        start, end: 時間範圍（會對齊到當地日界；None 表示不限）
+        resolutions: 要重建的解析度
+        chunk_size: 每次 bulk_create 的筆數
+        log: 進度輸出函式
+
+    Returns:
+        {resolution: 寫入的彙總筆數}
+    """
+    from .archive import archived_until
+    from .sketches import SKETCH_RESOLUTIONS, rebuild_sketches
+
+    start, end = _align_range(start, end)
+    archived = archived_until(station_ids)
+
+    def scoped(queryset, time_field):
+        if station_ids is not None:
+            queryset = queryset.filter(station_id__in=station_ids)
+        # 已封存的月份原始數據不在資料庫中，保留既有彙總
+        for station_id, until in archived.items():
+            queryset = queryset.exclude(station_id=station_id, **{f'{time_field}__lt': until})
+        if start is not None:
+            queryset = queryset.filter(**{f'{time_field}__gte': start})
+        if end is not None:
+            queryset = queryset.filter(**{f'{time_field}__lt': end})
+        return queryset
+
+    readings = scoped(Reading.objects.order_by(), 'timestamp')
+    rollups = scoped(ReadingRollup.objects.filter(resolution__in=resolutions), 'bucket')
+
+    annotations = {}
+    for field in ROLLUP_FIELDS:
+        annotations[f'{field}__count'] = Count(field)
+        annotations[f'{field}__sum'] = Sum(field)
+        annotations[f'{field}__sum_sq'] = Sum(F(field) * F(field))
+        annotations[f'{field}__min'] = Min(field)
+        annotations[f'{field}__max'] = Max(field)
+
+    tzinfo = timezone.get_current_timezone()
+    written = {}
+    with transaction.atomic():
+        deleted, _ = rollups.delete()
+        if log:
+            log(f'已清除 {deleted} 筆舊彙總')
+
+        for resolution in resolutions:
+            rows = (
+                readings
+                .annotate(rollup_bucket=Trunc('timestamp', resolution, tzinfo=tzinfo))
+                .values('station_id', 'rollup_bucket')
+                .annotate(**annotations)
+                .iterator(chunk_size=chunk_size)
+            )
+            batch = []
+            count = 0
+            for row in rows:
+                for field in ROLLUP_FIELDS:
+                    if not row[f'{field}__count']:
+                        continue
+                    batch.append(ReadingRollup(
+                        station_id=row['station_id'],
+                        resolution=resolution,
+                        field=field,
+                        bucket=row['rollup_bucket'],
+                        count=row[f'{field}__count'],
+                        sum=float(row[f'{field}__sum']),
+                        sum_sq=float(row[f'{field}__sum_sq']),
+                        min=float(row[f'{field}__min']),
+                        max=float(row[f'{field}__max']),
+                    ))
+                if len(batch) >= chunk_size:
+                    ReadingRollup.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                ReadingRollup.objects.bulk_create(batch)
+                count += len(batch)
+            written[resolution] = count
+            if log:
+                log(f'{resolution}: 已寫入 {count} 筆彙總')
+
+        # 分位數摘要（小時 / 日）同範圍重建；只有兩種解析度都重建時才重新讀取數值
+        if set(SKETCH_RESOLUTIONS) <= set(resolutions):
+            scoped(ReadingSketch.objects.all(), 'bucket').delete()
+            rebuild_sketches(readings, chunk_size=chunk_size, log=log)
+    return written
+
+
+def merge_rollups(rows):
+    """
+    合併多筆彙總（ReadingRollup 實例或含相同鍵名的字典）
+
+    Returns:
+        {'count', 'avg', 'min', 'max', 'std'}；沒有數據時 avg/min/max/std 為 None
+    """
+    count = 0
+    total = 0.0
+    total_sq = 0.0
+    minimum = None
+    maximum = None
+    for row in rows:
+        if isinstance(row, dict):
+            row_count, row_sum, row_sum_sq, row_min, row_max = (
+                row['count'], row['sum'], row['sum_sq'], row['min'], row['max']
+            )
+        else:
+            row_count, row_sum, row_sum_sq, row_min, row_max = row.count, row.sum, row.sum_sq, row.min, row.max
+        if not row_count:
+            continue
+        count += row_count
+        total += row_sum
+        total_sq += row_sum_sq
+        minimum = row_min if minimum is None else min(minimum, row_min)
+        maximum = row_max if maximum is None else max(maximum, row_max)
+
+    if not count:
+        return {'count': 0, 'avg': None, 'min': None, 'max': None, 'std': None}
+    avg = total / count
+    variance = max(total_sq / count - avg * avg, 0.0)
+    return {'count': count, 'avg': avg, 'min': minimum, 'max': maximum, 'std': math.sqrt(variance)}
+
+
+def rollup_queryset(resolution, station_id=None, field=None, start=None, end=None):
+    """依條件篩選彙總（start 含、end 不含，以區間起點判斷）"""
+    rollups = ReadingRollup.objects.filter(resolution=resolution)
+    if station_id is not None:
+        rollups = rollups.filter(station_id=station_id)
+    if field is not None:
+        rollups = rollups.filter(field=field)
+    if start is not None:
+        rollups = rollups.filter(bucket__gte=bucket_start(start, resolution))
+    if end is not None:
+        rollups = rollups.filter(bucket__lt=end)
+    return rollups
+
+
+def estimate_reading_count(station_id, start=None, end=None):
+    """
+    由日彙總估計範圍內的原始筆數（含已封存的數據，不掃描 Reading）
+
+    每天取各參數 count 的最大值；範圍頭尾不滿一天的部分以整天計，估計值可能偏高。
+
+    Returns:
+        (估計筆數, 最早一天的區間起點；沒有彙總時為 (0, None))
+    """
+    daily = rollup_queryset('day', station_id=station_id, start=start, end=end).values('bucket').annotate(
+        readings=Max('count'),
+    ).values_list('bucket', 'readings')
+    total, first = 0, None
+    for bucket, readings in daily:
+        total += readings
+        if first is None or bucket < first:
+            first = bucket
+    return total, first
+
+
+def minute_rollup_cutoff(older_than_days=None, now=None):
+    """分鐘彙總的保留起點（此時間之前的分鐘彙總可刪除）"""
+    days = settings.ROLLUP_MINUTE_RETENTION_DAYS if older_than_days is None else older_than_days
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def prune_minute_rollups(older_than_days=None, station_ids=None, chunk_size=None, dry_run=False):
+    """
+    刪除超過保留期限的分鐘彙總（依主鍵分批）
+
+    Returns:
+        刪除（dry_run 時為待刪除）的筆數
+    """
+    from .purge import DEFAULT_PURGE_CHUNK_SIZE, purge_queryset
+
+    rollups = rollup_queryset('minute', end=minute_rollup_cutoff(older_than_days))
+    if station_ids is not None:
+        rollups = rollups.filter(station_id__in=station_ids)
+    if dry_run:
+        return rollups.count()
+    return purge_queryset(rollups, chunk_size=chunk_size or DEFAULT_PURGE_CHUNK_SIZE, allow_truncate=False)
+
+
+def summarize_rollups(resolution='day', station_id=None, start=None, end=None, fields=ROLLUP_FIELDS):
+    """各參數在範圍內的合併統計：{field: merge_rollups() 結果}"""
+    rows = rollup_queryset(resolution, station_id=station_id, start=start, end=end).filter(field__in=fields)
+    grouped = {field: [] for field in fields}
+    for row in rows.values('field', 'count', 'sum', 'sum_sq', 'min', 'max'):
+        grouped[row['field']].append(row)
+    return {field: merge_rollups(grouped[field]) for field in fields}
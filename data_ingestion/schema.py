@@ -0,0 +1,457 @@
+"""
+批次匯入的解析與驗證（JSON 陣列 / NDJSON / CSV）
+
+READING_SCHEMA 在模組載入時由 Reading 的欄位編譯一次：每個數值欄位的合理範圍
+（物理範圍與 DecimalField 可表示的範圍取交集）與小數位數。驗證以欄為單位：
+
+- 每個欄位一次轉為 NumPy 陣列，缺值、格式錯誤、超出範圍都以向量運算標記
+- 測站 ID 對照記憶體中的測站清單（逾時或遇到未知 ID 時重新載入一次）
+- 只有被拒絕的列才逐筆組錯誤訊息；通過的列直接組成未存檔的 Reading
+
+Example:
+    batch = parse_payload(body, 'text/csv')
+    readings, rejects = READING_SCHEMA.validate(batch)
+"""
+import csv
+import io
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+import orjson
+from django.conf import settings
+from django.db.models.base import ModelState
+from django.utils import timezone
+
+from .models import Reading, Station
+
+# 沒有另行設定時的物理合理範圍（再與欄位可表示的範圍取交集）
+DEFAULT_FIELD_RANGES = {
+    'temperature': (-5, 45),
+    'conductivity': (0, 100000),
+    'pressure': (0, 1000),
+    'oxygen': (0, 30),
+    'ph': (0, 14),
+    'fluorescence': (0, 1000),
+    'turbidity': (0, 1000),
+    'salinity': (0, 45),
+    'latitude': (-90, 90),
+    'longitude': (-180, 180),
+}
+
+REQUIRED_FIELDS = ['station_id', 'timestamp']
+
+# 測站 ID 上限（超過即無法精確以 float64 表示，也無法轉為 int64）
+MAX_STATION_ID = 2 ** 53
+
+NON_FIELD_ERRORS = '__all__'
+
+CONTENT_TYPES = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+}
+
+
+class IngestError(Exception):
+    """整個請求無法處理（格式錯誤、筆數過多等），status 為 HTTP 狀態碼"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    name: str
+    minimum: float
+    maximum: float
+    decimal_places: int
+
+    @property
+    def range_message(self):
+        return f'超出範圍 {self.minimum:g} ~ {self.maximum:g}'
+
+
+@dataclass
+class ParsedBatch:
+    """
+    解析後的欄式數據
+
+    Args:
+        row_numbers: 每一列在原始內容中的列號（由 1 起算，CSV 不含標題列）
+        columns: {欄位: 與 row_numbers 等長的原始值列表}
+        rejects: 解析階段即被拒絕的列
+    """
+    row_numbers: list
+    columns: dict
+    rejects: list = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.row_numbers)
+
+
+# ==========================================
+# 解析
+# ==========================================
+
+def parse_payload(body, content_type, max_rows=None):
+    """
+    依 Content-Type 解析請求內容
+
+    Raises:
+        IngestError: 不支援的格式、內容無法解析、筆數超過上限
+    """
+    payload_format = CONTENT_TYPES.get(content_type)
+    if payload_format is None:
+        raise IngestError(f'不支援的 Content-Type: {content_type or "（未指定）"}', status=415)
+    if payload_format == 'csv':
+        batch = _parse_csv(body)
+    else:
+        batch = _parse_json_rows(body, payload_format)
+
+    max_rows = settings.INGEST_MAX_ROWS if max_rows is None else max_rows
+    if len(batch) + len(batch.rejects) > max_rows:
+        raise IngestError(f'單次最多 {max_rows:,} 筆', status=413)
+    return batch
+
+
+def _parse_json_rows(body, payload_format):
+    rejects = []
+    if payload_format == 'json':
+        try:
+            rows = orjson.loads(body)
+        except orjson.JSONDecodeError as exc:
+            raise IngestError(f'JSON 格式錯誤: {exc}')
+        if not isinstance(rows, list):
+            raise IngestError('JSON 內容必須是陣列')
+        numbered = enumerate(rows, start=1)
+    else:
+        numbered = []
+        for number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                numbered.append((number, orjson.loads(line)))
+            except orjson.JSONDecodeError:
+                rejects.append({'row': number, 'errors': {NON_FIELD_ERRORS: 'JSON 格式錯誤'}})
+
+    return batch_from_rows(numbered, rejects)
+
+
+def batch_from_rows(numbered, rejects=None):
+    """
+    (列號, 字典) 的序列轉為欄式的 ParsedBatch（JSON 匯入與 socket 匯入共用）
+
+    不是字典或含未知欄位的列直接列入 rejects。
+    """
+    rejects = [] if rejects is None else rejects
+    allowed = READING_SCHEMA.field_names
+    row_numbers = []
+    objects = []
+    for number, row in numbered:
+        if not isinstance(row, dict):
+            rejects.append({'row': number, 'errors': {NON_FIELD_ERRORS: '不是 JSON 物件'}})
+            continue
+        unknown = row.keys() - allowed
+        if unknown:
+            rejects.append({'row': number, 'errors': {name: '未知欄位' for name in sorted(unknown)}})
+            continue
+        row_numbers.append(number)
+        objects.append(row)
+
+    present = set().union(*(row.keys() for row in objects)) if objects else set()
+    columns = {name: [row.get(name) for row in objects] for name in allowed if name in present}
+    return ParsedBatch(row_numbers, columns, rejects)
+
+
+def _parse_csv(body):
+    try:
+        text = body.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise IngestError('CSV 必須是 UTF-8 編碼')
+    reader = csv.reader(io.StringIO(text))
+    header = [name.strip() for name in next(reader, [])]
+    if not header:
+        return ParsedBatch([], {})
+    unknown = [name for name in header if name not in READING_SCHEMA.field_names]
+    if unknown:
+        raise IngestError(f'未知欄位: {", ".join(unknown)}')
+    if len(set(header)) != len(header):
+        raise IngestError('標題列有重複欄位')
+
+    width = len(header)
+    row_numbers = []
+    rows = []
+    rejects = []
+    for number, row in enumerate(reader, start=1):
+        if len(row) == width:
+            row_numbers.append(number)
+            rows.append(row)
+        elif row:
+            rejects.append({'row': number, 'errors': {NON_FIELD_ERRORS: f'欄位數 {len(row)} 與標題列 {width} 不符'}})
+
+    columns = {name: list(values) for name, values in zip(header, zip(*rows))} if rows else {}
+    return ParsedBatch(row_numbers, columns, rejects)
+
+
+# ==========================================
+# 驗證
+# ==========================================
+
+class StationDirectory:
+    """
+    記憶體中的測站 ID 清單（每個行程一份）
+
+    逾時（INGEST_STATION_CACHE_SECONDS）後重新載入；遇到未知 ID 時也會重新載入一次，
+    新增的測站不必等到逾時。
+    """
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.loaded_at = -math.inf
+
+    def invalidate(self):
+        self.loaded_at = -math.inf
+
+    def _load(self):
+        self.ids = np.fromiter(Station.objects.values_list('pk', flat=True), dtype=np.int64)
+        self.loaded_at = time.monotonic()
+
+    def known(self, station_ids):
+        """station_ids 中已存在的測站（布林陣列）"""
+        reloaded = time.monotonic() - self.loaded_at > settings.INGEST_STATION_CACHE_SECONDS
+        if reloaded:
+            self._load()
+        known = np.isin(station_ids, self.ids)
+        if not reloaded and not known.all():
+            self._load()
+            known = np.isin(station_ids, self.ids)
+        return known
+
+
+STATIONS = StationDirectory()
+
+_STRING_TYPES = frozenset({str, type(None)})
+_NUMBER_TYPES = frozenset({int, float, type(None)})
+
+
+def _float_column(values):
+    """
+    原始值轉為 float64 陣列
+
+    只有全部為字串（或全部為數值）時才整欄轉換；布林、陣列、物件等逐筆判為格式錯誤
+    （NumPy 會把 true 轉成 1.0、把單列的 [1, 2] 轉成二維陣列）。
+
+    Returns:
+        (數值陣列, 缺值遮罩, 格式錯誤遮罩)
+    """
+    types = set(map(type, values))
+    if types <= _STRING_TYPES:
+        strings = np.array(['' if value is None else value for value in values], dtype=str)
+        missing = np.char.str_len(np.char.strip(strings)) == 0
+        try:
+            array = np.where(missing, 'nan', strings).astype(np.float64)
+            return array, missing, ~missing & ~np.isfinite(array)
+        except ValueError:
+            pass
+    elif types <= _NUMBER_TYPES:
+        try:
+            array = np.array(values, dtype=np.float64)
+            missing = np.isnan(array)
+            return array, missing, np.isinf(array)
+        except OverflowError:
+            pass
+
+    # 混合型別或含無法轉換的值：逐筆轉換
+    array = np.full(len(values), np.nan)
+    missing = np.zeros(len(values), dtype=bool)
+    invalid = np.zeros(len(values), dtype=bool)
+    for index, value in enumerate(values):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            missing[index] = True
+            continue
+        if type(value) not in _STRING_TYPES | _NUMBER_TYPES:
+            invalid[index] = True
+            continue
+        try:
+            array[index] = float(value)
+        except (ValueError, OverflowError):
+            invalid[index] = True
+    invalid |= ~missing & ~np.isfinite(array)
+    return array, missing, invalid
+
+
+def _parse_timestamp(value, tz):
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.strip())
+        except ValueError:
+            parsed = datetime.fromtimestamp(float(value), dt_timezone.utc)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        parsed = datetime.fromtimestamp(value, dt_timezone.utc)
+    else:
+        raise TypeError(value)
+    # 未帶時區的時間視為當地時間
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=tz)
+
+
+def _timestamp_column(values):
+    """
+    ISO 8601 字串或 Unix 秒數轉為 aware datetime
+
+    Returns:
+        (datetime 列表, epoch 秒數陣列, 缺值遮罩, 格式錯誤遮罩)
+    """
+    tz = timezone.get_current_timezone()
+    stamps = [None] * len(values)
+    epochs = np.full(len(values), np.nan)
+    missing = np.zeros(len(values), dtype=bool)
+    invalid = np.zeros(len(values), dtype=bool)
+    for index, value in enumerate(values):
+        if value is None or value == '':
+            missing[index] = True
+            continue
+        try:
+            stamp = _parse_timestamp(value, tz)
+        except (TypeError, ValueError, OverflowError, OSError):
+            invalid[index] = True
+            continue
+        stamps[index] = stamp
+        epochs[index] = stamp.timestamp()
+    return stamps, epochs, missing, invalid
+
+
+def _decimal_column(array, missing, decimal_places):
+    """
+    四捨五入到欄位的小數位數後轉為 Decimal（缺值為 None）
+
+    記錄器的數值重複度高（固定座標、量測解析度有限），同一欄相同的值共用一個 Decimal。
+    """
+    template = f'%.{decimal_places}f'
+    decimals = {}
+    column = []
+    for value, is_missing in zip(np.round(array, decimal_places).tolist(), missing.tolist()):
+        if is_missing:
+            column.append(None)
+            continue
+        decimal = decimals.get(value)
+        if decimal is None:
+            decimal = decimals[value] = Decimal(template % value)
+        column.append(decimal)
+    return column
+
+
+class ReadingSchema:
+    """
+    編譯後的 Reading 驗證規則
+
+    Args:
+        ranges: {欄位: (下限, 上限)}，未列出的欄位使用 DEFAULT_FIELD_RANGES
+    """
+
+    def __init__(self, ranges=None):
+        ranges = {**DEFAULT_FIELD_RANGES, **(ranges or {})}
+        self.specs = []
+        for model_field in Reading._meta.concrete_fields:
+            if model_field.name not in ranges:
+                continue
+            # DecimalField 可表示的最大絕對值
+            limit = 10 ** (model_field.max_digits - model_field.decimal_places) - 10 ** -model_field.decimal_places
+            minimum, maximum = ranges[model_field.name]
+            self.specs.append(FieldSpec(
+                model_field.name, max(minimum, -limit), min(maximum, limit), model_field.decimal_places,
+            ))
+        self.field_names = frozenset(REQUIRED_FIELDS + [spec.name for spec in self.specs])
+        # 建立 Reading 時的欄位順序
+        self.attnames = [model_field.attname for model_field in Reading._meta.concrete_fields]
+
+    def validate(self, batch, station_id=None):
+        """
+        驗證解析後的數據
+
+        Args:
+            batch: ParsedBatch
+            station_id: 權杖限定的測站（None 表示不限）
+
+        Returns:
+            (未存檔的 Reading 列表, 被拒絕的列 [{'row', 'errors': {欄位: 訊息}}]，依列號排序)
+        """
+        size = len(batch)
+        errors = {}
+
+        def reject(mask, name, message):
+            for index in np.flatnonzero(mask).tolist():
+                errors.setdefault(index, {}).setdefault(name, message)
+
+        if not size:
+            return [], sorted(batch.rejects, key=lambda item: item['row'])
+
+        for name in REQUIRED_FIELDS:
+            if name not in batch.columns:
+                reject(np.ones(size, dtype=bool), name, '必填')
+
+        station_ids = np.zeros(size, dtype=np.int64)
+        if 'station_id' in batch.columns:
+            array, missing, invalid = _float_column(batch.columns['station_id'])
+            invalid |= ~missing & ~invalid & ((array != np.floor(array)) | (np.abs(array) > MAX_STATION_ID))
+            reject(missing, 'station_id', '必填')
+            reject(invalid, 'station_id', '格式錯誤')
+            valid = ~missing & ~invalid
+            station_ids[valid] = array[valid]
+            reject(valid & ~STATIONS.known(station_ids), 'station_id', '測站不存在')
+            if station_id is not None:
+                reject(valid & (station_ids != station_id), 'station_id', '權杖不可寫入此測站')
+
+        stamps = [None] * size
+        if 'timestamp' in batch.columns:
+            stamps, epochs, missing, invalid = _timestamp_column(batch.columns['timestamp'])
+            reject(missing, 'timestamp', '必填')
+            reject(invalid, 'timestamp', '格式錯誤')
+            reject(epochs > time.time() + settings.INGEST_MAX_CLOCK_SKEW, 'timestamp', '晚於現在時間')
+            reject(epochs < settings.INGEST_MIN_TIMESTAMP, 'timestamp', '早於可接受的時間')
+
+        values = {}
+        for spec in self.specs:
+            if spec.name not in batch.columns:
+                continue
+            array, missing, invalid = _float_column(batch.columns[spec.name])
+            reject(invalid, spec.name, '格式錯誤')
+            with np.errstate(invalid='ignore'):
+                out_of_range = ~missing & ~invalid & ((array < spec.minimum) | (array > spec.maximum))
+            reject(out_of_range, spec.name, spec.range_message)
+            values[spec.name] = (array, missing, spec.decimal_places)
+
+        accepted = np.ones(size, dtype=bool)
+        accepted[list(errors)] = False
+        rejects = batch.rejects + [
+            {'row': batch.row_numbers[index], 'errors': row_errors} for index, row_errors in errors.items()
+        ]
+        rejects.sort(key=lambda item: item['row'])
+        if not accepted.any():
+            return [], rejects
+
+        indices = np.flatnonzero(accepted)
+        columns = {
+            'station_id': station_ids[indices].tolist(),
+            'timestamp': [stamps[index] for index in indices.tolist()],
+        }
+        for name, (array, missing, decimal_places) in values.items():
+            columns[name] = _decimal_column(array[indices], missing[indices], decimal_places)
+        empty = [None] * len(indices)
+        return [self._build(row) for row in zip(*(columns.get(name, empty) for name in self.attnames))], rejects
+
+    def _build(self, values):
+        # 數值已驗證並轉型，直接填入屬性（略過 Model.__init__ 逐欄 setattr，建立速度約快 3 倍）
+        reading = Reading.__new__(Reading)
+        reading._state = ModelState()
+        reading.__dict__.update(zip(self.attnames, values))
+        return reading
+
+
+READING_SCHEMA = ReadingSchema()
@@ -0,0 +1,80 @@
+"""
+Reading 寫入事件
+
+所有寫入 Reading 的路徑都會發送 readings_ingested 訊號，讓即時推播等功能
+只需要掛一個接收器：
+- 單筆 Reading.objects.create() / save()：由 post_save 轉發
+- bulk_create 等批次路徑：寫入後自行呼叫 notify_readings_ingested()
+
+接收器參數：
+    readings: 已寫入的 Reading 列表
+    columns: 同一批數據的 ReadingColumns（排序與數值陣列由各接收器共用）
+    live: 是否為即時數據；歷史回填（軌跡產生器等）為 False，
+          即時推播等只針對新數據的功能應略過
+
+本模組也負責增量更新 ReadingRollup、ReadingSketch、StationLatest 與 ReadingCount（歷史回填同樣需要）。
+
+大量刪除（data_ingestion.purge）完成後另發送 readings_purged 訊號：
+    station_ids: 受影響的測站 ID
+    deleted: 刪除筆數
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .columns import ReadingColumns
+from .models import Reading, Station
+from .counters import apply_reading_counts
+from .latest import update_station_latest
+from .rollups import apply_rollups
+from .sketches import apply_sketches
+
+readings_ingested = Signal()
+readings_purged = Signal()
+
+
+def notify_readings_ingested(readings, live=True):
+    """批次寫入後通知所有接收器"""
+    readings = list(readings)
+    if readings:
+        readings_ingested.send(sender=Reading, readings=readings, live=live, columns=ReadingColumns(readings))
+
+
+@receiver(post_save, sender=Reading)
+def reading_created(sender, instance, created, raw=False, **kwargs):
+    """單筆新增的 Reading 轉發為 readings_ingested（fixture 載入時略過）"""
+    if created and not raw:
+        readings_ingested.send(sender=Reading, readings=[instance], live=True, columns=ReadingColumns([instance]))
+
+
+@receiver(readings_ingested)
+def update_rollups(sender, readings, columns=None, **kwargs):
+    """將新數據累加到分鐘 / 小時 / 日彙總"""
+    apply_rollups(readings, columns=columns)
+
+
+@receiver(readings_ingested)
+def update_sketches(sender, readings, columns=None, **kwargs):
+    """將新數據合併到小時 / 日的分位數摘要"""
+    apply_sketches(readings, columns=columns)
+
+
+@receiver(readings_ingested)
+def update_latest_snapshot(sender, readings, **kwargs):
+    """更新各測站最新數據快照（只有時間較新的數據會覆蓋）"""
+    update_station_latest(readings)
+
+
+@receiver(readings_ingested)
+def update_reading_counts(sender, readings, columns=None, **kwargs):
+    """累加各測站每天的數據筆數"""
+    apply_reading_counts(readings, columns)
+
+
+@receiver(post_delete, sender=Station)
+def remove_station_archives(sender, instance, **kwargs):
+    """測站刪除後（交易提交後）移除其封存檔"""
+    from .archive import delete_station_archives
+
+    station_id = instance.pk
+    transaction.on_commit(lambda: delete_station_archives(station_id))
@@ -0,0 +1,371 @@
+"""
+分位數摘要（ReadingSketch，t-digest）
+
+ReadingRollup 的 count / sum / min / max 可合併出平均與標準差，但百分位數無法由
+彙總值推得，精確計算又必須載入所有原始數據。這裡為每個測站、每個參數的
+小時與日區間保存一個 t-digest：
+
+- 數值依 k1 尺度函數 k(q) = δ/2π · asin(2q - 1) 分組為質心 (平均, 權重)，
+  兩端（p5、p95）的質心較小、中段較大，大小上限約 δ/2 個質心
+- 摘要可任意合併（跨區間、跨測站），合併後重新壓縮即可
+- 任意時間範圍：完整的日子讀日摘要，頭尾不足一天的部分讀小時摘要；
+  一年 × 多個測站只需合併數千筆摘要
+
+- 增量更新：readings_ingested 接收器呼叫 apply_sketches()，
+  同一批數據先在記憶體中依區間分組，再與既有摘要合併後一次 upsert
+- 重建：backfill_rollups() 重建彙總時一併重建（rebuild_sketches()）
+"""
+import math
+import struct
+
+import numpy as np
+from django.db import transaction
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import ReadingSketch
+
+# 保存摘要的參數與解析度
+SKETCH_FIELDS = ['temperature', 'oxygen']
+SKETCH_RESOLUTIONS = ['hour', 'day']
+
+DEFAULT_COMPRESSION = 200
+DEFAULT_PERCENTILES = (5, 50, 95)
+
+# 序列化格式：壓縮參數、最小值、最大值，其後為質心平均（float64）與權重（uint32）
+_HEADER = struct.Struct('<Hdd')
+
+
+class TDigest:
+    """
+    可合併的 t-digest（以 NumPy 一次壓縮，非逐筆插入）
+
+    Example:
+        digest = TDigest.from_values(values)
+        TDigest.merge_all([digest, other]).percentiles([5, 50, 95])
+    """
+
+    __slots__ = ('means', 'weights', 'min', 'max', 'compression')
+
+    def __init__(self, means=(), weights=(), minimum=math.nan, maximum=math.nan, compression=DEFAULT_COMPRESSION):
+        self.means = np.asarray(means, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.min = minimum
+        self.max = maximum
+        self.compression = compression
+
+    @classmethod
+    def from_values(cls, values, compression=DEFAULT_COMPRESSION):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return cls(compression=compression)
+        digest = cls(values, np.ones(len(values)), float(values.min()), float(values.max()), compression)
+        return digest.compress()
+
+    @classmethod
+    def merge_all(cls, digests, compression=DEFAULT_COMPRESSION):
+        digests = [digest for digest in digests if len(digest.means)]
+        if not digests:
+            return cls(compression=compression)
+        merged = cls(
+            np.concatenate([digest.means for digest in digests]),
+            np.concatenate([digest.weights for digest in digests]),
+            min(digest.min for digest in digests),
+            max(digest.max for digest in digests),
+            compression,
+        )
+        return merged.compress()
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        compression, minimum, maximum = _HEADER.unpack_from(data)
+        size = (len(data) - _HEADER.size) // 12
+        means = np.frombuffer(data, dtype='<f8', count=size, offset=_HEADER.size)
+        weights = np.frombuffer(data, dtype='<u4', count=size, offset=_HEADER.size + size * 8)
+        return cls(means, weights, minimum, maximum, compression)
+
+    def to_bytes(self):
+        return (
+            _HEADER.pack(self.compression, self.min, self.max)
+            + self.means.astype('<f8').tobytes()
+            + np.rint(self.weights).astype('<u4').tobytes()
+        )
+
+    @property
+    def count(self):
+        return int(round(self.weights.sum()))
+
+    def compress(self):
+        """依 k1 尺度函數將排序後的質心分組合併"""
+        if len(self.means) > 1:
+            order = np.argsort(self.means, kind='stable')
+            means, weights = self.means[order], self.weights[order]
+            cumulative = np.cumsum(weights)
+            q = (cumulative - weights / 2) / cumulative[-1]
+            k = np.floor(self.compression / (2 * math.pi) * (np.arcsin(2 * q - 1) + math.pi / 2)).astype(np.int64)
+            starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+            self.weights = np.add.reduceat(weights, starts)
+            self.means = np.add.reduceat(means * weights, starts) / self.weights
+        return self
+
+    def percentiles(self, percents=DEFAULT_PERCENTILES):
+        """百分位數（0–100）；沒有數據時為 None"""
+        if not len(self.means):
+            return [None] * len(percents)
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        positions = np.r_[0.0, centers, total]
+        values = np.r_[self.min, self.means, self.max]
+        return [float(value) for value in np.interp(np.asarray(percents, dtype=np.float64) / 100 * total, positions, values)]
+
+
+def percentile_summary(digest, percents=DEFAULT_PERCENTILES):
+    """{'count', 'p5', 'p50', 'p95'}"""
+    summary = {'count': digest.count}
+    summary.update({f'p{percent:g}': value for percent, value in zip(percents, digest.percentiles(percents))})
+    return summary
+
+
+# ==========================================
+# 增量更新
+# ==========================================
+
+def _group_values(readings, resolutions, columns=None):
+    from .columns import ReadingColumns
+    from .rollups import bucket_start
+
+    # 依 (測站, 分鐘) 分組，每分鐘只換算一次區間（同 rollups.aggregate_readings）
+    columns = ReadingColumns(readings) if columns is None else columns
+    if not len(columns):
+        return {}
+    starts, keys = columns.minute_groups
+    values = {field: columns.values(field) for field in SKETCH_FIELDS}
+
+    parts = {}
+    tz = timezone.get_current_timezone()
+    for (station_id, minute), (start, end) in zip(keys, columns.bounds(starts)):
+        buckets = [(resolution, bucket_start(minute, resolution, tz)) for resolution in resolutions]
+        for field, column in values.items():
+            minute_values = column[start:end]
+            minute_values = minute_values[~np.isnan(minute_values)]
+            if not len(minute_values):
+                continue
+            for resolution, bucket in buckets:
+                parts.setdefault((station_id, resolution, field, bucket), []).append(minute_values)
+    return {key: np.concatenate(arrays) for key, arrays in parts.items()}
+
+
+def _sketch(key, digest):
+    station_id, resolution, field, bucket = key
+    return ReadingSketch(
+        station_id=station_id, resolution=resolution, field=field, bucket=bucket,
+        count=digest.count, digest=digest.to_bytes(),
+    )
+
+
+def _placeholder(key):
+    station_id, resolution, field, bucket = key
+    return ReadingSketch(station_id=station_id, resolution=resolution, field=field, bucket=bucket, count=0, digest=b'')
+
+
+def _upsert_sketches(sketches, batch_size=None):
+    ReadingSketch.objects.bulk_create(
+        sketches,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['station', 'resolution', 'field', 'bucket'],
+        update_fields=['count', 'digest'],
+    )
+
+
+def apply_sketches(readings, resolutions=SKETCH_RESOLUTIONS, columns=None):
+    """
+    將新寫入的數據合併到摘要（建立缺少的列、一次查詢並鎖定既有摘要、一次 upsert）
+
+    先以 INSERT ... ON CONFLICT DO NOTHING 建立尚不存在的摘要（count=0 的空列），
+    再以 SELECT ... FOR UPDATE 鎖定全部相關的列後合併：兩個行程同時建立同一個新摘要時，
+    後者會等待前者提交並合併其結果，而不是以自己的 t-digest 覆蓋。
+
+    Returns:
+        更新的摘要筆數
+    """
+    groups = _group_values(readings, resolutions, columns)
+    if not groups:
+        return 0
+
+    with transaction.atomic():
+        ReadingSketch.objects.bulk_create(
+            [_placeholder(key) for key in groups],
+            ignore_conflicts=True,
+        )
+        existing = {
+            (sketch.station_id, sketch.resolution, sketch.field, sketch.bucket): sketch.digest
+            for sketch in ReadingSketch.objects.select_for_update().filter(
+                station_id__in={key[0] for key in groups},
+                resolution__in=resolutions,
+                field__in=SKETCH_FIELDS,
+                bucket__in={key[3] for key in groups},
+                count__gt=0,
+            )
+        }
+        sketches = []
+        for key, values in groups.items():
+            digest = TDigest.from_values(values)
+            if key in existing:
+                digest = TDigest.merge_all([TDigest.from_bytes(existing[key]), digest])
+            sketches.append(_sketch(key, digest))
+        _upsert_sketches(sketches)
+    return len(sketches)
+
+
+def rebuild_sketches(readings, chunk_size=2000, log=None):
+    """
+    由原始數據重建摘要（呼叫端已刪除範圍內的舊摘要）
+
+    依 (測站, 小時) 排序讀取數值，每個小時與每一天各建立一次 t-digest。
+
+    Args:
+        readings: 已篩選的 Reading QuerySet
+
+    Returns:
+        寫入的摘要筆數
+    """
+    from .rollups import bucket_start
+
+    rows = (
+        readings
+        .annotate(sketch_hour=Trunc('timestamp', 'hour', tzinfo=timezone.get_current_timezone()))
+        .order_by('station_id', 'sketch_hour')
+        .values_list('station_id', 'sketch_hour', *SKETCH_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    batch = []
+    written = 0
+    current = {}
+
+    def flush(keys):
+        nonlocal batch, written
+        for key in keys:
+            batch.append(_sketch(key, TDigest.from_values(current.pop(key))))
+        if len(batch) >= chunk_size:
+            _upsert_sketches(batch)
+            written += len(batch)
+            batch = []
+
+    hour_key = day_key = None
+    for station_id, hour, *values in rows:
+        if (station_id, hour) != hour_key:
+            day = bucket_start(hour, 'day')
+            flush([key for key in current if key[1] == 'hour'])
+            if (station_id, day) != day_key:
+                flush(list(current))
+            hour_key, day_key = (station_id, hour), (station_id, day)
+        for field, value in zip(SKETCH_FIELDS, values):
+            if value is None:
+                continue
+            current.setdefault((station_id, 'hour', field, hour), []).append(float(value))
+            current.setdefault((station_id, 'day', field, day), []).append(float(value))
+    flush(list(current))
+    if batch:
+        _upsert_sketches(batch)
+        written += len(batch)
+    if log:
+        log(f'分位數摘要: 已寫入 {written} 筆')
+    return written
+
+
+# ==========================================
+# 查詢
+# ==========================================
+
+def _range_filters(start, end):
+    """
+    時間範圍對應的摘要條件：完整的日子用日摘要，頭尾不足一天的部分用小時摘要
+
+    Returns:
+        [(resolution, bucket__gte, bucket__lt)]；None 表示不限
+    """
+    from .rollups import RESOLUTION_STEPS, bucket_start
+
+    hour_start = bucket_start(start, 'hour') if start is not None else None
+    day_start = None
+    if start is not None:
+        day_start = bucket_start(start, 'day')
+        if day_start < hour_start:
+            day_start += RESOLUTION_STEPS['day']
+    day_end = bucket_start(end, 'day') if end is not None else None
+    if day_start is not None and day_end is not None and day_start >= day_end:
+        return [('hour', hour_start, end)]
+
+    filters = [('day', day_start, day_end)]
+    if start is not None and hour_start < day_start:
+        filters.append(('hour', hour_start, day_start))
+    if end is not None and day_end < end:
+        filters.append(('hour', day_end, end))
+    return filters
+
+
+def sketch_queryset(field, station_ids=None, start=None, end=None):
+    """範圍內要合併的摘要（start 含、end 不含，以區間起點判斷）"""
+    from django.db.models import Q
+
+    condition = Q()
+    for resolution, lower, upper in _range_filters(start, end):
+        part = Q(resolution=resolution)
+        if lower is not None:
+            part &= Q(bucket__gte=lower)
+        if upper is not None:
+            part &= Q(bucket__lt=upper)
+        condition |= part
+    sketches = ReadingSketch.objects.filter(condition, field=field)
+    if station_ids is not None:
+        sketches = sketches.filter(station_id__in=station_ids)
+    return sketches
+
+
+def range_percentiles(station_ids=None, start=None, end=None, fields=SKETCH_FIELDS, percents=DEFAULT_PERCENTILES):
+    """
+    任意時間範圍、任意測站組合的百分位數（合併摘要，不讀原始數據）
+
+    Returns:
+        {field: {'count', 'p5', 'p50', 'p95'}}
+    """
+    result = {}
+    for field in fields:
+        digests = [
+            TDigest.from_bytes(data)
+            for data in sketch_queryset(field, station_ids, start, end).values_list('digest', flat=True)
+        ]
+        result[field] = percentile_summary(TDigest.merge_all(digests), percents)
+    return result
+
+
+def daily_percentiles(day_start, fields=SKETCH_FIELDS, percents=DEFAULT_PERCENTILES):
+    """
+    某一天（當地日界）各測站與全部測站的百分位數（一次查詢）
+
+    Returns:
+        ({station_id: {field: summary}}, {field: summary})
+    """
+    digests = {}
+    for station_id, field, data in ReadingSketch.objects.filter(
+        resolution='day', bucket=day_start, field__in=fields,
+    ).values_list('station_id', 'field', 'digest'):
+        digests.setdefault(station_id, {})[field] = TDigest.from_bytes(data)
+
+    stations = {
+        station_id: {
+            field: percentile_summary(by_field.get(field, TDigest()), percents) for field in fields
+        }
+        for station_id, by_field in digests.items()
+    }
+    overall = {
+        field: percentile_summary(
+            TDigest.merge_all([by_field[field] for by_field in digests.values() if field in by_field]), percents
+        )
+        for field in fields
+    }
+    return stations, overall
@@ -0,0 +1,436 @@
+"""
+資料記錄器的 socket 匯入（asyncio TCP / UDP）
+
+CR1000X 等資料記錄器以小而頻繁的紀錄推送數據，每筆一個 HTTP 請求的負擔太重。
+`manage.py run_ingest_server` 啟動常駐的 asyncio 伺服器，接受兩種逐行格式：
+
+- 行協定：`<station_id> <timestamp> <欄位>=<值>,<欄位>=<值>...`
+      1 2025-12-14T10:00:00+08:00 temperature=25.12,ph=8.10,oxygen=6.5
+- CSV：`<station_id>,<timestamp>,<值>,...`，欄位順序預設為 DEFAULT_CSV_COLUMNS；
+  以 `# station_id,timestamp,temperature,...` 開頭的行可改變該連線（或該封包）之後的順序
+
+時間可為 ISO 8601 或 Unix 秒數。解析只用 split / partition（不逐行套用正規表示式），
+驗證與批次匯入 API 相同（schema.READING_SCHEMA）。
+
+- 批次：紀錄先暫存在記憶體，累積 batch_size 筆或經過 flush_interval 秒即在 DB 執行緒中
+  寫入（bulk_insert_readings，PostgreSQL 使用 COPY），每批最多 batch_size 筆；
+  整批寫入失敗時依測站、再對半拆開重試，只有無法寫入的紀錄計為失敗
+- 背壓：暫存加上寫入中的筆數達到 max_pending 時，TCP 連線暫停讀取，TCP 視窗填滿後
+  記錄器自然放慢；UDP 無法背壓，超過上限的封包直接丟棄並計數
+- 計數器：IngestStats，由 run_ingest_server 定期輸出並寫入快取（STATS_CACHE_KEY）
+- 存取限制：行協定沒有驗證，預設只監聽 127.0.0.1；allowed_sources 限定來源網段
+  （其他來源的 TCP 連線直接關閉、UDP 封包丟棄），station_ids 限定可寫入的測站
+"""
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+from dataclasses import asdict, dataclass
+
+from channels.db import database_sync_to_async
+from django.core.cache import cache
+from django.db import InterfaceError, OperationalError
+
+from .ingest import bulk_insert_readings
+from .schema import READING_SCHEMA, batch_from_rows
+
+logger = logging.getLogger(__name__)
+
+# CSV 行未指定標題時的欄位順序（與 CR1000X 範例程式的輸出表相同）
+DEFAULT_CSV_COLUMNS = [
+    'station_id', 'timestamp', 'temperature', 'salinity', 'oxygen', 'ph',
+    'pressure', 'latitude', 'longitude',
+]
+
+STATS_CACHE_KEY = 'ingest_server_stats'
+
+# 單行長度上限：超過仍未換行的內容直接丟棄
+MAX_LINE_BYTES = 64 * 1024
+
+READ_SIZE = 64 * 1024
+
+# UDP 接收緩衝區：寫入批次期間湧入的封包先由核心暫存，減少遺失
+UDP_RECEIVE_BUFFER = 4 * 1024 * 1024
+
+
+class LineError(ValueError):
+    pass
+
+
+def parse_line(line, columns):
+    """一行紀錄轉為 {欄位: 字串}（含 = 或不含逗號者視為行協定）"""
+    if '=' in line or ',' not in line:
+        parts = line.split(None, 2)
+        if len(parts) < 2:
+            raise LineError('缺少測站或時間')
+        row = {'station_id': parts[0], 'timestamp': parts[1]}
+        if len(parts) == 3:
+            for item in parts[2].split(','):
+                key, separator, value = item.partition('=')
+                if not separator:
+                    raise LineError(f'無法解析: {item}')
+                row[key.strip()] = value.strip()
+        return row
+
+    values = line.split(',')
+    if len(values) != len(columns):
+        raise LineError(f'欄位數 {len(values)} 與 {len(columns)} 不符')
+    return dict(zip(columns, values))
+
+
+class LineParser:
+    """
+    逐段餵入的位元組轉為紀錄（每個 TCP 連線或 UDP 封包一個）
+
+    不完整的最後一行保留到下一段；標題行（# 開頭）改變之後的 CSV 欄位順序。
+    """
+
+    def __init__(self, columns=DEFAULT_CSV_COLUMNS):
+        self.columns = list(columns)
+        self._tail = b''
+
+    def feed(self, data, final=False):
+        """
+        Returns:
+            (紀錄列表, 無法解析的行數)
+        """
+        chunks = (self._tail + data).split(b'\n')
+        self._tail = b'' if final else chunks.pop()
+        errors = 0
+        if len(self._tail) > MAX_LINE_BYTES:
+            self._tail = b''
+            errors += 1
+
+        rows = []
+        for line in b'\n'.join(chunks).decode('utf-8', 'replace').split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            if line[0] == '#':
+                columns = [name.strip() for name in line[1:].split(',')]
+                if set(columns) <= READING_SCHEMA.field_names:
+                    self.columns = columns
+                else:
+                    errors += 1
+                continue
+            try:
+                rows.append(parse_line(line, self.columns))
+            except LineError:
+                errors += 1
+        return rows, errors
+
+
+@dataclass
+class IngestStats:
+    connections: int = 0  # 目前的 TCP 連線數
+    bytes_received: int = 0
+    records_received: int = 0
+    parse_errors: int = 0
+    records_dropped: int = 0  # UDP 超過暫存上限而丟棄
+    readings_accepted: int = 0  # 通過驗證（並已寫入）
+    readings_rejected: int = 0  # 驗證未通過
+    readings_failed: int = 0  # 寫入失敗（失敗的批次拆開重試後仍無法寫入）
+    batches: int = 0
+    flush_seconds: float = 0.0
+    backpressure_waits: int = 0
+    sources_refused: int = 0  # 來源不在允許網段的 TCP 連線與 UDP 封包
+    pending: int = 0
+
+    @property
+    def processed(self):
+        """已結束處理（寫入、拒絕、失敗、丟棄或無法解析）的紀錄數"""
+        return (
+            self.readings_accepted + self.readings_rejected + self.readings_failed
+            + self.records_dropped + self.parse_errors
+        )
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def publish_stats(stats):
+    """將計數器寫入快取，供其他行程查詢（快取失敗不影響匯入）"""
+    try:
+        cache.set(STATS_CACHE_KEY, {**stats.as_dict(), 'updated_at': time.time()}, timeout=None)
+    except Exception:
+        logger.exception('寫入匯入伺服器計數器失敗')
+
+
+def write_readings(readings):
+    """
+    寫入已驗證的 Reading；整批失敗時拆成較小的批次重試，只有無法寫入的紀錄計為失敗
+
+    先依測站拆開，單一測站再對半拆分，直到找出失敗的單筆紀錄。
+    資料庫連線或鎖定錯誤（OperationalError / InterfaceError）拆批也不會成功，整批計為失敗。
+
+    Returns:
+        (寫入的筆數, 失敗的筆數)
+    """
+    try:
+        bulk_insert_readings(readings, use_copy=True)
+        return len(readings), 0
+    except (InterfaceError, OperationalError):
+        logger.exception('寫入 %d 筆紀錄失敗', len(readings))
+        return 0, len(readings)
+    except Exception:
+        if len(readings) == 1:
+            logger.exception('寫入紀錄失敗（測站 %s，%s）', readings[0].station_id, readings[0].timestamp)
+            return 0, 1
+        logger.warning('寫入 %d 筆紀錄失敗，拆成較小的批次重試', len(readings), exc_info=True)
+
+    by_station = {}
+    for reading in readings:
+        # 失敗的交易已回滾，已指定的主鍵不再有效
+        reading.pk = None
+        reading._state.adding = True
+        by_station.setdefault(reading.station_id, []).append(reading)
+    if len(by_station) > 1:
+        groups = by_station.values()
+    else:
+        middle = len(readings) // 2
+        groups = [readings[:middle], readings[middle:]]
+
+    written = failed = 0
+    for group in groups:
+        group_written, group_failed = write_readings(group)
+        written += group_written
+        failed += group_failed
+    return written, failed
+
+
+def write_rows(rows, write=True, station_ids=None):
+    """
+    驗證並寫入一批紀錄（在 DB 執行緒中執行）
+
+    Args:
+        station_ids: 可寫入的測站 ID（None 表示不限），其他測站的紀錄計為拒絕
+
+    Returns:
+        (寫入的筆數, 被拒絕的筆數, 寫入失敗的筆數)
+    """
+    readings, rejects = READING_SCHEMA.validate(batch_from_rows(enumerate(rows, start=1)))
+    rejected = len(rejects)
+    if station_ids is not None:
+        allowed = [reading for reading in readings if reading.station_id in station_ids]
+        rejected += len(readings) - len(allowed)
+        readings = allowed
+    if not write or not readings:
+        return len(readings), rejected, 0
+    written, failed = write_readings(readings)
+    return written, rejected, failed
+
+
+class ReadingBatcher:
+    """
+    記憶體中的紀錄暫存與批次寫入
+
+    Args:
+        batch_size: 達到此筆數立即寫入，也是每批的上限
+        flush_interval: 暫存的紀錄最多等待的秒數
+        max_pending: 暫存加上寫入中的筆數上限（背壓）
+        write: False 時只驗證不寫入（量測用）
+        station_ids: 可寫入的測站 ID（None 表示不限）
+    """
+
+    def __init__(self, stats, batch_size=5000, flush_interval=1.0, max_pending=50000, write=True, station_ids=None):
+        self.stats = stats
+        self.station_ids = None if station_ids is None else frozenset(station_ids)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.write = write
+        self.rows = []
+        self.in_flight = 0
+        self._ready = asyncio.Event()
+        self._capacity = asyncio.Event()
+        self._capacity.set()
+        self._closing = False
+
+    @property
+    def pending(self):
+        return len(self.rows) + self.in_flight
+
+    def has_capacity(self):
+        return self.pending < self.max_pending
+
+    def _update(self):
+        self.stats.pending = self.pending
+        if len(self.rows) >= self.batch_size:
+            self._ready.set()
+        if self.has_capacity():
+            self._capacity.set()
+        else:
+            self._capacity.clear()
+
+    def add(self, rows):
+        self.rows.extend(rows)
+        self.stats.records_received += len(rows)
+        self._update()
+
+    async def wait_for_capacity(self):
+        if not self._capacity.is_set():
+            self.stats.backpressure_waits += 1
+            await self._capacity.wait()
+
+    async def run(self):
+        """寫入迴圈：close() 後寫完剩餘的紀錄才結束"""
+        while True:
+            if not self._closing:
+                try:
+                    await asyncio.wait_for(self._ready.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._ready.clear()
+            if self.rows:
+                await self.flush()
+            elif self._closing:
+                return
+
+    async def flush(self):
+        rows, self.rows = self.rows[:self.batch_size], self.rows[self.batch_size:]
+        self.in_flight = len(rows)
+        started = time.perf_counter()
+        try:
+            accepted, rejected, failed = await database_sync_to_async(write_rows)(
+                rows, self.write, self.station_ids,
+            )
+        except Exception:
+            # 驗證本身失敗等非預期錯誤：整批不重試（記錄器保有自己的儲存，可重送）
+            logger.exception('處理 %d 筆紀錄失敗', len(rows))
+            self.stats.readings_failed += len(rows)
+        else:
+            self.stats.readings_accepted += accepted
+            self.stats.readings_rejected += rejected
+            self.stats.readings_failed += failed
+        finally:
+            self.in_flight = 0
+            self.stats.batches += 1
+            self.stats.flush_seconds += time.perf_counter() - started
+            self._update()
+
+    def close(self):
+        self._closing = True
+        self._ready.set()
+
+
+class UdpIngestProtocol(asyncio.DatagramProtocol):
+    """每個封包獨立解析（可含多行）；暫存已滿時丟棄"""
+
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        stats = self.server.stats
+        if not self.server.is_allowed(addr):
+            stats.sources_refused += 1
+            return
+        stats.bytes_received += len(data)
+        if not self.server.batcher.has_capacity():
+            stats.records_dropped += data.count(b'\n') + (not data.endswith(b'\n'))
+            return
+        rows, errors = LineParser(self.server.columns).feed(data, final=True)
+        stats.parse_errors += errors
+        self.server.batcher.add(rows)
+
+
+class IngestServer:
+    """
+    TCP 與 UDP 匯入伺服器（port 為 0 時由系統指定，None 表示不啟用）
+
+    Args:
+        allowed_sources: 允許的來源網段（如 '10.0.0.0/8'），None 表示不限
+
+    Example:
+        server = IngestServer(batcher, host='0.0.0.0', tcp_port=9100, allowed_sources=['10.1.0.0/16'])
+        await server.start()
+        ...
+        await server.stop()  # 停止接收並寫完暫存的紀錄
+    """
+
+    def __init__(
+        self, batcher, host='127.0.0.1', tcp_port=9100, udp_port=None, columns=DEFAULT_CSV_COLUMNS,
+        allowed_sources=None,
+    ):
+        self.batcher = batcher
+        self.stats = batcher.stats
+        self.host = host
+        self.allowed_sources = (
+            None if allowed_sources is None
+            else [ipaddress.ip_network(network, strict=False) for network in allowed_sources]
+        )
+        self.tcp_port = tcp_port
+        self.udp_port = udp_port
+        self.columns = list(columns)
+        self.tcp_server = None
+        self.udp_transport = None
+        self._flusher = None
+
+    @property
+    def tcp_address(self):
+        return self.tcp_server.sockets[0].getsockname()[:2] if self.tcp_server else None
+
+    @property
+    def udp_address(self):
+        return self.udp_transport.get_extra_info('sockname')[:2] if self.udp_transport else None
+
+    def is_allowed(self, address):
+        """來源位址（peername / UDP addr）是否在允許的網段內"""
+        if self.allowed_sources is None:
+            return True
+        try:
+            source = ipaddress.ip_address(address[0])
+        except (TypeError, ValueError, IndexError):
+            return False
+        # IPv6 socket 收到的 IPv4 來源為 ::ffff:a.b.c.d
+        source = getattr(source, 'ipv4_mapped', None) or source
+        return any(source in network for network in self.allowed_sources)
+
+    async def start(self):
+        self._flusher = asyncio.create_task(self.batcher.run())
+        if self.tcp_port is not None:
+            self.tcp_server = await asyncio.start_server(self.handle_tcp, self.host, self.tcp_port)
+        if self.udp_port is not None:
+            self.udp_transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: UdpIngestProtocol(self), local_addr=(self.host, self.udp_port),
+            )
+            try:
+                self.udp_transport.get_extra_info('socket').setsockopt(
+                    socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECEIVE_BUFFER,
+                )
+            except OSError:
+                logger.warning('無法設定 UDP 接收緩衝區大小')
+
+    async def stop(self):
+        if self.tcp_server is not None:
+            self.tcp_server.close()
+            await self.tcp_server.wait_closed()
+        if self.udp_transport is not None:
+            self.udp_transport.close()
+        self.batcher.close()
+        await self._flusher
+
+    async def handle_tcp(self, reader, writer):
+        if not self.is_allowed(writer.get_extra_info('peername')):
+            self.stats.sources_refused += 1
+            writer.close()
+            return
+        parser = LineParser(self.columns)
+        self.stats.connections += 1
+        try:
+            while True:
+                # 暫存已滿時不再讀取，讓 TCP 流量控制把壓力推回記錄器
+                await self.batcher.wait_for_capacity()
+                data = await reader.read(READ_SIZE)
+                final = not data
+                self.stats.bytes_received += len(data)
+                rows, errors = parser.feed(data, final=final)
+                self.stats.parse_errors += errors
+                self.batcher.add(rows)
+                if final:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.stats.connections -= 1
+            writer.close()
@@ -0,0 +1,202 @@
+"""
+data_ingestion.archive 測試 - 冷數據封存與 mmap 讀取
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pytest
+from django.utils import timezone
+
+from analysis_tools.chart_helpers import build_chart_data
+from data_ingestion import archive
+from data_ingestion.archive import (
+    ARCHIVE_FIELDS, ArchiveReader, archive_readings, to_micros, unscale_decimal, write_archive,
+)
+from data_ingestion.ingest import bulk_insert_readings
+from data_ingestion.models import Reading, ReadingArchive, ReadingRollup, StationLatest
+from data_ingestion.rollups import backfill_rollups
+
+
+@pytest.fixture
+def archive_now(django_capture_on_commit_callbacks):
+    """封存並執行提交後的檔案置換"""
+    def run(**kwargs):
+        with django_capture_on_commit_callbacks(execute=True):
+            return archive_readings(**kwargs)
+    return run
+
+
+def _local(year, month, day, hour=0):
+    return timezone.make_aware(datetime(year, month, day, hour))
+
+
+def _readings(station, count, start, step=timedelta(hours=1)):
+    return [
+        Reading(
+            station=station,
+            timestamp=start + step * i,
+            temperature=Decimal('20.00') + Decimal(i) / 100,
+            salinity=Decimal('34.1234'),
+            latitude=Decimal('22.123456'),
+            ph=None if i % 3 == 0 else Decimal('8.10'),
+        )
+        for i in range(count)
+    ]
+
+
+def test_write_and_read_blocks(tmp_path, monkeypatch):
+    """測試多區塊封存檔可依時間範圍只讀取部分欄位"""
+    monkeypatch.setattr(archive, 'BLOCK_ROWS', 4)
+    timestamps = np.arange(10, dtype=np.int64) * 1_000_000
+    columns = {
+        'id': np.arange(100, 110, dtype=np.int64),
+        'timestamp': timestamps,
+        'temperature': np.arange(2000, 2010, dtype=np.int64),
+    }
+    path = tmp_path / '1' / '2024-01.oca'
+    assert write_archive(path, columns) == path.stat().st_size
+
+    with ArchiveReader(path) as reader:
+        assert reader.rows == 10
+        assert len(reader.header['blocks']) == 3
+        sliced = reader.read(['id', 'temperature'], start=3_000_000, end=5_000_000)
+        full = reader.read(['timestamp'])
+    assert sliced['id'].tolist() == [103, 104, 105]
+    assert unscale_decimal(sliced['temperature'], 2) == [Decimal('20.03'), Decimal('20.04'), Decimal('20.05')]
+    assert full['timestamp'].tolist() == timestamps.tolist()
+
+
+def test_archive_moves_old_months_and_keeps_rollups(station, station_b, archive_root, archive_now):
+    """測試封存完整月份：原始數據移出資料庫、數值完全相同，小時 / 日彙總與最新快照保留，舊的分鐘彙總刪除"""
+    old = _readings(station, 60, _local(2024, 1, 30)) + _readings(station_b, 5, _local(2024, 2, 3))
+    recent = _readings(station, 3, timezone.now() - timedelta(hours=3))
+    bulk_insert_readings(old + recent)
+    expected = list(
+        Reading.objects.filter(station=station, timestamp__lte=_local(2024, 2, 1))
+        .order_by('timestamp').values_list('id', 'timestamp', *ARCHIVE_FIELDS)
+    )
+    coarse = ReadingRollup.objects.exclude(resolution='minute').count()
+    recent_minutes = ReadingRollup.objects.filter(resolution='minute', bucket__gte=_local(2025, 1, 1)).count()
+    old_minutes = ReadingRollup.objects.filter(resolution='minute', bucket__lt=_local(2025, 1, 1)).count()
+    assert recent_minutes and old_minutes
+
+    summary = archive_now(older_than_days=30)
+
+    assert summary['rows'] == 65
+    assert summary['months'] == 3  # station：2024-01、2024-02；station_b：2024-02
+    assert summary['minute_rollups'] == old_minutes
+    assert Reading.objects.count() == 3
+    assert ReadingRollup.objects.exclude(resolution='minute').count() == coarse
+    assert ReadingRollup.objects.filter(resolution='minute').count() == recent_minutes
+    assert StationLatest.objects.get(station=station).timestamp == recent[-1].timestamp
+
+    january = ReadingArchive.objects.get(station=station, month=datetime(2024, 1, 1).date())
+    assert january.rows == len(expected) - 1  # 2/1 00:00 屬於二月
+    assert (archive_root / january.path).exists()
+    rows = [
+        row
+        for chunk in archive.iter_archived_rows(ARCHIVE_FIELDS, station_ids=[station.id], end=_local(2024, 2, 1))
+        for row in chunk
+    ]
+    assert [(pk, timestamp, *values) for pk, _, timestamp, *values in rows] == expected
+
+    # 重建彙總不會清除已封存月份的彙總
+    backfill_rollups()
+    assert ReadingRollup.objects.count() == coarse + recent_minutes
+    assert archive_now(older_than_days=30)['rows'] == 0
+
+
+def test_late_readings_merge_into_existing_archive(station, archive_now):
+    """測試封存後補寫的舊數據再次封存時與既有檔案合併"""
+    bulk_insert_readings(_readings(station, 4, _local(2024, 3, 1)))
+    archive_now(older_than_days=30)
+    late = Reading.objects.create(station=station, timestamp=_local(2024, 3, 1, 1) + timedelta(minutes=30),
+                                  temperature=Decimal('25.55'))
+
+    assert archive_now(older_than_days=30)['rows'] == 1
+    entry = ReadingArchive.objects.get(station=station)
+    assert entry.rows == 5
+    with archive.open_archive(entry) as reader:
+        columns = reader.read(['id', 'timestamp', 'temperature'])
+    assert columns['id'][2] == late.pk
+    assert np.all(np.diff(columns['timestamp']) > 0)
+    assert to_micros(late.timestamp) == columns['timestamp'][2]
+
+
+def test_chart_and_export_read_archived_ranges(authenticated_client, station, archive_now):
+    """測試圖表與匯出透明地包含已封存的數據"""
+    bulk_insert_readings(_readings(station, 6, _local(2024, 4, 1)))
+    archive_now(older_than_days=30)
+    Reading.objects.create(station=station, timestamp=timezone.now(), temperature=Decimal('30.00'))
+
+    chart, sampling = build_chart_data(station)
+    assert sampling['total'] == 7
+    assert chart['temperature'] == [20.0, 20.01, 20.02, 20.03, 20.04, 20.05, 30.0]
+    assert chart['ph'][:2] == [None, 8.1]
+
+    response = authenticated_client.get(
+        '/stations/export/', {'format': 'csv', 'fields': 'temperature,salinity', 'temperature_min': '20.02'}
+    )
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert lines[0] == 'id,station_id,station_name,timestamp,temperature,salinity'
+    assert [line.split(',')[4] for line in lines[1:]] == ['20.02', '20.03', '20.04', '20.05', '30.00']
+    assert lines[1].split(',')[5] == '34.1234'
+
+
+def test_archive_deletes_only_archived_ids(station, archive_now, monkeypatch):
+    """測試封存期間提交、id 落在已封存範圍內的數據不會被刪除"""
+    bulk_insert_readings(_readings(station, 5, _local(2024, 5, 1)))
+    ids = sorted(Reading.objects.values_list('id', flat=True))
+    gap = Reading.objects.get(pk=ids[2])
+    Reading.objects.filter(pk=gap.pk).delete()
+    collect = archive._collect_columns
+
+    def collect_then_commit(readings, chunk_size):
+        columns = collect(readings, chunk_size)
+        Reading.objects.create(id=gap.pk, station=station, timestamp=gap.timestamp, temperature=gap.temperature)
+        return columns
+
+    monkeypatch.setattr(archive, '_collect_columns', collect_then_commit)
+    assert archive_now(older_than_days=30)['rows'] == 4
+    assert list(Reading.objects.values_list('id', flat=True)) == [gap.pk]
+
+
+def test_failed_archive_keeps_existing_file(station, archive_root, archive_now, monkeypatch):
+    """測試交易回復時既有封存檔與資料庫數據不變，暫存檔被移除"""
+    bulk_insert_readings(_readings(station, 4, _local(2024, 6, 1)))
+    archive_now(older_than_days=30)
+    entry = ReadingArchive.objects.get(station=station)
+    content = (archive_root / entry.path).read_bytes()
+    Reading.objects.create(station=station, timestamp=_local(2024, 6, 2), temperature=Decimal('21.00'))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('delete failed')
+
+    monkeypatch.setattr(archive, 'purge_queryset', fail)
+    with pytest.raises(RuntimeError):
+        archive_now(older_than_days=30)
+
+    assert (archive_root / entry.path).read_bytes() == content
+    assert ReadingArchive.objects.get(station=station).rows == 4
+    assert Reading.objects.count() == 1
+    assert [path.name for path in (archive_root / entry.path).parent.iterdir()] == [Path(entry.path).name]
+
+
+def test_chart_falls_back_to_rollups_when_archive_unreadable(authenticated_client, station, archive_root,
+                                                              archive_now):
+    """測試封存檔遺失或損毀時圖表改用該月份的小時彙總，而不是回傳 500"""
+    bulk_insert_readings(_readings(station, 6, _local(2024, 7, 1)) + _readings(station, 3, _local(2024, 8, 1)))
+    archive_now(older_than_days=30)
+    july, august = ReadingArchive.objects.order_by('month')
+    (archive_root / july.path).unlink()
+    (archive_root / august.path).write_bytes(b'garbage')
+
+    chart, sampling = build_chart_data(station)
+    assert sampling['total'] == 9
+    assert chart['temperature'] == [20.0, 20.01, 20.02, 20.03, 20.04, 20.05, 20.0, 20.01, 20.02]
+
+    response = authenticated_client.get(f'/stations/{station.id}/chart-data/', {'time_range': 'all'})
+    assert response.status_code == 200
+    assert response.json()['sampling']['total'] == 9
@@ -0,0 +1,79 @@
+"""
+data_ingestion.counters 與 station_data.stats 測試 - 數據筆數計數器
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from data_ingestion.archive import archive_readings
+from data_ingestion.counters import reconcile_reading_counts
+from data_ingestion.ingest import bulk_insert_readings
+from data_ingestion.models import Reading, ReadingCount
+from data_ingestion.purge import purge_readings
+from station_data.stats import annotate_reading_counts, reading_totals, station_reading_count
+
+
+def _readings(station, count, start, step=timedelta(hours=1)):
+    return [
+        Reading(station=station, timestamp=start + step * i, temperature=Decimal('20.00'))
+        for i in range(count)
+    ]
+
+
+def test_counts_follow_ingest_and_purge(station, station_b):
+    """測試寫入與大量刪除時計數器隨之增減"""
+    now = timezone.now()
+    bulk_insert_readings(_readings(station, 30, now - timedelta(days=20)) + _readings(station_b, 4, now - timedelta(hours=5)))
+    Reading.objects.create(station=station, timestamp=now, temperature=Decimal('21.00'))
+
+    assert station_reading_count(station.id) == 31
+    assert reading_totals() == {'total': 35, 'archived': 0, 'recent': 5}
+
+    purge_readings(station_ids=[station.id], before=now - timedelta(days=19, hours=12), chunk_size=7)
+    assert station_reading_count(station.id) == Reading.objects.filter(station=station).count()
+    assert reading_totals()['total'] == Reading.objects.count()
+
+    purge_readings()
+    assert not ReadingCount.objects.exists()
+
+
+def test_archived_readings_still_counted(station):
+    """測試封存後總筆數仍包含已封存的數據"""
+    bulk_insert_readings(_readings(station, 10, timezone.now() - timedelta(days=400)))
+    archive_readings(older_than_days=30)
+
+    assert Reading.objects.count() == 0
+    assert ReadingCount.objects.filter(count__gt=0).count() == 0
+    assert reading_totals() == {'total': 10, 'archived': 10, 'recent': 0}
+    assert annotate_reading_counts(type(station).objects.all()).get(pk=station.pk).reading_count == 10
+
+
+def test_reconcile_fixes_drift(station):
+    """測試單筆刪除（不經計數器）造成的差異由核對修正"""
+    bulk_insert_readings(_readings(station, 5, timezone.now() - timedelta(days=3)))
+    Reading.objects.filter(pk=Reading.objects.order_by('pk').first().pk).delete()
+    ReadingCount.objects.create(station=station, day=timezone.localdate() - timedelta(days=100), count=3)
+    assert station_reading_count(station.id) == 8
+
+    assert reconcile_reading_counts() == 2
+    assert station_reading_count(station.id) == 4
+    assert reconcile_reading_counts() == 0
+
+
+def test_station_list_does_not_count_readings(staff_authenticated_client, station):
+    """測試後台測站列表與儀表板不對 Reading 執行 COUNT"""
+    bulk_insert_readings(_readings(station, 3, timezone.now() - timedelta(hours=3)))
+
+    with CaptureQueriesContext(connection) as queries:
+        response = staff_authenticated_client.get(reverse('admin_panel:station_list'))
+        staff_authenticated_client.get(reverse('admin_panel:dashboard'))
+    assert response.context['stations'].get(pk=station.pk).reading_count == 3
+    reading_table = Reading._meta.db_table
+    assert not any(
+        'COUNT(' in query['sql'] and f'FROM "{reading_table}"' in query['sql']
+        for query in queries.captured_queries
+    )
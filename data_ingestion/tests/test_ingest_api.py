@@ -0,0 +1,192 @@
+"""
+批次匯入 API 測試 - 權杖驗證、三種格式、逐列拒絕
+"""
+import gzip
+from datetime import timedelta
+from decimal import Decimal
+
+import orjson
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from data_ingestion.models import IngestToken, Reading, ReadingRollup, Station
+from data_ingestion.schema import READING_SCHEMA, ParsedBatch
+
+
+@pytest.fixture
+def token(db):
+    return IngestToken.issue('測試記錄器')
+
+
+def post(client, body, content_type, key=None, **extra):
+    headers = {'HTTP_AUTHORIZATION': f'Token {key}'} if key else {}
+    return client.post(
+        reverse('data_ingestion:ingest_readings') + extra.pop('query', ''),
+        data=body, content_type=content_type, **headers, **extra,
+    )
+
+
+def test_csv_rows_are_validated_individually(client, station, token):
+    """測試 CSV：通過的列寫入（含彙總），未通過的列逐列回報原因"""
+    _, key = token
+    now = timezone.localtime().replace(microsecond=0) - timedelta(hours=1)
+    body = '\n'.join([
+        'station_id,timestamp,temperature,ph,oxygen',
+        f'{station.id},{now.isoformat()},25.123,8.1,',
+        f'{station.id},{(now + timedelta(minutes=1)).isoformat()},99,8.2,6.5',
+        f'9999,{now.isoformat()},25,8.1,6.5',
+        f'{station.id},yesterday,abc,8.1,6.5',
+        f'{station.id},{now.isoformat()},25',
+        f'{station.id},{(now + timedelta(days=1)).isoformat()},25,8.1,6.5',
+        f'{station.id},{int(now.timestamp()) + 120},26.5,,7',
+    ])
+
+    response = post(client, body, 'text/csv', key)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data['status'], data['accepted'], data['rejected']) == ('partial', 2, 5)
+    assert data['rejects'] == [
+        {'row': 2, 'errors': {'temperature': '超出範圍 -5 ~ 45'}},
+        {'row': 3, 'errors': {'station_id': '測站不存在'}},
+        {'row': 4, 'errors': {'timestamp': '格式錯誤', 'temperature': '格式錯誤'}},
+        {'row': 5, 'errors': {'__all__': '欄位數 3 與標題列 5 不符'}},
+        {'row': 6, 'errors': {'timestamp': '晚於現在時間'}},
+    ]
+    readings = list(Reading.objects.filter(station=station).order_by('timestamp'))
+    assert [(r.timestamp, r.temperature, r.ph, r.oxygen) for r in readings] == [
+        (now, Decimal('25.12'), Decimal('8.10'), None),
+        (now + timedelta(minutes=2), Decimal('26.50'), None, Decimal('7.000')),
+    ]
+    assert ReadingRollup.objects.get(station=station, resolution='day', field='temperature').count == 2
+    assert IngestToken.objects.get().last_used_at is not None
+
+
+def test_json_ndjson_and_gzip_payloads(client, station, station_b, token):
+    """測試 JSON 陣列、NDJSON（含無法解析的行）與 gzip 壓縮的請求"""
+    _, key = token
+    now = timezone.now() - timedelta(minutes=30)
+    rows = [
+        {'station_id': station.id, 'timestamp': now.isoformat(), 'temperature': 25.5, 'latitude': 22.6},
+        {'station_id': station_b.id, 'timestamp': now.isoformat(), 'salinity': '34.25'},
+        {'station_id': station.id, 'timestamp': now.isoformat(), 'temp': 25},
+        [station.id],
+    ]
+
+    response = post(client, orjson.dumps(rows), 'application/json', key)
+    data = response.json()
+    assert (data['accepted'], data['rejected']) == (2, 2)
+    assert data['rejects'] == [
+        {'row': 3, 'errors': {'temp': '未知欄位'}},
+        {'row': 4, 'errors': {'__all__': '不是 JSON 物件'}},
+    ]
+    assert Reading.objects.get(station=station_b).salinity == Decimal('34.25')
+
+    lines = b'\n'.join([orjson.dumps(rows[0]), b'{"station_id": ', b'', orjson.dumps(rows[1])])
+    response = post(
+        client, gzip.compress(lines), 'application/x-ndjson', key,
+        HTTP_CONTENT_ENCODING='gzip', query='?historical=1',
+    )
+    data = response.json()
+    assert (data['accepted'], data['rejects']) == (2, [{'row': 2, 'errors': {'__all__': 'JSON 格式錯誤'}}])
+    assert Reading.objects.count() == 4
+
+
+def test_authentication_and_station_scope(client, station, station_b):
+    """測試缺少、錯誤或停用的權杖回傳 401；限定測站的權杖不能寫入其他測站"""
+    body = orjson.dumps([
+        {'station_id': station.id, 'timestamp': timezone.now().isoformat(), 'ph': 8},
+        {'station_id': station_b.id, 'timestamp': timezone.now().isoformat(), 'ph': 8},
+    ])
+    scoped, key = IngestToken.issue('限定測站', station=station)
+
+    assert post(client, body, 'application/json').status_code == 401
+    assert post(client, body, 'application/json', 'wrong-key').status_code == 401
+    assert client.get(reverse('data_ingestion:ingest_readings'), HTTP_AUTHORIZATION=f'Token {key}').status_code == 405
+
+    data = post(client, body, 'application/json', key).json()
+    assert data['rejects'] == [{'row': 2, 'errors': {'station_id': '權杖不可寫入此測站'}}]
+    assert list(Reading.objects.values_list('station_id', flat=True)) == [station.id]
+
+    scoped.is_active = False
+    scoped.save()
+    assert post(client, body, 'application/json', key).status_code == 401
+
+
+def test_request_level_errors(client, station, token, settings):
+    """測試整個請求無法處理時的狀態碼（不寫入任何數據）"""
+    _, key = token
+    settings.INGEST_MAX_ROWS = 2
+    row = {'station_id': station.id, 'timestamp': timezone.now().isoformat()}
+
+    assert post(client, b'station_id,timestamp', 'text/plain', key).status_code == 415
+    assert post(client, b'{"station_id": 1}', 'application/json', key).status_code == 400
+    assert post(client, b'station_id,time\n1,2', 'text/csv', key).json()['message'] == '未知欄位: time'
+    assert post(client, orjson.dumps([row] * 3), 'application/json', key).status_code == 413
+    response = post(client, orjson.dumps([{'timestamp': 'x'}]), 'application/json', key)
+    assert response.status_code == 422
+    assert response.json()['rejects'] == [{'row': 1, 'errors': {'station_id': '必填', 'timestamp': '格式錯誤'}}]
+    assert not Reading.objects.exists()
+
+
+def test_body_size_limit_applies_only_to_ingest(client, station, token, settings):
+    """測試匯入 API 使用自己的大小上限（壓縮前後皆適用），不受也不放寬全站的上限"""
+    _, key = token
+    rows = [
+        {'station_id': station.id, 'timestamp': (timezone.now() - timedelta(minutes=i)).isoformat(), 'temperature': 25}
+        for i in range(1, 11)
+    ]
+    body = orjson.dumps(rows)
+    settings.DATA_UPLOAD_MAX_MEMORY_SIZE = 100
+    settings.INGEST_MAX_BODY_SIZE = len(body)
+
+    assert post(client, body, 'application/json', key).json()['accepted'] == 10
+    assert post(client, body + b' ', 'application/json', key).status_code == 413
+    compressed = gzip.compress(body + b' ' * 100)
+    assert len(compressed) < len(body)
+    response = post(client, compressed, 'application/json', key, HTTP_CONTENT_ENCODING='gzip')
+    assert (response.status_code, response.json()['message']) == (413, '解壓縮後的內容過大')
+
+
+def test_station_directory_reloads_for_new_stations(station):
+    """測試記憶體中的測站清單遇到未知 ID 時重新載入"""
+    timestamp = (timezone.now() - timedelta(minutes=1)).isoformat()
+    readings, rejects = READING_SCHEMA.validate(ParsedBatch([1], {'station_id': [station.id], 'timestamp': [timestamp]}))
+    assert len(readings) == 1 and not rejects
+
+    new_station = Station.objects.create(
+        station_name='新測站', device_model='CTD', location='外海', install_date=timezone.localdate(),
+    )
+    readings, rejects = READING_SCHEMA.validate(
+        ParsedBatch([1, 2], {'station_id': [str(new_station.id), '1.5'], 'timestamp': [timestamp, timestamp]})
+    )
+    assert [reading.station_id for reading in readings] == [new_station.id]
+    assert rejects == [{'row': 2, 'errors': {'station_id': '格式錯誤'}}]
+
+
+def test_rejects_booleans_nested_values_and_ancient_timestamps(client, station, token):
+    """測試 JSON 布林、陣列與早於下限的時間逐列拒絕，不會被轉成數值或造成 500"""
+    _, key = token
+    now = (timezone.now() - timedelta(minutes=5)).isoformat()
+    rows = [
+        {'station_id': True, 'timestamp': now},
+        {'station_id': station.id, 'timestamp': now, 'temperature': True},
+        {'station_id': station.id, 'timestamp': '0001-01-01T00:00:00'},
+        {'station_id': station.id, 'timestamp': now, 'ph': {'value': 8}},
+        {'station_id': station.id, 'timestamp': now, 'oxygen': 6.5},
+    ]
+
+    data = post(client, orjson.dumps(rows), 'application/json', key).json()
+    assert (data['accepted'], data['rejects']) == (1, [
+        {'row': 1, 'errors': {'station_id': '格式錯誤'}},
+        {'row': 2, 'errors': {'temperature': '格式錯誤'}},
+        {'row': 3, 'errors': {'timestamp': '早於可接受的時間'}},
+        {'row': 4, 'errors': {'ph': '格式錯誤'}},
+    ])
+
+    response = post(client, orjson.dumps([{'station_id': station.id, 'timestamp': now, 'temperature': [1, 2]}]),
+                    'application/json', key)
+    assert response.status_code == 422
+    assert response.json()['rejects'] == [{'row': 1, 'errors': {'temperature': '格式錯誤'}}]
+    assert list(Reading.objects.values_list('station_id', 'oxygen')) == [(station.id, Decimal('6.500'))]
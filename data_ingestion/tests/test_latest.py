@@ -0,0 +1,60 @@
+"""
+StationLatest 最新數據快照測試
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from data_ingestion.ingest import bulk_insert_readings
+from data_ingestion.latest import latest_readings, rebuild_station_latest
+from data_ingestion.models import Reading, StationLatest
+
+
+def test_snapshot_follows_newest_reading(station):
+    """測試寫入數據更新快照，補寫的舊數據不會覆蓋較新的快照"""
+    now = timezone.now()
+    newest = Reading.objects.create(station=station, timestamp=now, temperature=Decimal('25.50'))
+    bulk_insert_readings([
+        Reading(station=station, timestamp=now - timedelta(hours=1), temperature=Decimal('20.00')),
+    ])
+
+    latest = StationLatest.objects.get(station=station)
+    assert latest.reading_id == newest.id
+    assert latest.temperature == Decimal('25.50')
+
+
+def test_cold_start_uses_single_query_and_seeds_snapshot(station, station_b):
+    """測試快照為空時以單一視窗查詢取得各測站最新數據，並寫回快照"""
+    now = timezone.now()
+    Reading.objects.create(station=station, timestamp=now - timedelta(minutes=5), temperature=Decimal('20.00'))
+    Reading.objects.create(station=station, timestamp=now, temperature=Decimal('21.00'))
+    Reading.objects.create(station=station_b, timestamp=now, ph=Decimal('8.10'))
+    StationLatest.objects.all().delete()
+
+    with CaptureQueriesContext(connection) as queries:
+        rows = latest_readings()
+    selects = [query for query in queries.captured_queries if query['sql'].lstrip().upper().startswith('SELECT')]
+    assert len(selects) == 2  # 快照（空）+ 視窗查詢
+
+    assert [(reading.station_id, name) for reading, name in rows] == [
+        (station.id, station.station_name), (station_b.id, station_b.station_name),
+    ]
+    assert rows[0][0].temperature == Decimal('21.00')
+    assert StationLatest.objects.count() == 2
+
+    with CaptureQueriesContext(connection) as queries:
+        assert [reading.pk for reading, _ in latest_readings()] == [reading.pk for reading, _ in rows]
+    assert len(queries) == 1
+
+
+def test_rebuild_after_delete(station):
+    """測試刪除數據後重建快照"""
+    now = timezone.now()
+    older = Reading.objects.create(station=station, timestamp=now - timedelta(hours=1), temperature=Decimal('19.00'))
+    Reading.objects.filter(pk=Reading.objects.create(station=station, timestamp=now).pk).delete()
+
+    assert rebuild_station_latest() == 1
+    assert StationLatest.objects.get(station=station).reading_id == older.id
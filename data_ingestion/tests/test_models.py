@@ -188,3 +188,22 @@ def test_reading_decimal_precision(db, station):
     assert reading.temperature == Decimal('25.55')
     assert reading.salinity == Decimal('35.1234')
     assert reading.pressure == Decimal('10.123')
+
+
+# ==========================================
+# 索引測試
+# ==========================================
+
+def test_reading_station_timestamp_query_uses_composite_index(db, station):
+    """測試依測站篩選並按時間倒序的查詢會使用 (station, -timestamp) 複合索引"""
+    plan = Reading.objects.filter(station=station).order_by('-timestamp')[:50].explain()
+
+    assert 'reading_station_ts_idx' in plan
+
+
+def test_reading_timestamp_range_query_uses_timestamp_index(db):
+    """測試跨測站的時間範圍查詢會使用 timestamp 索引"""
+    since = timezone.now() - timedelta(hours=24)
+    plan = Reading.objects.filter(timestamp__gte=since).explain()
+
+    assert 'reading_timestamp_idx' in plan
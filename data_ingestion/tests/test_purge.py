@@ -0,0 +1,91 @@
+"""
+data_ingestion.purge 測試 - 依主鍵分批刪除
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from data_ingestion.ingest import bulk_insert_readings
+from data_ingestion.models import Reading, ReadingRollup, Station, StationLatest
+from data_ingestion.purge import can_fast_delete, purge_queryset, purge_readings
+from station_data.caching import data_version
+from station_data.models import Report
+
+
+def _readings(station, count, start):
+    return [
+        Reading(station=station, timestamp=start + timedelta(minutes=i), temperature=Decimal('20.00') + i)
+        for i in range(count)
+    ]
+
+
+def test_purge_in_pk_chunks_with_progress(station, station_b, django_capture_on_commit_callbacks):
+    """測試依測站與時間分批刪除，回報進度並重建彙總與最新快照"""
+    start = timezone.now() - timedelta(days=2)
+    bulk_insert_readings(_readings(station, 25, start) + _readings(station_b, 5, start))
+    keep = Reading.objects.create(station=station, timestamp=timezone.now(), temperature=Decimal('30.00'))
+    version = data_version(station.id)
+
+    progress = []
+    deleted = purge_readings(
+        station_ids=[station.id], before=start + timedelta(days=1), chunk_size=10,
+        progress=lambda done, total: progress.append((done, total)),
+    )
+
+    assert deleted == 25
+    assert progress == [(10, 25), (20, 25), (25, 25)]
+    assert list(Reading.objects.filter(station=station).values_list('pk', flat=True)) == [keep.pk]
+    assert Reading.objects.filter(station=station_b).count() == 5
+    assert StationLatest.objects.get(station=station).reading_id == keep.pk
+    assert ReadingRollup.objects.get(station=station, resolution='day', field='temperature').count == 1
+    assert data_version(station.id) > version
+
+
+def test_purge_uses_raw_delete_without_select(station):
+    """測試可快速刪除時每批直接 DELETE，不先載入物件"""
+    bulk_insert_readings(_readings(station, 10, timezone.now()))
+    readings = Reading.objects.filter(station=station)
+    assert can_fast_delete(readings)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert purge_queryset(readings, chunk_size=4) == 10
+    deletes = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('DELETE')]
+    assert len(deletes) == 3
+    # 只查詢主鍵邊界，不載入數據欄位
+    assert not any('"temperature"' in query['sql'] for query in queries.captured_queries)
+
+
+def test_purge_all_readings_truncates(station):
+    """測試刪除全部數據時清空資料表、彙總與快照"""
+    bulk_insert_readings(_readings(station, 10, timezone.now()))
+
+    with CaptureQueriesContext(connection) as queries:
+        assert purge_readings() == 10
+    assert any(query['sql'].startswith(('TRUNCATE', 'DELETE FROM "data_ingestion_reading"'))
+               for query in queries.captured_queries)
+    assert not Reading.objects.exists()
+    assert not ReadingRollup.objects.exists()
+    assert not StationLatest.objects.exists()
+
+
+def test_purge_cascading_model_uses_collector(multiple_stations):
+    """測試有串聯刪除的模型每批仍走 QuerySet.delete()"""
+    stations = Station.objects.all()
+    assert not can_fast_delete(stations)
+    assert purge_queryset(stations, chunk_size=2) == len(multiple_stations)
+    assert not Station.objects.exists()
+
+
+def test_report_delete_all_returns_task_id(authenticated_client, db):
+    """測試刪除全部報告交給背景任務並回傳 task_id"""
+    Report.objects.bulk_create([Report(report_type='custom', title=str(i)) for i in range(3)])
+
+    response = authenticated_client.post(reverse('station_data:report_delete_all'))
+
+    assert response.status_code == 202
+    assert response.json()['task_id']
+    assert not Report.objects.exists()
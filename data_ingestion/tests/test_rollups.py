@@ -0,0 +1,151 @@
+"""
+ReadingRollup 彙總測試 - 增量更新與重建
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.core.management import call_command
+
+from data_ingestion.ingest import bulk_insert_readings
+from data_ingestion.models import Reading, ReadingRollup
+from data_ingestion.rollups import (
+    backfill_rollups, bucket_start, choose_resolution, coarsest_resolution, estimate_reading_count, merge_rollups,
+    summarize_rollups,
+)
+
+TAIPEI = ZoneInfo('Asia/Taipei')
+
+
+def make_reading(station, timestamp, temperature, ph=None):
+    return Reading(
+        station=station,
+        timestamp=timestamp,
+        temperature=Decimal(str(temperature)),
+        ph=Decimal(str(ph)) if ph is not None else None,
+    )
+
+
+def rollup_rows():
+    return sorted(
+        ReadingRollup.objects.values_list('station_id', 'resolution', 'field', 'bucket', 'count', 'sum', 'min', 'max')
+    )
+
+
+def test_day_bucket_uses_local_time():
+    """測試日彙總依當地日界切分"""
+    timestamp = datetime(2025, 12, 14, 23, 30, tzinfo=ZoneInfo('UTC'))
+    assert bucket_start(timestamp, 'day') == datetime(2025, 12, 15, tzinfo=TAIPEI)
+    assert bucket_start(timestamp, 'hour') == datetime(2025, 12, 15, 7, tzinfo=TAIPEI)
+
+
+def test_single_create_updates_all_resolutions(station):
+    """測試單筆寫入會更新三種解析度的彙總（NULL 參數不建立）"""
+    Reading.objects.create(
+        station=station,
+        timestamp=datetime(2025, 12, 14, 10, 5, 30, tzinfo=TAIPEI),
+        temperature=Decimal('25.50'),
+    )
+
+    rollups = ReadingRollup.objects.filter(station=station)
+    assert rollups.count() == 3
+    assert set(rollups.values_list('field', flat=True)) == {'temperature'}
+    minute = rollups.get(resolution='minute')
+    assert minute.bucket == datetime(2025, 12, 14, 10, 5, tzinfo=TAIPEI)
+    assert minute.count == 1
+    assert minute.avg == pytest.approx(25.5)
+
+
+def test_batches_accumulate_into_existing_buckets(station):
+    """測試不同批次寫入同一區間時累加 count/sum 並更新 min/max"""
+    base = datetime(2025, 12, 14, 10, 0, tzinfo=TAIPEI)
+    bulk_insert_readings([make_reading(station, base, 20.0), make_reading(station, base + timedelta(minutes=1), 22.0)])
+    bulk_insert_readings([make_reading(station, base + timedelta(minutes=30), 18.0)])
+
+    hour = ReadingRollup.objects.get(station=station, resolution='hour', field='temperature')
+    assert hour.count == 3
+    assert hour.sum == pytest.approx(60.0)
+    assert hour.sum_sq == pytest.approx(400 + 484 + 324)
+    assert (hour.min, hour.max) == (18.0, 22.0)
+    assert ReadingRollup.objects.filter(station=station, resolution='minute', field='temperature').count() == 3
+
+
+def test_backfill_matches_incremental(station, station_b):
+    """測試重建結果與增量更新一致"""
+    base = datetime(2025, 12, 14, 22, 0, tzinfo=TAIPEI)
+    readings = [
+        make_reading(station if i % 2 else station_b, base + timedelta(minutes=17 * i), 20 + i * 0.5, ph=8.1)
+        for i in range(12)
+    ]
+    bulk_insert_readings(readings)
+    incremental = rollup_rows()
+
+    ReadingRollup.objects.all().delete()
+    written = backfill_rollups()
+
+    assert sum(written.values()) == len(incremental)
+    backfilled = rollup_rows()
+    for expected, actual in zip(incremental, backfilled):
+        assert expected[:5] == actual[:5]
+        assert expected[5:] == pytest.approx(actual[5:])
+
+
+def test_backfill_command_limits_range(station):
+    """測試指令只重建指定範圍（對齊到日界）"""
+    day1 = datetime(2025, 12, 14, 12, 0, tzinfo=TAIPEI)
+    day2 = day1 + timedelta(days=1)
+    bulk_insert_readings([make_reading(station, day1, 20.0), make_reading(station, day2, 30.0)], notify=False)
+
+    out = StringIO()
+    call_command('backfill_rollups', '--since', '2025-12-15', '--resolution', 'day', stdout=out)
+
+    day_rollups = ReadingRollup.objects.filter(resolution='day')
+    assert list(day_rollups.values_list('bucket', flat=True)) == [datetime(2025, 12, 15, tzinfo=TAIPEI)]
+    assert not ReadingRollup.objects.exclude(resolution='day').exists()
+    assert '共寫入 1 筆彙總' in out.getvalue()
+
+
+def test_summarize_rollups_merges_buckets(station):
+    """測試跨日合併平均值、極值與標準差"""
+    base = datetime(2025, 12, 14, 12, 0, tzinfo=TAIPEI)
+    bulk_insert_readings([make_reading(station, base + timedelta(days=i), value) for i, value in enumerate([2, 4, 6])])
+
+    summary = summarize_rollups('day', station_id=station.id, fields=['temperature', 'ph'])
+
+    assert summary['temperature']['count'] == 3
+    assert summary['temperature']['avg'] == pytest.approx(4.0)
+    assert summary['temperature']['std'] == pytest.approx((8 / 3) ** 0.5)
+    assert (summary['temperature']['min'], summary['temperature']['max']) == (2.0, 6.0)
+    assert summary['ph'] == merge_rollups([])
+
+
+def test_choose_resolution():
+    """測試依時間範圍選擇彙總解析度"""
+    end = datetime(2025, 12, 21, tzinfo=TAIPEI)
+    assert choose_resolution(end - timedelta(hours=6), end) == 'minute'
+    assert choose_resolution(end - timedelta(days=30), end) == 'hour'
+    assert choose_resolution(end - timedelta(days=365), end) == 'day'
+
+
+def test_coarsest_resolution():
+    """測試選擇至少有指定區間數的最粗解析度"""
+    end = datetime(2025, 12, 21, tzinfo=TAIPEI)
+    assert coarsest_resolution(end - timedelta(days=21), end, min_buckets=500) == 'hour'
+    assert coarsest_resolution(end - timedelta(days=730), end, min_buckets=500) == 'day'
+    assert coarsest_resolution(end - timedelta(hours=6), end, min_buckets=500) == 'minute'
+
+
+def test_estimate_reading_count(station):
+    """測試由日彙總估計筆數（各參數取最大的 count）"""
+    start = datetime(2025, 12, 20, 10, tzinfo=TAIPEI)
+    bulk_insert_readings([
+        make_reading(station, start + timedelta(hours=i), 20 + i, ph=8.1 if i % 2 else None) for i in range(30)
+    ])
+
+    assert estimate_reading_count(station.id) == (30, datetime(2025, 12, 20, tzinfo=TAIPEI))
+    assert estimate_reading_count(station.id, start=datetime(2025, 12, 21, 12, tzinfo=TAIPEI)) == (
+        16, datetime(2025, 12, 21, tzinfo=TAIPEI),
+    )
+    assert estimate_reading_count(station.id + 1) == (0, None)
@@ -0,0 +1,144 @@
+"""
+ReadingSketch 分位數摘要測試 - t-digest 精度、增量更新、重建與範圍查詢
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from data_ingestion.ingest import bulk_insert_readings
+from data_ingestion.models import Reading, ReadingSketch
+from data_ingestion.rollups import backfill_rollups
+from data_ingestion.sketches import TDigest, range_percentiles
+from station_data.tasks import generate_daily_statistics
+
+TAIPEI = ZoneInfo('Asia/Taipei')
+
+
+def make_readings(station, start, temperatures, step=timedelta(minutes=10)):
+    return [
+        Reading(station=station, timestamp=start + step * index, temperature=Decimal(f'{value:.2f}'))
+        for index, value in enumerate(temperatures)
+    ]
+
+
+def sketch_rows():
+    return sorted(
+        (station_id, resolution, field, bucket, count, TDigest.from_bytes(digest).percentiles())
+        for station_id, resolution, field, bucket, count, digest in ReadingSketch.objects.values_list(
+            'station_id', 'resolution', 'field', 'bucket', 'count', 'digest'
+        )
+    )
+
+
+def test_tdigest_merge_matches_exact_percentiles():
+    """測試分批建立再合併的摘要與精確百分位數接近，序列化後不變"""
+    rng = np.random.default_rng(0)
+    values = np.concatenate([rng.normal(25, 2, 50_000), rng.exponential(3, 20_000)])
+    parts = np.array_split(rng.permutation(values), 40)
+
+    digest = TDigest.merge_all(TDigest.from_bytes(TDigest.from_values(part).to_bytes()) for part in parts)
+
+    assert digest.count == len(values)
+    assert len(digest.means) <= digest.compression
+    exact = np.percentile(values, [5, 50, 95])
+    assert digest.percentiles([5, 50, 95]) == pytest.approx(exact, abs=0.05)
+    assert digest.percentiles([0, 100]) == [values.min(), values.max()]
+    assert TDigest().percentiles([50]) == [None]
+
+
+def test_ingest_merges_batches_into_hour_and_day_sketches(station):
+    """測試寫入更新小時與日摘要，跨批次合併；NULL 參數不建立摘要"""
+    start = datetime(2025, 12, 14, 10, 0, tzinfo=TAIPEI)
+    bulk_insert_readings(make_readings(station, start, [20, 21, 22]))
+    bulk_insert_readings(make_readings(station, start + timedelta(minutes=30), [23, 24]))
+
+    sketches = ReadingSketch.objects.filter(station=station)
+    assert set(sketches.values_list('resolution', 'field')) == {('hour', 'temperature'), ('day', 'temperature')}
+    day = TDigest.from_bytes(sketches.get(resolution='day').digest)
+    assert day.count == 5
+    assert day.percentiles([0, 50, 100]) == [20.0, 22.0, 24.0]
+    assert sketches.get(resolution='hour').bucket == start
+
+
+def test_new_sketches_are_inserted_before_locking(station):
+    """測試先建立缺少的摘要列再鎖定合併：並行寫入者留下的空列或摘要都會被合併而非覆蓋"""
+    start = datetime(2025, 12, 14, 10, 0, tzinfo=TAIPEI)
+    hour = start.astimezone(dt_timezone.utc)
+    ReadingSketch.objects.create(
+        station=station, resolution='hour', field='temperature', bucket=hour, count=0, digest=b'',
+    )
+    table = connection.ops.quote_name(ReadingSketch._meta.db_table)
+
+    with CaptureQueriesContext(connection) as queries:
+        bulk_insert_readings(make_readings(station, start, [20, 21, 22]))
+    statements = [query['sql'].split()[0].upper() for query in queries if table in query['sql']]
+    assert statements[:2] == ['INSERT', 'SELECT']
+
+    # 模擬另一個行程在本批之前提交的摘要：下一批會鎖定並合併
+    bulk_insert_readings(make_readings(station, start + timedelta(minutes=30), [23]))
+    digest = TDigest.from_bytes(ReadingSketch.objects.get(station=station, resolution='hour').digest)
+    assert digest.count == 4
+    assert digest.percentiles([0, 100]) == [20.0, 23.0]
+    assert not ReadingSketch.objects.filter(count=0).exists()
+
+
+def test_backfill_rebuilds_same_sketches(station, station_b):
+    """測試重建的摘要與增量更新的結果相同（跨測站、跨日）"""
+    start = datetime(2025, 12, 14, 22, 0, tzinfo=TAIPEI)
+    rng = np.random.default_rng(1)
+    for target in (station, station_b):
+        values = rng.normal(25, 1, 48)
+        bulk_insert_readings(make_readings(target, start, values[:20]))
+        bulk_insert_readings(make_readings(target, start + timedelta(minutes=200), values[20:]))
+    expected = sketch_rows()
+
+    backfill_rollups(chunk_size=7)
+
+    rebuilt = sketch_rows()
+    assert [row[:5] for row in rebuilt] == [row[:5] for row in expected]
+    for (*_, rebuilt_percentiles), (*_, expected_percentiles) in zip(rebuilt, expected):
+        assert rebuilt_percentiles == pytest.approx(expected_percentiles, abs=0.01)
+
+
+def test_range_percentiles_combine_day_and_hour_sketches(station, station_b):
+    """測試任意範圍：完整的日子用日摘要，頭尾用小時摘要，可指定測站"""
+    start = datetime(2025, 12, 13, 0, 0, tzinfo=TAIPEI)
+    # 三天每小時一筆，數值 = 小時序號
+    bulk_insert_readings(make_readings(station, start, range(72), step=timedelta(hours=1)))
+    bulk_insert_readings(make_readings(station_b, start, [100] * 72, step=timedelta(hours=1)))
+
+    range_start, range_end = start + timedelta(hours=18), start + timedelta(hours=54)
+    result = range_percentiles([station.id], range_start, range_end, fields=['temperature'], percents=(0, 50, 100))
+    assert result['temperature'] == {'count': 36, 'p0': 18.0, 'p50': pytest.approx(35.5, abs=0.5), 'p100': 53.0}
+
+    both = range_percentiles(None, range_start, range_end)
+    assert both['temperature']['count'] == 72
+    assert both['temperature']['p95'] == 100.0
+    assert both['oxygen'] == {'count': 0, 'p5': None, 'p50': None, 'p95': None}
+    # 同一天之內只用小時摘要
+    within_day = range_percentiles([station.id], start + timedelta(hours=2), start + timedelta(hours=5))
+    assert within_day['temperature']['count'] == 3
+
+
+def test_report_and_chart_include_percentiles(station, authenticated_client):
+    """測試日報與圖表 API 輸出百分位數"""
+    # 放在今天之內（日報只統計今天）
+    today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = max(today_start, timezone.now() - timedelta(minutes=10))
+    readings = make_readings(station, start, [20, 22, 24, 26, 28], step=timedelta(minutes=1))
+    bulk_insert_readings(readings)
+
+    result = generate_daily_statistics()
+    assert result['percentiles']['temperature']['count'] == 5
+
+    response = authenticated_client.get(reverse('station_data:get_chart_data_ajax', args=[station.id]))
+    percentiles = response.json()['percentiles']['temperature']
+    assert percentiles['count'] == 5
+    assert percentiles['p50'] == pytest.approx(24.0)
@@ -0,0 +1,188 @@
+"""
+socket 匯入測試 - 行協定解析、批次寫入、背壓與模擬記錄器
+"""
+import asyncio
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from data_ingestion.models import Reading
+from data_ingestion.signals import readings_ingested
+from data_ingestion.socket_ingest import IngestServer, IngestStats, LineParser, ReadingBatcher, write_rows
+
+
+def test_line_parser_handles_both_formats_and_partial_lines():
+    """測試行協定與 CSV、跨段的不完整行、標題行與無法解析的行"""
+    parser = LineParser(['station_id', 'timestamp', 'temperature'])
+
+    rows, errors = parser.feed(b'1 1700000000 temperature=25.1,ph=8.1\n1,17000000')
+    assert rows == [{'station_id': '1', 'timestamp': '1700000000', 'temperature': '25.1', 'ph': '8.1'}]
+    assert errors == 0
+
+    rows, errors = parser.feed(b'01,26.5\r\n# station_id,timestamp,oxygen\n2,1700000002,6.5\nbroken\n2 ts ph\n')
+    assert rows == [
+        {'station_id': '1', 'timestamp': '1700000001', 'temperature': '26.5'},
+        {'station_id': '2', 'timestamp': '1700000002', 'oxygen': '6.5'},
+    ]
+    assert errors == 2
+
+    rows, errors = parser.feed(b'3 2025-12-14T10:00:00+08:00', final=True)
+    assert rows == [{'station_id': '3', 'timestamp': '2025-12-14T10:00:00+08:00'}]
+    assert parser.feed(b'# station_id,time\n')[1] == 1
+
+
+def test_server_batches_tcp_and_udp_records(station, station_b):
+    """測試 TCP 與 UDP 的紀錄依批次大小寫入，驗證未通過的紀錄計入拒絕"""
+    stats = IngestStats()
+    now = int((timezone.now() - timedelta(minutes=10)).timestamp())
+    tcp_lines = [
+        f'{station.id} {now} temperature=25.123,oxygen=6.5\n',
+        f'{station.id} {now + 1} temperature=99\n',
+        f'# station_id,timestamp,ph\n{station.id},{now + 2},8.12\n',
+        f'9999,{now + 3},8.0\nnot a record\n',
+    ]
+
+    async def scenario():
+        batcher = ReadingBatcher(stats, batch_size=2, flush_interval=0.05, max_pending=10)
+        server = IngestServer(batcher, host='127.0.0.1', tcp_port=0, udp_port=0)
+        await server.start()
+
+        _, writer = await asyncio.open_connection(*server.tcp_address)
+        for line in tcp_lines:
+            writer.write(line.encode())
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=server.udp_address,
+        )
+        transport.sendto(f'{station_b.id} {now} salinity=34.5\n{station_b.id} {now + 1} salinity=34.6'.encode())
+        transport.close()
+
+        while stats.processed < 7:
+            await asyncio.sleep(0.01)
+        await server.stop()
+
+    async_to_sync(scenario)()
+
+    assert (stats.readings_accepted, stats.readings_rejected, stats.parse_errors) == (4, 2, 1)
+    assert stats.batches >= 3
+    assert stats.pending == 0 and stats.connections == 0
+    readings = Reading.objects.order_by('station_id', 'timestamp')
+    assert [(r.station_id, r.temperature, r.ph, r.salinity) for r in readings] == [
+        (station.id, Decimal('25.12'), None, None),
+        (station.id, None, Decimal('8.12'), None),
+        (station_b.id, None, None, Decimal('34.5000')),
+        (station_b.id, None, None, Decimal('34.6000')),
+    ]
+
+
+def test_write_failure_only_fails_offending_rows(station, station_b):
+    """測試整批寫入失敗時拆批重試，只有無法寫入的紀錄計為失敗"""
+    now = int((timezone.now() - timedelta(hours=1)).timestamp())
+    rows = [{'station_id': str(station.id), 'timestamp': str(now + index), 'temperature': '25.00'} for index in range(50)]
+    rows.insert(20, {'station_id': str(station.id), 'timestamp': str(now - 1), 'temperature': '33.33'})
+    rows += [{'station_id': str(station_b.id), 'timestamp': str(now + index), 'oxygen': '6.5'} for index in range(5)]
+
+    def reject_poisoned(sender, readings, **kwargs):
+        if any(reading.temperature == Decimal('33.33') for reading in readings):
+            raise RuntimeError('寫入失敗')
+
+    readings_ingested.connect(reject_poisoned)
+    try:
+        assert write_rows(rows) == (55, 0, 1)
+    finally:
+        readings_ingested.disconnect(reject_poisoned)
+
+    assert Reading.objects.filter(station=station).count() == 50
+    assert Reading.objects.filter(station=station_b).count() == 5
+    assert not Reading.objects.filter(temperature=Decimal('33.33')).exists()
+
+
+def test_server_restricts_sources_and_stations(station, station_b):
+    """測試來源不在允許網段時拒絕連線與封包，限定測站時其他測站的紀錄計為拒絕"""
+    now = int((timezone.now() - timedelta(minutes=10)).timestamp())
+    payload = f'{station.id} {now} temperature=25.1\n{station_b.id} {now} temperature=25.2\n'.encode()
+
+    async def scenario(stats, allowed_sources, station_ids, done):
+        batcher = ReadingBatcher(stats, batch_size=10, flush_interval=0.05, station_ids=station_ids)
+        server = IngestServer(batcher, tcp_port=0, udp_port=0, allowed_sources=allowed_sources)
+        await server.start()
+
+        _, writer = await asyncio.open_connection(*server.tcp_address)
+        writer.write(payload)
+        writer.close()
+        await writer.wait_closed()
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            asyncio.DatagramProtocol, remote_addr=server.udp_address,
+        )
+        transport.sendto(payload)
+        transport.close()
+
+        while not done(stats):
+            await asyncio.sleep(0.01)
+        await server.stop()
+
+    refused = IngestStats()
+    async_to_sync(scenario)(refused, ['10.0.0.0/8'], None, lambda stats: stats.sources_refused == 2)
+    assert (refused.sources_refused, refused.records_received, refused.bytes_received) == (2, 0, 0)
+    assert not Reading.objects.exists()
+
+    restricted = IngestStats()
+    async_to_sync(scenario)(restricted, ['127.0.0.0/8', '::1/128'], [station.id], lambda stats: stats.processed == 4)
+    assert (restricted.sources_refused, restricted.readings_accepted, restricted.readings_rejected) == (0, 2, 2)
+    assert set(Reading.objects.values_list('station_id', flat=True)) == {station.id}
+
+
+def test_run_ingest_server_requires_allow_list_on_public_host(db):
+    """測試監聽非本機位址時必須指定允許的來源網段"""
+    with pytest.raises(CommandError, match='--allow'):
+        call_command('run_ingest_server', '--host', '0.0.0.0')
+    with pytest.raises(CommandError, match='--allow'):
+        call_command('run_ingest_server', '--host', '0.0.0.0', '--allow', 'not-a-network')
+
+
+def test_backpressure_pauses_until_flush(station):
+    """測試暫存達到上限時等待寫入完成，UDP 則直接丟棄"""
+    stats = IngestStats()
+    now = timezone.now().isoformat()
+
+    async def scenario():
+        batcher = ReadingBatcher(stats, batch_size=2, flush_interval=60, max_pending=2, write=False)
+        batcher.add([{'station_id': str(station.id), 'timestamp': now}] * 2)
+        assert not batcher.has_capacity()
+
+        waiter = asyncio.create_task(batcher.wait_for_capacity())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+
+        flusher = asyncio.create_task(batcher.run())
+        await asyncio.wait_for(waiter, 1)
+        batcher.close()
+        await flusher
+
+    async_to_sync(scenario)()
+
+    assert (stats.backpressure_waits, stats.readings_accepted, stats.pending) == (1, 2, 0)
+    assert not Reading.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fake_loggers_measure_end_to_end_throughput(station):
+    """測試模擬記錄器搭配內建伺服器送出並寫入全部紀錄"""
+    out = StringIO()
+    call_command(
+        'simulate_data_loggers', '--serve', '--loggers', '3', '--records', '40', '--chunk', '7',
+        '--format', 'csv', '--batch-size', '25', '--max-pending', '50', stdout=out,
+    )
+
+    assert Reading.objects.filter(station=station).count() == 120
+    output = out.getvalue()
+    assert '送出 120 筆（3 個記錄器）' in output
+    assert '通過 120，拒絕 0，無法解析 0' in output
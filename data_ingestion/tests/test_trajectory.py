@@ -0,0 +1,79 @@
+"""
+向量化軌跡產生器測試 - pytest 風格
+"""
+from datetime import datetime, timedelta
+from io import StringIO
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.core.management import call_command
+
+from data_ingestion.models import Reading
+from data_ingestion.trajectory import (
+    SEA_AREAS, build_timestamps, generate_station_series, reflect,
+)
+
+TAIPEI = ZoneInfo('Asia/Taipei')
+
+
+def test_reflect_keeps_values_in_range():
+    """測試超出範圍的值會鏡射回海域內"""
+    values = np.array([-0.5, 0.2, 1.3, 2.7, 4.1])
+    reflected = reflect(values, 0.0, 1.0)
+    assert np.all((reflected >= 0.0) & (reflected <= 1.0))
+    assert reflected[1] == 0.2
+    assert np.isclose(reflected[2], 0.7)
+
+
+def test_build_timestamps_includes_end():
+    """測試時間點包含結束時間"""
+    start = datetime(2025, 12, 14, tzinfo=TAIPEI)
+    timestamps = build_timestamps(start, start + timedelta(hours=1), timedelta(minutes=10))
+    assert len(timestamps) == 7
+    assert timestamps[-1] == start + timedelta(hours=1)
+
+
+def test_generate_station_series_shapes_and_bounds():
+    """測試產生的數據長度、海域範圍與下限"""
+    area = SEA_AREAS['chaojing']
+    start = datetime(2025, 12, 14, tzinfo=TAIPEI)
+    timestamps = build_timestamps(start, start + timedelta(days=2), timedelta(minutes=10))
+
+    series = generate_station_series(
+        25.14, 121.88, area, timestamps, rng=np.random.default_rng(1)
+    )
+
+    assert all(len(values) == len(timestamps) for values in series.values())
+    assert series['latitude'].min() >= area['lat_range'][0]
+    assert series['latitude'].max() <= area['lat_range'][1]
+    assert series['longitude'].min() >= area['lng_range'][0]
+    assert series['longitude'].max() <= area['lng_range'][1]
+    assert series['oxygen'].min() >= 4.0
+    assert np.array_equal(series['temperature'], np.round(series['temperature'], 2))
+
+
+def test_generate_station_series_is_reproducible_with_seed():
+    """測試相同種子產生相同數據"""
+    area = SEA_AREAS['bisha']
+    start = datetime(2025, 12, 14, tzinfo=TAIPEI)
+    timestamps = build_timestamps(start, start + timedelta(hours=3), timedelta(minutes=10))
+
+    first = generate_station_series(25.14, 121.86, area, timestamps, rng=np.random.default_rng(7))
+    second = generate_station_series(25.14, 121.86, area, timestamps, rng=np.random.default_rng(7))
+    assert all(np.array_equal(first[field], second[field]) for field in first)
+
+
+def test_generate_trajectory_data_command(station):
+    """測試指令依時間範圍寫入預期筆數"""
+    out = StringIO()
+    call_command(
+        'generate_trajectory_data',
+        '--start', '2025-12-14', '--end', '2025-12-14',
+        '--interval', '60', '--chunk-size', '10', '--seed', '1',
+        stdout=out,
+    )
+
+    assert Reading.objects.filter(station=station).count() == 24
+    station.refresh_from_db()
+    assert station.latitude is not None
+    assert '總共生成 24 筆數據' in out.getvalue()
@@ -0,0 +1,220 @@
+"""
+向量化軌跡與環境數據產生器（NumPy）
+
+取代逐筆 random.uniform + Reading.objects.create 的 while 迴圈：
+- GPS：整段時間的漂移以 cumsum 一次算出，超出海域範圍時以鏡射方式反彈
+- 洋流變化：每步 5% 機率擾動漂移方向，同樣以 cumsum 累積
+- 環境參數：日週期以整段時間的小時陣列一次計算
+
+產生的結果是每個欄位一個 NumPy 陣列，再由 iter_reading_chunks() /
+iter_copy_rows() 分段轉為 Reading 實例或 COPY 資料列寫入。
+
+本模組頂層不匯入 Django model，讓 --workers 的子行程可以先完成
+django.setup() 再載入寫入相關模組。
+"""
+import math
+
+import numpy as np
+
+# 三個海域範圍（generate_trajectory_data 與 setup_demo_stations 共用）
+SEA_AREAS = {
+    'chaojing': {  # 潮境公園外海
+        'name': '潮境公園外海',
+        'lat_range': (25.115, 25.170),
+        'lng_range': (121.833, 121.923)
+    },
+    'bisha': {  # 碧砂漁港外海
+        'name': '碧砂漁港外海',
+        'lat_range': (25.116693, 25.170747),
+        'lng_range': (121.817556, 121.907124)
+    },
+    'zhengbin': {  # 正濱漁港外海
+        'name': '正濱漁港外海',
+        'lat_range': (25.126682, 25.180736),
+        'lng_range': (121.801490, 121.891066)
+    }
+}
+
+# 欄位名稱與四捨五入位數（對應 Reading 的 decimal_places）
+FIELD_DECIMALS = {
+    'latitude': 6,
+    'longitude': 6,
+    'temperature': 2,
+    'salinity': 4,
+    'oxygen': 3,
+    'ph': 2,
+    'conductivity': 2,
+    'pressure': 3,
+    'fluorescence': 3,
+    'turbidity': 3,
+}
+
+
+def find_sea_area(latitude, longitude):
+    """回傳座標所在的海域；不在任何海域內時回傳 None"""
+    for area in SEA_AREAS.values():
+        lat_min, lat_max = area['lat_range']
+        lng_min, lng_max = area['lng_range']
+        if lat_min <= latitude <= lat_max and lng_min <= longitude <= lng_max:
+            return area
+    return None
+
+
+def build_timestamps(start, end, interval):
+    """start 到 end（含）之間每隔 interval 的時間點"""
+    steps = int((end - start) / interval) + 1
+    return [start + interval * i for i in range(steps)]
+
+
+def reflect(values, lower, upper):
+    """將超出 [lower, upper] 的值鏡射回範圍內（向量化的邊界反彈）"""
+    width = upper - lower
+    folded = np.mod(values - lower, 2 * width)
+    return lower + np.where(folded > width, 2 * width - folded, folded)
+
+
+def random_walk(rng, start, lower, upper, steps):
+    """
+    模擬洋流帶動儀器的漂移軌跡
+
+    主要漂移方向朝東北，每步加入隨機擾動，並有 5% 機率改變漂移方向
+    """
+    drift = rng.uniform(0.00005, 0.00015)
+    direction_changes = np.where(rng.random(steps) < 0.05, rng.uniform(-0.0001, 0.0001, steps), 0.0)
+    drift_series = drift + np.cumsum(direction_changes)
+    increments = drift_series + rng.uniform(-0.00005, 0.00005, steps)
+    return reflect(start + np.cumsum(increments), lower, upper)
+
+
+def diurnal_factors(timestamps):
+    """日週期係數 (0-1)：中午 = 1.0，午夜 = 0.0（依各時間點的當地小時）"""
+    hours = np.fromiter((ts.hour for ts in timestamps), dtype=np.float64, count=len(timestamps))
+    return (np.sin((hours - 6) * math.pi / 12) + 1) / 2
+
+
+def generate_station_series(start_lat, start_lng, sea_area, timestamps, rng=None, station_offset=0.0):
+    """
+    產生單一測站整段時間的數據
+
+    Args:
+        start_lat, start_lng: 起始座標
+        sea_area: SEA_AREAS 中的海域，限制漂移範圍
+        timestamps: 時間點列表（aware datetime）
+        rng: numpy.random.Generator（預設新建）
+        station_offset: 測站間的細微差異係數（0.0-0.9）
+
+    Returns:
+        {欄位名稱: NumPy 陣列}，已依 Reading 的小數位數四捨五入
+    """
+    rng = rng or np.random.default_rng()
+    steps = len(timestamps)
+    lat_min, lat_max = sea_area['lat_range']
+    lng_min, lng_max = sea_area['lng_range']
+    diurnal = diurnal_factors(timestamps)
+
+    series = {
+        'latitude': random_walk(rng, start_lat, lat_min, lat_max, steps),
+        'longitude': random_walk(rng, start_lng, lng_min, lng_max, steps),
+        'temperature': 25.0 + diurnal * 3.0 + rng.uniform(-0.5, 0.5, steps) + station_offset * 0.5,
+        'salinity': 33.5 + rng.uniform(-0.3, 0.3, steps) + station_offset * 0.2,
+        'oxygen': np.maximum(8.0 + (1 - diurnal) * 1.5 + rng.uniform(-0.3, 0.3, steps), 4.0),
+        'ph': 8.2 + rng.uniform(-0.2, 0.2, steps),
+        'conductivity': 54000.0 + rng.uniform(-300, 300, steps) + station_offset * 100,
+        'pressure': 0.6 + rng.uniform(-0.03, 0.03, steps),
+        'fluorescence': np.maximum(0.5 + diurnal * 0.8 + rng.uniform(-0.1, 0.1, steps), 0.0),
+        'turbidity': rng.uniform(3.0, 7.0, steps) + station_offset,
+    }
+    return {field: np.round(values, FIELD_DECIMALS[field]) for field, values in series.items()}
+
+
+def iter_reading_chunks(station_id, timestamps, series, chunk_size):
+    """將數據陣列分段轉為未存檔的 Reading 實例（供 bulk_create）"""
+    from .models import Reading
+
+    fields = list(series)
+    columns = [series[field].tolist() for field in fields]
+    for offset in range(0, len(timestamps), chunk_size):
+        yield [
+            Reading(
+                station_id=station_id,
+                timestamp=timestamps[i],
+                **{field: column[i] for field, column in zip(fields, columns)}
+            )
+            for i in range(offset, min(offset + chunk_size, len(timestamps)))
+        ]
+
+
+def iter_copy_rows(station_id, timestamps, series, value_columns):
+    """產生 COPY 資料列：(station_id, timestamp, *value_columns)"""
+    columns = [series[column].tolist() for column in value_columns]
+    for i, timestamp in enumerate(timestamps):
+        yield (station_id, timestamp.isoformat(), *(column[i] for column in columns))
+
+
+def write_station_trajectory(job):
+    """
+    產生並寫入單一測站的數據（可在 --workers 子行程中執行）
+
+    Args:
+        job: dict，包含 station_id、start_lat、start_lng、sea_area、timestamps、
+             method（'bulk' 或 'copy'）、chunk_size、seed、station_offset
+
+    Returns:
+        (station_id, 寫入筆數)
+    """
+    from .ingest import COPY_COLUMNS, bulk_insert_readings, copy_insert_rows
+
+    timestamps = job['timestamps']
+    series = generate_station_series(
+        job['start_lat'],
+        job['start_lng'],
+        job['sea_area'],
+        timestamps,
+        rng=np.random.default_rng(job.get('seed')),
+        station_offset=job.get('station_offset', 0.0),
+    )
+
+    if job.get('method') == 'copy':
+        count, _ = copy_insert_rows(
+            iter_copy_rows(job['station_id'], timestamps, series, COPY_COLUMNS[2:])
+        )
+        return job['station_id'], count
+
+    count = 0
+    for chunk in iter_reading_chunks(job['station_id'], timestamps, series, job['chunk_size']):
+        # 歷史回填：維護衍生資料但不做即時推播
+        created, _ = bulk_insert_readings(chunk, chunk_size=job['chunk_size'], live=False)
+        count += len(created)
+    return job['station_id'], count
+
+
+def init_worker():
+    """--workers 子行程初始化：確保 Django 已設定（spawn 模式需要）"""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def run_trajectory_jobs(jobs, workers=1):
+    """
+    依序或以多行程執行 write_station_trajectory
+
+    Yields:
+        (station_id, 寫入筆數)，依完成順序
+    """
+    if workers <= 1:
+        for job in jobs:
+            yield write_station_trajectory(job)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from django.db import connections
+
+    # 子行程各自建立連線，避免共用父行程的資料庫連線
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [executor.submit(write_station_trajectory, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'data_ingestion'
+
+urlpatterns = [
+    path('readings/', views.ingest_readings, name='ingest_readings'),
+]
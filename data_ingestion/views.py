@@ -0,0 +1,110 @@
+"""
+批次匯入 API
+
+POST /api/ingest/readings/
+    Authorization: Token <權杖>（或 Bearer）
+    Content-Type: application/json（陣列）、application/x-ndjson 或 text/csv
+    Content-Encoding: gzip（選用）
+    ?historical=1：歷史回填（不觸發即時推播、警報與異常偵測）
+
+每一列獨立驗證：通過的數據在同一個交易內寫入（PostgreSQL 使用 COPY），
+未通過的列連同原因列在回應的 rejects 中，不影響其他列。
+"""
+import zlib
+
+import orjson
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .ingest import bulk_insert_readings
+from .models import IngestToken
+from .schema import READING_SCHEMA, IngestError, parse_payload
+
+
+def _json_response(data, status=200):
+    return HttpResponse(orjson.dumps(data), content_type='application/json', status=status)
+
+
+def authenticate_token(request):
+    """由 Authorization 標頭取得啟用中的 IngestToken；無效時回傳 None"""
+    scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() not in ('token', 'bearer') or not key.strip():
+        return None
+    return IngestToken.objects.filter(key_hash=IngestToken.hash_key(key.strip()), is_active=True).first()
+
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def _read_limited(request, limit):
+    """以串流讀取請求內容，超過 limit 位元組時回傳 413（不經過 request.body 的全站上限）"""
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length > limit:
+        raise IngestError('請求內容過大', status=413)
+    chunks = []
+    size = 0
+    while True:
+        chunk = request.read(min(READ_CHUNK_SIZE, limit + 1 - size))
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > limit:
+            raise IngestError('請求內容過大', status=413)
+
+
+def _request_body(request):
+    """請求內容（解壓縮 gzip）；壓縮前後都受 INGEST_MAX_BODY_SIZE 限制"""
+    limit = settings.INGEST_MAX_BODY_SIZE
+    body = _read_limited(request, limit)
+    encoding = request.headers.get('Content-Encoding', '').lower()
+    if encoding in ('', 'identity'):
+        return body
+    if encoding != 'gzip':
+        raise IngestError(f'不支援的 Content-Encoding: {encoding}', status=415)
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = decompressor.decompress(body, limit)
+    except zlib.error:
+        raise IngestError('gzip 內容無法解壓縮')
+    if decompressor.unconsumed_tail:
+        raise IngestError('解壓縮後的內容過大', status=413)
+    return data
+
+
+@csrf_exempt
+@require_POST
+def ingest_readings(request):
+    token = authenticate_token(request)
+    if token is None:
+        response = _json_response({'status': 'error', 'message': '權杖無效或未提供'}, status=401)
+        response['WWW-Authenticate'] = 'Token'
+        return response
+
+    try:
+        batch = parse_payload(_request_body(request), request.content_type)
+        readings, rejects = READING_SCHEMA.validate(batch, station_id=token.station_id)
+    except IngestError as exc:
+        return _json_response({'status': 'error', 'message': str(exc)}, status=exc.status)
+
+    historical = request.GET.get('historical', '').lower() in ('1', 'true', 'yes')
+    created, elapsed = bulk_insert_readings(readings, live=not historical, use_copy=True)
+    IngestToken.objects.filter(pk=token.pk).update(last_used_at=timezone.now())
+
+    if rejects and not created:
+        status, http_status = 'rejected', 422
+    else:
+        status, http_status = ('partial' if rejects else 'success'), 200
+    return _json_response({
+        'status': status,
+        'accepted': len(created),
+        'rejected': len(rejects),
+        'rejects': rejects,
+        'write_ms': round(elapsed * 1000, 1),
+    }, status=http_status)
@@ -1,6 +1,6 @@
 # ocean_monitor\station_data\admin.py
 from django.contrib import admin
-from .models import Report
+from .models import AlertEvent, AlertRule, Report
 
 
 @admin.register(Report)
@@ -27,3 +27,26 @@ class ReportAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         # 報告應由系統自動生成，不允許手動添加
         return False
+
+
+@admin.register(AlertRule)
+class AlertRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'field', 'min_value', 'max_value', 'hysteresis', 'severity', 'station', 'enabled']
+    list_filter = ['field', 'severity', 'enabled']
+    list_editable = ['enabled']
+    search_fields = ['name']
+    raw_id_fields = ['station']
+
+
+@admin.register(AlertEvent)
+class AlertEventAdmin(admin.ModelAdmin):
+    list_display = ['triggered_at', 'station', 'rule', 'kind', 'trigger_value', 'peak_value', 'state', 'resolved_at']
+    list_filter = ['state', 'severity', 'kind']
+    search_fields = ['message']
+    date_hierarchy = 'triggered_at'
+    list_select_related = ['station', 'rule']
+    readonly_fields = [field.name for field in AlertEvent._meta.fields]
+
+    def has_add_permission(self, request):
+        # 警報事件由規則引擎產生
+        return False
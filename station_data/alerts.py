@@ -0,0 +1,368 @@
+"""
+即時警報規則引擎（於數據寫入時評估）
+
+AlertRule 編譯為記憶體中的評估器：每個測站對應一組 (參數, 下限, 上限, 遲滯)，
+每批寫入的數據（readings_ingested）只檢查該測站適用的規則，不查詢 Reading。
+
+- 觸發：數值低於下限或高於上限
+- 解除（遲滯）：回到 [下限 + hysteresis, 上限 - hysteresis] 內才解除，
+  數值在門檻附近來回時不會反覆觸發
+- 去重：同一規則、同一測站同時只有一個觸發中的事件（資料庫部分唯一約束，跨行程成立）；
+  觸發期間的後續超標數據只更新 peak_value
+- 事件於交易提交後推送到 channel layer（測站群組與 all_stations 群組，type: alert_event）
+
+規則或事件狀態異動時遞增快取中的規則版本號，各行程在下一批數據時重新編譯。
+"""
+import json
+import logging
+from dataclasses import dataclass
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .broadcast import ALL_STATIONS_GROUP, station_group_name
+from .models import AlertEvent, AlertRule
+
+logger = logging.getLogger(__name__)
+
+RULES_VERSION_KEY = 'alert_rules_version'
+
+FIELD_LABELS = dict(AlertRule.FIELD_CHOICES)
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    rule_id: int
+    name: str
+    field: str
+    min_value: float | None
+    max_value: float | None
+    hysteresis: float
+    severity: str
+
+    def breach(self, value):
+        """超出範圍時回傳 (類型, 門檻)，否則 None"""
+        if self.max_value is not None and value > self.max_value:
+            return 'high', self.max_value
+        if self.min_value is not None and value < self.min_value:
+            return 'low', self.min_value
+        return None
+
+    def cleared(self, value):
+        """是否已回到遲滯範圍內"""
+        return (
+            (self.max_value is None or value <= self.max_value - self.hysteresis)
+            and (self.min_value is None or value >= self.min_value + self.hysteresis)
+        )
+
+    def message(self, kind, value, threshold):
+        direction = '高於上限' if kind == 'high' else '低於下限'
+        return f'{self.name}：{FIELD_LABELS.get(self.field, self.field)} {value:g} {direction} {threshold:g}'
+
+
+@dataclass
+class ActiveAlert:
+    event_id: int
+    kind: str
+    peak_value: float
+
+
+class AlertEvaluator:
+    """
+    編譯後的規則與觸發中的事件
+
+    Args:
+        rules: 啟用的 AlertRule
+        active: {(rule_id, station_id): ActiveAlert}
+    """
+
+    def __init__(self, rules, active):
+        self.global_rules = []
+        self.station_rules = {}
+        for rule in rules:
+            compiled = CompiledRule(
+                rule.pk, rule.name, rule.field, rule.min_value, rule.max_value, rule.hysteresis or 0.0, rule.severity,
+            )
+            if rule.station_id is None:
+                self.global_rules.append(compiled)
+            else:
+                self.station_rules.setdefault(rule.station_id, []).append(compiled)
+        self.active = active
+        self._by_station = {}
+
+    def rules_for(self, station_id):
+        rules = self._by_station.get(station_id)
+        if rules is None:
+            rules = self._by_station[station_id] = (*self.station_rules.get(station_id, ()), *self.global_rules)
+        return rules
+
+    def _candidates(self, columns):
+        """
+        {測站: 需要逐筆評估的規則}：沒有觸發中的事件且本批數值都在範圍內的規則不會產生狀態變化，
+        以整批陣列先行排除
+        """
+        candidates = {}
+        for start, end in columns.bounds(columns.station_starts):
+            station_id = int(columns.station_ids[start])
+            rules = []
+            for rule in self.rules_for(station_id):
+                if (rule.rule_id, station_id) not in self.active:
+                    values = columns.values(rule.field)[start:end]
+                    if not (
+                        (rule.max_value is not None and (values > rule.max_value).any())
+                        or (rule.min_value is not None and (values < rule.min_value).any())
+                    ):
+                        continue
+                rules.append(rule)
+            if rules:
+                candidates[station_id] = rules
+        return candidates
+
+    def evaluate(self, readings, columns=None):
+        """
+        依時間順序評估一批數據（不修改 self.active）
+
+        Args:
+            columns: 同一批數據的 ReadingColumns（可省略），大批數據時先排除不會觸發的規則
+
+        Returns:
+            依發生順序的狀態變化：
+            - ('trigger', rule, reading, value, (類型, 門檻))
+            - ('peak', rule, reading, value)：觸發中的事件出現更極端的數值
+            - ('resolve', rule, reading, value)
+        """
+        rules_for = self.rules_for
+        if columns is not None:
+            candidates = self._candidates(columns)
+            readings = [reading for reading in readings if reading.station_id in candidates]
+            rules_for = candidates.__getitem__
+
+        actions = []
+        state = {}
+        for reading in sorted(readings, key=lambda reading: reading.timestamp):
+            for rule in rules_for(reading.station_id):
+                value = getattr(reading, rule.field)
+                if value is None:
+                    continue
+                value = float(value)
+                key = (rule.rule_id, reading.station_id)
+                active = state[key] if key in state else self.active.get(key)
+                breach = rule.breach(value)
+                if active is None:
+                    if breach:
+                        actions.append(('trigger', rule, reading, value, breach))
+                        state[key] = ActiveAlert(None, breach[0], value)
+                elif breach:
+                    if value > active.peak_value if active.kind == 'high' else value < active.peak_value:
+                        actions.append(('peak', rule, reading, value))
+                        state[key] = ActiveAlert(active.event_id, active.kind, value)
+                elif rule.cleared(value):
+                    actions.append(('resolve', rule, reading, value))
+                    state[key] = None
+        return actions
+
+
+# ==========================================
+# 編譯與快取
+# ==========================================
+
+_evaluator = None
+_evaluator_version = None
+
+
+def rules_version():
+    try:
+        version = cache.get(RULES_VERSION_KEY)
+        if version is None:
+            cache.add(RULES_VERSION_KEY, 1, timeout=None)
+            version = cache.get(RULES_VERSION_KEY)
+        return version
+    except Exception:
+        logger.exception('讀取警報規則版本失敗')
+        return None
+
+
+def bump_rules_version():
+    """規則或事件狀態異動後，讓各行程重新編譯"""
+    try:
+        try:
+            cache.incr(RULES_VERSION_KEY)
+        except ValueError:
+            cache.add(RULES_VERSION_KEY, 1, timeout=None)
+    except Exception:
+        logger.exception('更新警報規則版本失敗')
+
+
+def compile_evaluator():
+    rules = list(AlertRule.objects.filter(enabled=True))
+    active = {
+        (event['rule_id'], event['station_id']): ActiveAlert(event['pk'], event['kind'], event['peak_value'])
+        for event in AlertEvent.objects.filter(state='active', rule__enabled=True).values(
+            'pk', 'rule_id', 'station_id', 'kind', 'peak_value',
+        )
+    }
+    return AlertEvaluator(rules, active)
+
+
+def get_evaluator():
+    """目前的評估器；規則版本改變（或快取無法連線）時重新編譯"""
+    global _evaluator, _evaluator_version
+    version = rules_version()
+    if _evaluator is None or version is None or version != _evaluator_version:
+        _evaluator = compile_evaluator()
+        _evaluator_version = version
+    return _evaluator
+
+
+def reset_evaluator():
+    global _evaluator, _evaluator_version
+    _evaluator = None
+    _evaluator_version = None
+
+
+# ==========================================
+# 事件寫入與推播
+# ==========================================
+
+def build_alert_payload(event):
+    return {
+        'id': event.pk,
+        'rule_id': event.rule_id,
+        'station_id': event.station_id,
+        'field': event.field,
+        'severity': event.severity,
+        'state': event.state,
+        'kind': event.kind,
+        'threshold': event.threshold,
+        'value': event.resolved_value if event.state == 'resolved' else event.trigger_value,
+        'peak_value': event.peak_value,
+        'triggered_at': event.triggered_at.isoformat(),
+        'resolved_at': event.resolved_at.isoformat() if event.resolved_at else None,
+        'message': event.message,
+    }
+
+
+def build_alert_event(event):
+    return {
+        'type': 'alert_event',
+        'station_id': event.station_id,
+        'text': json.dumps({'type': 'alert', 'data': build_alert_payload(event)}),
+    }
+
+
+def publish_alerts(events):
+    """將警報事件送到測站群組與 all_stations 群組"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not events:
+        return
+
+    async def _send_all():
+        for event in events:
+            message = build_alert_event(event)
+            await channel_layer.group_send(station_group_name(event.station_id), message)
+            await channel_layer.group_send(ALL_STATIONS_GROUP, message)
+
+    try:
+        async_to_sync(_send_all)()
+    except Exception:
+        # 推播失敗不應影響數據寫入
+        logger.exception('警報推播失敗（%d 筆）', len(events))
+
+
+def _create_event(rule, reading, kind, value, threshold):
+    """新增觸發中的事件；其他行程已建立時回傳 None（由部分唯一約束去重）"""
+    try:
+        with transaction.atomic():
+            return AlertEvent.objects.create(
+                rule_id=rule.rule_id,
+                station_id=reading.station_id,
+                field=rule.field,
+                severity=rule.severity,
+                kind=kind,
+                threshold=threshold,
+                trigger_value=value,
+                peak_value=value,
+                reading_id=reading.pk,
+                triggered_at=reading.timestamp,
+                message=rule.message(kind, value, threshold)[:255],
+            )
+    except IntegrityError:
+        return None
+
+
+def _active_event(rule_id, station_id):
+    return AlertEvent.objects.filter(rule_id=rule_id, station_id=station_id, state='active').first()
+
+
+def process_readings(readings, columns=None):
+    """
+    評估新寫入的數據並寫入警報事件（readings_ingested 接收器呼叫）
+
+    Returns:
+        本批觸發與解除的 AlertEvent 列表
+    """
+    evaluator = get_evaluator()
+    actions = evaluator.evaluate(readings, columns=columns)
+    if not actions:
+        return []
+
+    changed = []
+    # 本批處理後各 (規則, 測站) 的事件；None 表示已解除
+    current = {}
+    peaks = {}
+
+    def event_for(key):
+        if key in current:
+            return current[key]
+        active = evaluator.active.get(key)
+        if active is not None and active.event_id is not None:
+            return AlertEvent(pk=active.event_id, rule_id=key[0], station_id=key[1], kind=active.kind)
+        return _active_event(*key)
+
+    for action, rule, reading, value, *extra in actions:
+        key = (rule.rule_id, reading.station_id)
+        if action == 'trigger':
+            kind, threshold = extra[0]
+            event = _create_event(rule, reading, kind, value, threshold)
+            if event is None:
+                # 其他行程已建立觸發中的事件
+                event = _active_event(*key)
+            else:
+                changed.append(event)
+            current[key] = event
+        elif action == 'peak':
+            event = event_for(key)
+            if event is not None:
+                event.peak_value = value
+                peaks[event.pk] = value
+                current[key] = event
+        else:
+            event = event_for(key)
+            current[key] = None
+            if event is None:
+                continue
+            updated = AlertEvent.objects.filter(pk=event.pk, state='active').update(
+                state='resolved', resolved_value=value, resolved_at=reading.timestamp,
+                **({'peak_value': peaks.pop(event.pk)} if event.pk in peaks else {}),
+            )
+            if updated:
+                changed.append(AlertEvent.objects.get(pk=event.pk))
+
+    for event_id, peak in peaks.items():
+        AlertEvent.objects.filter(pk=event_id, state='active').update(peak_value=peak)
+
+    def _on_commit():
+        # 交易提交後才更新記憶體中的狀態，回滾的批次不影響評估器
+        for key, event in current.items():
+            if event is None:
+                evaluator.active.pop(key, None)
+            else:
+                evaluator.active[key] = ActiveAlert(event.pk, event.kind, event.peak_value)
+        if changed:
+            bump_rules_version()
+        publish_alerts(changed)
+
+    transaction.on_commit(_on_commit)
+    return changed
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class StationDataConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'station_data'
+
+    def ready(self):
+        # 註冊 readings_ingested 的接收器（即時推播等）
+        from . import signals  # noqa: F401
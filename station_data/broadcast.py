@@ -0,0 +1,135 @@
+"""
+即時數據推播
+
+新的 Reading 寫入後，透過 channel layer 推送到：
+- station_<id>：單一測站頁面
+- all_stations：所有測站總覽
+
+每筆數據只在寫入時序列化一次（預先產生 JSON 文字），
+Consumer 收到後直接轉送，不需要再查詢資料庫。
+大批寫入時每個測站只推播最新的 BROADCAST_MAX_PER_STATION 筆。
+"""
+import json
+import logging
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from data_ingestion.models import Station, Reading
+
+logger = logging.getLogger(__name__)
+
+ALL_STATIONS_GROUP = 'all_stations'
+
+# 推播的數值欄位：(Reading 欄位, 前端使用的鍵名)
+PAYLOAD_FIELDS = [
+    ('temperature', 'temperature'),
+    ('ph', 'ph'),
+    ('oxygen', 'dissolved_oxygen'),
+    ('salinity', 'salinity'),
+    ('conductivity', 'conductivity'),
+    ('pressure', 'pressure'),
+    ('fluorescence', 'fluorescence'),
+    ('turbidity', 'turbidity'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+]
+
+
+def station_group_name(station_id):
+    return f'station_{station_id}'
+
+
+def build_reading_payload(reading, station_name):
+    """將 Reading 轉為推播用的精簡字典（0 值保留，NULL 轉為 None）"""
+    payload = {
+        'reading_id': reading.pk,
+        'station_id': reading.station_id,
+        'station_name': station_name,
+        'timestamp': reading.timestamp.isoformat(),
+    }
+    for field, key in PAYLOAD_FIELDS:
+        value = getattr(reading, field)
+        payload[key] = float(value) if value is not None else None
+    return payload
+
+
+def build_update_event(payload):
+    """
+    產生 channel layer 事件；text 為預先序列化好的 WebSocket 訊息
+
+    station_id 供 Consumer 合併同一測站的待送訊息，不必解析 text
+    """
+    return {
+        'type': 'sensor_reading_update',
+        'station_id': payload['station_id'],
+        'text': json.dumps({'type': 'sensor_reading_update', 'data': payload}),
+    }
+
+
+def _station_names(readings):
+    """取得測站名稱；已快取 station 的 Reading 不再查詢，其餘一次查完"""
+    names = {}
+    missing = set()
+    for reading in readings:
+        if Reading.station.is_cached(reading):
+            names[reading.station_id] = reading.station.station_name
+        else:
+            missing.add(reading.station_id)
+    missing -= names.keys()
+    if missing:
+        names.update(Station.objects.filter(pk__in=missing).values_list('pk', 'station_name'))
+    return names
+
+
+def _latest_per_station(readings, limit):
+    """每個測站最新的 limit 筆（依時間由舊到新）；筆數未超過時原樣回傳"""
+    by_station = defaultdict(list)
+    for reading in readings:
+        by_station[reading.station_id].append(reading)
+    if all(len(group) <= limit for group in by_station.values()):
+        return readings
+    selected = []
+    for group in by_station.values():
+        selected.extend(sorted(group, key=lambda reading: reading.timestamp)[-limit:])
+    return selected
+
+
+def broadcast_readings(readings):
+    """
+    在交易提交後推播新數據
+
+    Args:
+        readings: 已存檔的 Reading 列表
+    """
+    if not readings:
+        return
+
+    readings = _latest_per_station(readings, settings.BROADCAST_MAX_PER_STATION)
+    names = _station_names(readings)
+    events = [
+        (reading.station_id, build_update_event(build_reading_payload(reading, names.get(reading.station_id))))
+        for reading in readings
+    ]
+    transaction.on_commit(lambda: publish_events(events))
+
+
+def publish_events(events):
+    """將 (station_id, event) 送到對應的測站群組與 all_stations 群組"""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    async def _send_all():
+        for station_id, event in events:
+            await channel_layer.group_send(station_group_name(station_id), event)
+            await channel_layer.group_send(ALL_STATIONS_GROUP, event)
+
+    try:
+        async_to_sync(_send_all)()
+    except Exception:
+        # 推播失敗不應影響數據寫入
+        logger.exception('即時推播失敗（%d 筆）', len(events))
@@ -0,0 +1,190 @@
+"""
+頁面與圖表 API 的快取
+
+快取鍵由 (view, station, time_range, 數據版本) 組成：
+- 每個測站一個版本號，另有一個全系統版本號（總覽頁面使用）
+- 新數據寫入（交易提交後）遞增對應測站與全系統的版本號，舊的快取鍵不再被讀取，
+  等待逾時自然淘汰，不需要逐一刪除
+- 版本號以目前時間（毫秒）初始化，即使 Redis 淘汰了版本鍵也不會退回舊版本
+
+同一個鍵同時未命中時，只有取得鎖的請求重新計算，其餘請求短暫等待結果
+（防止快取雪崩）；命中 / 未命中次數記錄在 cache_stats:<view>:<hit|miss>，
+以 `manage.py cache_stats` 查看。
+
+快取後端（Redis）無法連線時一律直接計算，不影響頁面。
+"""
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+VIEW_CACHE_TIMEOUT = 300
+LOCK_TIMEOUT = 30
+LOCK_WAIT_SECONDS = 5
+LOCK_POLL_SECONDS = 0.05
+
+GLOBAL_SCOPE = 'all'
+
+# 使用 get_or_compute() 的 view（cache_stats 預設列出）
+CACHED_VIEWS = ['dashboard', 'station_detail', 'station_readings', 'reading_list', 'chart_data']
+REPORT_COUNTS_KEY = 'report_counts'
+
+
+def _version_key(station_id=None):
+    return f'data_version:{GLOBAL_SCOPE if station_id is None else station_id}'
+
+
+def _initial_version():
+    return int(time.time() * 1000)
+
+
+def data_version(station_id=None):
+    """測站（或全系統，station_id=None）目前的數據版本號"""
+    key = _version_key(station_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(station_ids):
+    """遞增測站與全系統的版本號，使相關快取失效"""
+    for key in [_version_key(station_id) for station_id in set(station_ids)] + [_version_key()]:
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                # 版本鍵不存在（尚未建立或已被淘汰）
+                cache.add(key, _initial_version(), timeout=None)
+        except Exception:
+            logger.exception('更新快取版本失敗: %s', key)
+
+
+def invalidate_readings(readings):
+    """新數據寫入後，於交易提交時使對應測站的快取失效"""
+    station_ids = {reading.station_id for reading in readings}
+    if station_ids:
+        transaction.on_commit(lambda: bump_versions(station_ids))
+
+
+def get_report_counts(compute):
+    """
+    報告數量統計（報告列表的分頁總數與各類型數量）
+
+    報告新增 / 刪除時由 invalidate_report_counts() 清除；另有 VIEW_CACHE_TIMEOUT 作為上限，
+    涵蓋測站刪除時連帶刪除報告等未經過 Django 訊號的情況。
+    """
+    try:
+        counts = cache.get(REPORT_COUNTS_KEY)
+        if counts is None:
+            counts = compute()
+            cache.set(REPORT_COUNTS_KEY, counts, VIEW_CACHE_TIMEOUT)
+        return counts
+    except Exception:
+        logger.exception('讀取報告統計快取失敗')
+        return compute()
+
+
+def invalidate_report_counts():
+    """報告新增 / 刪除後，於交易提交時清除報告數量統計"""
+    def _delete():
+        try:
+            cache.delete(REPORT_COUNTS_KEY)
+        except Exception:
+            logger.exception('清除報告統計快取失敗')
+
+    transaction.on_commit(_delete)
+
+
+def cache_key(view, station_id=None, time_range='', *extra):
+    """組成快取鍵：(view, station, time_range, 額外參數, 數據版本)"""
+    parts = [view, GLOBAL_SCOPE if station_id is None else str(station_id), time_range, *map(str, extra)]
+    return f'view:{":".join(parts)}:v{data_version(station_id)}'
+
+
+def _stats_key(view, outcome):
+    return f'cache_stats:{view}:{outcome}'
+
+
+def _record(view, outcome):
+    key = _stats_key(view, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def cache_stats(views=CACHED_VIEWS):
+    """各 view 的命中 / 未命中次數與命中率"""
+    stats = {}
+    for view in views:
+        counts = cache.get_many([_stats_key(view, 'hit'), _stats_key(view, 'miss')])
+        hits = counts.get(_stats_key(view, 'hit'), 0)
+        misses = counts.get(_stats_key(view, 'miss'), 0)
+        total = hits + misses
+        stats[view] = {'hit': hits, 'miss': misses, 'hit_rate': hits / total if total else None}
+    return stats
+
+
+def reset_cache_stats(views=CACHED_VIEWS):
+    """將命中 / 未命中次數歸零"""
+    cache.delete_many([_stats_key(view, outcome) for view in views for outcome in ('hit', 'miss')])
+
+
+def get_or_compute(view, compute, station_id=None, time_range='', extra=(), timeout=VIEW_CACHE_TIMEOUT):
+    """
+    讀取快取，未命中時計算並寫入
+
+    Args:
+        view: view 名稱（快取鍵與統計使用）
+        compute: 無參數函式，回傳要快取的值（需可 pickle）
+        station_id: 測站 ID；None 表示依全系統版本失效
+        time_range: 時間範圍代碼
+        extra: 其他影響結果的參數
+        timeout: 快取秒數
+    """
+    try:
+        key = cache_key(view, station_id, time_range, *extra)
+        value = cache.get(key)
+        if value is not None:
+            _record(view, 'hit')
+            return value
+        _record(view, 'miss')
+    except Exception:
+        logger.exception('讀取快取失敗: %s', view)
+        return compute()
+
+    lock_key = f'lock:{key}'
+    try:
+        acquired = cache.add(lock_key, 1, timeout=LOCK_TIMEOUT)
+    except Exception:
+        logger.exception('取得快取鎖失敗: %s', key)
+        return compute()
+
+    if not acquired:
+        # 其他請求正在計算同一個鍵，等待結果
+        deadline = time.monotonic() + LOCK_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            value = cache.get(key)
+            if value is not None:
+                return value
+        return compute()
+
+    try:
+        value = compute()
+        try:
+            cache.set(key, value, timeout)
+        except Exception:
+            logger.exception('寫入快取失敗: %s', key)
+        return value
+    finally:
+        try:
+            cache.delete(lock_key)
+        except Exception:
+            logger.exception('釋放快取鎖失敗: %s', key)
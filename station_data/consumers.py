@@ -1,11 +1,99 @@
 """
 WebSocket consumers for real-time station data updates
+
+同一條連線可以訂閱多個測站（JSON 訊息）：
+
+    {"action": "subscribe", "stations": [1, 2, 3], "fields": ["temperature", "ph"], "max_rate": 2}
+    {"action": "subscribe", "stations": "all"}
+    {"action": "unsubscribe", "stations": [2]}
+    {"action": "unsubscribe"}                      # 取消全部訂閱
+
+- fields：只推送指定的數值欄位（PAYLOAD_FIELDS 的鍵名），省略時推送全部
+- max_rate：每個測站每秒最多推送幾次（上限 MAX_RATE），省略或 0 表示不限制
+
+每條連線的待送訊息以測站為鍵合併（只保留每個測站最新的一筆），
+客戶端跟不上或受 max_rate 限制時，舊訊息直接被新的取代，
+待送數量最多 MAX_PENDING 筆，連線的記憶體用量不隨寫入量增加。
+
+舊的端點維持原本行為：ws/stations/<id>/ 預設訂閱該測站，
+ws/stations/readings/ 預設訂閱所有測站；ws/stations/ 連線後不訂閱任何測站。
+
+訂閱的測站觸發或解除警報時會收到 {"type": "alert", "data": {...}}（見 station_data.alerts）。
 """
 import json
 import asyncio
+import logging
+from functools import lru_cache
+
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from data_ingestion.models import Station, Reading
+from data_ingestion.latest import latest_readings
+from data_ingestion.models import Station, StationLatest
+from .broadcast import ALL_STATIONS_GROUP, PAYLOAD_FIELDS, build_reading_payload, station_group_name
+
+logger = logging.getLogger(__name__)
+
+MAX_SUBSCRIBED_STATIONS = 200
+MAX_PENDING = 1000
+MAX_RATE = 10.0
+
+PAYLOAD_KEYS = [key for _, key in PAYLOAD_FIELDS]
+BASE_KEYS = ('reading_id', 'station_id', 'station_name', 'timestamp')
+
+
+class SubscriptionError(ValueError):
+    """訂閱訊息格式錯誤"""
+
+
+def filter_payload(payload, fields):
+    """只保留識別欄位與 fields 指定的數值欄位；fields 為 None 時原樣回傳"""
+    if fields is None:
+        return payload
+    return {key: payload[key] for key in (*BASE_KEYS, *fields) if key in payload}
+
+
+@lru_cache(maxsize=1024)
+def filter_message(text, fields):
+    """
+    將預先序列化的更新訊息裁剪為指定欄位
+
+    同一筆數據推送給多條相同欄位設定的連線時，同一個 process 只解析與序列化一次。
+    """
+    message = json.loads(text)
+    message['data'] = filter_payload(message['data'], fields)
+    return json.dumps(message)
+
+
+def parse_subscription(message):
+    """
+    驗證 subscribe / unsubscribe 訊息
+
+    Returns:
+        (stations, fields, max_rate)；stations 為 'all'、測站 ID 集合或 None（未指定）
+    """
+    stations = message.get('stations')
+    if stations is not None and stations != 'all':
+        if not isinstance(stations, list) or not all(
+            isinstance(station_id, int) and not isinstance(station_id, bool) and station_id > 0
+            for station_id in stations
+        ):
+            raise SubscriptionError('stations 必須是測站 ID 列表或 "all"')
+        if len(stations) > MAX_SUBSCRIBED_STATIONS:
+            raise SubscriptionError(f'最多訂閱 {MAX_SUBSCRIBED_STATIONS} 個測站')
+        stations = set(stations)
+
+    fields = message.get('fields')
+    if fields is not None:
+        if not isinstance(fields, list) or not all(field in PAYLOAD_KEYS for field in fields):
+            raise SubscriptionError(f'fields 只能包含: {", ".join(PAYLOAD_KEYS)}')
+        fields = tuple(key for key in PAYLOAD_KEYS if key in fields)
+
+    max_rate = message.get('max_rate')
+    if max_rate is not None:
+        if isinstance(max_rate, bool) or not isinstance(max_rate, (int, float)) or max_rate < 0:
+            raise SubscriptionError('max_rate 必須是非負數')
+        max_rate = min(float(max_rate), MAX_RATE)
+    return stations, fields, max_rate
 
 
 class StationReadingConsumer(AsyncWebsocketConsumer):
@@ -15,46 +103,196 @@ class StationReadingConsumer(AsyncWebsocketConsumer):
 
     async def connect(self):
         """處理 WebSocket 連接"""
+        kwargs = self.scope['url_route'].get('kwargs', {})
         # 從 URL 中獲取 station_id（如果有的話）
-        self.station_id = self.scope['url_route'].get('kwargs', {}).get('station_id')
+        self.station_id = kwargs.get('station_id')
+
+        self.all_stations = False
+        self.stations = set()
+        self.fields = None
+        self.min_interval = 0.0
+        self.pending = {}
+        self.coalesced = 0
+        self.dropped = 0
+        self.wakeup = asyncio.Event()
+        self.sender = asyncio.ensure_future(self.drain_pending())
 
         if self.station_id:
             # 單一測站的即時資料
-            self.group_name = f'station_{self.station_id}'
-        else:
+            self.station_id = int(self.station_id)
+            await self.join_stations({self.station_id})
+        elif kwargs.get('subscribe_all', True):
             # 所有測站的即時資料
-            self.group_name = 'all_stations'
-
-        # 加入群組
-        await self.channel_layer.group_add(
-            self.group_name,
-            self.channel_name
-        )
+            await self.join_all()
 
         # 接受 WebSocket 連接
         await self.accept()
 
         # 連接後立即發送當前資料
-        await self.send_current_data()
+        if self.station_id or self.all_stations:
+            await self.send_current_data()
 
     async def disconnect(self, close_code):
         """處理 WebSocket 斷開連接"""
-        # 離開群組
-        await self.channel_layer.group_discard(
-            self.group_name,
-            self.channel_name
-        )
+        # connect() 提早失敗時尚未建立推送工作，也尚未加入任何群組
+        sender = getattr(self, 'sender', None)
+        if sender is None:
+            return
+        sender.cancel()
+        try:
+            await sender
+        except asyncio.CancelledError:
+            pass
+        await self.leave_all()
+        await self.leave_stations(set(self.stations))
 
-    async def receive(self, text_data):
-        """接收來自 WebSocket 的訊息（目前不需要處理）"""
-        pass
+    async def receive(self, text_data=None, bytes_data=None):
+        """處理客戶端的訂閱訊息"""
+        try:
+            message = json.loads(text_data or '')
+            if not isinstance(message, dict):
+                raise SubscriptionError('訊息必須是 JSON 物件')
+            action = message.get('action')
+            if action == 'subscribe':
+                await self.subscribe(*parse_subscription(message))
+            elif action == 'unsubscribe':
+                await self.unsubscribe(parse_subscription(message)[0])
+            else:
+                raise SubscriptionError(f'未知的 action: {action}')
+        except (ValueError, SubscriptionError) as e:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'message': str(e)
+            }))
+
+    # ==========================================
+    # 訂閱管理
+    # ==========================================
+
+    async def join_stations(self, station_ids):
+        for station_id in station_ids - self.stations:
+            await self.channel_layer.group_add(station_group_name(station_id), self.channel_name)
+        self.stations |= station_ids
+
+    async def leave_stations(self, station_ids):
+        for station_id in station_ids & self.stations:
+            await self.channel_layer.group_discard(station_group_name(station_id), self.channel_name)
+            self.pending.pop(station_id, None)
+        self.stations -= station_ids
+
+    async def join_all(self):
+        # 改為訂閱全部時離開個別測站群組，避免同一筆數據收到兩次
+        await self.leave_stations(set(self.stations))
+        if not self.all_stations:
+            await self.channel_layer.group_add(ALL_STATIONS_GROUP, self.channel_name)
+        self.all_stations = True
+
+    async def leave_all(self):
+        if self.all_stations:
+            await self.channel_layer.group_discard(ALL_STATIONS_GROUP, self.channel_name)
+            self.pending.clear()
+        self.all_stations = False
+
+    async def subscribe(self, stations, fields, max_rate):
+        """訂閱測站並更新欄位 / 頻率設定；確認後送出新訂閱測站的最新數據"""
+        if fields is not None:
+            self.fields = fields
+        if max_rate is not None:
+            self.min_interval = 1 / max_rate if max_rate else 0.0
+
+        added = set()
+        if stations == 'all':
+            added = None if not self.all_stations else set()
+            await self.join_all()
+        elif stations and not self.all_stations:
+            if len(self.stations | stations) > MAX_SUBSCRIBED_STATIONS:
+                raise SubscriptionError(f'最多訂閱 {MAX_SUBSCRIBED_STATIONS} 個測站')
+            added = stations - self.stations
+            await self.join_stations(stations)
+
+        await self.send_subscription_state()
+        data = await self.get_latest_payloads(added) if added is None or added else []
+        if data:
+            await self.send(text_data=json.dumps({
+                'type': 'initial_data',
+                'data': [filter_payload(payload, self.fields) for payload in data]
+            }))
+
+    async def unsubscribe(self, stations):
+        """取消訂閱；未指定測站或 "all" 時取消全部"""
+        if stations is None or stations == 'all':
+            await self.leave_all()
+            await self.leave_stations(set(self.stations))
+        else:
+            await self.leave_stations(stations)
+        await self.send_subscription_state()
+
+    async def send_subscription_state(self):
+        await self.send(text_data=json.dumps({
+            'type': 'subscribed',
+            'stations': 'all' if self.all_stations else sorted(self.stations),
+            'fields': list(self.fields) if self.fields is not None else None,
+            'max_rate': 1 / self.min_interval if self.min_interval else None,
+        }))
+
+    # ==========================================
+    # 推送（以測站合併的待送佇列）
+    # ==========================================
 
     async def sensor_reading_update(self, event):
         """
-        從群組接收訊息並發送到 WebSocket
+        從群組接收訊息，放入待送佇列
+
+        推播端已預先序列化為 event['text']；同一測站尚未送出的舊訊息直接被取代
+        """
+        text = event['text'] if 'text' in event else json.dumps(event['data'])
+        station_id = event.get('station_id')
+        if station_id is None:
+            station_id = json.loads(text)['data']['station_id']
+        if not self.all_stations and station_id not in self.stations:
+            # 取消訂閱前已在 channel layer 中的訊息
+            return
+        if self.fields is not None:
+            text = filter_message(text, self.fields)
+
+        if station_id in self.pending:
+            self.coalesced += 1
+        elif len(self.pending) >= MAX_PENDING:
+            del self.pending[next(iter(self.pending))]
+            self.dropped += 1
+        self.pending[station_id] = text
+        self.wakeup.set()
+
+    async def alert_event(self, event):
+        """警報事件直接送出（不合併、不受 fields / max_rate 限制）"""
+        if not self.all_stations and event['station_id'] not in self.stations:
+            return
+        await self.send(text_data=event['text'])
+
+    async def drain_pending(self):
         """
-        # 發送訊息到 WebSocket
-        await self.send(text_data=json.dumps(event['data']))
+        依序送出待送訊息；設定 max_rate 時每輪之間暫停，期間的更新會被合併
+
+        送出失敗時關閉連線（1011）：推送迴圈已結束，保持連線只會讓客戶端再也收不到更新，
+        關閉後由客戶端重新連線
+        """
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.pending:
+                    station_id = next(iter(self.pending))
+                    await self.send(text_data=self.pending.pop(station_id))
+                if self.min_interval:
+                    await asyncio.sleep(self.min_interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception('WebSocket 推送失敗，關閉連線')
+            try:
+                await self.close(code=1011)
+            except Exception:
+                logger.exception('關閉 WebSocket 連線失敗')
 
     async def send_current_data(self):
         """發送當前資料到客戶端"""
@@ -78,46 +316,33 @@ class StationReadingConsumer(AsyncWebsocketConsumer):
 
     @database_sync_to_async
     def get_station_latest_data(self, station_id):
-        """獲取單一測站的最新資料"""
+        """獲取單一測站的最新資料（優先讀取快照）"""
+        latest = StationLatest.objects.select_related('station').filter(station_id=station_id).first()
+        if latest:
+            return build_reading_payload(latest.as_reading(), latest.station.station_name)
+
         try:
             station = Station.objects.get(id=station_id)
             latest_reading = station.readings.order_by('-timestamp').first()
 
             if latest_reading:
-                return {
-                    'station_id': station.id,
-                    'station_name': station.station_name,
-                    'timestamp': latest_reading.timestamp.isoformat(),
-                    'temperature': float(latest_reading.temperature) if latest_reading.temperature else None,
-                    'ph': float(latest_reading.ph) if latest_reading.ph else None,
-                    'dissolved_oxygen': float(latest_reading.oxygen) if latest_reading.oxygen else None,
-                    'salinity': float(latest_reading.salinity) if latest_reading.salinity else None,
-                    'conductivity': float(latest_reading.conductivity) if latest_reading.conductivity else None,
-                    'pressure': float(latest_reading.pressure) if latest_reading.pressure else None,
-                    'fluorescence': float(latest_reading.fluorescence) if latest_reading.fluorescence else None,
-                    'turbidity': float(latest_reading.turbidity) if latest_reading.turbidity else None,
-                }
+                return build_reading_payload(latest_reading, station.station_name)
             return None
         except Station.DoesNotExist:
             return None
 
     @database_sync_to_async
     def get_all_stations_latest_data(self):
-        """獲取所有測站的最新資料"""
-        stations_data = []
-        stations = Station.objects.all()
+        """獲取所有測站的最新資料（讀取 StationLatest 快照，一次查詢）"""
+        return [
+            build_reading_payload(reading, station_name)
+            for reading, station_name in latest_readings()
+        ]
 
-        for station in stations:
-            latest_reading = station.readings.order_by('-timestamp').first()
-            if latest_reading:
-                stations_data.append({
-                    'station_id': station.id,
-                    'station_name': station.station_name,
-                    'timestamp': latest_reading.timestamp.isoformat(),
-                    'temperature': float(latest_reading.temperature) if latest_reading.temperature else None,
-                    'ph': float(latest_reading.ph) if latest_reading.ph else None,
-                    'dissolved_oxygen': float(latest_reading.oxygen) if latest_reading.oxygen else None,
-                    'salinity': float(latest_reading.salinity) if latest_reading.salinity else None,
-                })
-
-        return stations_data
+    @database_sync_to_async
+    def get_latest_payloads(self, station_ids):
+        """指定測站（None 表示全部）的最新資料"""
+        return [
+            build_reading_payload(reading, station_name)
+            for reading, station_name in latest_readings(station_ids)
+        ]
@@ -0,0 +1,222 @@
+"""
+數據記錄串流匯出（CSV / NDJSON / Parquet，可選 gzip）
+
+- 以 values_list().iterator(chunk_size) 逐批讀取（PostgreSQL 為具名的伺服器端游標），
+  不一次載入整個結果集
+- 每批數據編碼為一個 bytes 區塊後立即送出；gzip 以 zlib 串流壓縮
+- Parquet 每累積 PARQUET_ROW_GROUP_SIZE 筆寫出一個 row group 並立即送出（需要 pyarrow）
+
+記憶體用量只與每批筆數有關，與匯出的總筆數無關。
+已封存到冷儲存的數據（data_ingestion.archive）依月份讀取後排在資料庫數據之前輸出。
+"""
+import csv
+import io
+import zlib
+
+import orjson
+from asgiref.sync import sync_to_async
+
+from data_ingestion.models import Station
+from .pagination import READING_VALUE_FIELDS
+
+EXPORT_CHUNK_SIZE = 5000
+PARQUET_ROW_GROUP_SIZE = 50000
+
+EXPORT_FORMATS = {
+    # 格式: (副檔名, Content-Type)
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'ndjson': ('ndjson', 'application/x-ndjson'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+BASE_COLUMNS = ['id', 'station_id', 'station_name', 'timestamp']
+
+
+class ExportError(ValueError):
+    """匯出格式無效或缺少相依套件"""
+
+
+def export_queryset(readings, fields=READING_VALUE_FIELDS):
+    """匯出用的欄位與排序（依時間、ID 由舊到新）"""
+    return readings.order_by('timestamp', 'id').values_list('id', 'station_id', 'timestamp', *fields)
+
+
+def iter_row_chunks(readings, fields=READING_VALUE_FIELDS, chunk_size=EXPORT_CHUNK_SIZE, archive_filters=None):
+    """
+    逐批產生匯出列：(id, station_id, station_name, timestamp, 數值...)
+
+    測站名稱預先一次查出，不在每列 JOIN。
+    指定 archive_filters（parse_reading_filters() 的結果）時，先輸出符合條件的封存數據。
+    """
+    from data_ingestion.archive import iter_archived_rows
+
+    names = dict(Station.objects.values_list('pk', 'station_name'))
+    if archive_filters is not None:
+        for archived in iter_archived_rows(fields, chunk_size=chunk_size, **archive_filters):
+            yield [
+                (pk, station_id, names.get(station_id, ''), timestamp, *values)
+                for pk, station_id, timestamp, *values in archived
+            ]
+
+    chunk = []
+    for pk, station_id, timestamp, *values in export_queryset(readings, fields).iterator(chunk_size=chunk_size):
+        chunk.append((pk, station_id, names.get(station_id, ''), timestamp, *values))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def csv_blocks(chunks, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(BASE_COLUMNS + list(fields))
+    for chunk in chunks:
+        writer.writerows(
+            (pk, station_id, name, timestamp.isoformat(), *values)
+            for pk, station_id, name, timestamp, *values in chunk
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # 沒有數據時仍輸出標題列
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def ndjson_blocks(chunks, fields):
+    columns = BASE_COLUMNS + list(fields)
+    for chunk in chunks:
+        yield b''.join(
+            orjson.dumps(dict(zip(columns, row)), default=float, option=orjson.OPT_APPEND_NEWLINE)
+            for row in chunk
+        )
+
+
+class _DrainableSink(io.RawIOBase):
+    """寫入端暫存，每寫完一個 row group 就取出已寫入的 bytes 送出"""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_blocks(chunks, fields, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ExportError('Parquet 匯出需要安裝 pyarrow') from e
+
+    schema = pa.schema(
+        [('id', pa.int64()), ('station_id', pa.int64()), ('station_name', pa.string()),
+         ('timestamp', pa.timestamp('us', tz='UTC'))]
+        + [(field, pa.float64()) for field in fields]
+    )
+
+    def to_table(rows):
+        columns = list(zip(*rows))
+        arrays = [pa.array(column, type=schema.field(i).type) for i, column in enumerate(columns[:4])]
+        arrays += [
+            pa.array([float(value) if value is not None else None for value in column], type=pa.float64())
+            for column in columns[4:]
+        ]
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    pending = []
+    for chunk in chunks:
+        pending.extend(chunk)
+        if len(pending) >= row_group_size:
+            writer.write_table(to_table(pending), row_group_size=row_group_size)
+            pending = []
+            yield sink.drain()
+    if pending:
+        writer.write_table(to_table(pending), row_group_size=row_group_size)
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    'csv': csv_blocks,
+    'ndjson': ndjson_blocks,
+    'parquet': parquet_blocks,
+}
+
+
+def gzip_blocks(blocks, level=6):
+    """串流 gzip 壓縮"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_blocks(readings, export_format='csv', fields=READING_VALUE_FIELDS, gzip=False, chunk_size=EXPORT_CHUNK_SIZE,
+                  archive_filters=None):
+    """
+    產生匯出檔案內容（bytes 區塊的產生器）
+
+    Args:
+        readings: 已篩選的 Reading QuerySet
+        export_format: 'csv'、'ndjson' 或 'parquet'
+        fields: 匯出的數值欄位
+        gzip: 是否以 gzip 壓縮
+        chunk_size: 每批讀取筆數
+        archive_filters: 與 readings 相同的篩選條件（parse_reading_filters() 的結果）；
+            指定時一併匯出已封存的數據（排在資料庫數據之前）
+    """
+    if export_format not in ENCODERS:
+        raise ExportError(f'不支援的格式: {export_format}')
+    if export_format == 'parquet':
+        # 缺少 pyarrow 時在開始串流前就回報錯誤
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ExportError('Parquet 匯出需要安裝 pyarrow') from e
+
+    blocks = ENCODERS[export_format](iter_row_chunks(readings, fields, chunk_size, archive_filters), fields)
+    return gzip_blocks(blocks) if gzip else blocks
+
+
+def export_filename(export_format, gzip=False, station=None):
+    extension = EXPORT_FORMATS[export_format][0]
+    name = f'readings-{station}' if station else 'readings'
+    return f'{name}.{extension}{".gz" if gzip else ""}'
+
+
+async def aiter_blocks(blocks):
+    """
+    在 ASGI 下逐塊送出同步產生器的內容
+
+    StreamingHttpResponse 在 ASGI 下遇到同步產生器會先整個讀進記憶體；
+    這裡每次只在資料庫執行緒取下一塊（同一條連線，伺服器端游標維持有效）。
+    """
+    sentinel = object()
+    while True:
+        block = await sync_to_async(next, thread_sensitive=True)(blocks, sentinel)
+        if block is sentinel:
+            break
+        yield block
@@ -0,0 +1,104 @@
+"""
+圖表數據序列化效能基準測試
+使用方法:
+    python manage.py benchmark_chart_data
+    python manage.py benchmark_chart_data --rows 50000 --repeat 10
+    python manage.py benchmark_chart_data --keep   # 保留測試數據
+
+比較兩種做法處理同一個時間窗（預設 10,000 筆）的耗時（含 JSON 序列化）：
+- 舊版：載入完整 Reading 實例，每個參數各走訪一次 reversed(readings)，json.dumps
+- 欄位式：values_list 只取需要的欄位，單次建立 NumPy 欄位陣列，orjson 序列化
+"""
+import json
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from analysis_tools.chart_helpers import columns_to_chart_data, dumps_chart_data, reading_columns
+from data_ingestion.models import Station, Reading
+
+BENCH_PREFIX = 'bench-'
+
+
+def legacy_prepare_chart_data(readings):
+    """舊版 prepare_chart_data（比較基準）：每個參數各走訪一次 model 實例"""
+    return {
+        'labels': [r.timestamp.strftime('%m/%d %H:%M') for r in reversed(readings)],
+        'temperature': [float(r.temperature) if r.temperature else None for r in reversed(readings)],
+        'ph': [float(r.ph) if r.ph else None for r in reversed(readings)],
+        'oxygen': [float(r.oxygen) if r.oxygen else None for r in reversed(readings)],
+        'salinity': [float(r.salinity) if r.salinity else None for r in reversed(readings)],
+        'conductivity': [float(r.conductivity) if r.conductivity else None for r in reversed(readings)],
+        'pressure': [float(r.pressure) if r.pressure else None for r in reversed(readings)],
+        'fluorescence': [float(r.fluorescence) if r.fluorescence else None for r in reversed(readings)],
+        'turbidity': [float(r.turbidity) if r.turbidity else None for r in reversed(readings)],
+    }
+
+
+class Command(BaseCommand):
+    help = '比較舊版與欄位式圖表數據序列化的耗時'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help='時間窗內的數據筆數（預設：10,000）')
+        parser.add_argument('--repeat', type=int, default=5, help='每種做法重複次數（預設：5）')
+        parser.add_argument('--keep', action='store_true', help='結束後保留測試測站與數據')
+
+    def handle(self, *args, **options):
+        station = self.prepare_data(options['rows'])
+        window = station.readings.order_by('-timestamp')
+
+        def legacy():
+            return json.dumps(legacy_prepare_chart_data(list(window))).encode()
+
+        def columnar():
+            x, values = reading_columns(window)
+            return dumps_chart_data(columns_to_chart_data(x[::-1], values[::-1], as_arrays=True))
+
+        results = {}
+        for name, run in [('舊版（model 實例 + json）', legacy), ('欄位式（values_list + NumPy + orjson）', columnar)]:
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                size = len(run())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+            self.stdout.write(f'{name:<36} 中位數 {results[name]:>9.2f} ms  （{size:,} bytes）')
+
+        legacy_ms, columnar_ms = results.values()
+        speedup = legacy_ms / columnar_ms if columnar_ms else float('inf')
+        self.stdout.write(self.style.SUCCESS(f'\n加速比: {speedup:.1f}x（{options["rows"]:,} 筆）'))
+
+        if not options['keep']:
+            deleted = Reading.objects.filter(station=station)._raw_delete(Reading.objects.db)
+            station.delete()
+            self.stdout.write(f'已清除 {deleted} 筆測試數據')
+
+    def prepare_data(self, rows):
+        station = Station.objects.create(
+            station_name=f'{BENCH_PREFIX}chart',
+            device_model='BENCH',
+            location='benchmark',
+            install_date=timezone.now().date(),
+        )
+        end = timezone.now()
+        Reading.objects.bulk_create([
+            Reading(
+                station=station,
+                timestamp=end - timedelta(minutes=i),
+                temperature=Decimal(f'{random.uniform(20, 30):.2f}'),
+                conductivity=Decimal(f'{random.uniform(53000, 55000):.2f}'),
+                pressure=Decimal(f'{random.uniform(0.5, 0.7):.3f}'),
+                oxygen=Decimal(f'{random.uniform(5, 9):.3f}'),
+                ph=Decimal(f'{random.uniform(7.8, 8.4):.2f}'),
+                fluorescence=Decimal(f'{random.uniform(0, 2):.3f}'),
+                turbidity=Decimal(f'{random.uniform(3, 7):.3f}'),
+                salinity=Decimal(f'{random.uniform(33, 34):.4f}'),
+            )
+            for i in range(rows)
+        ], batch_size=5000)
+        return station
@@ -0,0 +1,229 @@
+"""
+WebSocket 推播負載測試
+使用方法:
+    python manage.py benchmark_websocket_fanout
+    python manage.py benchmark_websocket_fanout --connections 5000 --stations 20 --rate 200 --duration 20
+    python manage.py benchmark_websocket_fanout --layer redis          # 使用 settings 的 channel layer
+    python manage.py benchmark_websocket_fanout --output bench.jsonl  # 結果附加為一行 JSON，方便跨 commit 比較
+
+在同一個 process 內啟動 config.asgi.application（預設改用 InMemoryChannelLayer），
+以 WebsocketCommunicator 模擬大量客戶端，依 --readings-share 比例分配到
+ws/stations/readings/ 與各測站的 ws/stations/<id>/。
+
+推播端以固定速率產生數據，走與正式環境相同的路徑
+（build_update_event → group_send 到測站群組與 all_stations 群組），不寫入資料庫，
+只量測推播本身。報告：
+- 推送延遲 p50 / p99（group_send 前到客戶端收到訊息）
+- 每秒送達訊息數、遺失訊息數（channel 佇列已滿時被丟棄）
+- 每 1,000 條連線增加的常駐記憶體（RSS）
+"""
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import time
+from decimal import Decimal
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from data_ingestion.models import Station, Reading
+from station_data.broadcast import (
+    ALL_STATIONS_GROUP, build_reading_payload, build_update_event, station_group_name,
+)
+
+BENCH_PREFIX = 'bench-'
+
+
+def current_rss_kb():
+    """目前的常駐記憶體（KB）；無 /proc 時改用峰值"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def receive_updates(communicator, sent_at, latencies):
+    """模擬客戶端：持續接收並記錄每筆更新的延遲"""
+    while True:
+        message = json.loads(await communicator.receive_from(timeout=3600))
+        if message.get('type') == 'sensor_reading_update':
+            latencies.append(time.perf_counter() - sent_at[message['data']['reading_id']])
+
+
+async def run_fanout(stations, options):
+    from config.asgi import application
+
+    layer = get_channel_layer()
+    rss_before = current_rss_kb()
+
+    # 建立連線
+    communicators = []
+    for i in range(options['connections']):
+        if random.random() < options['readings_share']:
+            path = '/ws/stations/readings/'
+        else:
+            path = f'/ws/stations/{stations[i % len(stations)].id}/'
+        communicators.append(WebsocketCommunicator(application, path))
+
+    connect_started = time.perf_counter()
+    batch = options['connect_batch']
+    for start in range(0, len(communicators), batch):
+        results = await asyncio.gather(*(c.connect(timeout=30) for c in communicators[start:start + batch]))
+        if not all(connected for connected, _ in results):
+            raise RuntimeError('部分連線被拒絕')
+        # 略過連線時的 initial_data
+        await asyncio.gather(*(c.receive_from(timeout=30) for c in communicators[start:start + batch]))
+    connect_seconds = time.perf_counter() - connect_started
+    rss_connected = current_rss_kb()
+
+    sent_at = {}
+    latencies = []
+    clients = [asyncio.ensure_future(receive_updates(c, sent_at, latencies)) for c in communicators]
+    readings_clients = sum(c.scope['path'] == '/ws/stations/readings/' for c in communicators)
+    per_station = {
+        station.id: sum(c.scope['path'] == f'/ws/stations/{station.id}/' for c in communicators)
+        for station in stations
+    }
+
+    # 以固定速率推播
+    interval = 1 / options['rate']
+    total_events = int(options['rate'] * options['duration'])
+    expected = 0
+    publish_started = time.perf_counter()
+    for reading_id in range(1, total_events + 1):
+        station = stations[reading_id % len(stations)]
+        reading = Reading(
+            pk=reading_id, station=station, timestamp=timezone.now(),
+            temperature=Decimal(f'{random.uniform(20, 30):.2f}'), ph=Decimal('8.10'),
+        )
+        event = build_update_event(build_reading_payload(reading, station.station_name))
+        sent_at[reading_id] = time.perf_counter()
+        await layer.group_send(station_group_name(station.id), event)
+        await layer.group_send(ALL_STATIONS_GROUP, event)
+        expected += per_station[station.id] + readings_clients
+
+        delay = publish_started + reading_id * interval - time.perf_counter()
+        await asyncio.sleep(max(delay, 0))
+
+    # 等待剩餘訊息送達
+    deadline = time.perf_counter() + options['drain_timeout']
+    while len(latencies) < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - publish_started
+    rss_peak = current_rss_kb()
+
+    for client in clients:
+        client.cancel()
+    await asyncio.gather(*clients, return_exceptions=True)
+    await asyncio.gather(*(c.disconnect() for c in communicators), return_exceptions=True)
+
+    delivered = np.array(latencies) * 1000
+    thousands = options['connections'] / 1000
+    return {
+        'connections': options['connections'],
+        'readings_connections': readings_clients,
+        'stations': len(stations),
+        'rate': options['rate'],
+        'duration': options['duration'],
+        'events': total_events,
+        'expected': expected,
+        'delivered': len(latencies),
+        'lost': expected - len(latencies),
+        'messages_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': float(np.percentile(delivered, 50)) if len(delivered) else None,
+        'p99_ms': float(np.percentile(delivered, 99)) if len(delivered) else None,
+        'connect_seconds': connect_seconds,
+        'rss_per_1k_connections_kb': (rss_connected - rss_before) / thousands if thousands else 0.0,
+        'rss_peak_kb': rss_peak,
+    }
+
+
+class Command(BaseCommand):
+    help = 'WebSocket 推播負載測試（延遲、吞吐量與每千條連線記憶體）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=2000, help='模擬連線數（預設：2,000）')
+        parser.add_argument('--stations', type=int, default=10, help='測站數（預設：10）')
+        parser.add_argument('--readings-share', type=float, default=0.2,
+                            help='連到 ws/stations/readings/ 的連線比例（預設：0.2）')
+        parser.add_argument('--rate', type=float, default=50, help='每秒推播數據筆數（預設：50）')
+        parser.add_argument('--duration', type=float, default=10, help='推播秒數（預設：10）')
+        parser.add_argument('--drain-timeout', type=float, default=10, help='推播結束後等待送達的秒數（預設：10）')
+        parser.add_argument('--connect-batch', type=int, default=200, help='每批同時建立的連線數（預設：200）')
+        parser.add_argument('--layer', choices=['memory', 'redis'], default='memory',
+                            help='memory：InMemoryChannelLayer；redis：使用 settings 的設定')
+        parser.add_argument('--capacity', type=int, default=100, help='InMemoryChannelLayer 每個 channel 的佇列容量')
+        parser.add_argument('--seed', type=int, default=0, help='亂數種子（固定連線分配，方便比較）')
+        parser.add_argument('--output', help='將結果（含 git commit）附加為一行 JSON')
+        parser.add_argument('--keep', action='store_true', help='結束後保留測試測站')
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        stations = self.prepare_stations(options['stations'])
+
+        layers = settings.CHANNEL_LAYERS
+        if options['layer'] == 'memory':
+            layers = {'default': {
+                'BACKEND': 'channels.layers.InMemoryChannelLayer',
+                'CONFIG': {'capacity': options['capacity']},
+            }}
+
+        self.stdout.write(
+            f'{options["connections"]:,} 條連線、{len(stations)} 個測站、'
+            f'每秒 {options["rate"]:g} 筆、{options["duration"]:g} 秒（{options["layer"]}）...'
+        )
+        try:
+            with override_settings(CHANNEL_LAYERS=layers):
+                result = async_to_sync(run_fanout)(stations, options)
+        finally:
+            if not options['keep']:
+                Station.objects.filter(pk__in=[station.pk for station in stations]).delete()
+
+        result.update({'layer': options['layer'], 'revision': git_revision()})
+        self.report(result)
+        if options['output']:
+            with open(options['output'], 'a', encoding='utf-8') as output:
+                output.write(json.dumps(result) + '\n')
+
+    def report(self, result):
+        def ms(value):
+            return f'{value:.2f} ms' if value is not None else '-'
+
+        self.stdout.write(f'建立連線: {result["connect_seconds"]:.2f} 秒')
+        self.stdout.write(f'送達: {result["delivered"]:,} / {result["expected"]:,}（遺失 {result["lost"]:,}）')
+        self.stdout.write(f'吞吐量: {result["messages_per_second"]:,.0f} 訊息/秒')
+        self.stdout.write(f'延遲: p50 {ms(result["p50_ms"])}, p99 {ms(result["p99_ms"])}')
+        self.stdout.write(f'記憶體: 每 1,000 條連線 {result["rss_per_1k_connections_kb"] / 1024:.1f} MB')
+        style = self.style.SUCCESS if not result['lost'] else self.style.WARNING
+        self.stdout.write(style(f'完成（revision {result["revision"] or "-"}）'))
+
+    def prepare_stations(self, count):
+        return Station.objects.bulk_create([
+            Station(
+                station_name=f'{BENCH_PREFIX}ws-{i + 1}',
+                device_model='BENCH',
+                location='benchmark',
+                install_date=timezone.now().date(),
+            )
+            for i in range(count)
+        ])
@@ -0,0 +1,48 @@
+"""
+頁面與圖表 API 的快取命中率
+使用方法:
+    python manage.py cache_stats
+    python manage.py cache_stats --view chart_data --view station_detail
+    python manage.py cache_stats --reset    # 輸出後將計數歸零
+
+計數由 station_data.caching.get_or_compute() 記錄在快取中（所有行程共用），
+快取後端重啟或淘汰計數鍵後重新累計。
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from station_data.caching import CACHED_VIEWS, cache_stats, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = '顯示各 view 的快取命中 / 未命中次數與命中率'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', action='append', help=f'view 名稱（可重複指定，預設：{", ".join(CACHED_VIEWS)}）')
+        parser.add_argument('--reset', action='store_true', help='輸出後將計數歸零')
+
+    def handle(self, *args, **options):
+        views = options['view'] or CACHED_VIEWS
+        try:
+            stats = cache_stats(views)
+        except Exception as exc:
+            raise CommandError(f'無法讀取快取: {exc}')
+
+        width = max(len(view) for view in views)
+        self.stdout.write(f'{"view":<{width}}  {"命中":>10}  {"未命中":>10}  {"命中率":>7}')
+        for view, entry in stats.items():
+            self.stdout.write(f'{view:<{width}}  {entry["hit"]:>10,}  {entry["miss"]:>10,}  {_rate(entry["hit_rate"]):>7}')
+
+        hits = sum(entry['hit'] for entry in stats.values())
+        misses = sum(entry['miss'] for entry in stats.values())
+        total = hits + misses
+        self.stdout.write(self.style.SUCCESS(
+            f'{"合計":<{width}}  {hits:>10,}  {misses:>10,}  {_rate(hits / total if total else None):>7}'
+        ))
+
+        if options['reset']:
+            reset_cache_stats(views)
+            self.stdout.write('計數已歸零')
+
+
+def _rate(rate):
+    return '-' if rate is None else f'{rate:.1%}'
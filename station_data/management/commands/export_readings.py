@@ -0,0 +1,76 @@
+"""
+匯出數據記錄（串流寫檔，記憶體用量固定；包含已封存的數據）
+使用方法:
+    python manage.py export_readings --output readings.csv
+    python manage.py export_readings --station 1 --since 2025-01-01 --until 2025-12-31 --format parquet --output st1.parquet
+    python manage.py export_readings --format ndjson --gzip --output readings.ndjson.gz
+    python manage.py export_readings --fields temperature,ph --output -    # 輸出到 stdout
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from data_ingestion.models import Reading
+from station_data.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, ExportError, export_blocks
+from station_data.pagination import PaginationError, apply_reading_filters, parse_fields
+
+
+class Command(BaseCommand):
+    help = '匯出數據記錄為 CSV / NDJSON / Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--station', type=int, action='append', help='測站 ID（可重複指定，預設全部）')
+        parser.add_argument('--since', help='開始日期 YYYY-MM-DD（含）')
+        parser.add_argument('--until', help='結束日期 YYYY-MM-DD（含）')
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv', help='輸出格式（預設：csv）')
+        parser.add_argument('--fields', help='匯出的數值欄位（逗號分隔，預設全部）')
+        parser.add_argument('--gzip', action='store_true', help='以 gzip 壓縮')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help=f'每批讀取筆數（預設：{EXPORT_CHUNK_SIZE}）')
+        parser.add_argument('--output', required=True, help='輸出檔案路徑，- 表示 stdout')
+
+    def _parse_date(self, value):
+        try:
+            return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+        except ValueError:
+            raise CommandError(f'日期格式錯誤: {value}，請使用 YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        filters = {
+            'station_ids': options['station'] or None,
+            'start': self._parse_date(options['since']) if options['since'] else None,
+            # --until 含當天
+            'end': (
+                self._parse_date(options['until']) + timedelta(days=1, microseconds=-1)
+                if options['until'] else None
+            ),
+        }
+
+        try:
+            fields = parse_fields(options['fields'])
+            blocks = export_blocks(
+                apply_reading_filters(Reading.objects.all(), filters), options['format'], fields,
+                gzip=options['gzip'], chunk_size=options['chunk_size'], archive_filters=filters,
+            )
+        except (PaginationError, ExportError) as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        written = 0
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for block in blocks:
+                output.write(block)
+                written += len(block)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        if options['output'] != '-':
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'[完成] 已寫入 {options["output"]}（{written:,} bytes），耗時 {elapsed:.2f} 秒'
+            ))
@@ -5,10 +5,12 @@
     python manage.py simulate_ocean_data                    # 生成一次數據
     python manage.py simulate_ocean_data --continuous       # 持續生成（測試用）
     python manage.py simulate_ocean_data --count=10         # 生成 10 筆數據
+    python manage.py simulate_ocean_data --steps=1440       # 一次批次寫入每個測站 1440 個時間步（1 天）
 """
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from station_data.simulation import simulate_data_for_all_stations
+from station_data.simulation import simulate_batch, simulate_data_for_all_stations
+from datetime import timedelta
 import time
 
 
@@ -33,12 +35,28 @@ class Command(BaseCommand):
             default=60,
             help='連續模式下的生成間隔（秒，預設：60）',
         )
+        parser.add_argument(
+            '--steps',
+            type=int,
+            default=1,
+            help='批次模式：每個測站往回產生的時間步數（每步 1 分鐘，預設：1）',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='批次模式：每次 INSERT 的筆數（預設：500）',
+        )
 
     def handle(self, *args, **options):
         continuous = options['continuous']
         count = options['count']
         interval = options['interval']
 
+        if options['steps'] > 1:
+            self.generate_batch(options['steps'], options['chunk_size'])
+            return
+
         if continuous:
             self.stdout.write(
                 self.style.SUCCESS(
@@ -69,6 +87,16 @@ class Command(BaseCommand):
                 self.style.SUCCESS(f'\n✓ 已生成 {count} 輪數據。')
             )
 
+    def generate_batch(self, steps, chunk_size):
+        """批次產生所有測站過去 steps 分鐘的數據"""
+        result = simulate_batch(steps=steps, interval=timedelta(minutes=1), chunk_size=chunk_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ 批次寫入 {result['count']:,} 筆數據，耗時 {result['elapsed']:.2f} 秒"
+                f"（{result['rows_per_sec']:,.0f} 筆/秒）"
+            )
+        )
+
     def generate_data(self):
         """生成一輪數據"""
         try:
@@ -78,6 +106,7 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.SUCCESS(
                         f"✓ 生成 {result['count']} 筆數據 @ {timezone.now().strftime('%H:%M:%S')}"
+                        f"（{result['rows_per_sec']:,.0f} 筆/秒）"
                     )
                 )
                 
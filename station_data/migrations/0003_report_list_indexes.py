@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-17 12:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0006_station_latest'),
+        ('station_data', '0002_report_station_alter_report_report_type'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='report',
+            name='station_dat_report__251ffd_idx',
+        ),
+        migrations.AlterField(
+            model_name='report',
+            name='station',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reports', to='data_ingestion.station', verbose_name='關聯測站'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['report_type', '-created_at'], name='report_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['station', '-created_at'], name='report_station_created_idx'),
+        ),
+    ]
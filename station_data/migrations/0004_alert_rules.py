@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-17 13:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# 原本定時任務中寫死的門檻，改為預設的全測站規則
+DEFAULT_RULES = [
+    # (名稱, 參數, 下限, 上限, 遲滯)
+    ('水溫異常', 'temperature', 15.0, 30.0, 0.5),
+    ('pH 值異常', 'ph', 7.5, 8.5, 0.05),
+    ('溶氧過低', 'oxygen', 6.0, None, 0.2),
+]
+
+
+def create_default_rules(apps, schema_editor):
+    AlertRule = apps.get_model('station_data', 'AlertRule')
+    AlertRule.objects.bulk_create([
+        AlertRule(name=name, field=field, min_value=minimum, max_value=maximum, hysteresis=hysteresis)
+        for name, field, minimum, maximum, hysteresis in DEFAULT_RULES
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_ingestion', '0008_reading_count'),
+        ('station_data', '0003_report_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='規則名稱')),
+                ('field', models.CharField(choices=[('temperature', '溫度'), ('ph', '酸鹼值'), ('oxygen', '溶氧'), ('salinity', '鹽度'), ('conductivity', '電導率'), ('pressure', '壓力'), ('fluorescence', '螢光值'), ('turbidity', '濁度')], max_length=20, verbose_name='參數')),
+                ('min_value', models.FloatField(blank=True, null=True, verbose_name='下限')),
+                ('max_value', models.FloatField(blank=True, null=True, verbose_name='上限')),
+                ('hysteresis', models.FloatField(default=0, help_text='解除警報需回到門檻內的距離', verbose_name='遲滯')),
+                ('severity', models.CharField(choices=[('info', '資訊'), ('warning', '警告'), ('critical', '嚴重')], default='warning', max_length=20, verbose_name='嚴重程度')),
+                ('enabled', models.BooleanField(default=True, verbose_name='啟用')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='建立時間')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新時間')),
+                ('station', models.ForeignKey(blank=True, help_text='空白表示套用到所有測站', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alert_rules', to='data_ingestion.station', verbose_name='測站')),
+            ],
+            options={
+                'verbose_name': '警報規則',
+                'verbose_name_plural': '警報規則',
+                'ordering': ['field', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AlertEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=20, verbose_name='參數')),
+                ('severity', models.CharField(choices=[('info', '資訊'), ('warning', '警告'), ('critical', '嚴重')], max_length=20, verbose_name='嚴重程度')),
+                ('state', models.CharField(choices=[('active', '觸發中'), ('resolved', '已解除')], default='active', max_length=20, verbose_name='狀態')),
+                ('kind', models.CharField(choices=[('high', '高於上限'), ('low', '低於下限')], max_length=10, verbose_name='類型')),
+                ('threshold', models.FloatField(verbose_name='門檻')),
+                ('trigger_value', models.FloatField(verbose_name='觸發數值')),
+                ('peak_value', models.FloatField(verbose_name='極值')),
+                ('resolved_value', models.FloatField(blank=True, null=True, verbose_name='解除數值')),
+                ('reading_id', models.BigIntegerField(blank=True, null=True, verbose_name='觸發數據 ID')),
+                ('triggered_at', models.DateTimeField(verbose_name='觸發時間')),
+                ('resolved_at', models.DateTimeField(blank=True, null=True, verbose_name='解除時間')),
+                ('message', models.CharField(max_length=255, verbose_name='訊息')),
+                ('station', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='alert_events', to='data_ingestion.station', verbose_name='測站')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='station_data.alertrule', verbose_name='規則')),
+            ],
+            options={
+                'verbose_name': '警報事件',
+                'verbose_name_plural': '警報事件',
+                'ordering': ['-triggered_at'],
+                'indexes': [models.Index(fields=['station', '-triggered_at'], name='alert_station_triggered_idx'), models.Index(fields=['-triggered_at'], name='alert_triggered_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('state', 'active')), fields=('rule', 'station'), name='alert_event_one_active')],
+            },
+        ),
+        migrations.RunPython(create_default_rules, migrations.RunPython.noop),
+    ]
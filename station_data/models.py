@@ -40,7 +40,8 @@ class Report(models.Model):
         null=True,
         blank=True,
         related_name='reports',
-        verbose_name="關聯測站"
+        verbose_name="關聯測站",
+        db_index=False,  # 由 (station, -created_at) 複合索引涵蓋
     )
 
     status = models.CharField(
@@ -60,7 +61,10 @@ class Report(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['-created_at']),
-            models.Index(fields=['report_type']),
+            # 依類型篩選的報告列表（最新在前）
+            models.Index(fields=['report_type', '-created_at'], name='report_type_created_idx'),
+            # 測站報告（最新在前）
+            models.Index(fields=['station', '-created_at'], name='report_station_created_idx'),
         ]
 
     def __str__(self):
@@ -74,3 +78,117 @@ class Report(models.Model):
             'warning': 'warning',
         }
         return status_map.get(self.status, 'secondary')
+
+
+class AlertRule(models.Model):
+    """
+    警報規則 - 參數超出範圍時觸發警報（於數據寫入時評估，見 station_data.alerts）
+
+    - 未指定測站時套用到所有測站
+    - 數值低於 min_value 或高於 max_value 時觸發；回到
+      [min_value + hysteresis, max_value - hysteresis] 內才解除
+    """
+
+    FIELD_CHOICES = [
+        ('temperature', '溫度'),
+        ('ph', '酸鹼值'),
+        ('oxygen', '溶氧'),
+        ('salinity', '鹽度'),
+        ('conductivity', '電導率'),
+        ('pressure', '壓力'),
+        ('fluorescence', '螢光值'),
+        ('turbidity', '濁度'),
+    ]
+
+    SEVERITY_CHOICES = [
+        ('info', '資訊'),
+        ('warning', '警告'),
+        ('critical', '嚴重'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name="規則名稱")
+    station = models.ForeignKey(
+        'data_ingestion.Station',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='alert_rules',
+        verbose_name="測站",
+        help_text="空白表示套用到所有測站",
+    )
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES, verbose_name="參數")
+    min_value = models.FloatField(null=True, blank=True, verbose_name="下限")
+    max_value = models.FloatField(null=True, blank=True, verbose_name="上限")
+    hysteresis = models.FloatField(default=0, verbose_name="遲滯", help_text="解除警報需回到門檻內的距離")
+    severity = models.CharField(max_length=20, choices=SEVERITY_CHOICES, default='warning', verbose_name="嚴重程度")
+    enabled = models.BooleanField(default=True, verbose_name="啟用")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="建立時間")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新時間")
+
+    class Meta:
+        verbose_name = "警報規則"
+        verbose_name_plural = "警報規則"
+        ordering = ['field', 'name']
+
+    def __str__(self):
+        scope = self.station_id or '全部測站'
+        return f"{self.name}（{self.get_field_display()}，{scope}）"
+
+
+class AlertEvent(models.Model):
+    """
+    警報事件 - 同一規則、同一測站同時只有一個觸發中的事件
+
+    觸發期間的後續超標數據只更新 peak_value，回到遲滯範圍內後標記為已解除。
+    """
+
+    STATE_CHOICES = [
+        ('active', '觸發中'),
+        ('resolved', '已解除'),
+    ]
+
+    KIND_CHOICES = [
+        ('high', '高於上限'),
+        ('low', '低於下限'),
+    ]
+
+    rule = models.ForeignKey(AlertRule, on_delete=models.CASCADE, related_name='events', verbose_name="規則")
+    station = models.ForeignKey(
+        'data_ingestion.Station',
+        on_delete=models.CASCADE,
+        related_name='alert_events',
+        verbose_name="測站",
+        db_index=False,  # 由 (station, -triggered_at) 複合索引涵蓋
+    )
+    field = models.CharField(max_length=20, verbose_name="參數")
+    severity = models.CharField(max_length=20, choices=AlertRule.SEVERITY_CHOICES, verbose_name="嚴重程度")
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='active', verbose_name="狀態")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="類型")
+    threshold = models.FloatField(verbose_name="門檻")
+    trigger_value = models.FloatField(verbose_name="觸發數值")
+    peak_value = models.FloatField(verbose_name="極值")
+    resolved_value = models.FloatField(null=True, blank=True, verbose_name="解除數值")
+    reading_id = models.BigIntegerField(null=True, blank=True, verbose_name="觸發數據 ID")
+    triggered_at = models.DateTimeField(verbose_name="觸發時間")
+    resolved_at = models.DateTimeField(null=True, blank=True, verbose_name="解除時間")
+    message = models.CharField(max_length=255, verbose_name="訊息")
+
+    class Meta:
+        verbose_name = "警報事件"
+        verbose_name_plural = "警報事件"
+        ordering = ['-triggered_at']
+        constraints = [
+            # 去重：同一規則、同一測站只能有一個觸發中的事件（跨行程也成立）
+            models.UniqueConstraint(
+                fields=['rule', 'station'],
+                condition=models.Q(state='active'),
+                name='alert_event_one_active',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['station', '-triggered_at'], name='alert_station_triggered_idx'),
+            models.Index(fields=['-triggered_at'], name='alert_triggered_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.message} - {self.triggered_at.strftime('%Y-%m-%d %H:%M')}"
@@ -0,0 +1,227 @@
+"""
+數據記錄的 keyset（cursor）分頁
+
+依 (timestamp, id) 由新到舊排序，以上一頁最後一筆的 (timestamp, id) 作為游標，
+查詢條件為「比游標更舊」，因此第 N 頁與第 1 頁同樣只需一次索引範圍掃描，
+不會像 OFFSET 隨頁數線性變慢。
+
+游標為不透明字串（URL-safe base64），內容為方向、時間（微秒）與 ID：
+- n：較舊的下一頁
+- p：較新的上一頁
+"""
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# 可投影 / 篩選的數值欄位
+READING_VALUE_FIELDS = [
+    'temperature', 'conductivity', 'pressure', 'oxygen', 'ph',
+    'fluorescence', 'turbidity', 'salinity', 'latitude', 'longitude',
+]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# BigAutoField 的上限（超過的 ID 無法傳給資料庫）
+MAX_PK = 2 ** 63 - 1
+
+
+class PaginationError(ValueError):
+    """游標或查詢參數無效"""
+
+
+def encode_cursor(direction, timestamp, pk):
+    """產生不透明游標；direction 為 'n'（較舊）或 'p'（較新）"""
+    raw = f'{direction}:{(timestamp - EPOCH) // MICROSECOND}:{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游標，回傳 (direction, timestamp, pk)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, micros, pk = raw.split(':')
+        if direction not in ('n', 'p'):
+            raise ValueError(direction)
+        pk = int(pk)
+        if not 0 < pk <= MAX_PK:
+            raise ValueError(pk)
+        return direction, EPOCH + int(micros) * MICROSECOND, pk
+    except (ValueError, OverflowError, UnicodeDecodeError) as e:
+        raise PaginationError('無效的游標') from e
+
+
+def _key(item):
+    if isinstance(item, dict):
+        return item['timestamp'], item['id']
+    return item.timestamp, item.pk
+
+
+class KeysetPage:
+    """一頁數據；items 為新到舊排列"""
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def paginate_readings(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    以 keyset 分頁取出一頁數據
+
+    Args:
+        queryset: Reading QuerySet（可已篩選、select_related、only 或 values）
+        cursor: 上一次回傳的 next_cursor / previous_cursor；None 表示最新一頁
+        limit: 每頁筆數
+
+    Returns:
+        KeysetPage
+    """
+    if cursor:
+        direction, timestamp, pk = decode_cursor(cursor)
+    else:
+        direction, timestamp, pk = 'n', None, None
+
+    if direction == 'n':
+        if timestamp is not None:
+            # timestamp__lte 讓資料庫能以時間索引做範圍掃描，OR 條件只處理同一時間的數據
+            queryset = queryset.filter(
+                Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk), timestamp__lte=timestamp,
+            )
+        rows = list(queryset.order_by('-timestamp', '-id')[:limit + 1])
+        items = rows[:limit]
+        next_cursor = encode_cursor('n', *_key(items[-1])) if len(rows) > limit else None
+        previous_cursor = encode_cursor('p', *_key(items[0])) if timestamp is not None and items else None
+        return KeysetPage(items, next_cursor, previous_cursor)
+
+    queryset = queryset.filter(
+        Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk), timestamp__gte=timestamp,
+    )
+    rows = list(queryset.order_by('timestamp', 'id')[:limit + 1])
+    items = rows[:limit][::-1]
+    previous_cursor = encode_cursor('p', *_key(items[0])) if len(rows) > limit else None
+    next_cursor = encode_cursor('n', *_key(items[-1])) if items else None
+    return KeysetPage(items, next_cursor, previous_cursor)
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError('limit 必須是整數')
+    return min(max(limit, 1), MAX_PAGE_SIZE)
+
+
+def _parse_time(value, name):
+    # 格式正確但數值無效（例如 13 月）時 parse_datetime 會拋出 ValueError
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(value)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        # 資料庫以 UTC 比較，超出 UTC 可表示範圍的時間（例如 9999-12-31 負時區）在此拒絕
+        parsed.astimezone(dt_timezone.utc)
+    except (ValueError, OverflowError) as e:
+        raise PaginationError(f'{name} 必須是 ISO 8601 時間') from e
+    return parsed
+
+
+def parse_reading_filters(params):
+    """
+    解析數據篩選參數
+
+    - station：測站 ID，可重複或以逗號分隔
+    - start / end：ISO 8601 時間（含）
+    - <欄位>_min / <欄位>_max：數值範圍（例如 temperature_min=20）
+
+    Returns:
+        {'station_ids': 測站 ID 列表或 None, 'start', 'end', 'ranges': [(欄位, 'gte' / 'lte', Decimal), ...]}
+    """
+    station_ids = [value for raw in params.getlist('station') for value in raw.split(',') if value]
+    try:
+        station_ids = [int(value) for value in station_ids] or None
+    except ValueError:
+        raise PaginationError('station 必須是測站 ID')
+    # 超出 bigint 範圍的 ID 會在資料庫查詢時出錯（匯出串流時已送出 200）
+    if station_ids and not all(0 < station_id <= MAX_PK for station_id in station_ids):
+        raise PaginationError('station 必須是測站 ID')
+
+    ranges = []
+    for field in READING_VALUE_FIELDS:
+        for suffix, lookup in (('min', 'gte'), ('max', 'lte')):
+            value = params.get(f'{field}_{suffix}')
+            if value in (None, ''):
+                continue
+            try:
+                number = Decimal(value)
+            except InvalidOperation:
+                number = None
+            # Decimal 接受 NaN / Infinity，資料庫查詢與封存篩選都無法處理
+            if number is None or not number.is_finite():
+                raise PaginationError(f'{field}_{suffix} 必須是數值')
+            ranges.append((field, lookup, number))
+
+    return {
+        'station_ids': station_ids,
+        'start': _parse_time(params['start'], 'start') if params.get('start') else None,
+        'end': _parse_time(params['end'], 'end') if params.get('end') else None,
+        'ranges': ranges,
+    }
+
+
+def apply_reading_filters(queryset, filters):
+    """將 parse_reading_filters() 的結果套用到 Reading QuerySet"""
+    if filters.get('station_ids') is not None:
+        queryset = queryset.filter(station_id__in=filters['station_ids'])
+    if filters.get('start') is not None:
+        queryset = queryset.filter(timestamp__gte=filters['start'])
+    if filters.get('end') is not None:
+        queryset = queryset.filter(timestamp__lte=filters['end'])
+    for field, lookup, value in filters.get('ranges', ()):
+        queryset = queryset.filter(**{f'{field}__{lookup}': value})
+    return queryset
+
+
+def filter_readings(queryset, params):
+    """依查詢參數篩選數據（參數見 parse_reading_filters）"""
+    return apply_reading_filters(queryset, parse_reading_filters(params))
+
+
+def parse_fields(value):
+    """fields 參數（逗號分隔）轉為要投影的數值欄位；未指定時回傳全部"""
+    if not value:
+        return list(READING_VALUE_FIELDS)
+    fields = [field for field in value.split(',') if field]
+    unknown = set(fields) - set(READING_VALUE_FIELDS)
+    if unknown:
+        raise PaginationError(f'未知的欄位: {", ".join(sorted(unknown))}')
+    return [field for field in READING_VALUE_FIELDS if field in fields]
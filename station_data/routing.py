@@ -5,6 +5,9 @@ from django.urls import re_path
 from . import consumers
 
 websocket_urlpatterns = [
+    # 由客戶端訊息訂閱測站（連線後不預設訂閱）
+    re_path(r'ws/stations/$', consumers.StationReadingConsumer.as_asgi(), {'subscribe_all': False}),
+
     # 所有測站的即時資料
     re_path(r'ws/stations/readings/$', consumers.StationReadingConsumer.as_asgi()),
 
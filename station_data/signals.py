@@ -0,0 +1,66 @@
+"""
+station_data 的訊號接收器
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from data_ingestion.models import Station
+from data_ingestion.signals import readings_ingested, readings_purged
+from .alerts import bump_rules_version, process_readings
+from .broadcast import broadcast_readings
+from .caching import bump_versions, invalidate_readings, invalidate_report_counts
+from .models import AlertRule, Report
+
+
+@receiver(readings_ingested)
+def push_new_readings(sender, readings, live=True, **kwargs):
+    """新數據寫入後推播到 WebSocket 群組（歷史回填不推播）"""
+    if live:
+        broadcast_readings(readings)
+
+
+@receiver(readings_ingested)
+def evaluate_alert_rules(sender, readings, live=True, columns=None, **kwargs):
+    """新數據寫入後評估警報規則（歷史回填不產生警報）"""
+    if live:
+        process_readings(readings, columns=columns)
+
+
+@receiver(readings_ingested)
+def invalidate_reading_caches(sender, readings, **kwargs):
+    """新數據寫入後使相關測站的頁面與圖表快取失效（含歷史回填）"""
+    invalidate_readings(readings)
+
+
+@receiver(readings_purged)
+def invalidate_purged_caches(sender, station_ids, **kwargs):
+    """大量刪除數據後使相關測站的頁面與圖表快取失效"""
+    bump_versions(station_ids)
+
+
+@receiver(post_save, sender=Station)
+@receiver(post_delete, sender=Station)
+def invalidate_station_caches(sender, instance, **kwargs):
+    """測站資料異動後使該測站與總覽頁面的快取失效（刪除測站會連帶刪除其報告）"""
+    bump_versions([instance.pk])
+    invalidate_report_counts()
+
+
+@receiver(post_save, sender=Report)
+def invalidate_report_list_counts(sender, created, **kwargs):
+    """
+    新增報告後清除報告數量統計
+
+    刪除不使用 post_delete 接收器（會使大量刪除無法走快速刪除），
+    由執行刪除的程式呼叫 invalidate_report_counts()
+    """
+    if created:
+        invalidate_report_counts()
+
+
+@receiver(post_save, sender=AlertRule)
+@receiver(post_delete, sender=AlertRule)
+def recompile_alert_rules(sender, **kwargs):
+    """警報規則異動後（交易提交時）讓各行程重新編譯評估器"""
+    transaction.on_commit(bump_rules_version)
@@ -4,8 +4,9 @@
 模擬真實的海洋環境數據變化，包括溫度、鹽度、溶氧等參數的自然波動
 """
 import random
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
+from data_ingestion.ingest import bulk_insert_readings
 from data_ingestion.models import Station, Reading
 from django.utils import timezone
 
@@ -58,17 +59,20 @@ class OceanDataSimulator:
         else:
             self.base_temp_offset = 0
         
-    def calculate_diurnal_factor(self):
+    def calculate_diurnal_factor(self, timestamp=None):
         """
         計算日週期係數 (0-1)
         中午 = 1.0，午夜 = 0.0
+
+        Args:
+            timestamp: 計算的時間點（預設為現在），批次產生多個時間步時使用
         """
-        hour = timezone.now().hour
+        hour = (timestamp or timezone.now()).hour
         # 使用正弦波表示日週期
         import math
         return (math.sin((hour - 6) * math.pi / 12) + 1) / 2
     
-    def generate_temperature(self):
+    def generate_temperature(self, timestamp=None):
         """
         根據時間和測站位置生成溫度值
 
@@ -77,7 +81,7 @@ class OceanDataSimulator:
         - 測站緯度（影響基礎溫度）
         - 隨機波動
         """
-        diurnal = self.calculate_diurnal_factor()
+        diurnal = self.calculate_diurnal_factor(timestamp)
         # 日間溫度較高，夜間較低
         variation = diurnal * self.TEMP_AMPLITUDE
         random_noise = random.uniform(-0.5, 0.5)
@@ -90,9 +94,9 @@ class OceanDataSimulator:
         salinity = self.BASE_SALINITY + variation
         return round(Decimal(str(salinity)), 4)
     
-    def generate_oxygen(self):
+    def generate_oxygen(self, timestamp=None):
         """生成溶氧值（與溫度反相關）"""
-        diurnal = self.calculate_diurnal_factor()
+        diurnal = self.calculate_diurnal_factor(timestamp)
         # 溫度高時溶氧低，溫度低時溶氧高
         variation = (1 - diurnal) * self.OXYGEN_AMPLITUDE
         random_noise = random.uniform(-0.3, 0.3)
@@ -117,9 +121,9 @@ class OceanDataSimulator:
         conductivity = self.BASE_CONDUCTIVITY + variation
         return round(Decimal(str(conductivity)), 2)
     
-    def generate_fluorescence(self):
+    def generate_fluorescence(self, timestamp=None):
         """生成螢光值（葉綠素濃度）"""
-        diurnal = self.calculate_diurnal_factor()
+        diurnal = self.calculate_diurnal_factor(timestamp)
         # 日間光合作用較強，螢光值較高
         variation = diurnal * 1.0
         random_noise = random.uniform(-0.2, 0.2)
@@ -167,16 +171,19 @@ class OceanDataSimulator:
             round(Decimal(str(new_lng)), 6)
         )
 
-    def generate_reading(self, station):
+    def build_reading(self, station, timestamp=None):
         """
-        生成完整的一筆數據記錄
+        產生一筆尚未存檔的數據記錄（供批次寫入使用）
 
         Args:
             station: Station 實例
+            timestamp: 數據時間（預設為現在）
 
         Returns:
-            Reading 實例（已保存到資料庫）
+            未存檔的 Reading 實例
         """
+        timestamp = timestamp or timezone.now()
+
         # 如果測站有基礎座標,生成帶漂移的位置
         latitude, longitude = None, None
         if station.latitude and station.longitude:
@@ -185,23 +192,79 @@ class OceanDataSimulator:
                 float(station.longitude)
             )
 
-        reading = Reading.objects.create(
+        return Reading(
             station=station,
-            timestamp=timezone.now(),
-            temperature=self.generate_temperature(),
+            timestamp=timestamp,
+            temperature=self.generate_temperature(timestamp),
             conductivity=self.generate_conductivity(),
             pressure=self.generate_pressure(),
-            oxygen=self.generate_oxygen(),
+            oxygen=self.generate_oxygen(timestamp),
             ph=self.generate_ph(),
-            fluorescence=self.generate_fluorescence(),
+            fluorescence=self.generate_fluorescence(timestamp),
             turbidity=self.generate_turbidity(),
             salinity=self.generate_salinity(),
             latitude=latitude,
             longitude=longitude,
         )
+
+    def generate_reading(self, station):
+        """
+        生成完整的一筆數據記錄
+
+        Args:
+            station: Station 實例
+
+        Returns:
+            Reading 實例（已保存到資料庫）
+        """
+        reading = self.build_reading(station)
+        reading.save()
         return reading
 
 
+def simulate_batch(stations=None, steps=1, interval=timedelta(minutes=1), end_time=None, chunk_size=500):
+    """
+    批次為多個測站產生多個時間步的數據，並以 bulk_create 一次寫入
+
+    所有數據先在記憶體中產生，再於單一交易內分批 INSERT，
+    取代每個測站各自 Reading.objects.create 的逐筆寫入。
+
+    Args:
+        stations: 測站列表（預設為所有測站）
+        steps: 每個測站產生的時間步數
+        interval: 時間步間隔
+        end_time: 最後一個時間步的時間（預設為現在）
+        chunk_size: 每次 INSERT 的筆數
+
+    Returns:
+        {
+            'readings': 已寫入的 Reading 列表,
+            'count': 筆數,
+            'elapsed': 寫入耗時（秒）,
+            'rows_per_sec': 每秒寫入筆數,
+        }
+    """
+    if stations is None:
+        stations = list(Station.objects.all())
+    end_time = end_time or timezone.now()
+    timestamps = [end_time - interval * i for i in reversed(range(steps))]
+
+    pending = []
+    for station in stations:
+        # 每個測站一個模擬器（依緯度調整基礎溫度），只在記憶體中運算
+        simulator = OceanDataSimulator(station=station)
+        for timestamp in timestamps:
+            pending.append(simulator.build_reading(station, timestamp))
+
+    created, elapsed = bulk_insert_readings(pending, chunk_size=chunk_size)
+    return {
+        'readings': created,
+        'count': len(created),
+        'elapsed': elapsed,
+        'rows_per_sec': len(created) / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
 def simulate_data_for_all_stations():
     """
     為所有測站生成模擬數據
@@ -211,6 +274,7 @@ def simulate_data_for_all_stations():
     2. 為每個測站創建專屬的 OceanDataSimulator 實例
     3. 根據測站的地理位置（緯度）調整數據參數
     4. 生成帶有 GPS 漂移的監測數據（模擬海上移動設備）
+    5. 透過 simulate_batch 一次 bulk_create 寫入所有測站的數據
 
     Returns:
         包含生成結果的字典
@@ -218,26 +282,25 @@ def simulate_data_for_all_stations():
             'status': 'success' 或 'error',
             'count': 生成的數據筆數,
             'readings': 數據記錄列表,
-            'timestamp': 生成時間
+            'timestamp': 生成時間,
+            'elapsed': 寫入耗時（秒）,
+            'rows_per_sec': 每秒寫入筆數
         }
     """
-    stations = Station.objects.all()
+    stations = list(Station.objects.all())
 
-    if not stations.exists():
+    if not stations:
         return {
             'status': 'error',
             'message': '沒有找到任何測站',
             'count': 0
         }
 
-    created_readings = []
-
-    for station in stations:
-        # 為每個測站創建專屬的模擬器實例
-        # 這樣每個測站會有不同的基礎參數（例如根據緯度調整的溫度）
-        simulator = OceanDataSimulator(station=station)
-        reading = simulator.generate_reading(station)
+    batch = simulate_batch(stations=stations)
 
+    created_readings = []
+    for reading in batch['readings']:
+        station = reading.station
         created_readings.append({
             'station_id': station.id,
             'station_name': station.station_name,
@@ -257,4 +320,6 @@ def simulate_data_for_all_stations():
         'count': len(created_readings),
         'readings': created_readings,
         'timestamp': timezone.now().isoformat(),
+        'elapsed': batch['elapsed'],
+        'rows_per_sec': batch['rows_per_sec'],
     }
@@ -0,0 +1,62 @@
+"""
+數據筆數統計（儀表板、測站列表、測站詳情共用）
+
+由 ReadingCount 計數器（資料庫中的數據）與 ReadingArchive（已封存的數據）加總，
+不對 Reading 執行 COUNT；計數器的維護與核對見 data_ingestion.counters。
+"""
+from datetime import timedelta
+
+from django.db.models import BigIntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from data_ingestion.models import ReadingArchive, ReadingCount
+
+RECENT_DAYS = 7
+
+
+def _station_sum(model, field):
+    """依測站加總的子查詢（沒有紀錄時為 0）"""
+    totals = (
+        model.objects.filter(station=OuterRef('pk'))
+        .order_by()
+        .values('station')
+        .annotate(total=Sum(field))
+        .values('total')
+    )
+    return Coalesce(Subquery(totals, output_field=BigIntegerField()), Value(0, output_field=BigIntegerField()))
+
+
+def annotate_reading_counts(stations):
+    """測站 QuerySet 加上 reading_count（含已封存的數據）"""
+    return stations.annotate(
+        reading_count=_station_sum(ReadingCount, 'count') + _station_sum(ReadingArchive, 'rows')
+    )
+
+
+def station_reading_count(station_id):
+    """單一測站的數據筆數（含已封存的數據）"""
+    hot = ReadingCount.objects.filter(station_id=station_id).aggregate(total=Sum('count'))['total']
+    archived = ReadingArchive.objects.filter(station_id=station_id).aggregate(total=Sum('rows'))['total']
+    return (hot or 0) + (archived or 0)
+
+
+def reading_totals(recent_days=RECENT_DAYS):
+    """
+    全系統的數據筆數
+
+    Returns:
+        {'total': 總筆數（含已封存）, 'archived': 已封存筆數,
+         'recent': 最近 recent_days 天（以當地日期計，含今天）的筆數}
+    """
+    since = timezone.localdate() - timedelta(days=recent_days - 1)
+    counts = ReadingCount.objects.aggregate(
+        total=Sum('count'),
+        recent=Sum('count', filter=Q(day__gte=since)),
+    )
+    archived = ReadingArchive.objects.aggregate(total=Sum('rows'))['total'] or 0
+    return {
+        'total': (counts['total'] or 0) + archived,
+        'archived': archived,
+        'recent': counts['recent'] or 0,
+    }
@@ -0,0 +1,193 @@
+"""
+Server-Sent Events 即時數據流
+
+同一個 process 內，每個測站只建立一個 channel layer 監聽器（StationSubscription），
+收到的更新再分送給所有開著該測站頁面的連線，避免每個分頁各自輪詢資料庫。
+
+事件格式：
+    id: <reading_id>            供瀏覽器斷線重連時帶回 Last-Event-ID
+    event: reading
+    data: <單筆數據 JSON>        只傳新的一筆（增量），不再重送統計與圖表
+
+另每隔 HEARTBEAT_SECONDS 送出註解行保持連線；若沒有 channel layer，
+改由單一輪詢器（每測站一個）查詢新數據。
+"""
+import asyncio
+import json
+import logging
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+
+from data_ingestion.models import Station, Reading
+from .broadcast import build_reading_payload, station_group_name
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 3000
+POLL_SECONDS = 5
+REPLAY_LIMIT = 500
+QUEUE_SIZE = 100
+
+
+def format_sse(payload, event='reading'):
+    """將單筆數據轉為 SSE 訊息字串"""
+    return f"id: {payload['reading_id']}\nevent: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+class StationSubscription:
+    """單一測站的共用監聽器，將更新分送給所有訂閱的佇列"""
+
+    def __init__(self, station_id):
+        self.station_id = station_id
+        self.queues = set()
+        self.channel_layer = get_channel_layer()
+        self.channel_name = None
+        self.task = None
+
+    async def start(self):
+        if self.channel_layer is not None:
+            self.channel_name = await self.channel_layer.new_channel()
+            await self.channel_layer.group_add(station_group_name(self.station_id), self.channel_name)
+            self.task = asyncio.ensure_future(self._listen())
+        else:
+            self.task = asyncio.ensure_future(self._poll())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+        if self.channel_name:
+            await self.channel_layer.group_discard(station_group_name(self.station_id), self.channel_name)
+
+    def publish(self, payload):
+        """分送給所有訂閱者；慢速連線的佇列滿了就丟掉最舊的訊息"""
+        # 每個測站只序列化一次，所有分頁共用
+        item = (payload['reading_id'], format_sse(payload))
+        for queue in self.queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(item)
+
+    async def _listen(self):
+        while True:
+            try:
+                event = await self.channel_layer.receive(self.channel_name)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('測站 %s 的即時數據監聽失敗', self.station_id)
+                await asyncio.sleep(POLL_SECONDS)
+                continue
+
+            if event.get('type') != 'sensor_reading_update':
+                continue
+            if 'text' in event:
+                payload = json.loads(event['text'])['data']
+            else:
+                payload = event['data']['data']
+            self.publish(payload)
+
+    async def _poll(self):
+        last_id = await _latest_reading_id(self.station_id)
+        while True:
+            await asyncio.sleep(POLL_SECONDS)
+            for payload in await _readings_after(self.station_id, last_id):
+                last_id = payload['reading_id']
+                self.publish(payload)
+
+
+class StationStreamHub:
+    """管理各測站的共用監聽器（每個 process 一個）"""
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.lock = None
+
+    def _get_lock(self):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        return self.lock
+
+    async def subscribe(self, station_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        async with self._get_lock():
+            subscription = self.subscriptions.get(station_id)
+            if subscription is None:
+                subscription = StationSubscription(station_id)
+                await subscription.start()
+                self.subscriptions[station_id] = subscription
+            subscription.queues.add(queue)
+        return queue
+
+    async def unsubscribe(self, station_id, queue):
+        async with self._get_lock():
+            subscription = self.subscriptions.get(station_id)
+            if subscription is None:
+                return
+            subscription.queues.discard(queue)
+            if not subscription.queues:
+                del self.subscriptions[station_id]
+                await subscription.stop()
+
+    def subscriber_count(self, station_id):
+        subscription = self.subscriptions.get(station_id)
+        return len(subscription.queues) if subscription else 0
+
+
+hub = StationStreamHub()
+
+
+@database_sync_to_async
+def _latest_reading_id(station_id):
+    return Reading.objects.filter(station_id=station_id).order_by('-pk').values_list('pk', flat=True).first()
+
+
+@database_sync_to_async
+def _readings_after(station_id, last_id):
+    """last_id 之後的數據（依寫入順序）；last_id 為 None 時只取最新一筆"""
+    station_name = Station.objects.filter(pk=station_id).values_list('station_name', flat=True).first()
+    readings = Reading.objects.filter(station_id=station_id)
+    if last_id is None:
+        latest = readings.order_by('-timestamp').first()
+        return [build_reading_payload(latest, station_name)] if latest else []
+    readings = readings.filter(pk__gt=last_id).order_by('pk')[:REPLAY_LIMIT]
+    return [build_reading_payload(reading, station_name) for reading in readings]
+
+
+def _parse_last_event_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def station_event_stream(station_id, last_event_id=None):
+    """
+    單一連線的 SSE 產生器
+
+    1. 先訂閱共用監聽器，避免補送期間漏掉新數據
+    2. 有 Last-Event-ID 時補送之後的數據，否則送出最新一筆作為初始狀態
+    3. 之後只轉送新數據，閒置時送心跳
+    """
+    queue = await hub.subscribe(station_id)
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+
+        last_id = _parse_last_event_id(last_event_id)
+        for payload in await _readings_after(station_id, last_id):
+            last_id = payload['reading_id']
+            yield format_sse(payload)
+
+        while True:
+            try:
+                reading_id, message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': heartbeat\n\n'
+                continue
+            # 補送期間已送出的數據不重複推送
+            if last_id is not None and reading_id <= last_id:
+                continue
+            yield message
+    finally:
+        await hub.unsubscribe(station_id, queue)
@@ -22,7 +22,8 @@ def update_ocean_data_from_source():
     result = simulate_data_for_all_stations()
 
     if result['status'] == 'success':
-        print(f"[定時任務] 成功生成 {result['count']} 筆數據記錄")
+        print(f"[定時任務] 成功生成 {result['count']} 筆數據記錄"
+              f"（{result['rows_per_sec']:,.0f} 筆/秒）")
         for reading in result['readings']:
             print(f"  - {reading['station_name']}: {reading['temperature']}°C, "
                   f"pH={reading['ph']}, 溶氧={reading['oxygen']}mg/L, "
@@ -33,51 +34,56 @@ def update_ocean_data_from_source():
     return result
 
 
+def _summarize_alert_events(since):
+    """
+    彙整 since 之後觸發的警報事件（一次 GROUP BY 查詢，不掃描 Reading）
+
+    事件由數據寫入時的規則引擎產生（見 station_data.alerts），
+    同一段持續超標只記一個事件。
+    """
+    from django.db.models import Count, Max, Min, Q
+    from .models import AlertEvent
+
+    rows = (
+        AlertEvent.objects.filter(triggered_at__gte=since)
+        .order_by()
+        .values('rule__name', 'kind')
+        .annotate(
+            events=Count('id'),
+            active=Count('id', filter=Q(state='active')),
+            stations=Count('station', distinct=True),
+            highest=Max('peak_value'),
+            lowest=Min('peak_value'),
+        )
+        .order_by('rule__name', 'kind')
+    )
+    alerts = []
+    for row in rows:
+        if row['kind'] == 'high':
+            detail = f"高於上限，最高 {row['highest']:g}"
+        else:
+            detail = f"低於下限，最低 {row['lowest']:g}"
+        alerts.append(
+            f"{row['rule__name']}：{row['stations']} 個測站 {row['events']} 次{detail}"
+            f"（{row['active']} 個尚未解除）"
+        )
+    return alerts
+
+
 @shared_task
 def check_ocean_data_alerts():
     """
-    檢查海洋數據異常並發送警告（定時任務）
+    彙整最近 24 小時的警報事件（定時任務）
 
-    這個任務會由 Celery Beat 定時執行
-    檢查項目：
-    - 溫度異常（過高或過低）
-    - pH 值異常
-    - 溶氧量過低
+    這個任務會由 Celery Beat 定時執行；
+    檢查項目（溫度、pH 值、溶氧等）由 AlertRule 設定，於數據寫入時評估
     """
-    from data_ingestion.models import Reading
     from django.utils import timezone
     from datetime import timedelta
 
     print("[定時任務] 開始檢查海洋數據異常...")
 
-    # 取得最近 24 小時的數據
-    yesterday = timezone.now() - timedelta(hours=24)
-    recent_readings = Reading.objects.filter(timestamp__gte=yesterday)
-
-    alerts = []
-
-    # 檢查溫度異常（超過 30°C 或低於 15°C）
-    high_temp = recent_readings.filter(temperature__gt=30).count()
-    low_temp = recent_readings.filter(temperature__lt=15).count()
-
-    if high_temp > 0:
-        alerts.append(f'發現 {high_temp} 筆高溫數據（>30°C）')
-    if low_temp > 0:
-        alerts.append(f'發現 {low_temp} 筆低溫數據（<15°C）')
-
-    # 檢查 pH 值異常（正常範圍 7.5-8.5）
-    abnormal_ph = recent_readings.filter(ph__isnull=False).exclude(
-        ph__gte=7.5, ph__lte=8.5
-    ).count()
-
-    if abnormal_ph > 0:
-        alerts.append(f'發現 {abnormal_ph} 筆 pH 值異常（不在 7.5-8.5 範圍）')
-
-    # 檢查溶氧量過低（< 6 mg/L）
-    low_oxygen = recent_readings.filter(oxygen__lt=6, oxygen__isnull=False).count()
-
-    if low_oxygen > 0:
-        alerts.append(f'發現 {low_oxygen} 筆溶氧量過低（<6 mg/L）')
+    alerts = _summarize_alert_events(timezone.now() - timedelta(hours=24))
 
     if alerts:
         print(f"[定時任務] 發現 {len(alerts)} 個警告")
@@ -93,6 +99,72 @@ def check_ocean_data_alerts():
     }
 
 
+# 每日統計的 8 個參數
+STATISTICS_FIELDS = [
+    'temperature', 'ph', 'oxygen', 'salinity',
+    'conductivity', 'pressure', 'fluorescence', 'turbidity',
+]
+
+
+def _aggregate_readings_by_station(readings):
+    """
+    以單一 GROUP BY 查詢取得各測站的筆數與各參數統計
+
+    除了 avg/max/min 外另取 sum 與非空筆數，全系統平均值由各測站的
+    sum / count 合併而來，不需要再掃描一次資料表。
+    """
+    from django.db.models import Avg, Count, Max, Min, Sum
+
+    annotations = {'total': Count('id')}
+    for field in STATISTICS_FIELDS:
+        annotations[f'avg_{field}'] = Avg(field)
+        annotations[f'max_{field}'] = Max(field)
+        annotations[f'min_{field}'] = Min(field)
+        annotations[f'sum_{field}'] = Sum(field)
+        annotations[f'count_{field}'] = Count(field)
+
+    rows = readings.order_by().values('station_id').annotate(**annotations)
+    return {row['station_id']: row for row in rows}
+
+
+def _merge_station_aggregates(rows):
+    """由各測站的分組結果合併出全系統統計（與 aggregate() 的鍵名相同）"""
+    merged = {}
+    for field in STATISTICS_FIELDS:
+        total = sum(row[f'sum_{field}'] or 0 for row in rows)
+        count = sum(row[f'count_{field}'] for row in rows)
+        maxima = [row[f'max_{field}'] for row in rows if row[f'max_{field}'] is not None]
+        minima = [row[f'min_{field}'] for row in rows if row[f'min_{field}'] is not None]
+        merged[f'avg_{field}'] = float(total) / count if count else None
+        merged[f'max_{field}'] = max(maxima) if maxima else None
+        merged[f'min_{field}'] = min(minima) if minima else None
+    return merged
+
+
+def _statistics_content(stats):
+    """轉為報告 content 的 averages 欄位（平均值、最大值、最小值）"""
+    def to_float(value):
+        return float(value) if value is not None else None
+
+    averages = {field: to_float(stats[f'avg_{field}']) for field in STATISTICS_FIELDS}
+    averages.update({f'max_{field}': to_float(stats[f'max_{field}']) for field in STATISTICS_FIELDS})
+    averages.update({f'min_{field}': to_float(stats[f'min_{field}']) for field in STATISTICS_FIELDS})
+    return averages
+
+
+PERCENTILE_LABELS = {'temperature': ('溫度', '°C'), 'oxygen': ('溶氧', ' mg/L')}
+
+
+def _percentile_lines(percentiles):
+    """報告摘要的百分位數（P5 / P50 / P95）"""
+    lines = []
+    for field, (label, unit) in PERCENTILE_LABELS.items():
+        summary = percentiles.get(field)
+        if summary and summary['count']:
+            lines.append(f"{label} P5 / P50 / P95: {summary['p5']:.2f} / {summary['p50']:.2f} / {summary['p95']:.2f}{unit}")
+    return lines
+
+
 @shared_task
 def generate_daily_statistics():
     """
@@ -106,12 +178,16 @@ def generate_daily_statistics():
     - 各測站數據筆數
     - 平均溫度、鹽度、溶氧等 8 個參數
     - 異常數據數量
+
+    今日數據只掃描一次：各測站統計來自同一個 GROUP BY 查詢，全系統統計
+    由分組結果合併；所有報告以一次 bulk_create 寫入。查詢數不隨測站數增加。
     """
     from data_ingestion.models import Station, Reading
+    from data_ingestion.sketches import daily_percentiles
     from station_data.models import Report
+    from django.db import transaction
+    from .caching import invalidate_report_counts
     from django.utils import timezone
-    from datetime import timedelta
-    from django.db.models import Avg, Count, Max, Min
 
     print("[定時任務] 開始產生每日統計報告...")
 
@@ -120,69 +196,41 @@ def generate_daily_statistics():
     today_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
     today_readings = Reading.objects.filter(timestamp__gte=today_start)
 
+    stations = list(Station.objects.only('id', 'station_name', 'location'))
+    grouped = _aggregate_readings_by_station(today_readings)
+
     # 統計各測站數據筆數
-    station_stats = []
-    for station in Station.objects.all():
-        count = today_readings.filter(station=station).count()
-        station_stats.append({
+    station_stats = [
+        {
             'station_name': station.station_name,
-            'today_count': count,
+            'today_count': grouped[station.id]['total'] if station.id in grouped else 0,
             'location': station.location
-        })
-
-    # 計算平均值和範圍 (8個完整參數,每個都有 min/max)
-    avg_stats = today_readings.aggregate(
-        # 溫度
-        avg_temperature=Avg('temperature'),
-        max_temperature=Max('temperature'),
-        min_temperature=Min('temperature'),
-        # pH
-        avg_ph=Avg('ph'),
-        max_ph=Max('ph'),
-        min_ph=Min('ph'),
-        # 溶氧
-        avg_oxygen=Avg('oxygen'),
-        max_oxygen=Max('oxygen'),
-        min_oxygen=Min('oxygen'),
-        # 鹽度
-        avg_salinity=Avg('salinity'),
-        max_salinity=Max('salinity'),
-        min_salinity=Min('salinity'),
-        # 電導率
-        avg_conductivity=Avg('conductivity'),
-        max_conductivity=Max('conductivity'),
-        min_conductivity=Min('conductivity'),
-        # 壓力
-        avg_pressure=Avg('pressure'),
-        max_pressure=Max('pressure'),
-        min_pressure=Min('pressure'),
-        # 螢光值
-        avg_fluorescence=Avg('fluorescence'),
-        max_fluorescence=Max('fluorescence'),
-        min_fluorescence=Min('fluorescence'),
-        # 濁度
-        avg_turbidity=Avg('turbidity'),
-        max_turbidity=Max('turbidity'),
-        min_turbidity=Min('turbidity'),
-    )
+        }
+        for station in stations
+    ]
+
+    avg_stats = _merge_station_aggregates(list(grouped.values()))
+    total_readings = sum(row['total'] for row in grouped.values())
 
-    total_readings = today_readings.count()
+    # 百分位數由今日的日分位數摘要合併（各測站一筆，不讀原始數據）
+    station_percentiles, percentiles = daily_percentiles(today_start)
 
     print(f"[定時任務] 今日數據筆數: {total_readings}")
-    print(f"[定時任務] 平均溫度: {avg_stats['avg_temperature']:.2f}°C" if avg_stats['avg_temperature'] else "[定時任務] 無溫度數據")
+    print(f"[定時任務] 平均溫度: {avg_stats['avg_temperature']:.2f}°C" if avg_stats['avg_temperature'] is not None else "[定時任務] 無溫度數據")
 
     # 生成報告摘要
     summary_lines = [
         f"總數據筆數: {total_readings}",
         f"監測測站數: {len(station_stats)}",
     ]
-    if avg_stats['avg_temperature']:
+    if avg_stats['avg_temperature'] is not None:
         summary_lines.append(f"平均溫度: {float(avg_stats['avg_temperature']):.2f}°C")
-    if avg_stats['avg_salinity']:
+    if avg_stats['avg_salinity'] is not None:
         summary_lines.append(f"平均鹽度: {float(avg_stats['avg_salinity']):.4f}")
+    summary_lines.extend(_percentile_lines(percentiles))
 
-    # 保存報告到數據庫 (包含完整的 8 個參數及其 min/max)
-    report = Report.objects.create(
+    # 全系統報告 (包含完整的 8 個參數及其 min/max)
+    reports = [Report(
         report_type='daily_statistics',
         title=f'{today} 每日統計報告',
         status='success' if total_readings > 0 else 'warning',
@@ -191,106 +239,39 @@ def generate_daily_statistics():
             'date': today.isoformat(),
             'total_readings': total_readings,
             'station_stats': station_stats,
-            'averages': {
-                # 平均值
-                'temperature': float(avg_stats['avg_temperature']) if avg_stats['avg_temperature'] else None,
-                'ph': float(avg_stats['avg_ph']) if avg_stats['avg_ph'] else None,
-                'oxygen': float(avg_stats['avg_oxygen']) if avg_stats['avg_oxygen'] else None,
-                'salinity': float(avg_stats['avg_salinity']) if avg_stats['avg_salinity'] else None,
-                'conductivity': float(avg_stats['avg_conductivity']) if avg_stats['avg_conductivity'] else None,
-                'pressure': float(avg_stats['avg_pressure']) if avg_stats['avg_pressure'] else None,
-                'fluorescence': float(avg_stats['avg_fluorescence']) if avg_stats['avg_fluorescence'] else None,
-                'turbidity': float(avg_stats['avg_turbidity']) if avg_stats['avg_turbidity'] else None,
-                # 最大值
-                'max_temperature': float(avg_stats['max_temperature']) if avg_stats['max_temperature'] else None,
-                'max_ph': float(avg_stats['max_ph']) if avg_stats['max_ph'] else None,
-                'max_oxygen': float(avg_stats['max_oxygen']) if avg_stats['max_oxygen'] else None,
-                'max_salinity': float(avg_stats['max_salinity']) if avg_stats['max_salinity'] else None,
-                'max_conductivity': float(avg_stats['max_conductivity']) if avg_stats['max_conductivity'] else None,
-                'max_pressure': float(avg_stats['max_pressure']) if avg_stats['max_pressure'] else None,
-                'max_fluorescence': float(avg_stats['max_fluorescence']) if avg_stats['max_fluorescence'] else None,
-                'max_turbidity': float(avg_stats['max_turbidity']) if avg_stats['max_turbidity'] else None,
-                # 最小值
-                'min_temperature': float(avg_stats['min_temperature']) if avg_stats['min_temperature'] else None,
-                'min_ph': float(avg_stats['min_ph']) if avg_stats['min_ph'] else None,
-                'min_oxygen': float(avg_stats['min_oxygen']) if avg_stats['min_oxygen'] else None,
-                'min_salinity': float(avg_stats['min_salinity']) if avg_stats['min_salinity'] else None,
-                'min_conductivity': float(avg_stats['min_conductivity']) if avg_stats['min_conductivity'] else None,
-                'min_pressure': float(avg_stats['min_pressure']) if avg_stats['min_pressure'] else None,
-                'min_fluorescence': float(avg_stats['min_fluorescence']) if avg_stats['min_fluorescence'] else None,
-                'min_turbidity': float(avg_stats['min_turbidity']) if avg_stats['min_turbidity'] else None,
-            }
+            'averages': _statistics_content(avg_stats),
+            'percentiles': percentiles,
         },
-    )
-
-    print(f"[定時任務] 全系統報告已保存，ID: {report.id}")
+    )]
 
     # ==========================================
     # 為每個測站生成獨立的統計報告
     # ==========================================
-    station_report_ids = []
+    for station in stations:
+        station_stats_agg = grouped.get(station.id)
 
-    for station in Station.objects.all():
-        # 取得該測站今天的數據
-        station_today_readings = today_readings.filter(station=station)
-        station_count = station_today_readings.count()
-
-        if station_count == 0:
+        if station_stats_agg is None:
             print(f"[定時任務] 測站 {station.station_name} 今日無數據，跳過")
             continue
 
-        # 計算該測站的平均值和範圍
-        station_stats_agg = station_today_readings.aggregate(
-            # 溫度
-            avg_temperature=Avg('temperature'),
-            max_temperature=Max('temperature'),
-            min_temperature=Min('temperature'),
-            # pH
-            avg_ph=Avg('ph'),
-            max_ph=Max('ph'),
-            min_ph=Min('ph'),
-            # 溶氧
-            avg_oxygen=Avg('oxygen'),
-            max_oxygen=Max('oxygen'),
-            min_oxygen=Min('oxygen'),
-            # 鹽度
-            avg_salinity=Avg('salinity'),
-            max_salinity=Max('salinity'),
-            min_salinity=Min('salinity'),
-            # 電導率
-            avg_conductivity=Avg('conductivity'),
-            max_conductivity=Max('conductivity'),
-            min_conductivity=Min('conductivity'),
-            # 壓力
-            avg_pressure=Avg('pressure'),
-            max_pressure=Max('pressure'),
-            min_pressure=Min('pressure'),
-            # 螢光值
-            avg_fluorescence=Avg('fluorescence'),
-            max_fluorescence=Max('fluorescence'),
-            min_fluorescence=Min('fluorescence'),
-            # 濁度
-            avg_turbidity=Avg('turbidity'),
-            max_turbidity=Max('turbidity'),
-            min_turbidity=Min('turbidity'),
-        )
+        station_count = station_stats_agg['total']
 
         # 生成測站報告摘要
         station_summary_lines = [
             f"測站: {station.station_name} ({station.location})",
             f"數據筆數: {station_count}",
         ]
-        if station_stats_agg['avg_temperature']:
+        if station_stats_agg['avg_temperature'] is not None:
             station_summary_lines.append(f"平均溫度: {float(station_stats_agg['avg_temperature']):.2f}°C")
-        if station_stats_agg['avg_salinity']:
+        if station_stats_agg['avg_salinity'] is not None:
             station_summary_lines.append(f"平均鹽度: {float(station_stats_agg['avg_salinity']):.4f}")
+        station_summary_lines.extend(_percentile_lines(station_percentiles.get(station.id, {})))
 
-        # 保存測站報告
-        station_report = Report.objects.create(
+        reports.append(Report(
             report_type='station_daily',
             station=station,  # 關聯到特定測站
             title=f'{today} {station.station_name} 每日統計',
-            status='success' if station_count > 0 else 'warning',
+            status='success',
             summary='\n'.join(station_summary_lines),
             content={
                 'date': today.isoformat(),
@@ -298,41 +279,18 @@ def generate_daily_statistics():
                 'station_name': station.station_name,
                 'station_location': station.location,
                 'total_readings': station_count,
-                'averages': {
-                    # 平均值
-                    'temperature': float(station_stats_agg['avg_temperature']) if station_stats_agg['avg_temperature'] else None,
-                    'ph': float(station_stats_agg['avg_ph']) if station_stats_agg['avg_ph'] else None,
-                    'oxygen': float(station_stats_agg['avg_oxygen']) if station_stats_agg['avg_oxygen'] else None,
-                    'salinity': float(station_stats_agg['avg_salinity']) if station_stats_agg['avg_salinity'] else None,
-                    'conductivity': float(station_stats_agg['avg_conductivity']) if station_stats_agg['avg_conductivity'] else None,
-                    'pressure': float(station_stats_agg['avg_pressure']) if station_stats_agg['avg_pressure'] else None,
-                    'fluorescence': float(station_stats_agg['avg_fluorescence']) if station_stats_agg['avg_fluorescence'] else None,
-                    'turbidity': float(station_stats_agg['avg_turbidity']) if station_stats_agg['avg_turbidity'] else None,
-                    # 最大值
-                    'max_temperature': float(station_stats_agg['max_temperature']) if station_stats_agg['max_temperature'] else None,
-                    'max_ph': float(station_stats_agg['max_ph']) if station_stats_agg['max_ph'] else None,
-                    'max_oxygen': float(station_stats_agg['max_oxygen']) if station_stats_agg['max_oxygen'] else None,
-                    'max_salinity': float(station_stats_agg['max_salinity']) if station_stats_agg['max_salinity'] else None,
-                    'max_conductivity': float(station_stats_agg['max_conductivity']) if station_stats_agg['max_conductivity'] else None,
-                    'max_pressure': float(station_stats_agg['max_pressure']) if station_stats_agg['max_pressure'] else None,
-                    'max_fluorescence': float(station_stats_agg['max_fluorescence']) if station_stats_agg['max_fluorescence'] else None,
-                    'max_turbidity': float(station_stats_agg['max_turbidity']) if station_stats_agg['max_turbidity'] else None,
-                    # 最小值
-                    'min_temperature': float(station_stats_agg['min_temperature']) if station_stats_agg['min_temperature'] else None,
-                    'min_ph': float(station_stats_agg['min_ph']) if station_stats_agg['min_ph'] else None,
-                    'min_oxygen': float(station_stats_agg['min_oxygen']) if station_stats_agg['min_oxygen'] else None,
-                    'min_salinity': float(station_stats_agg['min_salinity']) if station_stats_agg['min_salinity'] else None,
-                    'min_conductivity': float(station_stats_agg['min_conductivity']) if station_stats_agg['min_conductivity'] else None,
-                    'min_pressure': float(station_stats_agg['min_pressure']) if station_stats_agg['min_pressure'] else None,
-                    'min_fluorescence': float(station_stats_agg['min_fluorescence']) if station_stats_agg['min_fluorescence'] else None,
-                    'min_turbidity': float(station_stats_agg['min_turbidity']) if station_stats_agg['min_turbidity'] else None,
-                }
+                'averages': _statistics_content(station_stats_agg),
+                'percentiles': station_percentiles.get(station.id, {}),
             },
-        )
+        ))
 
-        station_report_ids.append(station_report.id)
-        print(f"[定時任務] 測站 {station.station_name} 報告已保存，ID: {station_report.id}")
+    # 保存所有報告（一次寫入；bulk_create 不觸發 post_save，自行清除報告數量統計）
+    with transaction.atomic():
+        report, *station_reports = Report.objects.bulk_create(reports)
+        invalidate_report_counts()
 
+    station_report_ids = [station_report.id for station_report in station_reports]
+    print(f"[定時任務] 全系統報告已保存，ID: {report.id}")
     print(f"[定時任務] 完成！生成了 1 個全系統報告 + {len(station_report_ids)} 個測站報告")
 
     return {
@@ -343,7 +301,124 @@ def generate_daily_statistics():
         'date': today.isoformat(),
         'total_readings': total_readings,
         'station_stats': station_stats,
-        'averages': avg_stats,
+        'averages': _statistics_content(avg_stats),
+        'percentiles': percentiles,
+    }
+
+
+@shared_task
+def ensure_reading_partitions(months_ahead=3):
+    """
+    預先建立 Reading 未來月份的分區（定時任務）
+
+    只有在 PostgreSQL 且已執行過 `manage.py partition_readings --convert` 時才會動作，
+    其他情況直接回傳 skipped。
+    """
+    from data_ingestion import partitioning
+
+    if not partitioning.is_partitioned():
+        return {'status': 'skipped', 'partitions': []}
+
+    names = partitioning.ensure_monthly_partitions(months_ahead=months_ahead)
+    print(f"[定時任務] 已確認 {len(names)} 個 Reading 分區")
+    return {'status': 'success', 'partitions': names}
+
+
+def _progress_reporter(task):
+    """將刪除進度寫入任務狀態（PROGRESS），供前端輪詢"""
+    def report(deleted, total):
+        # 直接呼叫或 eager 執行時沒有結果後端可寫
+        if not task.request.id or task.request.is_eager:
+            return
+        try:
+            task.update_state(state='PROGRESS', meta={'deleted': deleted, 'total': total})
+        except Exception as e:
+            print(f"[背景任務] 無法更新進度: {e}")
+    return report
+
+
+@shared_task(bind=True)
+def purge_reports(self, chunk_size=None):
+    """
+    刪除所有報告（背景任務，依主鍵分批，可快速刪除時直接 TRUNCATE）
+    """
+    from data_ingestion.purge import DEFAULT_PURGE_CHUNK_SIZE, purge_queryset
+    from station_data.models import Report
+    from .caching import invalidate_report_counts
+
+    deleted = purge_queryset(
+        Report.objects.all(),
+        chunk_size=chunk_size or DEFAULT_PURGE_CHUNK_SIZE,
+        progress=_progress_reporter(self),
+    )
+    invalidate_report_counts()
+    print(f"[背景任務] 已刪除 {deleted} 個報告")
+    return {'status': 'success', 'deleted': deleted}
+
+
+@shared_task(bind=True)
+def purge_readings(self, station_ids=None, before=None, chunk_size=None):
+    """
+    刪除數據記錄（背景任務，依主鍵分批）
+
+    Args:
+        station_ids: 限定測站（None 表示全部）
+        before: ISO 8601 時間，只刪除此時間之前的數據
+        chunk_size: 每批筆數
+    """
+    from data_ingestion import purge
+
+    deleted = purge.purge_readings(
+        station_ids=station_ids,
+        before=datetime.fromisoformat(before) if before else None,
+        chunk_size=chunk_size or purge.DEFAULT_PURGE_CHUNK_SIZE,
+        progress=_progress_reporter(self),
+    )
+    print(f"[背景任務] 已刪除 {deleted} 筆數據記錄")
+    return {'status': 'success', 'deleted': deleted}
+
+
+@shared_task
+def reconcile_reading_counts(days=None):
+    """
+    核對數據筆數計數器（定時任務）
+
+    單筆刪除、修改時間戳或 COPY 寫入不會更新計數器，這裡以原始數據重新計算並修正。
+
+    Args:
+        days: 只核對最近幾天（None 表示全部）
+    """
+    from django.utils import timezone
+    from datetime import timedelta
+    from data_ingestion.counters import reconcile_reading_counts as reconcile
+
+    since = timezone.localdate() - timedelta(days=days) if days is not None else None
+    corrected = reconcile(since=since)
+    print(f"[定時任務] 已修正 {corrected} 筆數據筆數計數器")
+    return {'status': 'success', 'corrected': corrected}
+
+
+@shared_task
+def archive_old_readings(older_than_days=None):
+    """
+    將超過保留期限的數據封存為欄式壓縮檔（定時任務）
+
+    Args:
+        older_than_days: 保留天數（None 使用 settings.READING_RETENTION_DAYS）
+    """
+    from data_ingestion.archive import archive_readings
+
+    summary = archive_readings(older_than_days=older_than_days)
+    print(
+        f"[定時任務] 已封存 {summary['rows']} 筆數據記錄（{summary['months']} 個檔案），"
+        f"刪除 {summary['minute_rollups']} 筆分鐘彙總"
+    )
+    return {
+        'status': 'success',
+        'cutoff': summary['cutoff'].isoformat(),
+        'months': summary['months'],
+        'rows': summary['rows'],
+        'minute_rollups': summary['minute_rollups'],
     }
 
 
@@ -442,7 +517,6 @@ def send_data_alert_notification(user_id=None):
     Args:
         user_id: 可選的使用者 ID，如果提供則只通知該使用者
     """
-    from data_ingestion.models import Reading
     from apps.core.accounts.models import User
     from django.utils import timezone
     from datetime import timedelta
@@ -456,28 +530,8 @@ def send_data_alert_notification(user_id=None):
             print(f"[通知任務] 使用者 {user_id} 不存在")
             return {'status': 'error', 'message': 'User not found'}
 
-    # 取得最近 1 小時的數據
-    one_hour_ago = timezone.now() - timedelta(hours=1)
-    recent_readings = Reading.objects.filter(timestamp__gte=one_hour_ago)
-
-    alerts = []
-
-    # 檢查溫度異常
-    high_temp = recent_readings.filter(temperature__gt=30).count()
-    if high_temp > 0:
-        alerts.append(f'發現 {high_temp} 筆高溫數據（>30°C）')
-
-    # 檢查 pH 值異常
-    abnormal_ph = recent_readings.filter(ph__isnull=False).exclude(
-        ph__gte=7.5, ph__lte=8.5
-    ).count()
-    if abnormal_ph > 0:
-        alerts.append(f'發現 {abnormal_ph} 筆 pH 值異常')
-
-    # 檢查溶氧量過低
-    low_oxygen = recent_readings.filter(oxygen__lt=6, oxygen__isnull=False).count()
-    if low_oxygen > 0:
-        alerts.append(f'發現 {low_oxygen} 筆溶氧量過低')
+    # 最近 1 小時觸發的警報事件
+    alerts = _summarize_alert_events(timezone.now() - timedelta(hours=1))
 
     if alerts:
         print(f"[通知任務] 發現 {len(alerts)} 個警告")
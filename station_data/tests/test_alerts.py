@@ -0,0 +1,188 @@
+"""
+station_data.alerts 測試 - 寫入時評估警報規則（去重、遲滯、推播）
+"""
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.utils import timezone
+
+from data_ingestion.columns import ReadingColumns
+from data_ingestion.ingest import bulk_insert_readings
+from data_ingestion.models import Reading
+from station_data.alerts import build_alert_event, compile_evaluator
+from station_data.broadcast import station_group_name
+from station_data.models import AlertEvent, AlertRule
+from station_data.routing import websocket_urlpatterns
+from station_data.tasks import check_ocean_data_alerts
+
+
+def _ingest(station, temperatures, start, captured):
+    readings = [
+        Reading(station=station, timestamp=start + timedelta(minutes=index), temperature=Decimal(value))
+        for index, value in enumerate(temperatures)
+    ]
+    with captured(execute=True):
+        created, _ = bulk_insert_readings(readings)
+    return created
+
+
+def _temperature_events(station):
+    return list(AlertEvent.objects.filter(station=station, field='temperature').order_by('triggered_at'))
+
+
+def test_default_rules_are_created():
+    """測試遷移建立預設的溫度、pH、溶氧規則"""
+    assert set(AlertRule.objects.values_list('field', flat=True)) == {'temperature', 'ph', 'oxygen'}
+
+
+def test_breach_triggers_once_across_batches(station, django_capture_on_commit_callbacks):
+    """測試持續超標只產生一個事件，後續批次只更新極值"""
+    start = timezone.now() - timedelta(hours=1)
+    _ingest(station, ['25.00', '31.00', '32.50'], start, django_capture_on_commit_callbacks)
+    _ingest(station, ['33.00', '31.00'], start + timedelta(minutes=10), django_capture_on_commit_callbacks)
+
+    events = _temperature_events(station)
+    assert len(events) == 1
+    event = events[0]
+    assert (event.state, event.kind, event.threshold) == ('active', 'high', 30.0)
+    assert (event.trigger_value, event.peak_value) == (31.0, 33.0)
+    assert event.triggered_at == start + timedelta(minutes=1)
+
+
+def test_hysteresis_resolves_only_inside_band(station, django_capture_on_commit_callbacks):
+    """測試數值回到門檻內但未超過遲滯距離時不解除，也不重複觸發"""
+    start = timezone.now() - timedelta(hours=1)
+    # 上限 30、遲滯 0.5：29.8 仍在遲滯帶內，29.4 才解除
+    _ingest(station, ['31.00', '29.80', '30.20', '29.40'], start, django_capture_on_commit_callbacks)
+
+    events = _temperature_events(station)
+    assert len(events) == 1
+    assert events[0].state == 'resolved'
+    assert events[0].resolved_value == 29.4
+    assert events[0].resolved_at == start + timedelta(minutes=3)
+
+    # 解除後再次超標產生新事件
+    _ingest(station, ['30.50'], start + timedelta(minutes=10), django_capture_on_commit_callbacks)
+    assert [event.state for event in _temperature_events(station)] == ['resolved', 'active']
+
+
+def test_rule_changes_apply_to_next_batch(station, station_b, django_capture_on_commit_callbacks):
+    """測試規則異動後下一批數據使用新規則（含只套用到單一測站的規則）"""
+    start = timezone.now() - timedelta(hours=1)
+    _ingest(station, ['26.00'], start, django_capture_on_commit_callbacks)
+    assert not _temperature_events(station)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        AlertRule.objects.create(name='測站高溫', station=station, field='temperature', max_value=25, severity='critical')
+    _ingest(station, ['26.00'], start + timedelta(minutes=5), django_capture_on_commit_callbacks)
+    _ingest(station_b, ['26.00'], start + timedelta(minutes=5), django_capture_on_commit_callbacks)
+
+    events = _temperature_events(station)
+    assert [(event.rule.name, event.severity) for event in events] == [('測站高溫', 'critical')]
+    assert not _temperature_events(station_b)
+
+    rule = AlertRule.objects.get(name='測站高溫')
+    rule.enabled = False
+    with django_capture_on_commit_callbacks(execute=True):
+        rule.save()
+    _ingest(station, ['20.00'], start + timedelta(minutes=10), django_capture_on_commit_callbacks)
+    # 停用的規則不再評估，事件維持原狀
+    assert [event.state for event in _temperature_events(station)] == ['active']
+
+
+def test_columns_prefilter_matches_row_by_row(station, station_b):
+    """測試以整批陣列排除規則後，狀態變化與逐筆評估相同"""
+    start = timezone.now() - timedelta(hours=1)
+    readings = [
+        Reading(station=station, timestamp=start + timedelta(minutes=index), temperature=Decimal(value))
+        for index, value in enumerate(['25.00', '31.00', '29.00', '32.00'])
+    ] + [
+        Reading(station=station_b, timestamp=start + timedelta(minutes=index), temperature=Decimal('25.00'), ph=ph)
+        for index, ph in enumerate([Decimal('8.10'), None, Decimal('7.00')])
+    ]
+    evaluator = compile_evaluator()
+
+    expected = evaluator.evaluate(readings)
+
+    assert {(action[0], action[1].field, action[2].station_id) for action in expected} == {
+        ('trigger', 'temperature', station.id), ('resolve', 'temperature', station.id), ('trigger', 'ph', station_b.id),
+    }
+    assert evaluator.evaluate(readings, columns=ReadingColumns(readings)) == expected
+    assert evaluator.evaluate([], columns=ReadingColumns([])) == []
+
+
+def test_historical_backfill_does_not_alert(station, django_capture_on_commit_callbacks):
+    """測試歷史回填（live=False）不產生警報"""
+    with django_capture_on_commit_callbacks(execute=True):
+        bulk_insert_readings([Reading(station=station, timestamp=timezone.now(), temperature=Decimal('35.00'))], live=False)
+
+    assert not AlertEvent.objects.exists()
+
+
+def test_alert_event_is_pushed_after_commit(station, django_capture_on_commit_callbacks):
+    """測試觸發與解除都推送到測站群組與 all_stations 群組"""
+    layer = get_channel_layer()
+    channels = []
+    for group in (f'station_{station.id}', 'all_stations'):
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(group, channel)
+        channels.append(channel)
+
+    _ingest(station, ['14.00', '16.00'], timezone.now() - timedelta(minutes=5), django_capture_on_commit_callbacks)
+
+    for channel in channels:
+        messages = []
+        while len(messages) < 2:
+            event = async_to_sync(layer.receive)(channel)
+            if event['type'] == 'alert_event':
+                messages.append(json.loads(event['text']))
+        assert [message['data']['state'] for message in messages] == ['active', 'resolved']
+        assert messages[0]['data']['kind'] == 'low'
+        assert messages[0]['data']['value'] == 14.0
+        assert messages[1]['data']['value'] == 16.0
+
+
+def test_consumer_forwards_alerts_for_subscribed_stations(station, station_b, django_capture_on_commit_callbacks):
+    """測試 WebSocket 連線只收到訂閱測站的警報（不受 fields 限制）"""
+    start = timezone.now() - timedelta(minutes=5)
+    _ingest(station_b, ['40.00'], start, django_capture_on_commit_callbacks)
+    _ingest(station, ['10.00'], start, django_capture_on_commit_callbacks)
+    events = {event.station_id: build_alert_event(event) for event in AlertEvent.objects.all()}
+
+    async def scenario():
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/stations/')
+        await communicator.connect()
+        await communicator.send_json_to({'action': 'subscribe', 'stations': [station.id], 'fields': ['ph']})
+        await communicator.receive_json_from()  # subscribed
+        await communicator.receive_json_from()  # initial_data
+
+        layer = get_channel_layer()
+        await layer.group_send(station_group_name(station_b.id), events[station_b.id])
+        await layer.group_send(station_group_name(station.id), events[station.id])
+        message = await communicator.receive_json_from()
+        assert await communicator.receive_nothing(timeout=0.1)
+        await communicator.disconnect()
+        return message
+
+    message = async_to_sync(scenario)()
+
+    assert message['type'] == 'alert'
+    assert message['data']['station_id'] == station.id
+    assert message['data']['field'] == 'temperature'
+
+
+def test_alert_task_summarizes_events(station, station_b, django_capture_on_commit_callbacks):
+    """測試定時檢查任務由警報事件彙整"""
+    start = timezone.now() - timedelta(hours=2)
+    _ingest(station, ['31.00', '25.00', '32.00'], start, django_capture_on_commit_callbacks)
+    _ingest(station_b, ['33.00'], start, django_capture_on_commit_callbacks)
+
+    result = check_ocean_data_alerts()
+
+    assert result['alerts_count'] == 1
+    assert result['alerts'] == ['水溫異常：2 個測站 3 次高於上限，最高 33（2 個尚未解除）']
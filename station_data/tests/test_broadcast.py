@@ -0,0 +1,95 @@
+"""
+station_data.broadcast 測試 - 新數據寫入後的即時推播
+"""
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from data_ingestion.models import Reading
+from data_ingestion.signals import notify_readings_ingested
+from station_data.broadcast import build_reading_payload
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+
+
+def _join_group(group):
+    """建立一個加入指定群組的 channel，回傳 channel 名稱"""
+    layer = get_channel_layer()
+    channel = async_to_sync(layer.new_channel)()
+    async_to_sync(layer.group_add)(group, channel)
+    return channel
+
+
+def _receive(channel):
+    return async_to_sync(get_channel_layer().receive)(channel)
+
+
+def test_build_reading_payload_keeps_zero_values(station):
+    """測試 0 值不會被當成 None"""
+    reading = Reading(
+        station=station,
+        timestamp=timezone.now(),
+        temperature=Decimal('0.00'),
+        ph=None,
+    )
+
+    payload = build_reading_payload(reading, station.station_name)
+
+    assert payload['temperature'] == 0.0
+    assert payload['ph'] is None
+    assert payload['station_name'] == station.station_name
+
+
+def test_created_reading_is_broadcast_after_commit(station, django_capture_on_commit_callbacks):
+    """測試單筆新增的數據在交易提交後推送到測站群組與 all_stations"""
+    station_channel = _join_group(f'station_{station.id}')
+    all_channel = _join_group('all_stations')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        reading = Reading.objects.create(
+            station=station,
+            timestamp=timezone.now(),
+            temperature=Decimal('25.50'),
+        )
+
+    for channel in (station_channel, all_channel):
+        event = _receive(channel)
+        message = json.loads(event['text'])
+        assert event['type'] == 'sensor_reading_update'
+        assert message['type'] == 'sensor_reading_update'
+        assert message['data']['reading_id'] == reading.id
+        assert message['data']['temperature'] == 25.5
+
+
+def test_bulk_readings_are_broadcast_once_each(station, station_b, django_capture_on_commit_callbacks):
+    """測試批次寫入時每筆數據只推送一次"""
+    all_channel = _join_group('all_stations')
+    now = timezone.now()
+    readings = Reading.objects.bulk_create([
+        Reading(station=station, timestamp=now, temperature=Decimal('20.00')),
+        Reading(station=station_b, timestamp=now, temperature=Decimal('21.00')),
+    ])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        notify_readings_ingested(readings)
+
+    received = {json.loads(_receive(all_channel)['text'])['data']['station_id'] for _ in readings}
+    assert received == {station.id, station_b.id}
+
+
+def test_large_batches_broadcast_latest_per_station(station, settings, django_capture_on_commit_callbacks):
+    """測試大批寫入時每個測站只推送最新的幾筆"""
+    settings.BROADCAST_MAX_PER_STATION = 2
+    channel = _join_group(f'station_{station.id}')
+    now = timezone.now()
+    readings = Reading.objects.bulk_create([
+        Reading(station=station, timestamp=now - timedelta(minutes=i), temperature=Decimal(20 + i))
+        for i in range(5)
+    ])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        notify_readings_ingested(readings)
+
+    received = [json.loads(_receive(channel)['text'])['data']['temperature'] for _ in range(2)]
+    assert received == [21.0, 20.0]
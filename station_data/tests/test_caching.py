@@ -0,0 +1,133 @@
+"""
+station_data.caching 測試 - 版本化快取、失效與防雪崩
+"""
+import threading
+import time
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from data_ingestion.ingest import bulk_insert_readings
+from data_ingestion.models import Reading
+from station_data import caching
+from station_data.caching import bump_versions, cache_stats, data_version, get_or_compute
+
+
+def test_get_or_compute_hits_until_version_bumped(db):
+    """測試相同版本命中快取，版本遞增後重新計算"""
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert get_or_compute('demo', compute, station_id=1, time_range='24h') == 1
+    assert get_or_compute('demo', compute, station_id=1, time_range='24h') == 1
+    assert get_or_compute('demo', compute, station_id=1, time_range='7d') == 2
+
+    bump_versions([2])  # 其他測站不影響
+    assert get_or_compute('demo', compute, station_id=1, time_range='24h') == 1
+
+    bump_versions([1])
+    assert get_or_compute('demo', compute, station_id=1, time_range='24h') == 3
+    assert cache_stats(['demo'])['demo'] == {'hit': 2, 'miss': 3, 'hit_rate': 0.4}
+
+
+def test_ingest_bumps_station_and_global_versions(station, station_b, django_capture_on_commit_callbacks):
+    """測試寫入數據（交易提交後）遞增該測站與全系統版本"""
+    before = (data_version(station.id), data_version(station_b.id), data_version())
+
+    with django_capture_on_commit_callbacks(execute=True):
+        bulk_insert_readings([Reading(station=station, timestamp=timezone.now(), temperature=Decimal('25.00'))])
+
+    assert data_version(station.id) == before[0] + 1
+    assert data_version(station_b.id) == before[1]
+    assert data_version() == before[2] + 1
+
+
+def test_version_survives_eviction(db):
+    """測試版本鍵被淘汰後重建的版本號大於舊版本"""
+    old = data_version(5)
+    cache.delete('data_version:5')
+    time.sleep(0.002)
+    assert data_version(5) > old
+
+
+def test_concurrent_misses_compute_once(db, monkeypatch):
+    """測試同一個鍵同時未命中時只計算一次"""
+    monkeypatch.setattr(caching, 'LOCK_POLL_SECONDS', 0.01)
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 'value'
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(get_or_compute('slow', compute, station_id=1)))
+        for _ in range(5)
+    ]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['value'] * 5
+    assert len(calls) == 1
+
+
+def test_chart_api_cached_and_invalidated(authenticated_client, station, django_capture_on_commit_callbacks):
+    """測試圖表 API 命中快取，新數據寫入後回傳新結果"""
+    url = f'/stations/{station.id}/chart-data/?time_range=24h'
+    with django_capture_on_commit_callbacks(execute=True):
+        Reading.objects.create(station=station, timestamp=timezone.now(), temperature=Decimal('20.00'))
+
+    first = authenticated_client.get(url).json()
+    assert first['chart_data']['temperature'] == [20.0]
+    assert authenticated_client.get(url).json() == first
+    assert cache_stats(['chart_data'])['chart_data']['hit'] == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Reading.objects.create(station=station, timestamp=timezone.now(), temperature=Decimal('21.00'))
+
+    assert authenticated_client.get(url).json()['chart_data']['temperature'] == [20.0, 21.0]
+
+
+def test_cache_stats_command_reports_hit_rate(db):
+    """測試 cache_stats 指令輸出各 view 的命中率與合計，--reset 後歸零"""
+    get_or_compute('chart_data', lambda: 1, station_id=1)
+    for _ in range(3):
+        get_or_compute('chart_data', lambda: 1, station_id=1)
+    get_or_compute('station_detail', lambda: 1, station_id=1)
+
+    out = StringIO()
+    call_command('cache_stats', '--view', 'chart_data', '--view', 'station_detail', '--reset', stdout=out)
+
+    lines = out.getvalue().splitlines()
+    assert lines[1].split() == ['chart_data', '3', '1', '75.0%']
+    assert lines[2].split() == ['station_detail', '0', '1', '0.0%']
+    assert lines[3].split() == ['合計', '3', '2', '60.0%']
+    assert lines[4] == '計數已歸零'
+    assert cache_stats(['chart_data'])['chart_data'] == {'hit': 0, 'miss': 0, 'hit_rate': None}
+
+
+def test_unknown_parameters_share_default_cache_entry(authenticated_client, station):
+    """測試未知的 time_range / method 正規化後使用預設值的快取項目，模板取得正規化的時間範圍"""
+    chart_url = f'/stations/{station.id}/chart-data/'
+    authenticated_client.get(chart_url)
+    for params in ({'time_range': 'x' * 200}, {'method': 'bogus'}, {'time_range': '24h', 'method': 'lttb'}):
+        assert authenticated_client.get(chart_url, params).json()['time_range'] == '24h'
+    assert cache_stats(['chart_data'])['chart_data'] == {'hit': 3, 'miss': 1, 'hit_rate': 0.75}
+
+    response = authenticated_client.get(f'/stations/{station.id}/', {'time_range': 'bogus'})
+    assert response.context['time_range'] == '24h'
+    authenticated_client.get(f'/stations/{station.id}/', {'time_range': 'other'})
+    assert cache_stats(['station_detail'])['station_detail']['hit'] == 1
@@ -0,0 +1,184 @@
+"""
+StationReadingConsumer 測試 - 訂閱協定與待送訊息合併
+"""
+import asyncio
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.core.management import call_command
+from django.utils import timezone
+
+from data_ingestion.models import Reading, Station
+from station_data.broadcast import build_reading_payload, build_update_event, station_group_name
+from station_data.consumers import StationReadingConsumer, SubscriptionError, parse_subscription
+from station_data.routing import websocket_urlpatterns
+
+
+def _communicator(path):
+    return WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+
+
+def _event(station, temperature, reading_id):
+    reading = Reading(pk=reading_id, station=station, timestamp=timezone.now(), temperature=Decimal(temperature))
+    return build_update_event(build_reading_payload(reading, station.station_name))
+
+
+def test_parse_subscription_validates_input():
+    """測試訂閱訊息驗證與 max_rate 上限"""
+    assert parse_subscription({'stations': [2, 1], 'fields': ['ph', 'temperature'], 'max_rate': 100}) == (
+        {1, 2}, ('temperature', 'ph'), 10.0,
+    )
+    for message in ({'stations': ['1']}, {'stations': 3}, {'fields': ['password']}, {'max_rate': -1}):
+        with pytest.raises(SubscriptionError):
+            parse_subscription(message)
+
+
+def test_subscribe_multiple_stations_with_field_subset(station, station_b):
+    """測試單一連線訂閱多個測站，只收到訂閱的測站與欄位"""
+    Reading.objects.create(station=station, timestamp=timezone.now() - timedelta(minutes=1), temperature=Decimal('20.00'))
+
+    async def scenario():
+        communicator = _communicator('/ws/stations/')
+        connected, _ = await communicator.connect()
+        assert connected
+
+        await communicator.send_json_to({'action': 'subscribe', 'stations': [station.id], 'fields': ['temperature']})
+        state = await communicator.receive_json_from()
+        initial = await communicator.receive_json_from()
+
+        layer = get_channel_layer()
+        await layer.group_send(station_group_name(station_b.id), _event(station_b, '30.00', 901))
+        await layer.group_send(station_group_name(station.id), _event(station, '21.00', 902))
+        update = await communicator.receive_json_from()
+
+        await communicator.send_json_to({'action': 'unsubscribe'})
+        cleared = await communicator.receive_json_from()
+        await communicator.send_json_to({'action': 'bogus'})
+        error = await communicator.receive_json_from()
+        await communicator.disconnect()
+        return state, initial, update, cleared, error
+
+    state, initial, update, cleared, error = async_to_sync(scenario)()
+
+    assert state == {'type': 'subscribed', 'stations': [station.id], 'fields': ['temperature'], 'max_rate': None}
+    assert initial['type'] == 'initial_data'
+    assert [payload['temperature'] for payload in initial['data']] == [20.0]
+    assert update['data'] == {
+        'reading_id': 902, 'station_id': station.id, 'station_name': station.station_name,
+        'timestamp': update['data']['timestamp'], 'temperature': 21.0,
+    }
+    assert cleared['stations'] == []
+    assert error['type'] == 'error'
+
+
+def test_slow_client_receives_latest_value_per_station(station, station_b):
+    """測試受 max_rate 限制時，同一測站的待送訊息只保留最新一筆"""
+
+    async def scenario():
+        communicator = _communicator('/ws/stations/')
+        await communicator.connect()
+        await communicator.send_json_to({'action': 'subscribe', 'stations': [station.id, station_b.id], 'max_rate': 1})
+        await communicator.receive_json_from()  # subscribed（尚無數據，不送 initial_data）
+
+        layer = get_channel_layer()
+        # 第一筆立即送出，之後一秒內的更新被合併
+        await layer.group_send(station_group_name(station.id), _event(station, '20.00', 1))
+        first = await communicator.receive_json_from()
+        for reading_id in range(2, 12):
+            await layer.group_send(station_group_name(station.id), _event(station, f'{20 + reading_id}.00', reading_id))
+        await layer.group_send(station_group_name(station_b.id), _event(station_b, '15.00', 50))
+
+        received = [await communicator.receive_json_from(timeout=3) for _ in range(2)]
+        assert await communicator.receive_nothing(timeout=0.2)
+        await communicator.disconnect()
+        return first, received
+
+    first, received = async_to_sync(scenario)()
+
+    assert first['data']['reading_id'] == 1
+    assert [message['data']['reading_id'] for message in received] == [11, 50]
+
+
+def test_send_failure_closes_connection(station, monkeypatch):
+    """測試推送失敗時關閉連線（1011），而不是留下收不到更新的連線"""
+    original_send = StationReadingConsumer.send
+
+    async def failing_send(self, text_data=None, bytes_data=None, close=False):
+        if text_data and 'sensor_reading_update' in text_data:
+            raise RuntimeError('send failed')
+        await original_send(self, text_data=text_data, bytes_data=bytes_data, close=close)
+
+    monkeypatch.setattr(StationReadingConsumer, 'send', failing_send)
+
+    async def scenario():
+        communicator = _communicator('/ws/stations/')
+        await communicator.connect()
+        await communicator.send_json_to({'action': 'subscribe', 'stations': [station.id]})
+        await communicator.receive_json_from()  # subscribed
+
+        await get_channel_layer().group_send(station_group_name(station.id), _event(station, '20.00', 1))
+        output = await communicator.receive_output(timeout=1)
+        await communicator.wait()
+        return output
+
+    assert async_to_sync(scenario)() == {'type': 'websocket.close', 'code': 1011}
+
+
+def test_disconnect_after_failed_connect_and_awaits_sender(station):
+    """測試 connect() 提早失敗（尚未建立推送工作）時 disconnect 不會出錯；正常斷線時等待推送工作結束"""
+    async def scenario():
+        await StationReadingConsumer().disconnect(1006)
+
+        consumer = StationReadingConsumer()
+        consumer.channel_layer = get_channel_layer()
+        consumer.channel_name = await consumer.channel_layer.new_channel()
+        consumer.all_stations = False
+        consumer.stations = set()
+        consumer.pending = {}
+        consumer.wakeup = asyncio.Event()
+        consumer.min_interval = 0.0
+        await consumer.join_stations({station.id})
+        consumer.sender = asyncio.ensure_future(consumer.drain_pending())
+        await consumer.disconnect(1000)
+        return consumer
+
+    consumer = async_to_sync(scenario)()
+    assert consumer.sender.cancelled()
+    assert consumer.stations == set()
+
+
+def test_legacy_endpoint_sends_initial_data(station):
+    """測試舊的單一測站端點連線即訂閱並送出最新數據"""
+    reading = Reading.objects.create(station=station, timestamp=timezone.now(), temperature=Decimal('22.00'))
+
+    async def scenario():
+        communicator = _communicator(f'/ws/stations/{station.id}/')
+        await communicator.connect()
+        initial = await communicator.receive_json_from()
+        await communicator.disconnect()
+        return initial
+
+    initial = async_to_sync(scenario)()
+    assert initial == {'type': 'initial_data', 'data': build_reading_payload(reading, station.station_name)}
+
+
+def test_fanout_benchmark_reports_latency(db, tmp_path):
+    """測試負載測試指令送達所有訊息並輸出可比較的 JSON 結果"""
+    output = tmp_path / 'bench.jsonl'
+    call_command(
+        'benchmark_websocket_fanout', connections=20, stations=2, rate=20, duration=0.5,
+        drain_timeout=5, output=str(output), stdout=StringIO(),
+    )
+
+    result = json.loads(output.read_text())
+    assert result['lost'] == 0
+    assert result['delivered'] == result['expected'] > 0
+    assert result['p99_ms'] >= result['p50_ms']
+    assert not Station.objects.filter(station_name__startswith='bench-').exists()
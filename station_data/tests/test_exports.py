@@ -0,0 +1,103 @@
+"""
+station_data.exports 測試 - 串流匯出
+"""
+import csv
+import gzip
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from data_ingestion.models import Reading
+from station_data.exports import ExportError, aiter_blocks, export_blocks
+
+
+@pytest.fixture
+def export_readings(station, station_b):
+    now = timezone.now()
+    Reading.objects.bulk_create(
+        [Reading(station=station, timestamp=now - timedelta(minutes=i), temperature=Decimal('20.50'), ph=None)
+         for i in range(25)]
+        + [Reading(station=station_b, timestamp=now, temperature=Decimal('0.00'))]
+    )
+    return station
+
+
+def test_csv_export_streams_in_chunks(export_readings):
+    """測試 CSV 以多個區塊輸出，依時間排序且保留 0 與空值"""
+    blocks = list(export_blocks(Reading.objects.all(), 'csv', ['temperature', 'ph'], chunk_size=10))
+    assert len(blocks) == 3
+
+    rows = list(csv.DictReader(io.StringIO(b''.join(blocks).decode())))
+    assert len(rows) == 26
+    assert list(rows[0]) == ['id', 'station_id', 'station_name', 'timestamp', 'temperature', 'ph']
+    assert rows[0]['station_name'] == export_readings.station_name
+    assert rows[0]['ph'] == ''
+    assert rows[-1]['temperature'] == '0.00'
+    assert [row['timestamp'] for row in rows] == sorted(row['timestamp'] for row in rows)
+
+
+def test_ndjson_gzip_export(export_readings):
+    """測試 NDJSON 串流 gzip 壓縮後可完整解壓"""
+    data = b''.join(export_blocks(
+        Reading.objects.filter(station=export_readings), 'ndjson', ['temperature'], gzip=True, chunk_size=7,
+    ))
+    rows = [json.loads(line) for line in gzip.decompress(data).splitlines()]
+    assert len(rows) == 25
+    assert rows[0]['temperature'] == 20.5
+
+
+def test_empty_csv_export_has_header(db):
+    """測試沒有數據時仍輸出標題列"""
+    assert b''.join(export_blocks(Reading.objects.all(), 'csv', ['ph'])) == b'id,station_id,station_name,timestamp,ph\r\n'
+
+
+def test_parquet_export_row_groups(export_readings):
+    """測試 Parquet 依 row group 分批寫出"""
+    pq = pytest.importorskip('pyarrow.parquet')
+    from station_data import exports
+
+    blocks = list(exports.parquet_blocks(exports.iter_row_chunks(Reading.objects.all(), ['temperature'], 10),
+                                         ['temperature'], row_group_size=10))
+    parquet = pq.ParquetFile(io.BytesIO(b''.join(blocks)))
+    assert parquet.metadata.num_rows == 26
+    assert parquet.metadata.num_row_groups == 3
+
+
+def test_export_rejects_unknown_format(db):
+    with pytest.raises(ExportError):
+        export_blocks(Reading.objects.all(), 'xlsx')
+
+
+def test_export_endpoint_streams_attachment(authenticated_client, export_readings):
+    """測試匯出端點回傳串流附件"""
+    response = authenticated_client.get(
+        reverse('station_data:readings_export'), {'station': export_readings.id, 'fields': 'temperature'}
+    )
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Disposition'] == f'attachment; filename="readings-{export_readings.id}.csv"'
+    assert len(b''.join(response.streaming_content).splitlines()) == 26
+
+    assert authenticated_client.get(reverse('station_data:readings_export'), {'format': 'xlsx'}).status_code == 400
+
+
+def test_export_command_writes_file(export_readings, tmp_path):
+    """測試匯出指令寫出 gzip 檔案"""
+    output = tmp_path / 'readings.csv.gz'
+    call_command('export_readings', output=str(output), gzip=True, stdout=io.StringIO())
+    assert len(gzip.decompress(output.read_bytes()).splitlines()) == 27
+
+
+def test_aiter_blocks_yields_each_block(db):
+    """測試 ASGI 下逐塊取出同步產生器的內容"""
+    async def collect():
+        return [block async for block in aiter_blocks(iter([b'a', b'b']))]
+
+    assert async_to_sync(collect)() == [b'a', b'b']
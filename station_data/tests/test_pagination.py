@@ -0,0 +1,126 @@
+"""
+station_data.pagination 測試 - keyset 分頁與數據記錄 API
+"""
+import base64
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from data_ingestion.models import Reading
+from station_data.pagination import (
+    PaginationError, decode_cursor, encode_cursor, filter_readings, paginate_readings,
+)
+
+
+@pytest.fixture
+def history(station):
+    """25 筆數據，其中兩筆時間相同（驗證以 id 區分）"""
+    now = timezone.now().replace(microsecond=123456)
+    readings = Reading.objects.bulk_create([
+        Reading(station=station, timestamp=now - timedelta(minutes=i), temperature=Decimal(f'{20 + i * 0.1:.2f}'))
+        for i in range(24)
+    ] + [Reading(station=station, timestamp=now - timedelta(minutes=5), temperature=Decimal('99.00'))])
+    return sorted(readings, key=lambda reading: (reading.timestamp, reading.pk), reverse=True)
+
+
+def test_cursor_round_trip():
+    """測試游標可還原方向、時間（微秒）與 ID，且無效游標會被拒絕"""
+    timestamp = timezone.now()
+    assert decode_cursor(encode_cursor('n', timestamp, 42)) == ('n', timestamp, 42)
+    with pytest.raises(PaginationError):
+        decode_cursor('not-a-cursor')
+
+
+def test_pages_forward_and_back_without_gaps(history):
+    """測試向舊翻頁不重複不遺漏，再以 previous_cursor 翻回來"""
+    pages = [paginate_readings(Reading.objects.all(), limit=10)]
+    while pages[-1].has_next:
+        pages.append(paginate_readings(Reading.objects.all(), pages[-1].next_cursor, limit=10))
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert [reading.pk for page in pages for reading in page] == [reading.pk for reading in history]
+    assert not pages[0].has_previous
+
+    back = paginate_readings(Reading.objects.all(), pages[2].previous_cursor, limit=10)
+    assert [reading.pk for reading in back] == [reading.pk for reading in pages[1]]
+    first = paginate_readings(Reading.objects.all(), back.previous_cursor, limit=10)
+    assert [reading.pk for reading in first] == [reading.pk for reading in pages[0]]
+    assert not first.has_previous
+
+
+def test_deep_page_is_single_query(history):
+    """測試任意頁都只需一次查詢（無 COUNT、無 OFFSET）"""
+    cursor = encode_cursor('n', history[19].timestamp, history[19].pk)
+    with CaptureQueriesContext(connection) as queries:
+        page = paginate_readings(Reading.objects.all(), cursor, limit=10)
+    assert len(queries) == 1
+    assert 'OFFSET' not in queries[0]['sql'].upper()
+    assert [reading.pk for reading in page] == [reading.pk for reading in history[20:]]
+
+
+def test_filter_readings_by_station_time_and_value(history, station_b):
+    """測試測站、時間與數值範圍篩選"""
+    Reading.objects.create(station=station_b, timestamp=timezone.now(), temperature=Decimal('21.00'))
+    params = QueryDict(f'station={history[0].station_id}&temperature_min=21&temperature_max=22')
+    assert {reading.station_id for reading in filter_readings(Reading.objects.all(), params)} == {history[0].station_id}
+    assert filter_readings(Reading.objects.all(), params).count() == 11
+
+    with pytest.raises(PaginationError):
+        filter_readings(Reading.objects.all(), QueryDict('start=yesterday'))
+
+
+def test_readings_api_projects_fields(authenticated_client, history):
+    """測試 API 只輸出指定欄位並回傳游標"""
+    url = reverse('station_data:readings_api')
+    response = authenticated_client.get(url, {'fields': 'temperature', 'limit': 20})
+    data = response.json()
+
+    assert response.status_code == 200
+    assert len(data['results']) == 20
+    assert set(data['results'][0]) == {'id', 'station_id', 'timestamp', 'temperature'}
+    assert data['previous_cursor'] is None
+
+    rest = authenticated_client.get(url, {'cursor': data['next_cursor']}).json()
+    assert [row['id'] for row in rest['results']] == [reading.pk for reading in history[20:]]
+    assert rest['next_cursor'] is None
+
+    assert authenticated_client.get(url, {'fields': 'secret'}).status_code == 400
+
+
+def test_admin_reading_list_pages(staff_authenticated_client, station):
+    """測試後台數據記錄列表可翻到第二頁"""
+    now = timezone.now()
+    Reading.objects.bulk_create([Reading(station=station, timestamp=now - timedelta(minutes=i)) for i in range(105)])
+
+    response = staff_authenticated_client.get(reverse('admin_panel:reading_list'))
+    assert len(response.context['readings']) == 100
+
+    response = staff_authenticated_client.get(
+        reverse('admin_panel:reading_list'), {'cursor': response.context['page'].next_cursor}
+    )
+    assert len(response.context['readings']) == 5
+
+
+@pytest.mark.parametrize('params', [
+    {'start': '2024-13-45T00:00:00'},
+    {'end': '9999-12-31T23:59:59-23:59'},
+    {'cursor': base64.urlsafe_b64encode(b'n:99999999999999999999:1').decode()},
+    {'cursor': base64.urlsafe_b64encode(b'n:0:99999999999999999999').decode()},
+    {'temperature_min': 'NaN'},
+    {'temperature_max': 'Infinity'},
+    {'oxygen_min': '-inf'},
+    {'station': '99999999999999999999999'},
+    {'station': '0'},
+    {'station': '1,-5'},
+])
+def test_invalid_parameters_are_rejected(authenticated_client, history, params):
+    """測試格式正確但數值無效的時間、溢位的游標與測站 ID、非有限數值回傳 400 而非 500"""
+    assert authenticated_client.get(reverse('station_data:readings_api'), params).status_code == 400
+    if 'cursor' not in params:
+        assert authenticated_client.get(reverse('station_data:readings_export'), params).status_code == 400
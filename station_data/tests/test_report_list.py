@@ -0,0 +1,74 @@
+"""
+報告列表測試 - 單一統計查詢、延遲載入內容與數量快取
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from station_data import tasks
+from station_data.models import Report
+from station_data.tasks import generate_daily_statistics
+
+
+def _create_reports():
+    Report.objects.bulk_create(
+        [Report(report_type='daily_statistics', title=f'日報 {i}', content={'metrics': list(range(50))}) for i in range(25)]
+        + [Report(report_type='custom', title='自訂')]
+    )
+
+
+def test_report_list_counts_in_one_query(authenticated_client, db):
+    """測試統計與分頁總數共用一次條件彙總查詢，且不載入報告內容"""
+    _create_reports()
+    url = reverse('station_data:report_list')
+
+    with CaptureQueriesContext(connection) as queries:
+        response = authenticated_client.get(url, {'type': 'daily_statistics', 'page': 2})
+    report_queries = [query['sql'] for query in queries.captured_queries if 'station_data_report' in query['sql']]
+
+    assert response.context['report_stats']['total'] == 26
+    assert response.context['report_stats']['daily_statistics'] == 25
+    assert response.context['page_obj'].paginator.num_pages == 2
+    assert len(response.context['page_obj']) == 5
+    assert len(report_queries) == 2  # 統計 + 當頁列表
+    assert '"content"' not in report_queries[-1]
+
+    # 第二次請求統計來自快取
+    with CaptureQueriesContext(connection) as queries:
+        authenticated_client.get(url)
+    assert len([query for query in queries.captured_queries if 'station_data_report' in query['sql']]) == 1
+
+
+def test_report_counts_invalidated_on_create_and_delete(
+    authenticated_client, station, django_capture_on_commit_callbacks,
+):
+    """測試產生報告（bulk_create）與刪除報告後統計重新計算"""
+    url = reverse('station_data:report_list')
+    assert authenticated_client.get(url).context['report_stats']['total'] == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        generate_daily_statistics()
+    assert authenticated_client.get(url).context['report_stats']['daily_statistics'] == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        authenticated_client.post(reverse('station_data:report_delete_all'))
+    assert authenticated_client.get(url).context['report_stats']['total'] == 0
+
+
+def test_delete_all_returns_503_when_broker_is_unavailable(authenticated_client, monkeypatch):
+    """測試無法排入背景任務時回傳 503，不在請求中同步刪除"""
+    _create_reports()
+    calls = []
+
+    def unavailable(*args, **kwargs):
+        calls.append(kwargs)
+        raise ConnectionRefusedError('broker down')
+
+    monkeypatch.setattr(tasks.purge_reports, 'apply_async', unavailable)
+
+    response = authenticated_client.post(reverse('station_data:report_delete_all'))
+
+    assert response.status_code == 503
+    assert response.json()['status'] == 'error'
+    assert calls == [{'retry': False}]
+    assert Report.objects.exists()
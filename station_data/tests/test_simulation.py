@@ -0,0 +1,66 @@
+"""
+station_data.simulation 測試 - 模擬數據批次寫入
+"""
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from data_ingestion.models import Reading
+from data_ingestion.signals import readings_ingested
+from station_data.simulation import OceanDataSimulator, simulate_batch, simulate_data_for_all_stations
+
+
+def test_build_reading_is_not_saved(station):
+    """測試 build_reading 只在記憶體產生數據"""
+    reading = OceanDataSimulator(station=station).build_reading(station)
+
+    assert reading.pk is None
+    assert reading.temperature is not None
+    assert Reading.objects.count() == 0
+
+
+def test_simulate_batch_writes_all_stations_and_steps(multiple_stations):
+    """測試批次產生每個測站 N 個時間步的數據"""
+    end_time = timezone.now()
+    result = simulate_batch(steps=5, interval=timedelta(minutes=1), end_time=end_time, chunk_size=4)
+
+    assert result['count'] == 15
+    assert result['rows_per_sec'] > 0
+    assert Reading.objects.count() == 15
+    for station in multiple_stations:
+        timestamps = list(station.readings.order_by('timestamp').values_list('timestamp', flat=True))
+        assert timestamps[0] == end_time - timedelta(minutes=4)
+        assert timestamps[-1] == end_time
+
+
+def test_simulate_batch_sends_one_ingest_signal(multiple_stations):
+    """測試整批寫入只發送一次 readings_ingested"""
+    received = []
+
+    def handler(sender, readings, **kwargs):
+        received.append(len(readings))
+
+    readings_ingested.connect(handler)
+    try:
+        simulate_batch(steps=2)
+    finally:
+        readings_ingested.disconnect(handler)
+
+    assert received == [6]
+
+
+def test_simulate_data_for_all_stations(multiple_stations):
+    """測試每個測站產生一筆數據並回報寫入速度"""
+    result = simulate_data_for_all_stations()
+
+    assert result['status'] == 'success'
+    assert result['count'] == 3
+    assert 'rows_per_sec' in result
+    assert {r['station_id'] for r in result['readings']} == {s.id for s in multiple_stations}
+
+
+def test_simulate_data_without_stations(db):
+    """測試沒有測站時回傳錯誤"""
+    result = simulate_data_for_all_stations()
+
+    assert result['status'] == 'error'
+    assert result['count'] == 0
@@ -0,0 +1,86 @@
+"""
+station_data.streams 測試 - SSE 即時數據流
+"""
+import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from data_ingestion.models import Reading
+from station_data.broadcast import build_reading_payload, build_update_event
+from station_data.streams import hub, station_event_stream
+
+
+def test_realtime_endpoint_returns_event_stream(authenticated_client, station):
+    """測試 SSE 端點回傳 text/event-stream 且不快取"""
+    response = authenticated_client.get(
+        reverse('station_data:station_detail_realtime', args=[station.id])
+    )
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/event-stream'
+    assert response['Cache-Control'] == 'no-cache'
+
+
+def test_realtime_endpoint_not_found(authenticated_client, db):
+    """測試不存在的測站回傳 404"""
+    response = authenticated_client.get(
+        reverse('station_data:station_detail_realtime', args=[99999])
+    )
+    assert response.status_code == 404
+
+
+def test_event_stream_resumes_from_last_event_id_then_streams_deltas(station):
+    """測試帶 Last-Event-ID 時補送之後的數據，接著只推送新的一筆"""
+    now = timezone.now()
+    first = Reading.objects.create(station=station, timestamp=now - timedelta(minutes=2), temperature=Decimal('20.00'))
+    second = Reading.objects.create(station=station, timestamp=now - timedelta(minutes=1), temperature=Decimal('21.00'))
+    live = Reading(pk=second.pk + 1, station=station, timestamp=now, temperature=Decimal('0.00'))
+
+    async def scenario():
+        stream = station_event_stream(station.id, str(first.id))
+        chunks = [await stream.__anext__(), await stream.__anext__()]
+
+        # 重複的舊數據會被略過，只送出新的一筆
+        layer = get_channel_layer()
+        for reading in (second, live):
+            payload = build_reading_payload(reading, station.station_name)
+            await layer.group_send(f'station_{station.id}', build_update_event(payload))
+        chunks.append(await stream.__anext__())
+
+        await stream.aclose()
+        return chunks
+
+    retry, replayed, delta = async_to_sync(scenario)()
+
+    assert retry.startswith('retry:')
+    assert f'id: {second.id}\n' in replayed
+    assert f'id: {live.pk}\n' in delta
+    assert '"temperature": 0.0' in delta
+    assert hub.subscriber_count(station.id) == 0
+
+
+def test_hub_shares_one_listener_per_station(station):
+    """測試同一測站的多個連線共用一個監聽器"""
+    async def scenario():
+        first = await hub.subscribe(station.id)
+        second = await hub.subscribe(station.id)
+        shared = len(hub.subscriptions)
+        count = hub.subscriber_count(station.id)
+
+        payload = {'reading_id': 1, 'station_id': station.id}
+        hub.subscriptions[station.id].publish(payload)
+        received = [first.get_nowait(), second.get_nowait()]
+
+        await hub.unsubscribe(station.id, first)
+        await hub.unsubscribe(station.id, second)
+        return shared, count, received
+
+    shared, count, received = async_to_sync(scenario)()
+
+    assert shared == 1
+    assert count == 2
+    assert received[0] is received[1]
+    assert station.id not in hub.subscriptions
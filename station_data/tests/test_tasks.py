@@ -0,0 +1,70 @@
+"""
+station_data.tasks 測試 - 每日統計報告
+"""
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from data_ingestion.models import Station, Reading
+from station_data.models import Report
+from station_data.tasks import generate_daily_statistics
+
+
+def create_today_readings(station, temperatures):
+    now = timezone.now()
+    Reading.objects.bulk_create([
+        Reading(station=station, timestamp=now, temperature=Decimal(str(value)), salinity=Decimal('33.0'))
+        for value in temperatures
+    ])
+
+
+def test_generate_daily_statistics_system_and_station_reports(station, station_b):
+    """測試全系統統計由各測站分組結果正確合併"""
+    create_today_readings(station, [20.0, 22.0])
+    create_today_readings(station_b, [0.0, 26.0, 28.0])
+
+    result = generate_daily_statistics()
+
+    assert result['total_readings'] == 5
+    assert result['station_report_count'] == 2
+
+    system_report = Report.objects.get(pk=result['system_report_id'])
+    averages = system_report.content['averages']
+    assert averages['temperature'] == pytest.approx(19.2)
+    assert averages['min_temperature'] == 0.0
+    assert averages['max_temperature'] == 28.0
+    assert averages['ph'] is None
+
+    station_report = Report.objects.get(report_type='station_daily', station=station_b)
+    assert station_report.content['total_readings'] == 3
+    assert station_report.content['averages']['temperature'] == pytest.approx(18.0)
+
+
+def test_generate_daily_statistics_skips_stations_without_data(station, station_b):
+    """測試今日無數據的測站不產生測站報告，但仍列在全系統統計中"""
+    create_today_readings(station, [25.0])
+
+    result = generate_daily_statistics()
+
+    assert result['station_report_count'] == 1
+    counts = {item['station_name']: item['today_count'] for item in result['station_stats']}
+    assert counts == {station.station_name: 1, station_b.station_name: 0}
+
+
+def test_generate_daily_statistics_query_count_is_flat(db):
+    """測試查詢數不隨測站數增加"""
+    def run_with_stations(count):
+        Report.objects.all().delete()
+        for index in range(Station.objects.count(), count):
+            station = Station.objects.create(
+                station_name=f'測站{index}', device_model='CR1000X', location='測試港', install_date='2024-01-01'
+            )
+            create_today_readings(station, [25.0])
+        with CaptureQueriesContext(connection) as queries:
+            generate_daily_statistics()
+        return len(queries)
+
+    assert run_with_stations(2) == run_with_stations(8)
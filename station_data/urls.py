@@ -10,6 +10,8 @@ urlpatterns = [
     path('<int:station_id>/realtime/', views.station_detail_realtime, name='station_detail_realtime'),
     path('<int:station_id>/chart-data/', views.get_chart_data_ajax, name='get_chart_data_ajax'),
     path('readings/', views.reading_list, name='reading_list'),
+    path('api/readings/', views.readings_api, name='readings_api'),
+    path('export/', views.readings_export, name='readings_export'),
 
     # 報告相關路由
     path('reports/', views.report_list, name='report_list'),
@@ -17,4 +19,5 @@ urlpatterns = [
     path('reports/<int:report_id>/delete/', views.report_delete, name='report_delete'),
     path('reports/delete-all/', views.report_delete_all, name='report_delete_all'),
     path('reports/<int:report_id>/insight/', views.report_insight, name='report_insight'),
+    path('tasks/<str:task_id>/', views.task_status, name='task_status'),
 ]
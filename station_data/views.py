@@ -1,15 +1,61 @@
 #ocean_monitor\station_data\views.py
 import json
-from django.shortcuts import render, get_object_or_404
-from django.http import StreamingHttpResponse, JsonResponse
+import logging
+from datetime import timedelta
+import orjson
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse, JsonResponse
 from django.views.decorators.http import condition
 from django.core.paginator import Paginator
+from django.db.models import Count, Q
 from django.contrib.auth.decorators import login_required
+from django.utils import timezone
 from data_ingestion.models import Station, Reading
+from data_ingestion.sketches import range_percentiles
 from station_data.models import Report
-from analysis_tools.calculations import calculate_statistics
-from analysis_tools.chart_helpers import prepare_chart_data
-import time
+from analysis_tools.calculations import calculate_field_statistics
+from analysis_tools.chart_helpers import (
+    DEFAULT_MAX_POINTS, DOWNSAMPLE_METHODS, build_chart_data, dumps_chart_data,
+)
+from .caching import get_or_compute, get_report_counts, invalidate_report_counts
+from .exports import EXPORT_FORMATS, ExportError, aiter_blocks, export_blocks, export_filename
+from .pagination import (
+    DEFAULT_PAGE_SIZE, PaginationError, apply_reading_filters, filter_readings, paginate_readings, parse_fields,
+    parse_page_size, parse_reading_filters,
+)
+from .stats import station_reading_count
+from .streams import station_event_stream
+
+logger = logging.getLogger(__name__)
+
+# 圖表時間範圍（None 表示全部數據）
+TIME_RANGES = {
+    '1h': timedelta(hours=1),
+    '6h': timedelta(hours=6),
+    '12h': timedelta(hours=12),
+    '24h': timedelta(hours=24),
+    '3d': timedelta(days=3),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    'all': None,
+}
+
+DEFAULT_TIME_RANGE = '24h'
+
+# points 參數上限
+MAX_CHART_POINTS = 5000
+
+
+def normalize_time_range(time_range):
+    """未知的時間範圍代碼視為 24h（快取鍵與模板只使用 TIME_RANGES 的鍵）"""
+    return time_range if time_range in TIME_RANGES else DEFAULT_TIME_RANGE
+
+
+def resolve_time_range(time_range):
+    """時間範圍代碼轉為起始時間；未知代碼視為 24h，'all' 回傳 None"""
+    time_delta = TIME_RANGES[normalize_time_range(time_range)]
+    return timezone.now() - time_delta if time_delta else None
 
 
 @login_required
@@ -19,275 +65,296 @@ def station_list(request):
     return render(request, 'station_data/station_list.html', context)
 
 
-@login_required
-def station_detail(request, station_id):
-    from django.utils import timezone
-    from datetime import timedelta
-
-    station = get_object_or_404(Station, pk=station_id)
-
-    # 獲取時間範圍參數 (默認為最近 24 小時)
-    time_range = request.GET.get('time_range', '24h')
-
-    # 根據時間範圍計算起始時間
-    now = timezone.now()
-    time_ranges = {
-        '1h': timedelta(hours=1),
-        '6h': timedelta(hours=6),
-        '12h': timedelta(hours=12),
-        '24h': timedelta(hours=24),
-        '3d': timedelta(days=3),
-        '7d': timedelta(days=7),
-        '30d': timedelta(days=30),
-        'all': None,
-    }
+def _gps_points(readings, station_name=None):
+    """GPS 軌跡點（readings 為新到舊，輸出為舊到新）"""
+    gps_points = []
+    for reading in reversed(list(readings)):
+        gps_points.append({
+            'station_name': station_name or reading.station.station_name,
+            'latitude': float(reading.latitude),
+            'longitude': float(reading.longitude),
+            'timestamp': reading.timestamp.isoformat(),
+            'temperature': float(reading.temperature) if reading.temperature else None,
+            'ph': float(reading.ph) if reading.ph else None,
+            'oxygen': float(reading.oxygen) if reading.oxygen else None,
+        })
+    return gps_points
 
-    time_delta = time_ranges.get(time_range, timedelta(hours=24))
 
+def _station_detail_data(station, start_time):
+    """station_detail 中與使用者無關、只隨數據變動的部分（可快取）"""
     # 獲取數據
-    if time_delta:
-        start_time = now - time_delta
+    if start_time:
         all_readings = station.readings.filter(timestamp__gte=start_time).order_by('-timestamp')
     else:
         all_readings = station.readings.all().order_by('-timestamp')
 
     # 表格顯示最新 50 筆
-    readings = all_readings[:50]
+    readings = list(all_readings[:50])
 
-    # 圖表使用篩選後的所有數據
-    chart_readings = all_readings[:200]  # 限制最多 200 筆避免圖表過於擁擠
+    # 四個參數的統計一次掃描完成
+    stats = calculate_field_statistics(readings, ['temperature', 'ph', 'oxygen', 'salinity'])
 
-    stats = {
-        'temperature': calculate_statistics(readings, 'temperature'),
-        'ph': calculate_statistics(readings, 'ph'),
-        'oxygen': calculate_statistics(readings, 'oxygen'),
-        'salinity': calculate_statistics(readings, 'salinity'),
+    # 圖表涵蓋整個時間範圍，降採樣到固定點數（保留突波）
+    chart_data, _ = build_chart_data(station, start=start_time, as_arrays=True)
+
+    # 獲取該測站的 GPS 軌跡數據（最新 100 筆），按時間順序排序以正確顯示軌跡（從舊到新）
+    gps_points = _gps_points(
+        station.readings.filter(
+            latitude__isnull=False,
+            longitude__isnull=False
+        ).order_by('-timestamp')[:100],
+        station.station_name,
+    )
+
+    return {
+        'readings': readings,
+        'stats': stats,
+        'total_count': station_reading_count(station.id),
+        'chart_data_json': dumps_chart_data(chart_data).decode(),
+        'gps_points': gps_points,
+        'gps_points_json': json.dumps(gps_points),
     }
 
-    chart_data = prepare_chart_data(chart_readings)
 
-    # 獲取該測站的 GPS 軌跡數據（最新 100 筆）
-    latest_gps_readings = station.readings.filter(
-        latitude__isnull=False,
-        longitude__isnull=False
-    ).order_by('-timestamp')[:100]
+def _reading_page(readings, cursor, limit=DEFAULT_PAGE_SIZE):
+    """HTML 表格的 keyset 分頁；游標無效時回到最新一頁"""
+    try:
+        return paginate_readings(readings, cursor, limit)
+    except PaginationError:
+        return paginate_readings(readings, None, limit)
 
-    # 按時間順序排序以正確顯示軌跡（從舊到新）
-    gps_points = []
-    for reading in reversed(list(latest_gps_readings)):
-        gps_points.append({
-            'station_name': station.station_name,
-            'latitude': float(reading.latitude),
-            'longitude': float(reading.longitude),
-            'timestamp': reading.timestamp.isoformat(),
-            'temperature': float(reading.temperature) if reading.temperature else None,
-            'ph': float(reading.ph) if reading.ph else None,
-            'oxygen': float(reading.oxygen) if reading.oxygen else None,
-        })
 
-    # 獲取該測站最新的 100 筆數據記錄
-    latest_readings = station.readings.order_by('-timestamp')[:100]
+@login_required
+def station_detail(request, station_id):
+    station = get_object_or_404(Station, pk=station_id)
+
+    # 獲取時間範圍參數 (默認為最近 24 小時)
+    time_range = normalize_time_range(request.GET.get('time_range'))
+    start_time = resolve_time_range(time_range)
+    cursor = request.GET.get('cursor', '')
+
+    # 數據部分依 (測站, 時間範圍, 數據版本) 快取，新數據寫入後自動失效
+    data = get_or_compute(
+        'station_detail',
+        lambda: _station_detail_data(station, start_time),
+        station_id=station.id,
+        time_range=time_range,
+    )
+
+    # 完整數據記錄表格（每頁 100 筆，keyset 分頁）
+    latest_readings = get_or_compute(
+        'station_readings',
+        lambda: _reading_page(station.readings.all(), cursor),
+        station_id=station.id,
+        extra=(cursor,),
+    )
 
     context = {
         'station': station,
-        'readings': readings,
-        'stats': stats,
-        'total_count': station.readings.count(),
-        'chart_data_json': json.dumps(chart_data),
         'time_range': time_range,
-        'gps_points': gps_points,
-        'gps_points_json': json.dumps(gps_points),
         'latest_readings': latest_readings,
+        **data,
     }
     return render(request, 'station_data/station_detail.html', context)
 
 
-@login_required
-def reading_list(request):
-    """數據記錄列表 - 包含 GPS 軌跡地圖"""
-    # 表格顯示最新 100 筆
-    readings = Reading.objects.select_related('station').order_by('-timestamp')[:100]
+def _reading_list_data(cursor):
+    # 表格每頁 100 筆（keyset 分頁）
+    readings = _reading_page(Reading.objects.select_related('station'), cursor)
 
-    # 地圖只顯示最新 100 個 GPS 點（更清晰、載入更快）
-    latest_gps_readings = Reading.objects.select_related('station').filter(
+    # 地圖只顯示最新 100 個 GPS 點（更清晰、載入更快），反轉順序使最舊的在前
+    gps_points = _gps_points(Reading.objects.select_related('station').filter(
         latitude__isnull=False,
         longitude__isnull=False
-    ).order_by('-timestamp')[:100]  # 最新 100 筆
+    ).order_by('-timestamp')[:100])
 
-    # 按時間順序排序以正確顯示軌跡（從舊到新）
-    gps_points = []
-    for reading in reversed(list(latest_gps_readings)):  # 反轉順序使最舊的在前
-        gps_points.append({
-            'station_name': reading.station.station_name,
-            'latitude': float(reading.latitude),
-            'longitude': float(reading.longitude),
-            'timestamp': reading.timestamp.isoformat(),
-            'temperature': float(reading.temperature) if reading.temperature else None,
-            'ph': float(reading.ph) if reading.ph else None,
-            'oxygen': float(reading.oxygen) if reading.oxygen else None,
-        })
-
-    context = {
-        'readings': readings,
+    return {
+        'readings': readings.items,
+        'page': readings,
         'gps_points': gps_points,
         'gps_points_json': json.dumps(gps_points),
     }
+
+
+@login_required
+def reading_list(request):
+    """數據記錄列表 - 包含 GPS 軌跡地圖"""
+    cursor = request.GET.get('cursor', '')
+    context = get_or_compute('reading_list', lambda: _reading_list_data(cursor), extra=(cursor,))
     return render(request, 'station_data/reading_list.html', context)
 
 
 @login_required
-def get_chart_data_ajax(request, station_id):
-    """AJAX 端點 - 獲取圖表數據"""
-    from django.utils import timezone
-    from datetime import timedelta
-    from django.http import JsonResponse
+def readings_api(request):
+    """
+    數據記錄 JSON API（keyset 分頁）
 
-    station = get_object_or_404(Station, pk=station_id)
-    time_range = request.GET.get('time_range', '24h')
-
-    # 時間範圍映射
-    now = timezone.now()
-    time_ranges = {
-        '1h': timedelta(hours=1),
-        '6h': timedelta(hours=6),
-        '12h': timedelta(hours=12),
-        '24h': timedelta(hours=24),
-        '3d': timedelta(days=3),
-        '7d': timedelta(days=7),
-        '30d': timedelta(days=30),
-        'all': None,
-    }
+    查詢參數：
+    - cursor：上一次回應的 next_cursor（較舊）或 previous_cursor（較新）
+    - limit：每頁筆數（預設 100，上限 1000）
+    - station、start、end、<欄位>_min、<欄位>_max：篩選條件
+    - fields：要輸出的數值欄位（逗號分隔），只查詢這些欄位
+    """
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        readings = filter_readings(Reading.objects.all(), request.GET)
+        page = paginate_readings(
+            readings.values('id', 'station_id', 'timestamp', *fields),
+            request.GET.get('cursor'),
+            parse_page_size(request.GET.get('limit')),
+        )
+    except PaginationError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    body = orjson.dumps(
+        {
+            'status': 'success',
+            'results': page.items,
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        },
+        default=float,  # Decimal
+    )
+    return HttpResponse(body, content_type='application/json')
 
-    time_delta = time_ranges.get(time_range, timedelta(hours=24))
 
-    # 獲取數據
-    if time_delta:
-        start_time = now - time_delta
-        chart_readings = station.readings.filter(timestamp__gte=start_time).order_by('-timestamp')[:200]
-    else:
-        chart_readings = station.readings.all().order_by('-timestamp')[:200]
+@login_required
+def readings_export(request):
+    """
+    串流匯出數據記錄
+
+    查詢參數：format（csv / ndjson / parquet）、gzip=1、fields，
+    以及與數據記錄 API 相同的 station、start、end、<欄位>_min、<欄位>_max 篩選條件
+    """
+    export_format = request.GET.get('format', 'csv')
+    gzip = request.GET.get('gzip') in ('1', 'true')
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        filters = parse_reading_filters(request.GET)
+        readings = apply_reading_filters(Reading.objects.all(), filters)
+        blocks = export_blocks(readings, export_format, fields, gzip=gzip, archive_filters=filters)
+    except (PaginationError, ExportError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    # ASGI 下改用非同步迭代，避免 Django 先把同步產生器整個讀進記憶體
+    content = aiter_blocks(blocks) if isinstance(request, ASGIRequest) else blocks
+    response = StreamingHttpResponse(
+        content,
+        content_type='application/gzip' if gzip else EXPORT_FORMATS[export_format][1],
+    )
+    station_ids = request.GET.getlist('station')
+    filename = export_filename(export_format, gzip, station_ids[0] if len(station_ids) == 1 else None)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
-    # 準備圖表數據
-    chart_data = prepare_chart_data(chart_readings)
 
-    return JsonResponse({
-        'status': 'success',
-        'chart_data': chart_data,
-        'time_range': time_range,
-    })
+@login_required
+def get_chart_data_ajax(request, station_id):
+    """
+    AJAX 端點 - 獲取圖表數據
+
+    查詢參數：time_range（預設 24h）、method（lttb / minmax）、points（輸出點數）
+    回應另含範圍內溫度與溶氧的 P5 / P50 / P95（percentiles）
+    """
+
+    station = get_object_or_404(Station, pk=station_id)
+    # 先正規化再組快取鍵，任意參數值不會各自佔用一個快取項目
+    time_range = normalize_time_range(request.GET.get('time_range'))
+    method = request.GET.get('method')
+    if method not in DOWNSAMPLE_METHODS:
+        method = 'lttb'
+    try:
+        max_points = min(max(int(request.GET.get('points', DEFAULT_MAX_POINTS)), 10), MAX_CHART_POINTS)
+    except ValueError:
+        max_points = DEFAULT_MAX_POINTS
+
+    def compute():
+        start = resolve_time_range(time_range)
+        # 整個時間範圍降採樣到固定點數（原始數據或彙總）
+        chart_data, sampling = build_chart_data(
+            station,
+            start=start,
+            max_points=max_points,
+            method=method,
+            as_arrays=True,
+        )
+        return dumps_chart_data({
+            'status': 'success',
+            'chart_data': chart_data,
+            'time_range': time_range,
+            'sampling': sampling,
+            # 百分位數由分位數摘要合併，不讀原始數據
+            'percentiles': range_percentiles([station.id], start=start),
+        })
+
+    # 快取序列化後的 JSON，命中時不需要重新查詢與序列化
+    body = get_or_compute(
+        'chart_data',
+        compute,
+        station_id=station.id,
+        time_range=time_range,
+        extra=(method, max_points),
+    )
+    return HttpResponse(body, content_type='application/json')
 
 
 @login_required
-def station_detail_realtime(request, station_id):
+async def station_detail_realtime(request, station_id):
     """
     實時推送站點數據的端點（使用 Server-Sent Events）
 
-    前端可以使用 EventSource 連接此端點，接收實時數據更新
+    前端可以使用 EventSource 連接此端點，接收實時數據更新。
+    每筆新數據以 `event: reading` 送出，事件 id 為 reading_id；
+    瀏覽器重連時帶回 Last-Event-ID 即可補送斷線期間的數據。
     """
-    station = get_object_or_404(Station, pk=station_id)
-    
-    def event_stream():
-        """生成實時數據流"""
-        last_reading_id = None
-        
-        while True:
-            try:
-                # 每 5 秒檢查一次是否有新數據
-                # 在生產環境中，你可能想增加檢查間隔
-                time.sleep(5)
-                
-                # 獲取最新的數據記錄
-                latest_reading = station.readings.order_by('-timestamp').first()
-                
-                # 如果有新數據，推送給客戶端
-                if latest_reading and (last_reading_id is None or latest_reading.id != last_reading_id):
-                    last_reading_id = latest_reading.id
-                    
-                    # 獲取統計數據
-                    readings = station.readings.all()[:50]
-                    stats = {
-                        'temperature': calculate_statistics(readings, 'temperature'),
-                        'ph': calculate_statistics(readings, 'ph'),
-                        'oxygen': calculate_statistics(readings, 'oxygen'),
-                        'salinity': calculate_statistics(readings, 'salinity'),
-                    }
-                    
-                    # 準備圖表數據
-                    chart_data = prepare_chart_data(readings)
-                    
-                    # 構造要發送的數據
-                    data = {
-                        'status': 'success',
-                        'station_id': station.id,
-                        'station_name': station.station_name,
-                        'latest_reading': {
-                            'id': latest_reading.id,
-                            'timestamp': latest_reading.timestamp.isoformat(),
-                            'temperature': float(latest_reading.temperature) if latest_reading.temperature else None,
-                            'ph': float(latest_reading.ph) if latest_reading.ph else None,
-                            'oxygen': float(latest_reading.oxygen) if latest_reading.oxygen else None,
-                            'salinity': float(latest_reading.salinity) if latest_reading.salinity else None,
-                            'conductivity': float(latest_reading.conductivity) if latest_reading.conductivity else None,
-                            'pressure': float(latest_reading.pressure) if latest_reading.pressure else None,
-                            'fluorescence': float(latest_reading.fluorescence) if latest_reading.fluorescence else None,
-                            'turbidity': float(latest_reading.turbidity) if latest_reading.turbidity else None,
-                        },
-                        'stats': {
-                            'temperature': stats['temperature'],
-                            'ph': stats['ph'],
-                            'oxygen': stats['oxygen'],
-                            'salinity': stats['salinity'],
-                        },
-                        'chart_data': chart_data,
-                        'total_count': station.readings.count(),
-                    }
-                    
-                    # 以 SSE 格式發送數據
-                    yield f"data: {json.dumps(data)}\n\n"
-                    
-            except Exception as e:
-                # 發送錯誤信息
-                error_data = {
-                    'status': 'error',
-                    'message': str(e)
-                }
-                yield f"data: {json.dumps(error_data)}\n\n"
-                break
-    
-    # 返回 SSE 流響應
-    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    station = await aget_object_or_404(Station, pk=station_id)
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+
+    # 返回 SSE 流響應（非同步產生器，不會佔用 worker 執行緒）
+    response = StreamingHttpResponse(
+        station_event_stream(station.id, last_event_id),
+        content_type='text/event-stream',
+    )
     response['Cache-Control'] = 'no-cache'
     response['X-Accel-Buffering'] = 'no'
     return response
 
 
+def _report_counts():
+    """全部與各類型的報告數量（單一條件彙總查詢）"""
+    return Report.objects.aggregate(
+        total=Count('id'),
+        **{
+            report_type: Count('id', filter=Q(report_type=report_type))
+            for report_type, _ in Report.REPORT_TYPES
+        },
+    )
+
+
 @login_required
 def report_list(request):
     """報告列表頁面"""
     # 獲取查詢參數
     report_type = request.GET.get('type', '')
 
-    # 基本查詢
-    reports = Report.objects.all()
+    # 列表不顯示報告內容，延遲載入 content（JSON）
+    reports = Report.objects.defer('content')
 
     # 根據類型過濾
     if report_type:
         reports = reports.filter(report_type=report_type)
 
-    # 分頁
+    # 統計不同類型的報告數量（快取，報告新增 / 刪除時失效）
+    report_stats = get_report_counts(_report_counts)
+
+    # 分頁：總數直接取自統計，不另外 COUNT
     paginator = Paginator(reports, 20)  # 每頁 20 個報告
+    paginator.count = report_stats.get(report_type, 0) if report_type else report_stats['total']
     page_number = request.GET.get('page', 1)
     page_obj = paginator.get_page(page_number)
 
-    # 統計不同類型的報告數量
-    report_stats = {
-        'total': Report.objects.count(),
-        'daily_statistics': Report.objects.filter(report_type='daily_statistics').count(),
-        'data_update': Report.objects.filter(report_type='data_update').count(),
-        'alert_check': Report.objects.filter(report_type='alert_check').count(),
-        'custom': Report.objects.filter(report_type='custom').count(),
-    }
-
     context = {
         'page_obj': page_obj,
         'report_stats': report_stats,
@@ -314,20 +381,50 @@ def report_delete(request, report_id):
     if request.method == 'POST':
         report = get_object_or_404(Report, pk=report_id)
         report.delete()
+        invalidate_report_counts()
         return JsonResponse({'status': 'success', 'message': '報告已刪除'})
     return JsonResponse({'status': 'error', 'message': '無效的請求方法'}, status=400)
 
 
 @login_required
 def report_delete_all(request):
-    """刪除所有報告"""
+    """刪除所有報告（交給背景任務，立即回傳 task_id）"""
     if request.method == 'POST':
-        count = Report.objects.count()
-        Report.objects.all().delete()
-        return JsonResponse({'status': 'success', 'message': f'已刪除 {count} 個報告'})
+        from .tasks import purge_reports
+
+        try:
+            # broker 無法連線時立即失敗，不在請求中重試，也不改為同步刪除（報告量大時會逾時）
+            task = purge_reports.apply_async(retry=False)
+        except Exception:
+            logger.exception('無法排入刪除報告的背景任務')
+            return JsonResponse({'status': 'error', 'message': '背景任務服務暫時無法使用，請稍後再試'}, status=503)
+        return JsonResponse(
+            {'status': 'accepted', 'task_id': task.id, 'message': '已開始在背景刪除報告'},
+            status=202,
+        )
     return JsonResponse({'status': 'error', 'message': '無效的請求方法'}, status=400)
 
 
+@login_required
+def task_status(request, task_id):
+    """背景任務狀態（刪除進度等）"""
+    from celery.result import AsyncResult
+
+    try:
+        result = AsyncResult(task_id)
+        state = result.state
+        info = result.info
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=503)
+
+    data = {'status': 'success', 'task_id': task_id, 'state': state}
+    if isinstance(info, dict):
+        data.update({key: info[key] for key in ('deleted', 'total') if key in info})
+    elif isinstance(info, Exception):
+        data['message'] = str(info)
+    return JsonResponse(data)
+
+
 @login_required
 def report_insight(request, report_id):
     """